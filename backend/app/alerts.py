@@ -0,0 +1,254 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from prometheus_client import Counter
+from sqlalchemy import bindparam, select, update
+
+from . import models, schemas
+from .collectors import collector
+from .database import SessionLocal
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+OPEN_STATUSES = ("active", "acknowledged")
+
+ALERTS_DEDUPLICATED = Counter(
+    'maintenance_alerts_deduplicated_total',
+    'Alert submissions merged into an open alert with the same equipment, type and title'
+)
+
+ALERTS_SUPPRESSED = Counter(
+    'maintenance_alerts_suppressed_total',
+    'Repeats during an alert storm that were counted in memory instead of written immediately'
+)
+
+AlertKey = Tuple[int, str, str]
+
+
+def _row_values(alert: models.MaintenanceAlert) -> dict:
+    return {column.key: getattr(alert, column.key) for column in models.MaintenanceAlert.__table__.columns}
+
+
+class _OpenAlert:
+    """What the index knows about an open alert: its row values and the repeat rate of its key"""
+
+    __slots__ = ("values", "window_start", "window_count", "pending", "pending_last_seen")
+
+    def __init__(self, alert: models.MaintenanceAlert):
+        self.values = _row_values(alert)
+        self.window_start: Optional[datetime] = None
+        self.window_count = 0
+        self.pending = 0
+        self.pending_last_seen: Optional[datetime] = None
+
+    @property
+    def id(self) -> int:
+        return self.values["id"]
+
+
+class AlertDeduplicator:
+    """Merges repeats of open alerts and absorbs alert storms
+
+    An alert is identified by (equipment_id, type, title). While one is open
+    (active or acknowledged), submitting it again increments occurrence_count
+    and moves last_seen_at with a single UPDATE instead of inserting a row.
+    When a key repeats more than `storm_threshold` times within
+    `storm_window` seconds, further repeats are only counted in memory and
+    written in one batch every `flush_interval` seconds.
+
+    The index is per process and filled lazily: a key that is not indexed is
+    looked up in the database once. Alerts resolved elsewhere are detected by
+    the UPDATE matching no open row.
+    """
+
+    def __init__(self, session_factory=SessionLocal,
+                 storm_threshold: int = settings.alert_storm_threshold,
+                 storm_window: float = settings.alert_storm_window_seconds,
+                 flush_interval: float = settings.alert_flush_interval):
+        self.session_factory = session_factory
+        self.storm_threshold = storm_threshold
+        self.storm_window = storm_window
+        self.flush_interval = flush_interval
+        self._index: Dict[AlertKey, _OpenAlert] = {}
+        self._keys_by_id: Dict[int, AlertKey] = {}
+        self._creating: Dict[AlertKey, asyncio.Future] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Flushing suppressed alert counts failed")
+
+    def clear(self):
+        self._index.clear()
+        self._keys_by_id.clear()
+
+    async def submit(self, db, alert: schemas.MaintenanceAlertCreate):
+        key = (alert.equipment_id, alert.type, alert.title)
+        now = datetime.now()
+        while True:
+            entry = self._index.get(key)
+            if entry is not None:
+                merged = await self._repeat(db, entry, now)
+                if merged is not None:
+                    return merged
+                continue
+            creating = self._creating.get(key)
+            if creating is not None:
+                # Another request is looking up or inserting this key; use its result
+                await asyncio.shield(creating)
+                continue
+            return await self._lookup_or_insert(db, key, alert, now)
+
+    async def _repeat(self, db, entry: _OpenAlert, now: datetime):
+        """Merge a repeat into the open alert; None if it has been resolved in the meantime"""
+        if entry.window_start is None or (now - entry.window_start).total_seconds() > self.storm_window:
+            entry.window_start, entry.window_count = now, 0
+        entry.window_count += 1
+        ALERTS_DEDUPLICATED.inc()
+
+        if entry.window_count > self.storm_threshold:
+            ALERTS_SUPPRESSED.inc()
+            entry.pending += 1
+            entry.pending_last_seen = now
+            entry.values["occurrence_count"] += 1
+            entry.values["last_seen_at"] = now
+            return schemas.MaintenanceAlert.model_validate(entry.values)
+
+        # Take the repeats counted in memory so far; ones arriving during the UPDATE stay pending
+        included, entry.pending = entry.pending, 0
+        try:
+            result = await db.scalars(
+                update(models.MaintenanceAlert)
+                .where(models.MaintenanceAlert.id == entry.id, models.MaintenanceAlert.status.in_(OPEN_STATUSES))
+                .values(occurrence_count=models.MaintenanceAlert.occurrence_count + 1 + included, last_seen_at=now)
+                .returning(models.MaintenanceAlert)
+            )
+            db_alert = result.one_or_none()
+            await db.commit()
+        except BaseException:
+            entry.pending += included
+            raise
+        if db_alert is None:
+            self._forget(entry.id)
+            return None
+        entry.values = _row_values(db_alert)
+        return db_alert
+
+    async def _lookup_or_insert(self, db, key: AlertKey, alert: schemas.MaintenanceAlertCreate, now: datetime):
+        self._creating[key] = asyncio.get_running_loop().create_future()
+        try:
+            equipment_id, alert_type, title = key
+            db_alert = await db.scalar(
+                select(models.MaintenanceAlert)
+                .where(models.MaintenanceAlert.equipment_id == equipment_id,
+                       models.MaintenanceAlert.type == alert_type,
+                       models.MaintenanceAlert.title == title,
+                       models.MaintenanceAlert.status.in_(OPEN_STATUSES))
+                .order_by(models.MaintenanceAlert.id.desc())
+                .limit(1)
+            )
+            if db_alert is not None:
+                self._remember(key, db_alert)
+                return await self._repeat(db, self._index[key], now) or db_alert
+
+            db_alert = models.MaintenanceAlert(**alert.dict(), last_seen_at=now)
+            db.add(db_alert)
+            await db.commit()
+            collector.mark_dirty()
+            self._remember(key, db_alert)
+            return db_alert
+        finally:
+            self._creating.pop(key).set_result(None)
+
+    def _remember(self, key: AlertKey, alert: models.MaintenanceAlert):
+        self._index[key] = _OpenAlert(alert)
+        self._keys_by_id[alert.id] = key
+
+    def _forget(self, alert_id: int) -> Optional[_OpenAlert]:
+        key = self._keys_by_id.pop(alert_id, None)
+        return self._index.pop(key, None) if key is not None else None
+
+    async def flush(self):
+        """Write the repeats counted in memory during storms to alerts that are still open
+
+        The counts are taken before the write so that a concurrent flush does
+        not write them twice, and given back if the write fails.
+        """
+        entries = [entry for entry in self._index.values() if entry.pending]
+        if not entries:
+            return
+        params = [
+            {"alert_id": entry.id, "increment": entry.pending, "seen": entry.pending_last_seen}
+            for entry in entries
+        ]
+        for entry in entries:
+            entry.pending = 0
+        table = models.MaintenanceAlert.__table__
+        try:
+            async with self.session_factory() as db:
+                conn = await db.connection()
+                await conn.execute(
+                    table.update()
+                    .where(table.c.id == bindparam("alert_id"), table.c.status != "resolved")
+                    .values(occurrence_count=table.c.occurrence_count + bindparam("increment"),
+                            last_seen_at=bindparam("seen")),
+                    params
+                )
+                await db.commit()
+        except BaseException:
+            for entry, row in zip(entries, params):
+                entry.pending += row["increment"]
+            raise
+
+    async def set_status(self, db, alert_ids: List[int], status: str) -> int:
+        """Bulk acknowledge or resolve; resolving sets resolved_at and closes the alerts for deduplication"""
+        await self.flush()
+        values = {"status": status}
+        allowed = OPEN_STATUSES
+        if status == "resolved":
+            values["resolved_at"] = datetime.now()
+        elif status == "acknowledged":
+            allowed = ("active",)
+        else:
+            raise ValueError(f"Unsupported alert status {status!r}")
+        result = await db.scalars(
+            update(models.MaintenanceAlert)
+            .where(models.MaintenanceAlert.id.in_(alert_ids), models.MaintenanceAlert.status.in_(allowed))
+            .values(**values)
+            .returning(models.MaintenanceAlert.id),
+            execution_options={"synchronize_session": False}
+        )
+        updated = result.all()
+        await db.commit()
+        for alert_id in updated:
+            if status == "resolved":
+                self._forget(alert_id)
+            elif alert_id in self._keys_by_id:
+                self._index[self._keys_by_id[alert_id]].values["status"] = status
+        if updated:
+            collector.mark_dirty()
+        return len(updated)
+
+
+deduplicator = AlertDeduplicator()
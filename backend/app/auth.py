@@ -8,6 +8,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from . import models, schemas
 from .database import SessionLocal
+from .collectors import collector
 
 import os
 from dotenv import load_dotenv
@@ -55,25 +56,37 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+async def get_user_from_token(db: AsyncSession, token: str) -> Optional[models.User]:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
         if email is None:
-            raise credentials_exception
+            return None
         token_data = schemas.TokenData(email=email)
     except JWTError:
-        raise credentials_exception
-    user = await get_user_by_email(db, email=token_data.email)
+        return None
+    return await get_user_by_email(db, email=token_data.email)
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    user = await get_user_from_token(db, token)
     if user is None:
         raise credentials_exception
+    collector.record_user_activity(user.id)
     return user
 
+async def get_current_admin(current_user: models.User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required",
+        )
+    return current_user
+
 async def create_user(db: AsyncSession, user: schemas.UserCreate):
     hashed_password = get_password_hash(user.password)
     db_user = models.User(
@@ -85,5 +98,4 @@ async def create_user(db: AsyncSession, user: schemas.UserCreate):
     )
     db.add(db_user)
     await db.commit()
-    await db.refresh(db_user)
     return db_user
\ No newline at end of file
@@ -0,0 +1,228 @@
+import asyncio
+import logging
+import re
+from bisect import bisect_left
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import func, or_, select
+
+from . import models
+from .database import SessionLocal
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+_SEP = "\x00"  # sorts before any character, so a key's token is matched as a prefix
+_END = "\U0010ffff"
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return re.findall(r"\w+", (text or "").lower())
+
+
+class Suggestion(NamedTuple):
+    id: int
+    name: str
+    type: Optional[str]
+    location: Optional[str]
+
+
+class _Entry(NamedTuple):
+    suggestion: Suggestion
+    name_keys: Tuple[str, ...]
+    other_keys: Tuple[str, ...]
+    tokens: frozenset
+
+
+class _SortedKeys:
+    """Sorted "token NUL name NUL id" keys with the equipment id of each key alongside"""
+
+    def __init__(self):
+        self.keys: List[str] = []
+        self.ids: List[int] = []
+
+    def load(self, pairs):
+        pairs = sorted(pairs)
+        self.keys = [key for key, _ in pairs]
+        self.ids = [equipment_id for _, equipment_id in pairs]
+
+    def add(self, key: str, equipment_id: int):
+        i = bisect_left(self.keys, key)
+        self.keys.insert(i, key)
+        self.ids.insert(i, equipment_id)
+
+    def remove(self, key: str):
+        i = bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            del self.keys[i]
+            del self.ids[i]
+
+    def range(self, prefix: str) -> Tuple[int, int]:
+        return bisect_left(self.keys, prefix), bisect_left(self.keys, prefix + _END)
+
+
+class EquipmentIndex:
+    """In-memory typeahead over equipment name, type and location
+
+    Every word of those fields is a key in a sorted list, so the matches
+    for a typed prefix are one contiguous slice found by binary search.
+    Name matches come before type and location matches; within each, by
+    matched word and then name. With several words typed, the slice of the
+    most selective word is scanned and the other words must prefix-match
+    some word of the same equipment.
+
+    Each worker holds its own copy. Equipment created through this worker
+    is added immediately. Changes made by other workers are picked up every
+    `refresh_interval` seconds: the index compares its version (row count,
+    highest id and last update) with the table and loads only the rows
+    that are new or changed since, or everything when rows were deleted.
+    """
+
+    def __init__(self, session_factory=SessionLocal, refresh_interval: float = settings.autocomplete_refresh_interval):
+        self.session_factory = session_factory
+        self.refresh_interval = refresh_interval
+        self._entries: Dict[int, _Entry] = {}
+        self._names = _SortedKeys()
+        self._others = _SortedKeys()
+        self._version: Optional[Tuple[int, Optional[int], Optional[datetime]]] = None
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._version is not None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Equipment autocomplete refresh failed")
+            await asyncio.sleep(self.refresh_interval)
+
+    @staticmethod
+    def _version_query():
+        return select(func.count(models.Equipment.id), func.max(models.Equipment.id),
+                      func.max(models.Equipment.updated_at))
+
+    @staticmethod
+    def _rows_query():
+        return select(models.Equipment.id, models.Equipment.name, models.Equipment.type,
+                      models.Equipment.location, models.Equipment.updated_at)
+
+    async def refresh(self, db=None):
+        """Bring the index up to date with the equipment table; a no-op when the version is unchanged"""
+        async with self._lock:
+            if db is None:
+                async with self.session_factory() as session:
+                    await self._refresh(session)
+            else:
+                await self._refresh(db)
+
+    async def _refresh(self, db):
+        version = tuple((await db.execute(self._version_query())).one())
+        if version == self._version:
+            return
+        if self._version is not None:
+            _, max_id, last_update = self._version
+            changed = [models.Equipment.id > (max_id or 0)]
+            if last_update is not None:
+                # Timestamps may have one second resolution; rows seen already are skipped by _add
+                changed.append(models.Equipment.updated_at >= last_update)
+            else:
+                changed.append(models.Equipment.updated_at.isnot(None))
+            for row in (await db.execute(self._rows_query().where(or_(*changed)))).all():
+                self._add(Suggestion(row.id, row.name, row.type, row.location))
+        if len(self._entries) != version[0]:
+            # First load, or rows were deleted: rebuild
+            self._load((await db.execute(self._rows_query())).all())
+        self._version = version
+
+    def _load(self, rows):
+        self._entries = {}
+        names, others = [], []
+        for row in rows:
+            entry = self._entry(Suggestion(row.id, row.name, row.type, row.location))
+            self._entries[row.id] = entry
+            names.extend((key, row.id) for key in entry.name_keys)
+            others.extend((key, row.id) for key in entry.other_keys)
+        self._names.load(names)
+        self._others.load(others)
+
+    @staticmethod
+    def _entry(suggestion: Suggestion) -> _Entry:
+        suffix = f"{_SEP}{(suggestion.name or '').lower()}{_SEP}{suggestion.id:012d}"
+        name_tokens = set(tokenize(suggestion.name))
+        other_tokens = (set(tokenize(suggestion.type)) | set(tokenize(suggestion.location))) - name_tokens
+        return _Entry(suggestion,
+                      tuple(token + suffix for token in sorted(name_tokens)),
+                      tuple(token + suffix for token in sorted(other_tokens)),
+                      frozenset(name_tokens | other_tokens))
+
+    def _add(self, suggestion: Suggestion):
+        old = self._entries.get(suggestion.id)
+        if old is not None:
+            if old.suggestion == suggestion:
+                return
+            for key in old.name_keys:
+                self._names.remove(key)
+            for key in old.other_keys:
+                self._others.remove(key)
+        entry = self._entries[suggestion.id] = self._entry(suggestion)
+        for key in entry.name_keys:
+            self._names.add(key, suggestion.id)
+        for key in entry.other_keys:
+            self._others.add(key, suggestion.id)
+
+    def add(self, equipment: models.Equipment):
+        """Index equipment created by this worker without waiting for the next refresh"""
+        if self.loaded:
+            self._add(Suggestion(equipment.id, equipment.name, equipment.type, equipment.location))
+
+    async def ensure_loaded(self, db):
+        if not self.loaded:
+            await self.refresh(db)
+
+    def search(self, query: str, limit: int = 10) -> List[Suggestion]:
+        words = tokenize(query)
+        if not words or limit <= 0:
+            return []
+        # Scan the matches of the most selective word, name matches first; the other words filter them
+        ranges = {word: (self._names.range(word), self._others.range(word)) for word in set(words)}
+        scanned = min(ranges, key=lambda word: sum(hi - lo for lo, hi in ranges[word]))
+        rest = [word for word in ranges if word != scanned]
+        results: List[Suggestion] = []
+        seen = set()
+        for keys, (lo, hi) in zip((self._names, self._others), ranges[scanned]):
+            for i in range(lo, hi):
+                equipment_id = keys.ids[i]
+                if equipment_id in seen:
+                    continue
+                entry = self._entries[equipment_id]
+                if rest and not all(any(t.startswith(word) for t in entry.tokens) for word in rest):
+                    continue
+                seen.add(equipment_id)
+                results.append(entry.suggestion)
+                if len(results) >= limit:
+                    return results
+        return results
+
+
+equipment_index = EquipmentIndex()
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import bindparam, select, func, update
+
+from . import models
+from .database import SessionLocal
+from .equipment_status import tracker
+from .monitoring import ACTIVE_USERS, EQUIPMENT_STATUS, ACTIVE_ALERTS, SENSOR_INGEST_RATE
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+EQUIPMENT_STATUSES = ("operational", "warning", "critical", "maintenance")
+ALERT_PRIORITIES = ("low", "medium", "high", "critical")
+
+
+class MetricsCollector:
+    """Refreshes business gauges in the background so /metrics scrapes never touch the database"""
+
+    def __init__(self, session_factory=SessionLocal,
+                 interval: float = settings.metrics_refresh_interval,
+                 min_interval: float = settings.metrics_min_refresh_interval,
+                 active_user_window: float = settings.active_user_window_seconds):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.min_interval = min_interval
+        self.active_user_window = active_user_window
+        self._dirty: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._users_seen: Dict[int, datetime] = {}  # since the last refresh, not yet in users.last_seen_at
+        self._ingested_total = 0
+        self._last_ingest_sample = (time.monotonic(), 0)
+
+    def start(self):
+        if self._task is None:
+            self._dirty = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def mark_dirty(self):
+        """Request an early refresh after a write that changes equipment or alert counts"""
+        if self._dirty is not None:
+            self._dirty.set()
+
+    def record_sensor_ingest(self, count: int = 1):
+        self._ingested_total += count
+
+    def record_user_activity(self, user_id: int):
+        self._users_seen[user_id] = datetime.now()
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Metrics refresh failed")
+            try:
+                await asyncio.wait_for(self._dirty.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._dirty.clear()
+            # Coalesce bursts of writes into one refresh
+            await asyncio.sleep(self.min_interval)
+
+    async def refresh(self):
+        async with self.session_factory() as db:
+            equipment_counts = await tracker.counts(db)
+
+            alerts_result = await db.execute(
+                select(models.MaintenanceAlert.priority, func.count(models.MaintenanceAlert.id))
+                .filter(models.MaintenanceAlert.status == "active")
+                .group_by(models.MaintenanceAlert.priority)
+            )
+            alert_counts = dict(alerts_result.all())
+
+            # Workers only see the users they served, so the count comes from the shared last_seen_at
+            await self._write_users_seen(db)
+            active_users = await db.scalar(
+                select(func.count(models.User.id))
+                .filter(models.User.last_seen_at >= datetime.now() - timedelta(seconds=self.active_user_window))
+            )
+
+        for status in set(EQUIPMENT_STATUSES) | set(equipment_counts):
+            EQUIPMENT_STATUS.labels(status=status or "unknown").set(equipment_counts.get(status, 0))
+        for priority in set(ALERT_PRIORITIES) | set(alert_counts):
+            ACTIVE_ALERTS.labels(priority=priority or "unknown").set(alert_counts.get(priority, 0))
+
+        now = time.monotonic()
+        last_time, last_total = self._last_ingest_sample
+        if now > last_time:
+            SENSOR_INGEST_RATE.set((self._ingested_total - last_total) / (now - last_time))
+        self._last_ingest_sample = (now, self._ingested_total)
+
+        ACTIVE_USERS.set(active_users)
+
+    async def _write_users_seen(self, db):
+        seen, self._users_seen = self._users_seen, {}
+        if not seen:
+            return
+        users = models.User.__table__
+        try:
+            await db.execute(
+                update(users).where(users.c.id == bindparam("user_id")).values(last_seen_at=bindparam("seen")),
+                [{"user_id": user_id, "seen": at} for user_id, at in seen.items()]
+            )
+            await db.commit()
+        except BaseException:
+            # Keep them for the next refresh, unless the user has been seen again since
+            for user_id, at in seen.items():
+                self._users_seen.setdefault(user_id, at)
+            raise
+
+
+collector = MetricsCollector()
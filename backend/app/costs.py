@@ -0,0 +1,221 @@
+import re
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import case, delete, func, select
+
+from . import models
+from .database import upsert_insert
+
+UNSPECIFIED = "unspecified"  # rollup key for logs without a maintenance type
+
+_PART_SEPARATORS = re.compile(r"[,;\n]+")
+
+
+def cost_month(log) -> Optional[date]:
+    """First day of the month a log's cost is booked in"""
+    when = log.scheduled_date or log.created_at
+    return date(when.year, when.month, 1) if when is not None else None
+
+
+def parse_parts(text: Optional[str]) -> List[Tuple[str, str]]:
+    """(key, name) per part listed in parts_replaced; keys are lower case with single spaces"""
+    parts = []
+    for name in _PART_SEPARATORS.split(text or ""):
+        name = " ".join(name.split())
+        if name:
+            parts.append((name.lower(), name))
+    return parts
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+class Rollup:
+    """Aggregates logs into cost and parts rows in memory, for rebuilds and migrations"""
+
+    def __init__(self):
+        self.costs: Dict[Tuple[date, int, str], List[float]] = defaultdict(lambda: [0, 0.0])
+        self.parts: Dict[Tuple[date, str], List] = {}
+
+    def add(self, log):
+        month = cost_month(log)
+        if month is None or log.equipment_id is None:
+            return
+        total = self.costs[(month, log.equipment_id, log.maintenance_type or UNSPECIFIED)]
+        total[0] += 1
+        total[1] += log.cost or 0.0
+        for key, name in parse_parts(log.parts_replaced):
+            self.parts.setdefault((month, key), [name, 0])[1] += 1
+
+    def cost_rows(self) -> List[dict]:
+        return [{"month": month, "equipment_id": equipment_id, "maintenance_type": maintenance_type,
+                 "logs": logs, "cost": cost}
+                for (month, equipment_id, maintenance_type), (logs, cost) in self.costs.items()]
+
+    def part_rows(self) -> List[dict]:
+        return [{"month": month, "part": key, "name": name, "replacements": replacements}
+                for (month, key), (name, replacements) in self.parts.items()]
+
+
+async def log_created(db, log: models.MaintenanceLog):
+    """Add a new log to the monthly rollups in the caller's transaction; call after flushing it"""
+    rollup = Rollup()
+    rollup.add(log)
+    dialect_name = (await db.connection()).dialect.name
+    insert = upsert_insert(dialect_name)
+
+    table = models.MaintenanceCostMonthly.__table__
+    for row in rollup.cost_rows():
+        statement = insert(table).values(**row)
+        await db.execute(statement.on_conflict_do_update(
+            index_elements=[table.c.month, table.c.equipment_id, table.c.maintenance_type],
+            set_={"logs": table.c.logs + statement.excluded.logs, "cost": table.c.cost + statement.excluded.cost}
+        ))
+
+    parts = rollup.part_rows()
+    if parts:
+        table = models.PartsUsageMonthly.__table__
+        statement = insert(table).values(parts)
+        await db.execute(statement.on_conflict_do_update(
+            index_elements=[table.c.month, table.c.part],
+            set_={"replacements": table.c.replacements + statement.excluded.replacements}
+        ))
+
+
+async def rebuild(db, chunk: int = 10_000):
+    """Recompute the rollups from the maintenance history, e.g. after bulk loads that bypass crud"""
+    logs = models.MaintenanceLog.__table__
+    rollup = Rollup()
+    result = await db.stream(
+        select(logs.c.equipment_id, logs.c.maintenance_type, logs.c.cost, logs.c.parts_replaced,
+               logs.c.scheduled_date, logs.c.created_at)
+        .execution_options(yield_per=chunk)
+    )
+    async for row in result:
+        rollup.add(row)
+
+    for model, rows in ((models.MaintenanceCostMonthly, rollup.cost_rows()),
+                        (models.PartsUsageMonthly, rollup.part_rows())):
+        table = model.__table__
+        await db.execute(delete(table))
+        for start in range(0, len(rows), chunk):
+            await db.execute(table.insert(), rows[start:start + chunk])
+
+
+def _periods(year: int, today: date) -> Tuple[int, Tuple[date, date], Tuple[date, date]]:
+    """Months compared, and the current and previous year windows covering them"""
+    through = 12 if year < today.year else (today.month if year == today.year else 0)
+    current = date(year, 1, 1)
+    previous = date(year - 1, 1, 1)
+    return through, (current, add_months(current, through)), (previous, add_months(previous, through))
+
+
+async def year_to_date_savings(db, today: Optional[date] = None) -> float:
+    """Maintenance spend so far this year below the same months of last year"""
+    today = today or datetime.now().date()
+    _, (current_start, current_end), (previous_start, previous_end) = _periods(today.year, today)
+    table = models.MaintenanceCostMonthly.__table__
+    row = (await db.execute(
+        select(func.sum(case((table.c.month >= current_start, table.c.cost), else_=0.0)).label("current"),
+               func.sum(case((table.c.month < previous_end, table.c.cost), else_=0.0)).label("previous"))
+        .where(table.c.month >= previous_start, table.c.month < current_end)
+    )).one()
+    return round((row.previous or 0.0) - (row.current or 0.0), 2)
+
+
+def _change(current: float, previous: float) -> Optional[float]:
+    return round((current - previous) / previous * 100, 2) if previous else None
+
+
+async def cost_analytics(db, year: Optional[int] = None, group_by: str = "type", limit: int = 20,
+                         today: Optional[date] = None) -> dict:
+    """Year-over-year maintenance spend and parts usage from the monthly rollups
+
+    The monthly series covers all twelve months of both years. Totals, the
+    breakdown and the parts ranking compare like for like: for the current
+    year only the months so far, against the same months of the year before.
+    Reads only the rollup tables, whose size depends on months x equipment,
+    never on the number of logs.
+    """
+    today = today or datetime.now().date()
+    year = year or today.year
+    through, (current_start, current_end), (previous_start, previous_end) = _periods(year, today)
+    costs = models.MaintenanceCostMonthly.__table__
+
+    rows = (await db.execute(
+        select(costs.c.month, func.sum(costs.c.cost).label("cost"), func.sum(costs.c.logs).label("logs"))
+        .where(costs.c.month >= previous_start, costs.c.month < add_months(date(year, 1, 1), 12))
+        .group_by(costs.c.month)
+    )).all()
+    monthly = [{"month": m, "cost": 0.0, "previous_cost": 0.0, "logs": 0} for m in range(1, 13)]
+    for row in rows:
+        entry = monthly[row.month.month - 1]
+        if row.month.year == year:
+            entry["cost"], entry["logs"] = round(row.cost or 0.0, 2), row.logs
+        else:
+            entry["previous_cost"] = round(row.cost or 0.0, 2)
+    total = sum(entry["cost"] for entry in monthly[:through])
+    previous_total = sum(entry["previous_cost"] for entry in monthly[:through])
+
+    in_current = costs.c.month >= current_start
+    in_previous = costs.c.month < previous_end
+    in_either = (costs.c.month >= previous_start) & (costs.c.month < current_end) & (in_current | in_previous)
+    # Sum per equipment (or maintenance type) first, so equipment is joined once per machine, not per month
+    dimension = costs.c.maintenance_type if group_by == "maintenance_type" else costs.c.equipment_id
+    sums = (
+        select(dimension.label("dimension"),
+               func.sum(case((in_current, costs.c.cost), else_=0.0)).label("cost"),
+               func.sum(case((in_previous, costs.c.cost), else_=0.0)).label("previous_cost"),
+               func.sum(case((in_current, costs.c.logs), else_=0)).label("logs"))
+        .where(in_either)
+        .group_by(dimension)
+        .subquery()
+    )
+    equipment = models.Equipment.__table__
+    keys = {
+        "equipment": [equipment.c.id.label("equipment_id"), equipment.c.name.label("key")],
+        "type": [equipment.c.type.label("key")],
+        "location": [equipment.c.location.label("key")],
+        "maintenance_type": [sums.c.dimension.label("key")],
+    }[group_by]
+    source = sums if group_by == "maintenance_type" else sums.join(equipment, equipment.c.id == sums.c.dimension)
+    current_cost = func.sum(sums.c.cost)
+    rows = (await db.execute(
+        select(*keys, current_cost.label("cost"), func.sum(sums.c.previous_cost).label("previous_cost"),
+               func.sum(sums.c.logs).label("logs"))
+        .select_from(source)
+        .group_by(*keys)
+        .order_by(current_cost.desc(), *keys)
+        .limit(limit)
+    )).all()
+    breakdown = [{
+        "key": row.key, "equipment_id": getattr(row, "equipment_id", None), "logs": row.logs,
+        "cost": round(row.cost, 2), "previous_cost": round(row.previous_cost, 2),
+        "change_percentage": _change(row.cost, row.previous_cost),
+    } for row in rows]
+
+    parts = models.PartsUsageMonthly.__table__
+    in_current = parts.c.month >= current_start
+    in_previous = parts.c.month < previous_end
+    replacements = func.sum(case((in_current, parts.c.replacements), else_=0))
+    rows = (await db.execute(
+        select(func.min(parts.c.name).label("name"), replacements.label("replacements"),
+               func.sum(case((in_previous, parts.c.replacements), else_=0)).label("previous_replacements"))
+        .where(parts.c.month >= previous_start, parts.c.month < current_end, in_current | in_previous)
+        .group_by(parts.c.part)
+        .order_by(replacements.desc(), parts.c.part)
+        .limit(limit)
+    )).all()
+    top_parts = [{"part": row.name, "replacements": row.replacements,
+                  "previous_replacements": row.previous_replacements} for row in rows]
+
+    return {
+        "year": year, "through_month": through, "group_by": group_by,
+        "total_cost": round(total, 2), "previous_total_cost": round(previous_total, 2),
+        "change_percentage": _change(total, previous_total),
+        "monthly": monthly, "breakdown": breakdown, "top_parts": top_parts,
+    }
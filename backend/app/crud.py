@@ -1,19 +1,36 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, desc
+from sqlalchemy import select, func, desc, insert
 from typing import List, Optional
 from datetime import datetime, timedelta
 import random
 
-from . import models, schemas
+from . import costs, exports, models, reliability, retention, schemas
+from .alerts import deduplicator
+from .autocomplete import equipment_index
+from .collectors import collector
+from .database import stream_scalar_partitions
+from .dimensions import sensor_dimensions
+from .equipment_status import StatusUpdate, tracker
+from .search import search as full_text_search
+from .settings import settings
+
+# List queries are shared by the get_* functions and their stream_* variants, which return batches
+# of the same rows read through a server-side cursor (for NDJSON responses, see app/streaming.py)
 
 # Equipment CRUD operations
-async def get_equipment(db: AsyncSession, skip: int = 0, limit: int = 100, status: Optional[str] = None):
+def _equipment_query(skip: int, limit: int, status: Optional[str]):
     query = select(models.Equipment)
     if status:
         query = query.filter(models.Equipment.status == status)
-    result = await db.execute(query.offset(skip).limit(limit))
+    return query.offset(skip).limit(limit)
+
+async def get_equipment(db: AsyncSession, skip: int = 0, limit: int = 100, status: Optional[str] = None):
+    result = await db.execute(_equipment_query(skip, limit, status))
     return result.scalars().all()
 
+async def stream_equipment(db: AsyncSession, skip: int = 0, limit: int = 100, status: Optional[str] = None):
+    return stream_scalar_partitions(db, _equipment_query(skip, limit, status))
+
 async def get_equipment_by_id(db: AsyncSession, equipment_id: int):
     result = await db.execute(select(models.Equipment).filter(models.Equipment.id == equipment_id))
     return result.scalar_one_or_none()
@@ -21,42 +38,152 @@ async def get_equipment_by_id(db: AsyncSession, equipment_id: int):
 async def create_equipment(db: AsyncSession, equipment: schemas.EquipmentCreate):
     db_equipment = models.Equipment(**equipment.dict())
     db.add(db_equipment)
+    # Server defaults (created_at) are returned by INSERT ... RETURNING (eager_defaults)
     await db.commit()
-    await db.refresh(db_equipment)
+    tracker.record_created(db_equipment.status)
+    equipment_index.add(db_equipment)
+    collector.mark_dirty()
     return db_equipment
 
+async def autocomplete_equipment(db: AsyncSession, query: str, limit: int = 10):
+    # Served from memory; the database is only read to build the index on first use
+    await equipment_index.ensure_loaded(db)
+    return equipment_index.search(query, limit=limit)
+
 # Sensor data CRUD operations
-async def get_sensor_data(db: AsyncSession, equipment_id: int, limit: int = 100):
-    result = await db.execute(
-        select(models.SensorData)
-        .filter(models.SensorData.equipment_id == equipment_id)
-        .order_by(desc(models.SensorData.timestamp))
-        .limit(limit)
+def _sensor_data_query(equipment_id: int, start: Optional[datetime], end: Optional[datetime],
+                       sensor_type: Optional[str], columns=(models.SensorData,)):
+    query = select(*columns).filter(models.SensorData.equipment_id == equipment_id)
+    if start is not None:
+        query = query.filter(models.SensorData.timestamp >= start)
+    if end is not None:
+        query = query.filter(models.SensorData.timestamp < end)
+    if sensor_type is not None:
+        # Compare codes rather than decoding every reading's type
+        query = query.filter(models.SensorData.sensor_type_id.in_(
+            select(models.SensorType.id).where(models.SensorType.name == sensor_type)))
+    return query.order_by(desc(models.SensorData.timestamp))
+
+async def get_sensor_data(db: AsyncSession, equipment_id: int, limit: int = 100, start: Optional[datetime] = None,
+                          end: Optional[datetime] = None, sensor_type: Optional[str] = None):
+    result = await db.execute(_sensor_data_query(equipment_id, start, end, sensor_type).limit(limit))
+    readings = result.scalars().all()
+    # Older readings may have been moved to archive files by the retention job; only those that
+    # could still make the newest `limit` are read, so recent queries skip the archive entirely
+    archived = await retention.read_archived(
+        db, equipment_id, start=start, end=end, sensor_type=sensor_type,
+        after=readings[-1].timestamp if len(readings) == limit else None
     )
-    return result.scalars().all()
+    if not archived:
+        return readings
+    return sorted([*readings, *archived], key=lambda reading: reading.timestamp, reverse=True)[:limit]
+
+async def stream_sensor_data(db: AsyncSession, equipment_id: int, limit: int = 100, start: Optional[datetime] = None,
+                             end: Optional[datetime] = None, sensor_type: Optional[str] = None):
+    # The archive cut-off of get_sensor_data, from the limit-th newest live reading's timestamp alone
+    timestamps = _sensor_data_query(equipment_id, start, end, sensor_type, columns=(models.SensorData.timestamp,))
+    after = await db.scalar(timestamps.offset(max(limit - 1, 0)).limit(1))
+    archived = await retention.read_archived(db, equipment_id, start=start, end=end, sensor_type=sensor_type,
+                                             after=after)
+    readings = stream_scalar_partitions(db, _sensor_data_query(equipment_id, start, end, sensor_type).limit(limit))
+    if not archived:
+        return readings
+    return _merge_newest(readings, sorted(archived, key=lambda reading: reading.timestamp, reverse=True), limit)
+
+async def _merge_newest(batches, archived: List[models.SensorData], limit: int):
+    """Batches of live readings with the archived ones (newest first) merged in, up to limit readings"""
+    position = sent = 0
+    try:
+        async for batch in batches:
+            merged = []
+            for reading in batch:
+                while position < len(archived) and archived[position].timestamp > reading.timestamp:
+                    merged.append(archived[position])
+                    position += 1
+                merged.append(reading)
+            merged = merged[:limit - sent]
+            sent += len(merged)
+            yield merged
+            if sent >= limit:
+                return
+        if position < len(archived):
+            yield archived[position:position + limit - sent]
+    finally:
+        await batches.aclose()
 
 async def create_sensor_data(db: AsyncSession, sensor_data: schemas.SensorDataCreate, equipment_id: int):
     db_sensor_data = models.SensorData(**sensor_data.dict(), equipment_id=equipment_id)
     db.add(db_sensor_data)
+    status_update = await derive_equipment_status(db, [db_sensor_data])
     await db.commit()
-    await db.refresh(db_sensor_data)
+    apply_equipment_status(status_update)
+    collector.record_sensor_ingest()
     return db_sensor_data
 
+async def create_sensor_data_bulk(db: AsyncSession, readings: List[schemas.SensorDataCreate], equipment_id: int):
+    if not readings:
+        return []
+    # Single multi-row INSERT ... RETURNING instead of one INSERT + SELECT per reading
+    result = await db.scalars(
+        insert(models.SensorData).returning(models.SensorData),
+        [{**reading.dict(), "equipment_id": equipment_id} for reading in readings]
+    )
+    db_readings = result.all()
+    # RETURNING has the codes; the strings were just encoded, so they decode from memory
+    await (await db.connection()).run_sync(sensor_dimensions.decode, db_readings)
+    status_update = await derive_equipment_status(db, db_readings)
+    await db.commit()
+    apply_equipment_status(status_update)
+    collector.record_sensor_ingest(len(db_readings))
+    return db_readings
+
+async def derive_equipment_status(db: AsyncSession, readings: List[models.SensorData]) -> Optional[StatusUpdate]:
+    if not settings.equipment_status_derivation_enabled:
+        return None
+    return await tracker.observe(db, ((r.equipment_id, r.sensor_type, r.status) for r in readings))
+
+def apply_equipment_status(status_update: Optional[StatusUpdate]):
+    """Call once the transaction of derive_equipment_status() has committed"""
+    if status_update is None:
+        return
+    tracker.apply(status_update)
+    if status_update.transitions:
+        collector.mark_dirty()
+
 # Maintenance alert CRUD operations
-async def get_maintenance_alerts(db: AsyncSession, skip: int = 0, limit: int = 100, priority: Optional[str] = None):
+def _maintenance_alerts_query(skip: int, limit: int, priority: Optional[str]):
     query = select(models.MaintenanceAlert).filter(models.MaintenanceAlert.status == "active")
     if priority:
         query = query.filter(models.MaintenanceAlert.priority == priority)
-    result = await db.execute(query.offset(skip).limit(limit))
+    return query.offset(skip).limit(limit)
+
+async def get_maintenance_alerts(db: AsyncSession, skip: int = 0, limit: int = 100, priority: Optional[str] = None):
+    result = await db.execute(_maintenance_alerts_query(skip, limit, priority))
     return result.scalars().all()
 
+async def stream_maintenance_alerts(db: AsyncSession, skip: int = 0, limit: int = 100,
+                                    priority: Optional[str] = None):
+    return stream_scalar_partitions(db, _maintenance_alerts_query(skip, limit, priority))
+
 async def create_maintenance_alert(db: AsyncSession, alert: schemas.MaintenanceAlertCreate):
+    if settings.alert_dedup_enabled:
+        return await deduplicator.submit(db, alert)
     db_alert = models.MaintenanceAlert(**alert.dict())
     db.add(db_alert)
     await db.commit()
-    await db.refresh(db_alert)
+    collector.mark_dirty()
     return db_alert
 
+async def acknowledge_maintenance_alerts(db: AsyncSession, alert_ids: List[int]) -> int:
+    return await deduplicator.set_status(db, alert_ids, "acknowledged")
+
+async def resolve_maintenance_alerts(db: AsyncSession, alert_ids: List[int]) -> int:
+    return await deduplicator.set_status(db, alert_ids, "resolved")
+
+# Full-text search
+async def search(db: AsyncSession, query: str, types: Optional[List[str]] = None, skip: int = 0, limit: int = 20):
+    return await full_text_search(db, query, types=types, skip=skip, limit=limit)
+
 # Production metrics
 async def get_production_metrics(db: AsyncSession) -> schemas.ProductionMetrics:
     today = datetime.now().date()
@@ -99,11 +226,8 @@ async def get_production_metrics(db: AsyncSession) -> schemas.ProductionMetrics:
 
 # Dashboard summary
 async def get_dashboard_summary(db: AsyncSession) -> schemas.DashboardSummary:
-    equipment_counts_result = await db.execute(
-        select(models.Equipment.status, func.count(models.Equipment.id))
-        .group_by(models.Equipment.status)
-    )
-    status_counts = {status: count for status, count in equipment_counts_result.all()}
+    # Kept in memory by the status tracker; re-read at most every equipment_status_sync_interval
+    status_counts = await tracker.counts(db)
     
     active_alerts_result = await db.execute(
         select(func.count())
@@ -113,7 +237,8 @@ async def get_dashboard_summary(db: AsyncSession) -> schemas.DashboardSummary:
     active_alerts = active_alerts_result.scalar_one()
     
     production_efficiency = 92.3
-    cost_savings = 45300.0
+    # Year-to-date maintenance spend against the same months of last year, from the monthly rollups
+    cost_savings = await costs.year_to_date_savings(db)
     
     return schemas.DashboardSummary(
         equipment_operational=status_counts.get("operational", 0),
@@ -179,6 +304,9 @@ async def init_sample_data(db: AsyncSession):
         models.MaintenanceLog(equipment_id=4, maintenance_type="emergency", description="Hydraulic system repair - critical failure", technician_id=3, cost=1200.00, duration_hours=6.0, parts_replaced="Hydraulic pump, pressure valve", status="in_progress", scheduled_date=datetime.now())
     ]
     db.add_all(maintenance_logs)
+    await db.flush()
+    await reliability.rebuild(db)
+    await costs.rebuild(db)
     await db.commit()
 
 def generate_sensor_value(sensor_type: str) -> float:
@@ -206,13 +334,19 @@ def get_sensor_status(sensor_type: str, value: float) -> str:
         if value < 1200 or value > 1800: return "critical"
     return "normal"
 
-async def get_production_records(db: AsyncSession, skip: int = 0, limit: int = 100, equipment_id: Optional[int] = None, shift: Optional[str] = None):
+def _production_records_query(skip: int, limit: int, equipment_id: Optional[int], shift: Optional[str]):
     query = select(models.ProductionRecord)
     if equipment_id: query = query.filter(models.ProductionRecord.equipment_id == equipment_id)
     if shift: query = query.filter(models.ProductionRecord.shift == shift)
-    result = await db.execute(query.order_by(desc(models.ProductionRecord.date)).offset(skip).limit(limit))
+    return query.order_by(desc(models.ProductionRecord.date)).offset(skip).limit(limit)
+
+async def get_production_records(db: AsyncSession, skip: int = 0, limit: int = 100, equipment_id: Optional[int] = None, shift: Optional[str] = None):
+    result = await db.execute(_production_records_query(skip, limit, equipment_id, shift))
     return result.scalars().all()
 
+async def stream_production_records(db: AsyncSession, skip: int = 0, limit: int = 100, equipment_id: Optional[int] = None, shift: Optional[str] = None):
+    return stream_scalar_partitions(db, _production_records_query(skip, limit, equipment_id, shift))
+
 async def get_production_record_by_id(db: AsyncSession, record_id: int):
     result = await db.execute(select(models.ProductionRecord).filter(models.ProductionRecord.id == record_id))
     return result.scalar_one_or_none()
@@ -226,7 +360,6 @@ async def create_production_record(db: AsyncSession, record: schemas.ProductionR
     db_record = models.ProductionRecord(**record.dict())
     db.add(db_record)
     await db.commit()
-    await db.refresh(db_record)
     return db_record
 
 async def update_production_record(db: AsyncSession, record_id: int, record_update: schemas.ProductionRecordCreate):
@@ -235,16 +368,21 @@ async def update_production_record(db: AsyncSession, record_id: int, record_upda
         for key, value in record_update.dict(exclude_unset=True).items():
             setattr(db_record, key, value)
         await db.commit()
-        await db.refresh(db_record)
     return db_record
 
-async def get_maintenance_logs(db: AsyncSession, skip: int = 0, limit: int = 100, equipment_id: Optional[int] = None, status: Optional[str] = None):
+def _maintenance_logs_query(skip: int, limit: int, equipment_id: Optional[int], status: Optional[str]):
     query = select(models.MaintenanceLog)
     if equipment_id: query = query.filter(models.MaintenanceLog.equipment_id == equipment_id)
     if status: query = query.filter(models.MaintenanceLog.status == status)
-    result = await db.execute(query.order_by(desc(models.MaintenanceLog.created_at)).offset(skip).limit(limit))
+    return query.order_by(desc(models.MaintenanceLog.created_at)).offset(skip).limit(limit)
+
+async def get_maintenance_logs(db: AsyncSession, skip: int = 0, limit: int = 100, equipment_id: Optional[int] = None, status: Optional[str] = None):
+    result = await db.execute(_maintenance_logs_query(skip, limit, equipment_id, status))
     return result.scalars().all()
 
+async def stream_maintenance_logs(db: AsyncSession, skip: int = 0, limit: int = 100, equipment_id: Optional[int] = None, status: Optional[str] = None):
+    return stream_scalar_partitions(db, _maintenance_logs_query(skip, limit, equipment_id, status))
+
 async def get_maintenance_log_by_id(db: AsyncSession, log_id: int):
     result = await db.execute(select(models.MaintenanceLog).filter(models.MaintenanceLog.id == log_id))
     return result.scalar_one_or_none()
@@ -252,22 +390,47 @@ async def get_maintenance_log_by_id(db: AsyncSession, log_id: int):
 async def create_maintenance_log(db: AsyncSession, log: schemas.MaintenanceLogCreate):
     db_log = models.MaintenanceLog(**log.dict())
     db.add(db_log)
+    await db.flush()
+    # Running MTBF/MTTR statistics and cost rollups are updated in the same transaction as the log
+    await reliability.log_created(db, db_log)
+    await costs.log_created(db, db_log)
     await db.commit()
-    await db.refresh(db_log)
     return db_log
 
 async def update_maintenance_log_status(db: AsyncSession, log_id: int, status: str, completed_date: Optional[datetime] = None):
     db_log = await get_maintenance_log_by_id(db, log_id)
     if db_log:
+        hours_before = reliability.repair_hours(db_log)
         db_log.status = status
         if completed_date:
             db_log.completed_date = completed_date
         elif status == "completed":
             db_log.completed_date = datetime.now()
+        await reliability.log_changed(db, db_log, hours_before)
         await db.commit()
-        await db.refresh(db_log)
     return db_log
 
+async def get_fleet_reliability(db: AsyncSession, group_by: str = "equipment", sort_by: str = "mtbf", limit: int = 20):
+    return await reliability.fleet_reliability(db, group_by=group_by, sort_by=sort_by, limit=limit)
+
+async def get_cost_analytics(db: AsyncSession, year: Optional[int] = None, group_by: str = "type", limit: int = 20):
+    return await costs.cost_analytics(db, year=year, group_by=group_by, limit=limit)
+
+# Streaming exports; the returned export reads its rows from db while the response is sent
+async def export_sensor_data(db: AsyncSession, format: str = "csv", equipment_id: Optional[int] = None,
+                             start: Optional[datetime] = None, end: Optional[datetime] = None,
+                             sensor_type: Optional[str] = None, cursor: Optional[str] = None,
+                             limit: Optional[int] = None, gzip: bool = False) -> exports.Export:
+    return await exports.sensor_data(db, format=format, equipment_id=equipment_id, start=start, end=end,
+                                     sensor_type=sensor_type, cursor=cursor, limit=limit, gzip=gzip)
+
+async def export_production_records(db: AsyncSession, format: str = "csv", equipment_id: Optional[int] = None,
+                                    start: Optional[datetime] = None, end: Optional[datetime] = None,
+                                    cursor: Optional[str] = None, limit: Optional[int] = None,
+                                    gzip: bool = False) -> exports.Export:
+    return await exports.production_records(db, format=format, equipment_id=equipment_id, start=start, end=end,
+                                            cursor=cursor, limit=limit, gzip=gzip)
+
 async def get_shift_summary(db: AsyncSession, date: datetime, shift: Optional[str] = None):
     query = select(models.ProductionRecord).filter(func.date(models.ProductionRecord.date) == date.date())
     if shift: query = query.filter(models.ProductionRecord.shift == shift)
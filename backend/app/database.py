@@ -1,3 +1,6 @@
+from sqlalchemy import event, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 import os
@@ -6,11 +9,81 @@ from .settings import settings
 
 load_dotenv()
 
+
+def normalize_database_url(url: str) -> str:
+    """Map plain driver URLs (postgresql://, sqlite://) to their async drivers"""
+    parsed = make_url(url)
+    if parsed.drivername in ("postgresql", "postgres", "postgresql+psycopg2"):
+        parsed = parsed.set(drivername="postgresql+asyncpg")
+    elif parsed.drivername == "sqlite":
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+    return parsed.render_as_string(hide_password=False)
+
+
+def engine_options(url: str) -> dict:
+    """Dialect specific engine tuning"""
+    backend = make_url(url).get_backend_name()
+    if backend == "postgresql":
+        return {
+            "pool_size": settings.db_pool_size,
+            "max_overflow": settings.db_max_overflow,
+            "pool_recycle": settings.db_pool_recycle,
+            "pool_pre_ping": settings.db_pool_pre_ping,
+            "connect_args": {
+                # asyncpg caches prepared statements per connection; the dialect
+                # additionally caches them across checkouts of the same connection.
+                "prepared_statement_cache_size": settings.db_statement_cache_size,
+                "server_settings": {
+                    "application_name": "producflow-api",
+                    # Short OLTP queries pay JIT compilation cost without benefit
+                    "jit": "off",
+                },
+            },
+        }
+    return {}
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # Only takes effect on a new database (or after VACUUM); lets retention release space incrementally
+    cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+
+def create_engine_for_url(url: str, **kwargs):
+    url = normalize_database_url(url)
+    options = engine_options(url)
+    if "poolclass" in kwargs:
+        # Sizing only applies to the default QueuePool (e.g. migrations use NullPool)
+        options.pop("pool_size", None)
+        options.pop("max_overflow", None)
+    options.update(kwargs)
+    db_engine = create_async_engine(url, **options)
+    if db_engine.dialect.name == "sqlite":
+        event.listen(db_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    return db_engine
+
+
+def upsert_insert(dialect_name: str):
+    """insert() supporting on_conflict_do_update for the dialect (PostgreSQL or SQLite)"""
+    return postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+
+
+def epoch_seconds(column, dialect_name: str):
+    """SQL expression for a timestamp column as seconds since 1970-01-01 (naive, as stored)"""
+    if dialect_name == "postgresql":
+        return func.extract("epoch", column)
+    return (func.julianday(column) - 2440587.5) * 86400.0
+
+
 # Database URL - using pydantic settings (env-file aware)
-DATABASE_URL = settings.database_url
+DATABASE_URL = normalize_database_url(settings.database_url)
 
 # The create_async_engine() function is used to create an asynchronous engine.
-engine = create_async_engine(DATABASE_URL, echo=settings.debug)
+engine = create_engine_for_url(DATABASE_URL, echo=settings.debug)
 
 # The async_sessionmaker() function is used to create an asynchronous session maker.
 SessionLocal = async_sessionmaker(
@@ -21,4 +94,31 @@ SessionLocal = async_sessionmaker(
 )
 
 # The declarative_base() is used to create the Base class for the models.
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
+
+
+async def stream_scalars(session, statement, batch_size: int = None):
+    """Iterate ORM rows through a server-side cursor, batch_size rows at a time"""
+    result = await session.stream_scalars(
+        statement.execution_options(yield_per=batch_size or settings.db_stream_batch_size)
+    )
+    async for row in result:
+        yield row
+
+
+async def stream_partitions(session, statement, batch_size: int = None):
+    """Iterate rows through a server-side cursor as lists of up to batch_size rows"""
+    result = await session.stream(
+        statement.execution_options(yield_per=batch_size or settings.db_stream_batch_size)
+    )
+    async for partition in result.partitions():
+        yield partition
+
+
+async def stream_scalar_partitions(session, statement, batch_size: int = None):
+    """Iterate ORM rows through a server-side cursor as lists of up to batch_size objects"""
+    result = await session.stream_scalars(
+        statement.execution_options(yield_per=batch_size or settings.db_stream_batch_size)
+    )
+    async for partition in result.partitions():
+        yield partition
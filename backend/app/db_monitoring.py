@@ -0,0 +1,152 @@
+import hashlib
+import json
+import logging
+import re
+import time
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from prometheus_client import Histogram
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+from .monitoring import get_route_template
+from .settings import settings
+
+slow_query_logger = logging.getLogger("producflow.sql.slow")
+
+# Prometheus metrics
+DB_QUERIES_PER_REQUEST = Histogram(
+    'db_queries_per_request',
+    'SQL statements executed per HTTP request',
+    ['endpoint'],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+)
+
+DB_QUERY_TIME_PER_REQUEST = Histogram(
+    'db_query_time_per_request_seconds',
+    'Total SQL time spent per HTTP request',
+    ['endpoint']
+)
+
+DB_QUERY_DURATION = Histogram(
+    'db_query_duration_seconds',
+    'SQL statement duration by statement fingerprint',
+    ['fingerprint'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+
+
+class QueryStats:
+    """SQL statements executed on behalf of one HTTP request"""
+    __slots__ = ("path", "count", "duration", "rows")
+
+    def __init__(self, path: str = ""):
+        self.path = path
+        self.count = 0
+        self.duration = 0.0
+        self.rows = 0
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("db_query_stats", default=None)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_BIND_PARAM = re.compile(r"\$\d+|%\(\w+\)s|%s|:\w+|\?")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_VALUES_LIST = re.compile(r"(VALUES\s*\(\.\.\.\))(?:\s*,\s*\(\.\.\.\))+", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def fingerprint_statement(statement: str) -> Tuple[str, str]:
+    """Return (fingerprint, normalized SQL) with literals, bind params and IN/VALUES lists collapsed"""
+    normalized = _STRING_LITERAL.sub("?", statement)
+    normalized = _BIND_PARAM.sub("?", normalized)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _PLACEHOLDER_LIST.sub("(...)", normalized)
+    normalized = _VALUES_LIST.sub(r"\1", normalized)
+    normalized = _WHITESPACE.sub(" ", normalized).strip()
+    fingerprint = hashlib.sha1(normalized.encode()).hexdigest()[:12]
+    return fingerprint, normalized
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info["query_start_time"].pop()
+    fingerprint, normalized = fingerprint_statement(statement)
+    # rowcount is rows affected for DML; asyncpg also reports it for SELECT, SQLite returns -1
+    rows = cursor.rowcount if cursor.rowcount is not None and cursor.rowcount >= 0 else None
+
+    DB_QUERY_DURATION.labels(fingerprint=fingerprint).observe(duration)
+
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.duration += duration
+        stats.rows += rows or 0
+
+    if duration * 1000 >= settings.slow_query_threshold_ms:
+        slow_query_logger.warning(json.dumps({
+            "event": "slow_query",
+            "fingerprint": fingerprint,
+            "duration_ms": round(duration * 1000, 2),
+            "rows": rows,
+            "executemany": executemany,
+            "path": stats.path if stats is not None else None,
+            "statement": normalized[:2000],
+        }))
+
+
+def _handle_error(exception_context):
+    starts = exception_context.connection.info.get("query_start_time") if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+
+def instrument_engine(engine):
+    """Attach per-statement timing to an (async) engine"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+
+class QueryStatsMiddleware:
+    """Attribute SQL statements to the current request and export per-request totals"""
+
+    def __init__(self, app, debug_headers: bool = False):
+        self.app = app
+        self.debug_headers = debug_headers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats(scope["path"])
+        token = _current_stats.set(stats)
+
+        async def send_with_stats(message):
+            if self.debug_headers and message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("X-DB-Query-Count", str(stats.count))
+                headers.append("X-DB-Query-Time-Ms", f"{stats.duration * 1000:.2f}")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            _current_stats.reset(token)
+            endpoint = get_route_template(scope)
+            DB_QUERIES_PER_REQUEST.labels(endpoint=endpoint).observe(stats.count)
+            DB_QUERY_TIME_PER_REQUEST.labels(endpoint=endpoint).observe(stats.duration)
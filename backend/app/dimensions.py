@@ -0,0 +1,170 @@
+"""
+Small-integer codes for the strings every sensor reading repeats.
+
+sensor_data stores sensor_type_id, an id in sensor_types (a sensor type
+together with its unit), and status_id, an id in sensor_statuses, instead
+of the strings. SensorData keeps its sensor_type, unit and status
+attributes: loaded readings read them through subqueries on the two small
+tables, and new readings are encoded by the session hooks below, both when
+added to a session and in insert(SensorData) bulk statements. Callers and
+the API keep working with strings.
+
+SensorDimensions holds both directions of each mapping in memory. Codes
+are never reassigned, so the cache only grows: a miss reloads it from the
+database, in case another worker registered the value, and registers the
+value if it is still unknown. Registration runs in the caller's
+transaction; if that transaction rolls back, the cache is cleared because
+the new codes were never committed.
+"""
+import weakref
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from . import models
+from .database import upsert_insert
+
+DEFAULT_STATUS = "normal"  # for readings inserted without one, as the former column default
+
+_REGISTERED = "sensor_dimensions_registered"  # Connection.info flag: uncommitted codes were added
+
+
+class _Lookup:
+    """Two-way map between the value columns of a code table and its ids"""
+
+    def __init__(self, table, columns: Tuple[str, ...]):
+        self.table = table
+        self.columns = columns
+        self.codes: Dict[tuple, int] = {}
+        self.values: Dict[int, tuple] = {}
+
+    def load(self, conn: Connection):
+        columns = [self.table.c[column] for column in self.columns]
+        rows = conn.execute(select(self.table.c.id, *columns).order_by(self.table.c.id.desc())).all()
+        # Descending, so the lowest id wins if NULL values were registered twice
+        self.codes = {tuple(row[1:]): row[0] for row in rows}
+        self.values = {row[0]: tuple(row[1:]) for row in rows}
+
+    def code(self, conn: Connection, value: tuple) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            self.load(conn)
+            code = self.codes.get(value)
+        if code is None:
+            conn.execute(upsert_insert(conn.dialect.name)(self.table)
+                         .values(dict(zip(self.columns, value))).on_conflict_do_nothing())
+            conn.info[_REGISTERED] = True
+            self.load(conn)
+            code = self.codes[value]
+        return code
+
+    def value(self, conn: Connection, code: int) -> tuple:
+        if code not in self.values:
+            self.load(conn)
+        return self.values[code]
+
+
+class SensorDimensions:
+    """Codes of sensor types (with unit) and statuses; methods take a sync connection (use run_sync from async code)"""
+
+    def __init__(self):
+        # Per engine, as each database assigns its own codes (tests and benchmarks open several)
+        self._engines: "weakref.WeakKeyDictionary[Engine, Tuple[_Lookup, _Lookup]]" = weakref.WeakKeyDictionary()
+
+    def _lookups(self, conn: Connection) -> Tuple[_Lookup, _Lookup]:
+        lookups = self._engines.get(conn.engine)
+        if lookups is None:
+            lookups = self._engines[conn.engine] = (_Lookup(models.SensorType.__table__, ("name", "unit")),
+                                                    _Lookup(models.SensorStatus.__table__, ("name",)))
+        return lookups
+
+    def clear(self, engine: Optional[Engine] = None):
+        if engine is None:
+            self._engines.clear()
+        else:
+            self._engines.pop(engine, None)
+
+    def sensor_type_code(self, conn: Connection, sensor_type: Optional[str], unit: Optional[str]) -> Optional[int]:
+        if sensor_type is None and unit is None:
+            return None
+        return self._lookups(conn)[0].code(conn, (sensor_type, unit))
+
+    def status_code(self, conn: Connection, status: Optional[str]) -> Optional[int]:
+        return None if status is None else self._lookups(conn)[1].code(conn, (status,))
+
+    def sensor_type(self, conn: Connection, code: Optional[int]) -> Tuple[Optional[str], Optional[str]]:
+        """(sensor type, unit) of a code"""
+        return (None, None) if code is None else self._lookups(conn)[0].value(conn, code)
+
+    def status(self, conn: Connection, code: Optional[int]) -> Optional[str]:
+        return None if code is None else self._lookups(conn)[1].value(conn, code)[0]
+
+    def sensor_type_names(self, conn: Connection, codes: Iterable[int]) -> Dict[int, Optional[str]]:
+        """Sensor type name of each code"""
+        return {code: self.sensor_type(conn, code)[0] for code in set(codes)}
+
+    def encode_row(self, conn: Connection, row: dict) -> dict:
+        """SensorData column values with sensor_type, unit and status replaced by their codes"""
+        row = dict(row)
+        sensor_type, unit = row.pop("sensor_type", None), row.pop("unit", None)
+        status = row.pop("status", DEFAULT_STATUS)
+        if "sensor_type_id" not in row:
+            row["sensor_type_id"] = self.sensor_type_code(conn, sensor_type, unit)
+        if "status_id" not in row:
+            row["status_id"] = self.status_code(conn, status)
+        return row
+
+    def decode(self, conn: Connection, readings: Iterable[models.SensorData]):
+        """Fill in sensor_type, unit and status of readings returned without them (INSERT ... RETURNING)"""
+        for reading in readings:
+            sensor_type, unit = self.sensor_type(conn, reading.sensor_type_id)
+            set_committed_value(reading, "sensor_type", sensor_type)
+            set_committed_value(reading, "unit", unit)
+            set_committed_value(reading, "status", self.status(conn, reading.status_id))
+
+
+sensor_dimensions = SensorDimensions()
+
+
+@event.listens_for(Session, "before_flush")
+def _encode_new_readings(session, flush_context, instances):
+    readings = [obj for obj in session.new if isinstance(obj, models.SensorData)]
+    if not readings:
+        return
+    conn = session.connection()
+    for reading in readings:
+        # Set every attribute, so none is left to be loaded (lazily, which async sessions cannot) after the flush
+        for attribute, default in (("sensor_type", None), ("unit", None), ("status", DEFAULT_STATUS)):
+            if attribute not in reading.__dict__:
+                setattr(reading, attribute, default)
+        if reading.sensor_type_id is None:
+            reading.sensor_type_id = sensor_dimensions.sensor_type_code(conn, reading.sensor_type, reading.unit)
+        if reading.status_id is None:
+            reading.status_id = sensor_dimensions.status_code(conn, reading.status)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _encode_inserted_readings(state):
+    if not state.is_insert or state.bind_mapper is None or state.bind_mapper.class_ is not models.SensorData:
+        return
+    if not state.parameters:
+        return
+    conn = state.session.connection()
+    if isinstance(state.parameters, dict):
+        state.parameters = sensor_dimensions.encode_row(conn, state.parameters)
+    else:
+        state.parameters = [sensor_dimensions.encode_row(conn, row) for row in state.parameters]
+
+
+@event.listens_for(Engine, "commit")
+def _keep_registered(conn):
+    conn.info.pop(_REGISTERED, None)
+
+
+@event.listens_for(Engine, "rollback")
+def _forget_registered(conn):
+    if conn.info.pop(_REGISTERED, False):
+        sensor_dimensions.clear(conn.engine)
@@ -0,0 +1,195 @@
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from prometheus_client import Counter
+from sqlalchemy import func, select, update
+
+from . import models
+from .settings import settings
+
+# Sensor reading status -> severity; equipment status is the worst recent severity of its sensors
+SEVERITY = {"normal": 0, "warning": 1, "critical": 2}
+DERIVED_STATUSES = ("operational", "warning", "critical")
+
+EQUIPMENT_STATUS_TRANSITIONS = Counter(
+    'equipment_status_transitions_total',
+    'Equipment status changes derived from sensor readings',
+    ['from_status', 'to_status']
+)
+
+Reading = Tuple[int, str, str]  # equipment_id, sensor_type, reading status
+Transition = Tuple[int, str, str]  # equipment_id, old status, new status
+
+
+class _SensorState:
+    __slots__ = ("level", "below", "below_max")
+
+    def __init__(self, level: int):
+        self.level = level
+        self.below = 0  # consecutive readings under the current level
+        self.below_max = 0  # worst of those readings
+
+    def copy(self) -> "_SensorState":
+        sensor = _SensorState(self.level)
+        sensor.below, sensor.below_max = self.below, self.below_max
+        return sensor
+
+
+class _EquipmentState:
+    __slots__ = ("status", "sensors")
+
+    def __init__(self, status: Optional[str]):
+        self.status = status
+        self.sensors: Dict[str, _SensorState] = {}
+
+    def derived(self) -> str:
+        return DERIVED_STATUSES[max((s.level for s in self.sensors.values()), default=0)]
+
+    def copy(self) -> "_EquipmentState":
+        state = _EquipmentState(self.status)
+        state.sensors = {sensor_type: sensor.copy() for sensor_type, sensor in self.sensors.items()}
+        return state
+
+
+class StatusUpdate(NamedTuple):
+    """What observe() wrote in the caller's transaction; hand it to apply() once that commits"""
+    states: Dict[int, _EquipmentState]  # per-machine state after the readings
+    transitions: List[Transition]
+    lost: List[int]  # machines whose status was changed elsewhere, reloaded on their next reading
+
+
+class EquipmentStatusTracker:
+    """Derives Equipment.status from the status of incoming sensor readings
+
+    Each sensor of a machine has a severity level. A worse reading raises it
+    immediately; it only drops after `clear_after` consecutive better
+    readings, to the worst of those, so a value flapping around a limit does
+    not flap the machine. The machine's status is the highest level of its
+    sensors. Equipment in maintenance (or any status not derived here) is
+    left alone, and its status is re-read on each reading until it is back in
+    a derived status.
+
+    Per-machine state is per process and loaded lazily. Status updates are
+    compare-and-set, so a change made by another worker drops the local state
+    instead of being overwritten. observe() works on copies of that state;
+    apply() takes them over once the caller's transaction has committed, so a
+    rollback leaves memory as it was. Status counts are kept in memory and
+    adjusted on every transition (see counts() for the periodic resync).
+    """
+
+    def __init__(self, clear_after: int = settings.equipment_status_clear_after,
+                 sync_interval: float = settings.equipment_status_sync_interval):
+        self.clear_after = clear_after
+        self.sync_interval = sync_interval
+        self._equipment: Dict[int, _EquipmentState] = {}
+        self._counts: Dict[str, int] = {}
+        self._synced_at: Optional[float] = None
+
+    def clear(self):
+        self._equipment.clear()
+        self._counts.clear()
+        self._synced_at = None
+
+    async def observe(self, db, readings: Iterable[Reading]) -> StatusUpdate:
+        """Feed readings in arrival order and write the resulting status changes
+
+        The UPDATEs run in the caller's transaction; pass the result to
+        apply() after committing it.
+        """
+        readings = list(readings)
+        states: Dict[int, _EquipmentState] = {}
+        reload = set()
+        for equipment_id in {equipment_id for equipment_id, _, _ in readings}:
+            state = self._equipment.get(equipment_id)
+            if state is None or state.status not in DERIVED_STATUSES:
+                reload.add(equipment_id)
+            else:
+                states[equipment_id] = state.copy()
+        if reload:
+            result = await db.execute(
+                select(models.Equipment.id, models.Equipment.status).where(models.Equipment.id.in_(reload))
+            )
+            for equipment_id, status in result.all():
+                states[equipment_id] = _EquipmentState(status)
+
+        touched: Dict[int, str] = {}
+        for equipment_id, sensor_type, reading_status in readings:
+            state = states.get(equipment_id)
+            if state is None or state.status not in DERIVED_STATUSES:
+                continue
+            touched.setdefault(equipment_id, state.status)
+            self._step(state, sensor_type, SEVERITY.get(reading_status, 0))
+            state.status = state.derived()
+
+        transitions, lost = [], []
+        for equipment_id, old in touched.items():
+            new = states[equipment_id].status
+            if new == old:
+                continue
+            result = await db.execute(
+                update(models.Equipment)
+                .where(models.Equipment.id == equipment_id, models.Equipment.status == old)
+                .values(status=new, updated_at=func.now()),
+                execution_options={"synchronize_session": False}
+            )
+            if result.rowcount:
+                transitions.append((equipment_id, old, new))
+            else:
+                # Changed elsewhere (e.g. put into maintenance)
+                lost.append(equipment_id)
+        return StatusUpdate(states, transitions, lost)
+
+    def apply(self, update: StatusUpdate):
+        """Take over the state computed by observe() once its transaction has committed"""
+        self._equipment.update(update.states)
+        for equipment_id in update.lost:
+            self._equipment.pop(equipment_id, None)
+        for _, old, new in update.transitions:
+            self._move(old, new)
+            EQUIPMENT_STATUS_TRANSITIONS.labels(from_status=old, to_status=new).inc()
+
+    def _step(self, state: _EquipmentState, sensor_type: str, severity: int):
+        sensor = state.sensors.get(sensor_type)
+        if sensor is None:
+            # Until a sensor proves otherwise, assume it explains the current status
+            sensor = state.sensors[sensor_type] = _SensorState(DERIVED_STATUSES.index(state.status))
+        if severity >= sensor.level:
+            sensor.level, sensor.below, sensor.below_max = severity, 0, 0
+            return
+        sensor.below += 1
+        sensor.below_max = max(sensor.below_max, severity)
+        if sensor.below >= self.clear_after:
+            sensor.level, sensor.below, sensor.below_max = sensor.below_max, 0, 0
+
+    def _move(self, old: str, new: str):
+        if self._synced_at is not None:
+            self._counts[old] = self._counts.get(old, 0) - 1
+            self._counts[new] = self._counts.get(new, 0) + 1
+
+    def record_created(self, status: Optional[str]):
+        if self._synced_at is not None:
+            self._counts[status] = self._counts.get(status, 0) + 1
+
+    async def sync(self, db) -> Dict[str, int]:
+        result = await db.execute(
+            select(models.Equipment.status, func.count(models.Equipment.id))
+            .group_by(models.Equipment.status)
+        )
+        self._counts = dict(result.all())
+        self._synced_at = time.monotonic()
+        return dict(self._counts)
+
+    async def counts(self, db) -> Dict[str, int]:
+        """Equipment per status, from memory unless the last sync is older than `sync_interval`
+
+        Transitions only adjust the counts of the worker that made them, so
+        each worker re-reads them with one GROUP BY at most every
+        `sync_interval` seconds to pick up the others' changes. Reads between
+        syncs never touch the table.
+        """
+        if self._synced_at is None or time.monotonic() - self._synced_at > self.sync_interval:
+            return await self.sync(db)
+        return dict(self._counts)
+
+
+tracker = EquipmentStatusTracker()
@@ -0,0 +1,374 @@
+"""
+Streaming exports of sensor readings and production records.
+
+An export reads its rows through a server-side cursor (yield_per) in id
+order and writes each batch (db_stream_batch_size rows) out as CSV, NDJSON
+or Parquet as soon as it is fetched, optionally gzipped. Memory is bounded
+by the batch size (for Parquet, by the row group) however many rows are
+exported, and the event loop is free between batches.
+
+Exports are resumable. The id range of an export is fixed before the first
+byte is sent: every matching row after the cursor, up to the newest one or
+up to `limit` rows. When the limit cut the range short, the response
+carries a cursor token for the rest in X-Export-Next-Cursor. A token always
+returns the same rows, so an interrupted download is retried with the
+token it started with.
+
+Readings already moved to archive files by the retention job (see
+app/retention.py) are not included.
+"""
+import asyncio
+import base64
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, NamedTuple, Optional
+
+from prometheus_client import Counter
+from sqlalchemy import func, select
+
+from . import models
+from .database import stream_partitions
+from .settings import settings
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Parquet exports are optional
+    pyarrow = None
+
+EXPORT_ROWS = Counter(
+    'export_rows_total',
+    'Rows written by streaming exports',
+    ['export', 'format']
+)
+
+FORMATS = ("csv", "ndjson", "parquet")
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson", "parquet": "application/vnd.apache.parquet"}
+
+
+class ExportError(ValueError):
+    """The export cannot be run as requested (bad cursor, unavailable format)"""
+
+
+class ExportsBusy(Exception):
+    """settings.export_max_concurrent exports are already streaming in this worker"""
+
+
+def encode_cursor(export: str, after: int) -> str:
+    payload = json.dumps({"export": export, "after": after}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(export: str, token: str) -> int:
+    """Id after which the export resumes"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        name, after = payload["export"], payload["after"]
+    except (ValueError, KeyError, TypeError):
+        raise ExportError("Invalid export cursor")
+    if name != export or not isinstance(after, int):
+        raise ExportError(f"Cursor does not belong to the {export} export")
+    return after
+
+
+# Writers: begin() and end() return the bytes before the first and after the last batch, write() those of a batch
+
+class _CsvWriter:
+    threaded = False
+
+    def __init__(self, columns: List[str]):
+        self.columns = columns
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer, lineterminator="\n")
+
+    def _drain(self) -> bytes:
+        text = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return text.encode()
+
+    def begin(self) -> bytes:
+        self.writer.writerow(self.columns)
+        return self._drain()
+
+    def write(self, rows) -> bytes:
+        self.writer.writerows(rows)
+        return self._drain()
+
+    def end(self) -> bytes:
+        return b""
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class _NdjsonWriter:
+    threaded = False
+
+    def __init__(self, columns: List[str]):
+        self.columns = columns
+        self.encode = json.JSONEncoder(separators=(",", ":"), default=_json_default).encode
+
+    def begin(self) -> bytes:
+        return b""
+
+    def write(self, rows) -> bytes:
+        columns, encode = self.columns, self.encode
+        return "".join([encode(dict(zip(columns, row))) + "\n" for row in rows]).encode()
+
+    def end(self) -> bytes:
+        return b""
+
+
+class _Chunks(io.RawIOBase):
+    """Write-only file that hands what was written to the caller instead of storing it"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+class _ParquetWriter:
+    """Buffers a row group of rows at a time; write() runs in a thread as encoding a group takes a while"""
+    threaded = True
+
+    def __init__(self, columns: List[str], types: List[type]):
+        self.columns = columns
+        self.types = types
+        self.rows: list = []
+        self.file = _Chunks()
+        self.schema = None
+        self.writer = None
+
+    def _schema(self):
+        fields = []
+        for index, (column, python_type) in enumerate(zip(self.columns, self.types)):
+            if python_type is datetime:
+                # Aware if the database returns aware timestamps (PostgreSQL), naive otherwise (SQLite)
+                sample = next((row[index] for row in self.rows if row[index] is not None), None)
+                arrow_type = pyarrow.timestamp("us", tz="UTC" if sample is not None and sample.tzinfo else None)
+            else:
+                arrow_type = {int: pyarrow.int64(), float: pyarrow.float64()}.get(python_type, pyarrow.string())
+            fields.append(pyarrow.field(column, arrow_type))
+        return pyarrow.schema(fields)
+
+    def _flush(self):
+        if self.writer is None:
+            self.schema = self._schema()
+            self.writer = pyarrow.parquet.ParquetWriter(self.file, self.schema)
+        columns = list(zip(*self.rows)) if self.rows else [()] * len(self.columns)
+        self.writer.write_table(pyarrow.Table.from_arrays(
+            [pyarrow.array(values, type=field.type) for values, field in zip(columns, self.schema)],
+            schema=self.schema))
+        self.rows = []
+
+    def begin(self) -> bytes:
+        return b""
+
+    def write(self, rows) -> bytes:
+        self.rows.extend(rows)
+        if len(self.rows) >= settings.export_parquet_row_group_rows:
+            self._flush()
+        return self.file.drain()
+
+    def end(self) -> bytes:
+        if self.rows or self.writer is None:
+            self._flush()
+        self.writer.close()
+        return self.file.drain()
+
+
+class _Query(NamedTuple):
+    name: str
+    key: object  # id column the export is ordered and resumed by
+    columns: list
+    source: object
+    conditions: list
+
+
+def _sensor_data_query(equipment_id: Optional[int], start: Optional[datetime], end: Optional[datetime],
+                       sensor_type: Optional[str]) -> _Query:
+    table = models.SensorData.__table__
+    types, statuses = models.SensorType.__table__, models.SensorStatus.__table__
+    conditions = []
+    if equipment_id is not None:
+        conditions.append(table.c.equipment_id == equipment_id)
+    if start is not None:
+        conditions.append(table.c.timestamp >= start)
+    if end is not None:
+        conditions.append(table.c.timestamp < end)
+    if sensor_type is not None:
+        conditions.append(table.c.sensor_type_id.in_(select(types.c.id).where(types.c.name == sensor_type)))
+    return _Query(
+        "sensor_data", table.c.id,
+        [table.c.id, table.c.equipment_id, table.c.timestamp, types.c.name.label("sensor_type"), types.c.unit,
+         table.c.value, statuses.c.name.label("status")],
+        table.outerjoin(types, types.c.id == table.c.sensor_type_id)
+        .outerjoin(statuses, statuses.c.id == table.c.status_id),
+        conditions
+    )
+
+
+def _production_records_query(equipment_id: Optional[int], start: Optional[datetime],
+                              end: Optional[datetime]) -> _Query:
+    table = models.ProductionRecord.__table__
+    conditions = []
+    if equipment_id is not None:
+        conditions.append(table.c.equipment_id == equipment_id)
+    if start is not None:
+        conditions.append(table.c.date >= start)
+    if end is not None:
+        conditions.append(table.c.date < end)
+    return _Query("production_records", table.c.id, list(table.c), table, conditions)
+
+
+class Export:
+    """An export whose id range is fixed; send headers, then stream body()
+
+    Holds one of the worker's export_max_concurrent slots from _prepare()
+    until body() finishes or release() is called.
+    """
+
+    active = 0  # exports holding a slot in this worker
+
+    def __init__(self, db, query: _Query, format: str, after: int, through: Optional[int],
+                 next_cursor: Optional[str], gzip: bool):
+        self.db = db
+        self.query = query
+        self.format = format
+        self.after = after
+        self.through = through
+        self.next_cursor = next_cursor
+        self.gzip = gzip
+        self._reserved = True
+
+    def release(self):
+        """Give back the export's slot; safe to call more than once"""
+        if self._reserved:
+            self._reserved = False
+            Export.active -= 1
+
+    @property
+    def media_type(self) -> str:
+        return MEDIA_TYPES[self.format]
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        headers = {"Content-Disposition": f'attachment; filename="{self.query.name}.{self.format}"'}
+        if self.gzip:
+            headers["Content-Encoding"] = "gzip"
+        if self.next_cursor:
+            headers["X-Export-Next-Cursor"] = self.next_cursor
+        return headers
+
+    def _writer(self):
+        names = [column.name for column in self.query.columns]
+        if self.format == "csv":
+            return _CsvWriter(names)
+        if self.format == "ndjson":
+            return _NdjsonWriter(names)
+        return _ParquetWriter(names, [column.type.python_type for column in self.query.columns])
+
+    async def _chunks(self) -> AsyncIterator[bytes]:
+        writer = self._writer()
+        yield writer.begin()
+        if self.through is not None:
+            query = self.query
+            statement = (select(*query.columns).select_from(query.source)
+                         .where(*query.conditions, query.key > self.after, query.key <= self.through)
+                         .order_by(query.key))
+            rows = EXPORT_ROWS.labels(query.name, self.format)
+            async for batch in stream_partitions(self.db, statement):
+                yield await asyncio.to_thread(writer.write, batch) if writer.threaded else writer.write(batch)
+                rows.inc(len(batch))
+        yield await asyncio.to_thread(writer.end) if writer.threaded else writer.end()
+
+    async def body(self) -> AsyncIterator[bytes]:
+        try:
+            compressor = zlib.compressobj(settings.export_gzip_level, zlib.DEFLATED, 31) if self.gzip else None
+            async for chunk in self._chunks():
+                if compressor is not None:
+                    chunk = compressor.compress(chunk)
+                if chunk:
+                    yield chunk
+            if compressor is not None:
+                yield compressor.flush()
+        finally:
+            self.release()
+
+
+async def _prepare(db, query: _Query, format: str, cursor: Optional[str], limit: Optional[int],
+                   gzip: bool) -> Export:
+    if format not in FORMATS:
+        raise ExportError(f"Unknown export format {format!r}")
+    if format == "parquet":
+        if pyarrow is None:
+            raise ExportError("Parquet exports need pyarrow installed")
+        if gzip:
+            raise ExportError("Parquet files are compressed internally; gzip applies to csv and ndjson")
+    if Export.active >= settings.export_max_concurrent:
+        raise ExportsBusy()
+    # Reserved before the first await, so concurrent requests cannot all pass the check
+    Export.active += 1
+    try:
+        return await _fix_range(db, query, format, cursor, limit, gzip)
+    except BaseException:
+        Export.active -= 1
+        raise
+
+
+async def _fix_range(db, query: _Query, format: str, cursor: Optional[str], limit: Optional[int],
+                     gzip: bool) -> Export:
+    after = decode_cursor(query.name, cursor) if cursor else 0
+    matching = [*query.conditions, query.key > after]
+    next_cursor = None
+    if limit is None:
+        through = await db.scalar(select(func.max(query.key)).where(*matching))
+    else:
+        # The id of the limit-th row, and whether any follow it
+        ids = (await db.scalars(select(query.key).where(*matching).order_by(query.key)
+                                .offset(limit - 1).limit(2))).all()
+        if not ids:
+            through = await db.scalar(select(func.max(query.key)).where(*matching))
+        else:
+            through = ids[0]
+            if len(ids) > 1:
+                next_cursor = encode_cursor(query.name, through)
+    return Export(db, query, format, after, through, next_cursor, gzip)
+
+
+async def sensor_data(db, format: str = "csv", equipment_id: Optional[int] = None, start: Optional[datetime] = None,
+                      end: Optional[datetime] = None, sensor_type: Optional[str] = None,
+                      cursor: Optional[str] = None, limit: Optional[int] = None, gzip: bool = False) -> Export:
+    """Export of sensor readings in [start, end), optionally of one machine and sensor type"""
+    return await _prepare(db, _sensor_data_query(equipment_id, start, end, sensor_type), format, cursor, limit, gzip)
+
+
+async def production_records(db, format: str = "csv", equipment_id: Optional[int] = None,
+                             start: Optional[datetime] = None, end: Optional[datetime] = None,
+                             cursor: Optional[str] = None, limit: Optional[int] = None,
+                             gzip: bool = False) -> Export:
+    """Export of production records dated in [start, end), optionally of one machine"""
+    return await _prepare(db, _production_records_query(equipment_id, start, end), format, cursor, limit, gzip)
@@ -0,0 +1,274 @@
+"""
+Batch health scores and failure forecasts for the whole fleet.
+
+Recent readings of every machine with new sensor data are loaded into NumPy
+arrays, and a linear trend is fitted for every (equipment, sensor) pair at
+once from grouped sums. Health is the remaining margin to the critical
+limits, reduced when a trend is heading for one; a trend predicted to cross
+a critical limit within the horizon raises (or updates) a predictive alert.
+"""
+import asyncio
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict
+
+import numpy as np
+from sqlalchemy import bindparam, func, insert, select
+
+from . import models
+from .alerts import OPEN_STATUSES
+from .collectors import collector
+from .database import SessionLocal, epoch_seconds
+from .dimensions import sensor_dimensions
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+SENSOR_TYPES = ("temperature", "pressure", "vibration", "speed")
+# Nominal operating point and critical limits, as in crud.get_sensor_status
+SENSOR_NOMINAL = np.array([75.0, 55.0, 1.0, 1500.0])
+SENSOR_CRITICAL_LOW = np.array([-np.inf, 45.0, -np.inf, 1200.0])
+SENSOR_CRITICAL_HIGH = np.array([85.0, 65.0, 2.5, 1800.0])
+SENSOR_NOMINAL_MARGIN = np.minimum(SENSOR_NOMINAL - SENSOR_CRITICAL_LOW, SENSOR_CRITICAL_HIGH - SENSOR_NOMINAL)
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def fit_trends(groups: np.ndarray, hours: np.ndarray, values: np.ndarray, group_count: int) -> Dict[str, np.ndarray]:
+    """Least-squares line per group from grouped sums; hours are relative to the newest reading (<= 0)
+
+    Returns per group: reading count, slope per hour, level at the group's last
+    reading, time of that reading, and R² of the fit.
+    """
+    def total(weights=None):
+        return np.bincount(groups, weights=weights, minlength=group_count)
+
+    n = total()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_t = total(hours) / n
+        mean_v = total(values) / n
+        # Centered sums keep the normal equations well conditioned
+        dt = hours - mean_t[groups]
+        dv = values - mean_v[groups]
+        stt = total(dt * dt)
+        stv = total(dt * dv)
+        svv = total(dv * dv)
+        slope = np.where(stt > 0, stv / stt, 0.0)
+        last = np.full(group_count, -np.inf)
+        np.maximum.at(last, groups, hours)
+        level = mean_v + slope * (last - mean_t)
+        r2 = np.where(svv > 0, slope * stv / svv, 0.0)
+    return {"n": n, "slope": slope, "level": level, "last": last, "r2": np.clip(r2, 0.0, 1.0)}
+
+
+def score_trends(fit: Dict[str, np.ndarray], horizon_hours: float) -> Dict[str, np.ndarray]:
+    """Health (0-100), hours until the first predicted critical breach and its sensor, per equipment
+
+    `fit` arrays are laid out as equipment-major groups of len(SENSOR_TYPES).
+    """
+    sensors = len(SENSOR_TYPES)
+    shape = (-1, sensors)
+    n, slope, level, r2 = (fit[key].reshape(shape) for key in ("n", "slope", "level", "r2"))
+    usable = n >= 2
+
+    margin = np.minimum(level - SENSOR_CRITICAL_LOW, SENSOR_CRITICAL_HIGH - level) / SENSOR_NOMINAL_MARGIN
+    margin = np.clip(margin, 0.0, 1.0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        to_high = np.where(slope > 0, (SENSOR_CRITICAL_HIGH - level) / slope, np.inf)
+        to_low = np.where(slope < 0, (SENSOR_CRITICAL_LOW - level) / slope, np.inf)
+    breach = np.clip(np.minimum(to_high, to_low), 0.0, None)
+    breach = np.where(usable, breach, np.inf)
+
+    count = usable.sum(axis=1)
+    has_data = count > 0
+    worst = np.where(has_data, np.min(np.where(usable, margin, np.inf), axis=1), 0.0)
+    average = np.where(usable, margin, 0.0).sum(axis=1) / np.maximum(count, 1)
+    breach_sensor = np.argmin(breach, axis=1)
+    breach_hours = breach[np.arange(len(breach)), breach_sensor]
+    confidence = (r2 * n / (n + 10.0))[np.arange(len(breach)), breach_sensor]
+
+    health = 100.0 * (0.6 * worst + 0.4 * average)
+    # A trend heading for a critical limit within the horizon costs up to half the score
+    health *= 0.5 + 0.5 * np.clip(breach_hours / horizon_hours, 0.0, 1.0)
+    return {
+        "has_data": has_data,
+        "health": np.round(health, 1),
+        "breach_hours": breach_hours,
+        "breach_sensor": breach_sensor,
+        "confidence": np.round(confidence, 2),
+    }
+
+
+def score_chunk(equipment_ids: np.ndarray, readings: Dict[str, np.ndarray],
+                horizon_hours: float) -> Dict[str, np.ndarray]:
+    """Fit and score one chunk of equipment (sorted ids); pure NumPy so it can run in a worker process"""
+    sensors = len(SENSOR_TYPES)
+    epochs, values = readings["epoch"], readings["value"]
+    positions = np.searchsorted(equipment_ids, readings["equipment_id"])
+    groups = positions * sensors + readings["sensor"]
+    newest = np.full(len(equipment_ids), -np.inf)
+    np.maximum.at(newest, positions, epochs)
+    hours = (epochs - newest[positions]) / 3600.0
+    scores = score_trends(fit_trends(groups, hours, values, len(equipment_ids) * sensors), horizon_hours)
+    scores["newest_epoch"] = newest
+    return scores
+
+
+class HealthPipeline:
+    """Recomputes health_score and predictive alerts for equipment with new sensor readings
+
+    Incremental: only equipment with readings newer than the last processed
+    sensor_data id are scored (everything on the first run after start-up).
+    Chunks of `chunk_size` machines are scored in a thread, or in a process
+    pool of `workers` processes when set.
+    """
+
+    def __init__(self, session_factory=SessionLocal,
+                 window_hours: float = settings.health_window_hours,
+                 horizon_days: float = settings.health_forecast_horizon_days,
+                 min_confidence: float = settings.health_alert_min_confidence,
+                 chunk_size: int = settings.health_chunk_size,
+                 workers: int = settings.health_workers):
+        self.session_factory = session_factory
+        self.window_hours = window_hours
+        self.horizon_hours = horizon_days * 24
+        self.min_confidence = min_confidence
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.watermark = 0
+
+    async def run(self, full: bool = False) -> dict:
+        started = time.perf_counter()
+        async with self.session_factory() as db:
+            newest_id = await db.scalar(select(func.max(models.SensorData.id))) or 0
+            if full or self.watermark == 0:
+                changed = (await db.scalars(select(models.Equipment.id).order_by(models.Equipment.id))).all()
+            else:
+                changed = (await db.scalars(
+                    select(models.SensorData.equipment_id).distinct()
+                    .where(models.SensorData.id > self.watermark, models.SensorData.id <= newest_id)
+                )).all()
+        equipment_ids = np.array(sorted(i for i in changed if i is not None), dtype=np.int64)
+
+        stats = {"equipment": 0, "readings": 0, "alerts_created": 0, "alerts_updated": 0}
+        executor = ProcessPoolExecutor(self.workers) if self.workers > 0 and len(equipment_ids) else None
+        try:
+            chunks = [equipment_ids[i:i + self.chunk_size] for i in range(0, len(equipment_ids), self.chunk_size)]
+            next_load = asyncio.ensure_future(self._load(chunks[0])) if chunks else None
+            for index, chunk in enumerate(chunks):
+                readings = await next_load
+                # Load the next chunk while this one is scored
+                if index + 1 < len(chunks):
+                    next_load = asyncio.ensure_future(self._load(chunks[index + 1]))
+                stats["readings"] += len(readings["value"])
+                if executor is not None:
+                    scores = await asyncio.get_running_loop().run_in_executor(
+                        executor, score_chunk, chunk, readings, self.horizon_hours)
+                else:
+                    scores = await asyncio.to_thread(score_chunk, chunk, readings, self.horizon_hours)
+                written = await self._write(chunk, scores)
+                for key, value in written.items():
+                    stats[key] += value
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        self.watermark = max(self.watermark, newest_id)
+        if stats["alerts_created"] or stats["equipment"]:
+            collector.mark_dirty()
+        stats["seconds"] = round(time.perf_counter() - started, 3)
+        logger.info("Health scores updated: %s", stats)
+        return stats
+
+    async def _load(self, equipment_ids: np.ndarray) -> Dict[str, np.ndarray]:
+        """Readings in the window as equipment_id, sensor (index into SENSOR_TYPES), epoch and value arrays"""
+        table = models.SensorData.__table__
+        sensor_types = models.SensorType.__table__
+        cutoff = datetime.now() - timedelta(hours=self.window_hours)
+        sensor_index = {name: index for index, name in enumerate(SENSOR_TYPES)}
+        async with self.session_factory() as db:
+            conn = await db.connection()
+            result = await conn.execute(
+                select(table.c.equipment_id, table.c.sensor_type_id, table.c.value,
+                       epoch_seconds(table.c.timestamp, conn.dialect.name))
+                .where(table.c.equipment_id.in_(equipment_ids.tolist()),
+                       table.c.timestamp >= cutoff,
+                       table.c.sensor_type_id.in_(
+                           select(sensor_types.c.id).where(sensor_types.c.name.in_(SENSOR_TYPES))),
+                       table.c.value.is_not(None))
+            )
+            rows = result.all()
+            equipment, codes, values, epochs = zip(*rows) if rows else ((), (), (), ())
+            names = await conn.run_sync(sensor_dimensions.sensor_type_names, codes)
+        sensor_of_code = {code: sensor_index[name] for code, name in names.items()}
+        return {
+            "equipment_id": np.array(equipment, dtype=np.int64),
+            "sensor": np.array([sensor_of_code[code] for code in codes], dtype=np.int64),
+            "epoch": np.array(epochs, dtype=np.float64),
+            "value": np.array(values, dtype=np.float64),
+        }
+
+    async def _write(self, equipment_ids: np.ndarray, scores: Dict[str, np.ndarray]) -> dict:
+        scored = np.flatnonzero(scores["has_data"])
+        if not len(scored):
+            return {"equipment": 0, "alerts_created": 0, "alerts_updated": 0}
+        equipment = models.Equipment.__table__
+        alerts = models.MaintenanceAlert.__table__
+
+        forecast = scored[(scores["breach_hours"][scored] <= self.horizon_hours)
+                          & (scores["confidence"][scored] >= self.min_confidence)]
+        planned = {}
+        for i in forecast.tolist():
+            hours = float(scores["breach_hours"][i])
+            sensor = SENSOR_TYPES[scores["breach_sensor"][i]]
+            planned[(int(equipment_ids[i]), f"{sensor.capitalize()} trending to critical")] = {
+                "priority": "critical" if hours <= 72 else "high" if hours <= 168 else "medium",
+                "predicted_date": EPOCH + timedelta(seconds=float(scores["newest_epoch"][i]) + hours * 3600),
+                "confidence": float(scores["confidence"][i]),
+                "description": f"{sensor.capitalize()} is predicted to reach its critical limit "
+                               f"in {hours:.0f} hours at the current trend.",
+            }
+
+        now = datetime.now()
+        async with self.session_factory() as db:
+            conn = await db.connection()
+            await conn.execute(
+                equipment.update().where(equipment.c.id == bindparam("equipment_id"))
+                .values(health_score=bindparam("health")),
+                [{"equipment_id": int(equipment_ids[i]), "health": float(scores["health"][i])} for i in scored.tolist()]
+            )
+            existing = {}
+            if planned:
+                result = await conn.execute(
+                    select(alerts.c.id, alerts.c.equipment_id, alerts.c.title)
+                    .where(alerts.c.equipment_id.in_(sorted({key[0] for key in planned})),
+                           alerts.c.type == "predictive", alerts.c.status.in_(OPEN_STATUSES))
+                )
+                existing = {(equipment_id, title): alert_id for alert_id, equipment_id, title in result.all()}
+            updates = [
+                {"alert_id": existing[key], "seen": now, **fields}
+                for key, fields in planned.items() if key in existing
+            ]
+            creates = [
+                {"equipment_id": key[0], "type": "predictive", "title": key[1], "status": "active",
+                 "occurrence_count": 1, "last_seen_at": now, **fields}
+                for key, fields in planned.items() if key not in existing
+            ]
+            if updates:
+                await conn.execute(
+                    alerts.update().where(alerts.c.id == bindparam("alert_id"))
+                    .values(priority=bindparam("priority"), predicted_date=bindparam("predicted_date"),
+                            confidence=bindparam("confidence"), description=bindparam("description"),
+                            last_seen_at=bindparam("seen")),
+                    updates
+                )
+            if creates:
+                await conn.execute(insert(alerts), creates)
+            await db.commit()
+        return {"equipment": len(scored), "alerts_created": len(creates), "alerts_updated": len(updates)}
+
+
+pipeline = HealthPipeline()
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from prometheus_client import Counter, Histogram
+
+from .monitoring import active_requests, get_route_template
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+STACK_LIMIT = 40  # innermost frames to log; the outer ones are the server bootstrap
+
+EVENT_LOOP_LAG = Histogram(
+    'event_loop_lag_seconds',
+    'Delay between when a loop callback was due and when it ran',
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+
+EVENT_LOOP_BLOCKED = Counter(
+    'event_loop_blocked_total',
+    'Times the event loop was blocked for longer than the threshold',
+    ['endpoint']
+)
+
+
+class LoopMonitor:
+    """Measures event loop lag and reports the stack of whatever is blocking the loop
+
+    A task on the loop sleeps for `interval` and records how late it woke up.
+    It also updates a heartbeat that a watchdog thread checks; when the heartbeat
+    is older than `threshold`, the loop is blocked right now, so the watchdog
+    captures the loop thread's stack and the route of the running request.
+    """
+
+    def __init__(self, interval: float = settings.loop_monitor_interval,
+                 threshold: float = settings.loop_block_threshold_ms / 1000):
+        self.interval = interval
+        self.threshold = threshold
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._heartbeat = 0.0
+        self._beat = 0
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._measure())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stopped.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._watchdog.join()
+        self._task = None
+        self._watchdog = None
+
+    async def _measure(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._heartbeat = time.monotonic()
+            self._beat += 1
+            scheduled = loop.time()
+            await asyncio.sleep(self.interval)
+            EVENT_LOOP_LAG.observe(max(loop.time() - scheduled - self.interval, 0.0))
+
+    def _watch(self):
+        reported_beat = None
+        while not self._stopped.wait(min(self.interval, self.threshold) / 2):
+            beat, heartbeat = self._beat, self._heartbeat
+            # The heartbeat is due every `interval`; anything beyond that is lag
+            if time.monotonic() - heartbeat - self.interval < self.threshold or beat == reported_beat:
+                continue
+            reported_beat = beat
+            self.report_blocked(time.monotonic() - heartbeat - self.interval)
+
+    def report_blocked(self, blocked_for: float):
+        """Log the loop thread's current stack together with the request it is serving"""
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+        stack = "".join(traceback.format_stack(frame, limit=STACK_LIMIT))
+
+        endpoint, description = "none", "no request"
+        task = asyncio.current_task(self._loop)
+        scope = active_requests.get(task) if task is not None else None
+        if scope is not None:
+            endpoint = get_route_template(scope)
+            description = f"{scope['method']} {scope['path']} ({endpoint})"
+
+        EVENT_LOOP_BLOCKED.labels(endpoint=endpoint).inc()
+        logger.warning(
+            "Event loop blocked for more than %.0f ms while serving %s\n%s",
+            blocked_for * 1000, description, stack
+        )
+
+
+monitor = LoopMonitor()
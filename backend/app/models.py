@@ -1,10 +1,13 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy import (Column, Integer, SmallInteger, String, Float, Date, DateTime, Boolean, ForeignKey, Text, Index,
+                        UniqueConstraint, select)
+from sqlalchemy.orm import column_property, relationship
 from sqlalchemy.sql import func
 from .database import Base
+from .search import attach_search_index
 
 class User(Base):
     __tablename__ = "users"
+    __mapper_args__ = {"eager_defaults": "auto"}
 
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, index=True)
@@ -14,9 +17,11 @@ class User(Base):
     department = Column(String)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_seen_at = Column(DateTime(timezone=True))  # last authenticated request, written by the metrics collector
 
 class Equipment(Base):
     __tablename__ = "equipment"
+    __mapper_args__ = {"eager_defaults": "auto"}
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
@@ -34,22 +39,68 @@ class Equipment(Base):
     sensor_data = relationship("SensorData", back_populates="equipment")
     maintenance_alerts = relationship("MaintenanceAlert", back_populates="equipment")
 
+class SensorType(Base):
+    """A sensor type with its unit; sensor_data stores its id instead of the strings (see app/dimensions.py)"""
+    __tablename__ = "sensor_types"
+    __table_args__ = (UniqueConstraint("name", "unit"),)
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String)  # temperature, pressure, vibration, speed
+    unit = Column(String)
+
+class SensorStatus(Base):
+    """Reading status names by id (see app/dimensions.py)"""
+    __tablename__ = "sensor_statuses"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True)  # normal, warning, critical
+
+def _decoded(column, code):
+    """Read-only attribute looking up a code in its table; kept as set on new objects after flush"""
+    return column_property(select(column).where(column.class_.id == code).scalar_subquery(), expire_on_flush=False)
+
 class SensorData(Base):
     __tablename__ = "sensor_data"
+    __table_args__ = (Index("ix_sensor_data_equipment_timestamp", "equipment_id", "timestamp"),)
+    __mapper_args__ = {"eager_defaults": "auto"}
 
     id = Column(Integer, primary_key=True, index=True)
     equipment_id = Column(Integer, ForeignKey("equipment.id"))
-    sensor_type = Column(String)  # temperature, pressure, vibration, speed
+    sensor_type_id = Column(SmallInteger, ForeignKey("sensor_types.id"))
     value = Column(Float)
-    unit = Column(String)
-    status = Column(String, default="normal")  # normal, warning, critical
+    status_id = Column(SmallInteger, ForeignKey("sensor_statuses.id"))
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
 
+    # Decoded in SQL when loaded; set on new readings and encoded on flush by app/dimensions.py
+    sensor_type = _decoded(SensorType.name, sensor_type_id)
+    unit = _decoded(SensorType.unit, sensor_type_id)
+    status = _decoded(SensorStatus.name, status_id)
+
     # Relationships
     equipment = relationship("Equipment", back_populates="sensor_data")
 
+class SensorArchiveFile(Base):
+    """Raw sensor readings moved out of sensor_data by the retention job (see app/retention.py)"""
+    __tablename__ = "sensor_archive_files"
+    __table_args__ = (Index("ix_sensor_archive_files_last_timestamp", "last_timestamp"),)
+
+    id = Column(Integer, primary_key=True)
+    path = Column(String, unique=True, nullable=False)  # relative to settings.sensor_archive_dir
+    min_equipment_id = Column(Integer, nullable=False)
+    max_equipment_id = Column(Integer, nullable=False)
+    first_timestamp = Column(DateTime(timezone=True), nullable=False)
+    last_timestamp = Column(DateTime(timezone=True), nullable=False)
+    readings = Column(Integer, nullable=False)
+    size_bytes = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
 class MaintenanceAlert(Base):
     __tablename__ = "maintenance_alerts"
+    __table_args__ = (
+        Index("ix_maintenance_alerts_status_priority", "status", "priority"),
+        Index("ix_maintenance_alerts_dedup", "equipment_id", "type", "title", "status"),
+    )
+    __mapper_args__ = {"eager_defaults": "auto"}
 
     id = Column(Integer, primary_key=True, index=True)
     equipment_id = Column(Integer, ForeignKey("equipment.id"))
@@ -62,12 +113,20 @@ class MaintenanceAlert(Base):
     status = Column(String, default="active")  # active, acknowledged, resolved
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     resolved_at = Column(DateTime(timezone=True))
+    # Repeats of an open alert with the same (equipment_id, type, title), see app/alerts.py
+    occurrence_count = Column(Integer, default=1, server_default="1")
+    last_seen_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relationships
     equipment = relationship("Equipment", back_populates="maintenance_alerts")
 
 class ProductionRecord(Base):
     __tablename__ = "production_records"
+    __table_args__ = (
+        Index("ix_production_records_equipment_date", "equipment_id", "date"),
+        Index("ix_production_records_date", "date"),  # newest-first listing without a sort
+    )
+    __mapper_args__ = {"eager_defaults": "auto"}
 
     id = Column(Integer, primary_key=True, index=True)
     equipment_id = Column(Integer, ForeignKey("equipment.id"))
@@ -81,6 +140,11 @@ class ProductionRecord(Base):
 
 class MaintenanceLog(Base):
     __tablename__ = "maintenance_logs"
+    __table_args__ = (
+        Index("ix_maintenance_logs_equipment_created", "equipment_id", "created_at"),
+        Index("ix_maintenance_logs_created", "created_at"),
+    )
+    __mapper_args__ = {"eager_defaults": "auto"}
 
     id = Column(Integer, primary_key=True, index=True)
     equipment_id = Column(Integer, ForeignKey("equipment.id"))
@@ -93,4 +157,43 @@ class MaintenanceLog(Base):
     status = Column(String, default="completed")  # scheduled, in_progress, completed
     scheduled_date = Column(DateTime(timezone=True))
     completed_date = Column(DateTime(timezone=True))
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class EquipmentReliability(Base):
+    """Running failure and repair statistics per equipment, kept up to date by crud (see app/reliability.py)"""
+    __tablename__ = "equipment_reliability"
+
+    equipment_id = Column(Integer, ForeignKey("equipment.id"), primary_key=True)
+    failures = Column(Integer, default=0, nullable=False)  # corrective and emergency logs
+    first_failure_at = Column(DateTime(timezone=True))
+    last_failure_at = Column(DateTime(timezone=True))
+    repairs = Column(Integer, default=0, nullable=False)  # completed failure logs with a known duration
+    repair_hours = Column(Float, default=0.0, nullable=False)
+
+class MaintenanceCostMonthly(Base):
+    """Maintenance spend per month, equipment and maintenance type, kept up to date by crud (see app/costs.py)"""
+    __tablename__ = "maintenance_cost_monthly"
+    __table_args__ = {"sqlite_with_rowid": False}  # clustered on the key, so month ranges are one sequential read
+
+    month = Column(Date, primary_key=True)  # first day of the month
+    equipment_id = Column(Integer, ForeignKey("equipment.id"), primary_key=True)
+    maintenance_type = Column(String, primary_key=True)
+    logs = Column(Integer, default=0, nullable=False)
+    cost = Column(Float, default=0.0, nullable=False)
+
+class PartsUsageMonthly(Base):
+    """Replacements per month of each part named in parts_replaced (see app/costs.py)"""
+    __tablename__ = "parts_usage_monthly"
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    month = Column(Date, primary_key=True)
+    part = Column(String, primary_key=True)  # normalized: lower case, single spaces
+    name = Column(String, nullable=False)  # as first written
+    replacements = Column(Integer, default=0, nullable=False)
+
+# Full-text search indexes (FTS5 on SQLite, tsvector on PostgreSQL), see app/search.py
+for _table in (MaintenanceLog.__table__, MaintenanceAlert.__table__, Equipment.__table__):
+    attach_search_index(_table)
+
+# Registers the session hooks that encode new readings (see app/dimensions.py); imported last as it uses the classes above
+from . import dimensions  # noqa: E402,F401
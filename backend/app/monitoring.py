@@ -1,12 +1,17 @@
+import asyncio
+import os
+import random
+import re
+import threading
 import time
-from prometheus_client import Counter, Histogram, Gauge, generate_latest
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from typing import Callable
+from typing import Dict, Optional
+from prometheus_client import Counter, Histogram, Gauge, CollectorRegistry, generate_latest, multiprocess
 import sentry_sdk
 from sentry_sdk.integrations.fastapi import FastApiIntegration
 from sentry_sdk.integrations.sqlalchemy import SqlalchemyIntegration
 
+from .settings import settings
+
 # Prometheus metrics
 REQUEST_COUNT = Counter(
     'http_requests_total', 
@@ -20,30 +25,208 @@ REQUEST_DURATION = Histogram(
     ['method', 'endpoint']
 )
 
-ACTIVE_USERS = Gauge('active_users', 'Number of active users')
-EQUIPMENT_STATUS = Gauge('equipment_status', 'Equipment status by type', ['status'])
-
-class PrometheusMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        start_time = time.time()
-        response = await call_next(request)
-        
-        # Record metrics
-        REQUEST_COUNT.labels(
-            method=request.method,
-            endpoint=request.url.path,
-            status_code=response.status_code
-        ).inc()
-        
-        REQUEST_DURATION.labels(
-            method=request.method,
-            endpoint=request.url.path
-        ).observe(time.time() - start_time)
-        
-        return response
-
-def init_sentry(dsn: str, environment: str = "development"):
+REQUESTS_IN_PROGRESS = Gauge(
+    'http_requests_in_progress',
+    'HTTP Requests currently being served',
+    ['method'],
+    multiprocess_mode='livesum'
+)
+
+RESPONSE_SIZE = Histogram(
+    'http_response_size_bytes',
+    'HTTP Response body size',
+    ['method', 'endpoint'],
+    buckets=(100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+)
+
+# multiprocess_mode decides how values from gunicorn workers are combined.
+# Every worker counts active users from users.last_seen_at, so all report the fleet-wide count; take the max.
+ACTIVE_USERS = Gauge('active_users', 'Number of active users', multiprocess_mode='livemax')
+EQUIPMENT_STATUS = Gauge('equipment_status', 'Equipment status by type', ['status'], multiprocess_mode='mostrecent')
+ACTIVE_ALERTS = Gauge('maintenance_alerts_active', 'Active maintenance alerts by priority', ['priority'], multiprocess_mode='mostrecent')
+SENSOR_INGEST_RATE = Gauge('sensor_ingest_rate', 'Sensor readings ingested per second', multiprocess_mode='livesum')
+
+# Request scope per running task, so out-of-band observers (loop_monitor) can name the active route
+active_requests: Dict[asyncio.Task, dict] = {}
+
+def get_route_template(scope) -> str:
+    """Matched route path (e.g. /equipment/{equipment_id}) so metric labels stay bounded"""
+    route = scope.get("route")
+    if route is not None:
+        return getattr(route, "path", "unmatched")
+    # Older Starlette versions only expose the endpoint in the scope
+    endpoint = scope.get("endpoint")
+    app = scope.get("app")
+    if endpoint is not None and app is not None:
+        for candidate in getattr(app, "routes", []):
+            if getattr(candidate, "endpoint", None) is endpoint:
+                return candidate.path
+    return "unmatched"
+
+def compile_route_template(template: str):
+    """Regex matching raw paths for a route template, for decisions made before routing"""
+    pattern = re.sub(r"\\{[^/]+?\\}", "[^/]+", re.escape(template))
+    return re.compile(f"^{pattern}$")
+
+class PrometheusMiddleware:
+    """Pure ASGI request metrics, labelled by route template rather than raw path"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        start_time = time.perf_counter()
+        status_code = 500
+        response_size = 0
+
+        async def send_with_metrics(message):
+            nonlocal status_code, response_size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                response_size += len(message.get("body", b""))
+            await send(message)
+
+        in_progress = REQUESTS_IN_PROGRESS.labels(method=method)
+        in_progress.inc()
+        task = asyncio.current_task()
+        active_requests[task] = scope
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            active_requests.pop(task, None)
+            in_progress.dec()
+            endpoint = get_route_template(scope)
+
+            # Record metrics
+            REQUEST_COUNT.labels(
+                method=method,
+                endpoint=endpoint,
+                status_code=status_code
+            ).inc()
+
+            REQUEST_DURATION.labels(
+                method=method,
+                endpoint=endpoint
+            ).observe(time.perf_counter() - start_time)
+
+            RESPONSE_SIZE.labels(
+                method=method,
+                endpoint=endpoint
+            ).observe(response_size)
+
+            duration = time.perf_counter() - start_time
+            if _slow_request_seconds is not None and duration >= _slow_request_seconds:
+                report_slow_request(method, endpoint, status_code, duration)
+
+class AdaptiveTraceSampler:
+    """Sentry traces_sampler with per-route rates, scaled to stay within a traces-per-minute budget
+
+    route_rates maps "METHOD /route/{template}" (or just the template) to a base
+    sample rate. Every window the scale factor is adjusted so that the number of
+    sampled transactions converges on target_per_minute.
+    """
+
+    def __init__(self, default_rate: float, route_rates: Dict[str, float],
+                 target_per_minute: float, window_seconds: float = 60.0,
+                 min_scale: float = 0.0001, max_scale: float = 100.0):
+        self.default_rate = default_rate
+        self.target_per_window = target_per_minute * window_seconds / 60.0
+        self.window_seconds = window_seconds
+        self.min_scale = min_scale
+        self.max_scale = max_scale
+        self.scale = 1.0
+        self._routes = []
+        for key, rate in route_rates.items():
+            method, template = self._split(key)
+            self._routes.append((method, compile_route_template(template), rate))
+        self._rate_cache: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._sampled_in_window = 0
+        self._base_samples = 0.0
+
+    @staticmethod
+    def _split(key: str):
+        method, _, template = key.strip().rpartition(" ")
+        return (method.upper() or None, template)
+
+    def base_rate(self, method: str, path: str) -> float:
+        key = (method, path)
+        rate = self._rate_cache.get(key)
+        if rate is None:
+            rate = self.default_rate
+            for route_method, pattern, route_rate in self._routes:
+                if (route_method is None or route_method == method) and pattern.match(path):
+                    rate = route_rate
+                    break
+            if len(self._rate_cache) < 10_000:
+                self._rate_cache[key] = rate
+        return rate
+
+    def _roll_window(self, now: float):
+        elapsed = now - self._window_start
+        # Close the window early on a traffic spike instead of overshooting for a whole window
+        if elapsed < self.window_seconds and self._sampled_in_window < 2 * self.target_per_window:
+            return
+        # _base_samples is how many traces the window would have produced at scale 1.0
+        expected = self.target_per_window * max(elapsed, 0.001) / self.window_seconds
+        if self._base_samples > 0:
+            self.scale = min(self.max_scale, max(self.min_scale, expected / self._base_samples))
+        else:
+            self.scale = 1.0
+        self._window_start = now
+        self._sampled_in_window = 0
+        self._base_samples = 0.0
+
+    def __call__(self, sampling_context) -> float:
+        parent_sampled = sampling_context.get("parent_sampled")
+        if parent_sampled is not None:
+            return float(parent_sampled)
+
+        scope = sampling_context.get("asgi_scope") or {}
+        rate = self.base_rate(scope.get("method", ""), scope.get("path", ""))
+        if rate <= 0.0:
+            return 0.0
+
+        with self._lock:
+            self._roll_window(time.monotonic())
+            self._base_samples += rate
+            sampled = random.random() < min(1.0, rate * self.scale)
+            if sampled:
+                self._sampled_in_window += 1
+        return 1.0 if sampled else 0.0
+
+
+# Requests slower than this are reported to Sentry even when their trace was not sampled
+_slow_request_seconds: Optional[float] = None
+
+
+def report_slow_request(method: str, endpoint: str, status_code: int, duration: float):
+    span = sentry_sdk.get_current_span()
+    if span is not None and span.sampled:
+        return  # the full trace is already being sent
+    with sentry_sdk.new_scope() as scope:
+        scope.set_tag("endpoint", endpoint)
+        scope.set_tag("method", method)
+        scope.set_context("request_timing", {
+            "duration_ms": round(duration * 1000, 1),
+            "status_code": status_code,
+        })
+        scope.fingerprint = ["slow-request", method, endpoint]
+        sentry_sdk.capture_message(f"Slow request: {method} {endpoint}", level="warning")
+
+
+def init_sentry(dsn: str, environment: str = "development", **options):
     """Initialize Sentry for error tracking"""
+    global _slow_request_seconds
+    _slow_request_seconds = settings.sentry_slow_request_ms / 1000 if settings.sentry_slow_request_ms else None
+
     sentry_sdk.init(
         dsn=dsn,
         environment=environment,
@@ -51,10 +234,23 @@ def init_sentry(dsn: str, environment: str = "development"):
             FastApiIntegration(),
             SqlalchemyIntegration(),
         ],
-        traces_sample_rate=1.0,
-        profiles_sample_rate=1.0,
+        # Error events are always sent; only performance traces are sampled
+        sample_rate=1.0,
+        traces_sampler=AdaptiveTraceSampler(
+            default_rate=settings.sentry_traces_sample_rate,
+            route_rates=settings.sentry_trace_route_rates,
+            target_per_minute=settings.sentry_traces_per_minute,
+        ),
+        # Fraction of sampled transactions that are also profiled
+        profiles_sample_rate=settings.sentry_profiles_sample_rate,
+        **options,
     )
 
 def get_metrics():
     """Get Prometheus metrics in the latest format"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        # Aggregate the per-worker metric files written under gunicorn
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
     return generate_latest()
\ No newline at end of file
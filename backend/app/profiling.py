@@ -0,0 +1,372 @@
+import asyncio
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs
+
+from starlette.datastructures import MutableHeaders
+
+from . import auth
+from .database import SessionLocal
+from .monitoring import compile_route_template
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_QUERY_FLAG = "__profile"
+ARMED_FILE = "armed.json"
+
+
+_switch_lock = threading.Lock()
+_active_profilers = 0
+_saved_switch_interval = None
+
+
+def _acquire_switch_interval(interval: float):
+    """Shorten the GIL switch interval so the sampler thread gets to run between bytecodes
+
+    The default (5 ms) would otherwise cap the sampling rate of CPU-bound code.
+    """
+    global _active_profilers, _saved_switch_interval
+    with _switch_lock:
+        if _active_profilers == 0:
+            _saved_switch_interval = sys.getswitchinterval()
+            sys.setswitchinterval(min(interval, _saved_switch_interval))
+        _active_profilers += 1
+
+
+def _release_switch_interval():
+    global _active_profilers
+    with _switch_lock:
+        _active_profilers -= 1
+        if _active_profilers == 0:
+            sys.setswitchinterval(_saved_switch_interval)
+
+
+class SamplingProfiler:
+    """Samples the Python stack of one thread at a fixed interval
+
+    When a task is given, only samples taken while that task is running on the
+    event loop are kept, so concurrent requests do not leak into the profile.
+    Time spent awaiting I/O is not on-CPU and therefore not sampled.
+    """
+
+    def __init__(self, thread_id: int, loop=None, task=None, interval: float = 0.001):
+        self.thread_id = thread_id
+        self.loop = loop
+        self.task = task
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.skipped = 0
+        self.started_at = 0.0
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        _acquire_switch_interval(self.interval)
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        _release_switch_interval()
+        self.duration = time.perf_counter() - self.started_at
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            if self.task is not None and asyncio.current_task(self.loop) is not self.task:
+                self.skipped += 1
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            stack.reverse()
+            self.samples[tuple(stack)] += 1
+
+    def to_speedscope(self, name: str) -> dict:
+        frames: List[dict] = []
+        frame_index: Dict[tuple, int] = {}
+        samples, weights = [], []
+        for stack, count in self.samples.most_common():
+            indexes = []
+            for key in stack:
+                if key not in frame_index:
+                    frame_index[key] = len(frames)
+                    frames.append({"name": key[0], "file": key[1], "line": key[2]})
+                indexes.append(frame_index[key])
+            samples.append(indexes)
+            weights.append(count * self.interval)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "producflow",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+
+def _profile_dir() -> str:
+    os.makedirs(settings.profile_dir, exist_ok=True)
+    return settings.profile_dir
+
+
+def profile_path(profile_id: str) -> Optional[str]:
+    if not profile_id.isalnum():
+        return None
+    path = os.path.join(settings.profile_dir, f"{profile_id}.speedscope.json")
+    return path if os.path.exists(path) else None
+
+
+def list_profiles() -> List[dict]:
+    if not os.path.isdir(settings.profile_dir):
+        return []
+    profiles = []
+    for entry in os.scandir(settings.profile_dir):
+        if entry.name.endswith(".speedscope.json"):
+            stat = entry.stat()
+            profiles.append({
+                "id": entry.name.split(".", 1)[0],
+                "created_at": stat.st_mtime,
+                "size_bytes": stat.st_size,
+            })
+    return sorted(profiles, key=lambda p: p["created_at"], reverse=True)
+
+
+def _store_profile(profile: dict) -> str:
+    directory = _profile_dir()
+    profile_id = uuid.uuid4().hex[:16]
+    path = os.path.join(directory, f"{profile_id}.speedscope.json")
+    with open(path, "w") as f:
+        json.dump(profile, f)
+    for stale in list_profiles()[settings.profile_max_stored:]:
+        try:
+            os.remove(os.path.join(directory, f"{stale['id']}.speedscope.json"))
+        except OSError:
+            pass
+    return profile_id
+
+
+# Armed captures ("profile the next N requests matching route X") live in a file
+# in profile_dir so that arming through one gunicorn worker applies to all of them.
+def arm(route: str, count: int, duration_seconds: float, method: Optional[str] = None) -> dict:
+    arm_id = uuid.uuid4().hex[:12]
+    armed = {
+        "id": arm_id,
+        "route": route,
+        "method": method.upper() if method else None,
+        "count": count,
+        "expires_at": time.time() + duration_seconds,
+    }
+    path = os.path.join(_profile_dir(), ARMED_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(armed, f)
+    os.replace(path + ".tmp", path)
+    _remove_slots(keep=arm_id)
+    return armed
+
+
+def disarm():
+    try:
+        os.remove(os.path.join(settings.profile_dir, ARMED_FILE))
+    except FileNotFoundError:
+        pass
+    _remove_slots()
+
+
+def _remove_slots(keep: Optional[str] = None):
+    """Delete the slot files claimed from earlier armed captures (all but those of `keep`)"""
+    if not os.path.isdir(settings.profile_dir):
+        return
+    for entry in os.scandir(settings.profile_dir):
+        arm_id, dot, slot = entry.name.partition(".slot")
+        if dot and slot.isdigit() and arm_id != keep:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+
+class _ArmedState:
+    """Per-worker view of the armed file, re-read at most once per second"""
+
+    def __init__(self):
+        self.checked_at = 0.0
+        self.mtime = None
+        self.armed: Optional[dict] = None
+        self.pattern = None
+
+    def current(self) -> Optional[dict]:
+        now = time.monotonic()
+        if now - self.checked_at >= 1.0:
+            self.checked_at = now
+            self._reload()
+        if self.armed is not None and self.armed["expires_at"] < time.time():
+            self.armed = None
+        return self.armed
+
+    def _reload(self):
+        path = os.path.join(settings.profile_dir, ARMED_FILE)
+        try:
+            mtime = os.stat(path).st_mtime
+        except FileNotFoundError:
+            self.mtime, self.armed = None, None
+            return
+        if mtime == self.mtime:
+            return
+        try:
+            with open(path) as f:
+                self.armed = json.load(f)
+            self.pattern = compile_route_template(self.armed["route"])
+            self.mtime = mtime
+        except (OSError, ValueError, KeyError):
+            self.armed = None
+
+    def matches(self, scope) -> bool:
+        armed = self.current()
+        if armed is None:
+            return False
+        if armed["method"] and armed["method"] != scope["method"]:
+            return False
+        return bool(self.pattern.match(scope["path"]))
+
+    def claim_slot(self) -> bool:
+        """Atomically take one of the armed captures (shared across workers)"""
+        armed = self.armed
+        for slot in range(armed["count"]):
+            try:
+                fd = os.open(os.path.join(settings.profile_dir, f"{armed['id']}.slot{slot}"),
+                             os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.close(fd)
+                return True
+            except FileExistsError:
+                continue
+        return False
+
+
+def _requested_mode(scope) -> Optional[str]:
+    for name, value in scope["headers"]:
+        if name == PROFILE_HEADER:
+            return value.decode().lower() or "store"
+    query = scope.get("query_string", b"")
+    if PROFILE_QUERY_FLAG.encode() in query:
+        values = parse_qs(query.decode()).get(PROFILE_QUERY_FLAG)
+        if values:
+            return values[0].lower()
+    return None
+
+
+async def _is_admin(scope) -> bool:
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode().partition(" ")
+            if scheme.lower() != "bearer" or not token:
+                return False
+            async with SessionLocal() as db:
+                user = await auth.get_user_from_token(db, token)
+            return user is not None and user.role == "admin"
+    return False
+
+
+class ProfilingMiddleware:
+    """Profiles single requests on demand
+
+    - "X-Profile: store" (or ?__profile=store) from an admin stores a speedscope
+      profile and returns its id in X-Profile-Id.
+    - "X-Profile: return" replaces the response with the speedscope JSON.
+    - Requests matching an armed route are profiled and stored.
+
+    Only installed when PROFILING_ENABLED is set.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.armed = _ArmedState()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        mode = _requested_mode(scope)
+        if mode is not None and mode not in ("0", "false", "off"):
+            if not await _is_admin(scope):
+                mode = None
+        elif self.armed.matches(scope) and self.armed.claim_slot():
+            mode = "store"
+        else:
+            mode = None
+
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+        await self._profile(scope, receive, send, return_profile=(mode == "return"))
+
+    async def _profile(self, scope, receive, send, return_profile: bool):
+        profiler = SamplingProfiler(
+            threading.get_ident(),
+            loop=asyncio.get_running_loop(),
+            task=asyncio.current_task(),
+            interval=settings.profile_sample_interval_ms / 1000,
+        )
+        name = f"{scope['method']} {scope['path']}"
+        profile_id = None
+
+        async def send_with_profile(message):
+            if return_profile:
+                return  # the profile is sent instead of the response
+            if message["type"] == "http.response.start":
+                profiler.stop()
+                nonlocal profile_id
+                profile_id = await asyncio.to_thread(_store_profile, profiler.to_speedscope(name))
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Profile-Id", profile_id)
+                headers.append("X-Profile-Duration-Ms", f"{profiler.duration * 1000:.1f}")
+            await send(message)
+
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            profiler.stop()
+            if profile_id is None and not return_profile:
+                await asyncio.to_thread(_store_profile, profiler.to_speedscope(name))
+
+        if return_profile:
+            body = json.dumps(profiler.to_speedscope(name)).encode()
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"x-profile-duration-ms", f"{profiler.duration * 1000:.1f}".encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+        logger.info("Profiled %s %s in %.1f ms", scope["method"], scope["path"], profiler.duration * 1000)
@@ -0,0 +1,160 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import case, delete, func, select
+
+from . import models
+from .database import epoch_seconds, upsert_insert
+
+# Maintenance types that record a failure; preventive work does not count
+FAILURE_TYPES = ("corrective", "emergency")
+RANKINGS = {
+    # sort key -> order that puts the worst first
+    "mtbf": "asc",
+    "mttr": "desc",
+    "failures": "desc",
+    "availability": "asc",
+}
+
+
+def failure_time(log: models.MaintenanceLog) -> Optional[datetime]:
+    return log.scheduled_date or log.created_at
+
+
+def repair_hours(log: models.MaintenanceLog) -> Optional[float]:
+    """Hours to repair if the log is a completed failure repair, otherwise None"""
+    if log.maintenance_type not in FAILURE_TYPES or log.status != "completed":
+        return None
+    if log.duration_hours is not None:
+        return log.duration_hours
+    start = failure_time(log)
+    if start is None or log.completed_date is None:
+        return None
+    return max((log.completed_date.replace(tzinfo=None) - start.replace(tzinfo=None)).total_seconds(), 0.0) / 3600
+
+
+async def _record(db, equipment_id: int, failures: int = 0, failure_at: Optional[datetime] = None,
+                  repairs: int = 0, hours: float = 0.0):
+    """Add to the running statistics of one equipment in the caller's transaction"""
+    table = models.EquipmentReliability.__table__
+    dialect_name = (await db.connection()).dialect.name
+    least, greatest = (func.least, func.greatest) if dialect_name == "postgresql" else (func.min, func.max)
+    statement = upsert_insert(dialect_name)(table).values(
+        equipment_id=equipment_id, failures=failures, first_failure_at=failure_at, last_failure_at=failure_at,
+        repairs=repairs, repair_hours=hours
+    )
+    excluded = statement.excluded
+    await db.execute(statement.on_conflict_do_update(
+        index_elements=[table.c.equipment_id],
+        set_={
+            "failures": table.c.failures + excluded.failures,
+            "first_failure_at": func.coalesce(least(table.c.first_failure_at, excluded.first_failure_at),
+                                              table.c.first_failure_at, excluded.first_failure_at),
+            "last_failure_at": func.coalesce(greatest(table.c.last_failure_at, excluded.last_failure_at),
+                                             table.c.last_failure_at, excluded.last_failure_at),
+            "repairs": table.c.repairs + excluded.repairs,
+            "repair_hours": table.c.repair_hours + excluded.repair_hours,
+        }
+    ))
+
+
+async def log_created(db, log: models.MaintenanceLog):
+    """Count a new log; call after flushing it so column defaults are set"""
+    if log.maintenance_type not in FAILURE_TYPES or log.equipment_id is None:
+        return
+    hours = repair_hours(log)
+    await _record(db, log.equipment_id, failures=1, failure_at=failure_time(log),
+                  repairs=int(hours is not None), hours=hours or 0.0)
+
+
+async def log_changed(db, log: models.MaintenanceLog, hours_before: Optional[float]):
+    """Apply a status or completion change, given repair_hours(log) from before the change"""
+    hours = repair_hours(log)
+    if hours == hours_before or log.equipment_id is None:
+        return
+    await _record(db, log.equipment_id, repairs=int(hours is not None) - int(hours_before is not None),
+                  hours=(hours or 0.0) - (hours_before or 0.0))
+
+
+async def rebuild(db):
+    """Recompute all statistics from the maintenance history, e.g. after bulk loads that bypass crud"""
+    logs = models.MaintenanceLog.__table__
+    dialect_name = (await db.connection()).dialect.name
+    started = func.coalesce(logs.c.scheduled_date, logs.c.created_at)
+    elapsed = (epoch_seconds(logs.c.completed_date, dialect_name) - epoch_seconds(started, dialect_name)) / 3600.0
+    hours = case(
+        (logs.c.status != "completed", None),
+        # Completed before it was scheduled counts as no repair time, as in repair_hours()
+        else_=func.coalesce(logs.c.duration_hours, case((elapsed < 0, 0.0), else_=elapsed))
+    )
+    aggregated = (
+        select(logs.c.equipment_id, func.count(), func.min(started), func.max(started),
+               func.count(hours), func.coalesce(func.sum(hours), 0.0))
+        .where(logs.c.maintenance_type.in_(FAILURE_TYPES), logs.c.equipment_id.isnot(None))
+        .group_by(logs.c.equipment_id)
+    )
+    table = models.EquipmentReliability.__table__
+    await db.execute(delete(table))
+    await db.execute(table.insert().from_select(
+        ["equipment_id", "failures", "first_failure_at", "last_failure_at", "repairs", "repair_hours"], aggregated
+    ))
+
+
+def _metrics(row) -> dict:
+    mtbf = row.span_hours / row.intervals if row.intervals else None
+    mttr = row.repair_hours / row.repairs if row.repairs else None
+    availability = mtbf / (mtbf + mttr) if mtbf is not None and mttr is not None and mtbf + mttr > 0 else None
+    return {
+        "failures": row.failures or 0,
+        "repairs": row.repairs or 0,
+        "mtbf_hours": round(mtbf, 2) if mtbf is not None else None,
+        "mttr_hours": round(mttr, 2) if mttr is not None else None,
+        "availability": round(availability, 4) if availability is not None else None,
+    }
+
+
+async def fleet_reliability(db, group_by: str = "equipment", sort_by: str = "mtbf", limit: int = 20) -> dict:
+    """MTBF, MTTR and availability for the fleet plus a worst-first ranking by equipment or type
+
+    Reads only the running statistics (one row per equipment), never the
+    maintenance history. MTBF is the mean interval between consecutive
+    failures; pooled over several machines it is total span over total
+    intervals.
+    """
+    stats = models.EquipmentReliability.__table__
+    dialect_name = (await db.connection()).dialect.name
+    span = (epoch_seconds(stats.c.last_failure_at, dialect_name)
+            - epoch_seconds(stats.c.first_failure_at, dialect_name)) / 3600.0
+    columns = [
+        func.sum(stats.c.failures).label("failures"),
+        func.sum(stats.c.failures - 1).label("intervals"),
+        func.coalesce(func.sum(span), 0.0).label("span_hours"),
+        func.sum(stats.c.repairs).label("repairs"),
+        func.coalesce(func.sum(stats.c.repair_hours), 0.0).label("repair_hours"),
+    ]
+    fleet = (await db.execute(select(*columns).where(stats.c.failures > 0))).one()
+
+    equipment = models.Equipment.__table__
+    if group_by == "type":
+        keys = [equipment.c.type]
+    else:
+        keys = [equipment.c.id.label("equipment_id"), equipment.c.name, equipment.c.type]
+    mtbf = func.sum(span) / func.nullif(func.sum(stats.c.failures - 1), 0)
+    mttr = func.sum(stats.c.repair_hours) / func.nullif(func.sum(stats.c.repairs), 0)
+    sort_expression = {
+        "mtbf": mtbf,
+        "mttr": mttr,
+        "failures": func.sum(stats.c.failures),
+        "availability": mtbf / func.nullif(mtbf + mttr, 0),
+    }[sort_by]
+    sort_expression = sort_expression.asc() if RANKINGS[sort_by] == "asc" else sort_expression.desc()
+    rows = (await db.execute(
+        select(*keys, *columns)
+        .select_from(stats.join(equipment, equipment.c.id == stats.c.equipment_id))
+        .where(stats.c.failures > 0)
+        .group_by(*keys)
+        .order_by(sort_expression.nulls_last(), *keys)
+        .limit(limit)
+    )).all()
+    ranking = [{**{key.name: getattr(row, key.name) for key in keys}, **_metrics(row)} for row in rows]
+    return {"fleet": _metrics(fleet), "ranking": ranking}
@@ -0,0 +1,267 @@
+"""
+Retention for raw sensor readings.
+
+Readings older than their retention period are written to compressed
+columnar files (see app/timeseries.py) under `sensor_archive_dir` and then
+deleted, one chunk per short transaction so ingest never waits long for
+the write lock. Each file is recorded in sensor_archive_files with the
+equipment and time range it covers; read_archived() uses that manifest to
+bring archived readings back into queries. On SQLite the freed pages are
+returned to the file system with incremental vacuum, a few pages per step.
+"""
+import asyncio
+import csv
+import gzip
+import logging
+import math
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from prometheus_client import Counter, Histogram
+from sqlalchemy import delete, or_, select, text
+
+from . import models, timeseries
+from .database import SessionLocal
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+SENSOR_READINGS_ARCHIVED = Counter(
+    'sensor_readings_archived_total',
+    'Raw sensor readings moved from the database to archive files'
+)
+
+SENSOR_ARCHIVE_DELETE_SECONDS = Histogram(
+    'sensor_archive_delete_seconds',
+    'Duration of the write transaction that deletes one archived chunk',
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+
+SENSOR_ARCHIVE_FILE_READS = Counter(
+    'sensor_archive_file_reads_total',
+    'Archive files read to answer sensor data queries'
+)
+
+
+class RetentionPolicy:
+    """Days to keep raw readings per equipment type and sensor type
+
+    Overrides are keyed "<equipment type>/<sensor type>" and either side may
+    be "*". The most specific match wins, an equipment type match before a
+    sensor type match. Zero or fewer days keeps readings forever.
+    """
+
+    def __init__(self, default_days: int, overrides: Optional[Dict[str, int]] = None):
+        self.default_days = default_days
+        self.overrides: Dict[Tuple[str, str], int] = {}
+        for key, days in (overrides or {}).items():
+            equipment_type, separator, sensor_type = key.partition("/")
+            if not separator:
+                raise ValueError(f"Retention override {key!r} must be '<equipment type>/<sensor type>'")
+            self.overrides[(equipment_type.strip(), sensor_type.strip())] = days
+
+    def days(self, equipment_type: Optional[str], sensor_type: Optional[str]) -> int:
+        for key in ((equipment_type, sensor_type), (equipment_type, "*"), ("*", sensor_type), ("*", "*")):
+            if key in self.overrides:
+                return self.overrides[key]
+        return self.default_days
+
+    def rules(self, equipment_type: Optional[str]) -> List[Tuple[int, Optional[List[str]], List[str]]]:
+        """(days, sensor types or None for any, excluded sensor types) covering every reading of an equipment type"""
+        named = sorted({sensor_type for _, sensor_type in self.overrides if sensor_type != "*"})
+        rules = [(self.days(equipment_type, sensor_type), [sensor_type], []) for sensor_type in named]
+        rules.append((self.days(equipment_type, "*"), None, named))
+        return rules
+
+
+def _write_file(root: str, rows) -> Tuple[str, int]:
+    """Write rows to a new archive file; returns its path relative to root and its size"""
+    first = min(row.timestamp for row in rows)
+    relative = os.path.join(f"{first:%Y}", f"{first:%m}",
+                            f"sensor_data_{min(row.id for row in rows)}_{max(row.id for row in rows)}.tsc")
+    path = os.path.join(root, relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return relative, timeseries.write_file(path, rows)
+
+
+def _read_file(path: str, equipment_id: int, start: Optional[datetime], end: Optional[datetime],
+               sensor_type: Optional[str], after: Optional[datetime]) -> List[models.SensorData]:
+    if path.endswith(".csv.gz"):
+        return _read_csv_file(path, equipment_id, start, end, sensor_type, after)
+    lower = max((bound for bound in (start, after) if bound is not None), default=None)
+    low = timeseries.to_micros(lower) if lower is not None else None
+    high = timeseries.to_micros(end) if end is not None else None
+    readings = []
+    with timeseries.ArchiveReader(path) as reader:
+        for info in reader.find(equipment_id, sensor_type, low, high):
+            block = reader.read(info, low, high)
+            for reading_id, timestamp, value, status in zip(
+                    block.ids.tolist(), timeseries.from_micros(block.timestamps, reader.aware),
+                    block.values.tolist(), block.statuses.tolist()):
+                readings.append(models.SensorData(
+                    id=reading_id, equipment_id=equipment_id, sensor_type=block.sensor_type,
+                    value=None if math.isnan(value) else value, unit=block.unit, status=status, timestamp=timestamp
+                ))
+    return readings
+
+
+def _read_csv_file(path: str, equipment_id: int, start: Optional[datetime], end: Optional[datetime],
+                   sensor_type: Optional[str], after: Optional[datetime]) -> List[models.SensorData]:
+    """Archives written before the columnar format (gzip CSV, one row per reading)"""
+    readings = []
+    with gzip.open(path, "rt", newline="") as f:
+        for row in csv.DictReader(f):
+            if int(row["equipment_id"]) != equipment_id or (sensor_type and row["sensor_type"] != sensor_type):
+                continue
+            timestamp = datetime.fromisoformat(row["timestamp"])
+            if (start and timestamp < start) or (end and timestamp >= end) or (after and timestamp < after):
+                continue
+            readings.append(models.SensorData(
+                id=int(row["id"]), equipment_id=equipment_id, sensor_type=row["sensor_type"] or None,
+                value=float(row["value"]) if row["value"] else None, unit=row["unit"] or None,
+                status=row["status"] or None, timestamp=timestamp
+            ))
+    return readings
+
+
+async def read_archived(db, equipment_id: int, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                        sensor_type: Optional[str] = None, after: Optional[datetime] = None,
+                        archive_dir: str = None) -> List[models.SensorData]:
+    """Archived readings of one machine in [start, end), and no older than `after` when given
+
+    Returns detached SensorData objects. Only files whose manifest entry
+    overlaps the request are opened, so a query that the live table already
+    answers costs one lookup in the manifest.
+    """
+    files = models.SensorArchiveFile
+    query = select(files.path).where(files.min_equipment_id <= equipment_id, files.max_equipment_id >= equipment_id)
+    for lower in (start, after):
+        if lower is not None:
+            query = query.where(files.last_timestamp >= lower)
+    if end is not None:
+        query = query.where(files.first_timestamp < end)
+    paths = (await db.scalars(query.order_by(files.first_timestamp))).all()
+    root = archive_dir or settings.sensor_archive_dir
+    readings = []
+    for path in paths:
+        SENSOR_ARCHIVE_FILE_READS.inc()
+        readings.extend(await asyncio.to_thread(
+            _read_file, os.path.join(root, path), equipment_id, start, end, sensor_type, after))
+    return readings
+
+
+class SensorArchiver:
+    """Moves expired readings to archive files in chunks, then vacuums (SQLite)
+
+    Each chunk is selected in a read-only transaction, written and fsynced
+    to its file, and only then recorded in the manifest and deleted in one
+    short write transaction. A crash in between leaves an unreferenced file
+    and the readings still in place; the next run archives them again.
+    """
+
+    def __init__(self, session_factory=SessionLocal, policy: Optional[RetentionPolicy] = None,
+                 archive_dir: str = settings.sensor_archive_dir,
+                 chunk_size: int = settings.sensor_archive_chunk_size,
+                 pause: float = settings.sensor_archive_pause,
+                 vacuum_pages: int = settings.sensor_archive_vacuum_pages):
+        self.session_factory = session_factory
+        self.policy = policy or RetentionPolicy(settings.sensor_retention_days, settings.sensor_retention_overrides)
+        self.archive_dir = archive_dir
+        self.chunk_size = chunk_size
+        self.pause = pause
+        self.vacuum_pages = vacuum_pages
+
+    async def run(self, now: Optional[datetime] = None) -> dict:
+        started = time.perf_counter()
+        now = now or datetime.now()
+        stats = {"readings": 0, "files": 0, "vacuumed_pages": 0}
+        async with self.session_factory() as db:
+            equipment_types = (await db.scalars(select(models.Equipment.type).distinct())).all()
+        for equipment_type in equipment_types:
+            for days, sensor_types, excluded in self.policy.rules(equipment_type):
+                if days <= 0:
+                    continue
+                cutoff = now - timedelta(days=days)
+                while True:
+                    archived = await self._archive_chunk(equipment_type, sensor_types, excluded, cutoff)
+                    if archived:
+                        stats["readings"] += archived
+                        stats["files"] += 1
+                    if archived < self.chunk_size:
+                        break
+                    await asyncio.sleep(self.pause)
+        if stats["readings"]:
+            stats["vacuumed_pages"] = await self._vacuum()
+        stats["seconds"] = round(time.perf_counter() - started, 3)
+        logger.info("Sensor data retention: %s", stats)
+        return stats
+
+    async def _archive_chunk(self, equipment_type: Optional[str], sensor_types: Optional[List[str]],
+                             excluded: List[str], cutoff: datetime) -> int:
+        table = models.SensorData.__table__
+        equipment = models.Equipment.__table__
+        types = models.SensorType.__table__
+        of_type = select(equipment.c.id).where(
+            equipment.c.type.is_(None) if equipment_type is None else equipment.c.type == equipment_type)
+        conditions = [table.c.equipment_id.in_(of_type), table.c.timestamp < cutoff]
+        if sensor_types is not None:
+            conditions.append(table.c.sensor_type_id.in_(select(types.c.id).where(types.c.name.in_(sensor_types))))
+        if excluded:
+            conditions.append(or_(table.c.sensor_type_id.is_(None), table.c.sensor_type_id.not_in(
+                select(types.c.id).where(types.c.name.in_(excluded)))))
+        statuses = models.SensorStatus.__table__
+        source = (table.outerjoin(types, types.c.id == table.c.sensor_type_id)
+                  .outerjoin(statuses, statuses.c.id == table.c.status_id))
+        # Read in its own transaction: on SQLite a read transaction cannot be upgraded once another writer committed
+        async with self.session_factory() as db:
+            rows = (await db.execute(
+                select(table.c.id, table.c.equipment_id, types.c.name.label("sensor_type"), table.c.value,
+                       types.c.unit, statuses.c.name.label("status"), table.c.timestamp)
+                .select_from(source).where(*conditions)
+                .order_by(table.c.equipment_id, table.c.timestamp).limit(self.chunk_size)
+            )).all()
+        if not rows:
+            return 0
+
+        path, size = await asyncio.to_thread(_write_file, self.archive_dir, rows)
+        async with self.session_factory() as db:
+            started = time.perf_counter()
+            db.add(models.SensorArchiveFile(
+                path=path, min_equipment_id=min(row.equipment_id for row in rows),
+                max_equipment_id=max(row.equipment_id for row in rows),
+                first_timestamp=min(row.timestamp for row in rows), last_timestamp=max(row.timestamp for row in rows),
+                readings=len(rows), size_bytes=size
+            ))
+            await db.execute(delete(table).where(table.c.id.in_([row.id for row in rows])))
+            await db.commit()
+            SENSOR_ARCHIVE_DELETE_SECONDS.observe(time.perf_counter() - started)
+        SENSOR_READINGS_ARCHIVED.inc(len(rows))
+        return len(rows)
+
+    async def _vacuum(self) -> int:
+        """Release free pages a step at a time; needs auto_vacuum=INCREMENTAL (new databases have it)"""
+        async with self.session_factory() as db:
+            conn = await db.connection()
+            if conn.dialect.name != "sqlite":
+                return 0
+            if await conn.scalar(text("PRAGMA auto_vacuum")) != 2:
+                logger.info("SQLite auto_vacuum is not INCREMENTAL; run VACUUM once to return archived space")
+                return 0
+        released = 0
+        while True:
+            async with self.session_factory() as db:
+                conn = await db.connection()
+                free = await conn.scalar(text("PRAGMA freelist_count"))
+                if not free:
+                    return released
+                # The pragma releases one page per step and the DB-API cursor only steps once;
+                # executescript runs it to completion (in its own short write transaction)
+                raw = await conn.get_raw_connection()
+                await raw.driver_connection.executescript(f"PRAGMA incremental_vacuum({self.vacuum_pages})")
+            released += min(free, self.vacuum_pages)
+            await asyncio.sleep(self.pause)
+
+
+archiver = SensorArchiver()
@@ -0,0 +1,393 @@
+import asyncio
+import fcntl
+import logging
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import text
+
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_JOB_DURATION = Histogram(
+    'scheduler_job_duration_seconds',
+    'Duration of periodic job runs',
+    ['job'],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0)
+)
+
+SCHEDULER_JOB_LAG = Histogram(
+    'scheduler_job_lag_seconds',
+    'Delay between when a job was due and when it started',
+    ['job'],
+    buckets=(0.001, 0.01, 0.1, 0.5, 1.0, 5.0, 30.0, 120.0)
+)
+
+SCHEDULER_JOB_RUNS = Counter(
+    'scheduler_job_runs_total',
+    'Periodic job runs by outcome (success, failure, timeout, skipped)',
+    ['job', 'outcome']
+)
+
+# Summed over workers this is the number of leaders, which should be exactly 1
+SCHEDULER_LEADER = Gauge('scheduler_leader', 'Whether this process runs the periodic jobs', multiprocess_mode='livesum')
+
+
+class IntervalTrigger:
+    """Fires every `seconds`, counted from the previous due time"""
+
+    def __init__(self, seconds: float):
+        if seconds <= 0:
+            raise ValueError("Interval must be positive")
+        self.seconds = seconds
+
+    def next_after(self, previous: datetime) -> datetime:
+        return previous + timedelta(seconds=self.seconds)
+
+    def __repr__(self):
+        return f"every {self.seconds:g}s"
+
+
+class CronTrigger:
+    """Standard five-field cron expression (minute hour day-of-month month day-of-week), local time
+
+    Fields accept *, numbers, ranges (1-5), lists (1,15) and steps (*/10, 0-30/5).
+    Day of week runs 0-6 from Sunday (7 is also Sunday). As in cron, when both
+    day fields are restricted a day matching either of them fires.
+    """
+
+    FIELDS = (("minute", 0, 59), ("hour", 0, 23), ("day", 1, 31), ("month", 1, 12), ("weekday", 0, 7))
+
+    def __init__(self, expression: str):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"Cron expression needs 5 fields, got {expression!r}")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            self._parse(part, low, high) for part, (_, low, high) in zip(parts, self.FIELDS)
+        )
+        self.weekdays = {d % 7 for d in weekdays}
+        self.any_day = parts[2] == "*"
+        self.any_weekday = parts[4] == "*"
+
+    @staticmethod
+    def _parse(field: str, low: int, high: int) -> set:
+        values = set()
+        for item in field.split(","):
+            spec, _, step = item.partition("/")
+            if spec == "*":
+                start, end = low, high
+            elif "-" in spec:
+                start, end = (int(v) for v in spec.split("-", 1))
+            else:
+                start = int(spec)
+                end = high if step else start
+            step = int(step) if step else 1
+            if not low <= start <= end <= high or step < 1:
+                raise ValueError(f"Invalid cron field {field!r}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, day: datetime) -> bool:
+        # datetime.weekday() is Monday=0; cron is Sunday=0
+        in_days = day.day in self.days
+        in_weekdays = (day.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return in_days and in_weekdays
+        return in_days or in_weekdays
+
+    def next_after(self, previous: datetime) -> datetime:
+        candidate = previous.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 5)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                candidate = (candidate.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"Cron expression {self.expression!r} never fires")
+
+    def __repr__(self):
+        return f"cron {self.expression!r}"
+
+
+class Job:
+    def __init__(self, name: str, func: Callable[[], Awaitable], trigger, timeout: Optional[float] = None,
+                 jitter: float = 0.0):
+        self.name = name
+        self.func = func
+        self.trigger = trigger
+        self.timeout = timeout
+        self.jitter = jitter
+        self.scheduled: Optional[datetime] = None  # next_due before jitter
+        self.next_due: Optional[datetime] = None
+        self.last_started: Optional[datetime] = None
+        self.last_outcome: Optional[str] = None
+        self._running: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._running is not None and not self._running.done()
+
+
+class FileLeaderLock:
+    """Exclusive flock on a file; held for the life of the process, released by the kernel when it exits
+
+    Only elects one leader per host, so use the database lock when workers span machines.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    async def acquire(self) -> bool:
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.getpid()}\n".encode())
+        self._fd = fd
+        return True
+
+    async def check(self) -> bool:
+        return self._fd is not None
+
+    async def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+
+class AdvisoryLeaderLock:
+    """PostgreSQL session advisory lock on a dedicated connection; released when the connection drops"""
+
+    def __init__(self, engine, key: int):
+        self.engine = engine
+        self.key = key
+        self._conn = None
+
+    async def acquire(self) -> bool:
+        conn = await self.engine.connect()
+        try:
+            # Autocommit so the held connection is never left idle in a transaction
+            await conn.execution_options(isolation_level="AUTOCOMMIT")
+            acquired = await conn.scalar(text("SELECT pg_try_advisory_lock(:key)"), {"key": self.key})
+        except Exception:
+            await conn.close()
+            raise
+        if not acquired:
+            await conn.close()
+            return False
+        self._conn = conn
+        return True
+
+    async def check(self) -> bool:
+        if self._conn is None:
+            return False
+        try:
+            await self._conn.scalar(text("SELECT 1"))
+            return True
+        except Exception:
+            logger.warning("Scheduler lost its database connection, giving up leadership")
+            await self._close()
+            return False
+
+    async def release(self):
+        if self._conn is not None:
+            try:
+                await self._conn.scalar(text("SELECT pg_advisory_unlock(:key)"), {"key": self.key})
+            except Exception:
+                pass
+            await self._close()
+
+    async def _close(self):
+        try:
+            await self._conn.close()
+        except Exception:
+            pass
+        self._conn = None
+
+
+class NoLeaderLock:
+    """Every process is the leader; for single-process deployments"""
+
+    async def acquire(self) -> bool:
+        return True
+
+    async def check(self) -> bool:
+        return True
+
+    async def release(self):
+        pass
+
+
+def create_leader_lock(kind: str = settings.scheduler_lock, engine=None):
+    """'file', 'db', 'none', or 'auto' (the database lock on PostgreSQL, otherwise the file lock)"""
+    if kind == "auto":
+        kind = "db" if engine is not None and engine.dialect.name == "postgresql" else "file"
+    if kind == "db":
+        if engine is None:
+            raise ValueError("The database leader lock needs an engine")
+        return AdvisoryLeaderLock(engine, settings.scheduler_lock_key)
+    if kind == "file":
+        return FileLeaderLock(settings.scheduler_lock_path)
+    if kind == "none":
+        return NoLeaderLock()
+    raise ValueError(f"Unknown scheduler lock {kind!r}")
+
+
+class Scheduler:
+    """Runs registered async jobs on interval or cron triggers in the leader process only
+
+    Every gunicorn worker starts the scheduler; the one holding the leader lock
+    runs the jobs and the others retry the lock every `leader_check_interval`,
+    so a new leader takes over within that time when the old one exits. A job
+    still running when it is due again is skipped rather than started twice.
+    """
+
+    def __init__(self, leader_check_interval: float = settings.scheduler_leader_check_interval):
+        self.leader_check_interval = leader_check_interval
+        self.jobs: Dict[str, Job] = {}
+        self.is_leader = False
+        self._lock = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def add_job(self, name: str, func: Callable[[], Awaitable], *, seconds: Optional[float] = None,
+                cron: Optional[str] = None, timeout: Optional[float] = None, jitter: float = 0.0) -> Job:
+        if (seconds is None) == (cron is None):
+            raise ValueError("Pass exactly one of seconds or cron")
+        if name in self.jobs:
+            raise ValueError(f"Job {name!r} is already registered")
+        trigger = IntervalTrigger(seconds) if seconds is not None else CronTrigger(cron)
+        job = self.jobs[name] = Job(name, func, trigger, timeout=timeout, jitter=jitter)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    def job(self, name: str, **options):
+        """Decorator form of add_job"""
+        def register(func):
+            self.add_job(name, func, **options)
+            return func
+        return register
+
+    def start(self, lock=None):
+        if self._task is not None:
+            return
+        self._lock = lock or NoLeaderLock()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        running = [job._running for job in self.jobs.values() if job.running]
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+        await self._set_leader(False)
+
+    async def _set_leader(self, leader: bool):
+        if leader == self.is_leader:
+            return
+        if not leader:
+            await self._lock.release()
+        self.is_leader = leader
+        SCHEDULER_LEADER.set(1 if leader else 0)
+        logger.info("Scheduler %s leadership (pid %d)", "acquired" if leader else "released", os.getpid())
+
+    async def _run(self):
+        next_check = 0.0
+        while True:
+            if time.monotonic() >= next_check:
+                next_check = time.monotonic() + self.leader_check_interval
+                try:
+                    if self.is_leader:
+                        await self._set_leader(await self._lock.check())
+                    elif await self._lock.acquire():
+                        await self._set_leader(True)
+                        self._plan(datetime.now())
+                except Exception:
+                    logger.exception("Scheduler leader election failed")
+
+            sleep = next_check - time.monotonic()
+            if self.is_leader:
+                now = datetime.now()
+                for job in self.jobs.values():
+                    if job.next_due is None:
+                        self._plan_job(job, now)
+                    elif job.next_due <= now:
+                        self._fire(job, now)
+                sleep = min([sleep] + [(job.next_due - now).total_seconds() for job in self.jobs.values()])
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(sleep, 0.0))
+            except asyncio.TimeoutError:
+                pass
+
+    def _plan(self, now: datetime):
+        for job in self.jobs.values():
+            self._plan_job(job, now)
+
+    def _plan_job(self, job: Job, after: datetime):
+        job.scheduled = due = job.trigger.next_after(after)
+        if job.jitter:
+            due += timedelta(seconds=random.uniform(0, job.jitter))
+        job.next_due = due
+
+    def _fire(self, job: Job, now: datetime):
+        due = job.next_due
+        # Plan from the due time before jitter so runs stay on the trigger's grid; after a long stall, skip missed runs
+        self._plan_job(job, job.scheduled)
+        if job.next_due <= now:
+            self._plan_job(job, now)
+
+        if job.running:
+            SCHEDULER_JOB_RUNS.labels(job=job.name, outcome="skipped").inc()
+            logger.warning("Job %s is still running, skipping the run due at %s", job.name, due)
+            return
+        SCHEDULER_JOB_LAG.labels(job=job.name).observe(max((now - due).total_seconds(), 0.0))
+        job._running = asyncio.create_task(self._execute(job), name=f"job:{job.name}")
+
+    async def _execute(self, job: Job):
+        job.last_started = datetime.now()
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(job.func(), timeout=job.timeout)
+            outcome = "success"
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            logger.error("Job %s timed out after %.0fs", job.name, job.timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            outcome = "failure"
+            logger.exception("Job %s failed", job.name)
+        job.last_outcome = outcome
+        SCHEDULER_JOB_DURATION.labels(job=job.name).observe(time.perf_counter() - start)
+        SCHEDULER_JOB_RUNS.labels(job=job.name, outcome=outcome).inc()
+
+
+scheduler = Scheduler()
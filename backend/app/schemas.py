@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from datetime import datetime
 from typing import List, Optional
 
@@ -50,6 +50,15 @@ class Equipment(EquipmentBase):
     class Config:
         from_attributes = True
 
+class EquipmentSuggestion(BaseModel):
+    id: int
+    name: str
+    type: Optional[str] = None
+    location: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
 # Sensor data schemas
 class SensorDataBase(BaseModel):
     sensor_type: str
@@ -86,10 +95,15 @@ class MaintenanceAlert(MaintenanceAlertBase):
     status: str
     created_at: datetime
     resolved_at: Optional[datetime] = None
+    occurrence_count: int = 1
+    last_seen_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
 
+class MaintenanceAlertBulkUpdate(BaseModel):
+    alert_ids: List[int] = Field(..., min_length=1, max_length=10000)
+
 # Production metrics schemas
 class ProductionMetrics(BaseModel):
     total_output: int
@@ -156,6 +170,52 @@ class MaintenanceLog(MaintenanceLogBase):
     class Config:
         from_attributes = True
 
+# Reliability schemas
+class ReliabilityStats(BaseModel):
+    equipment_id: Optional[int] = None
+    name: Optional[str] = None
+    type: Optional[str] = None
+    failures: int
+    repairs: int
+    mtbf_hours: Optional[float] = None  # mean time between failures
+    mttr_hours: Optional[float] = None  # mean time to repair
+    availability: Optional[float] = None  # mtbf / (mtbf + mttr)
+
+class FleetReliability(BaseModel):
+    fleet: ReliabilityStats
+    ranking: List[ReliabilityStats]  # worst first by the requested metric
+
+# Cost analytics schemas
+class MonthlyCost(BaseModel):
+    month: int  # 1-12
+    cost: float
+    previous_cost: float  # same month of the year before
+    logs: int
+
+class CostBreakdown(BaseModel):
+    key: Optional[str] = None  # equipment name, type, location or maintenance type
+    equipment_id: Optional[int] = None
+    logs: int
+    cost: float
+    previous_cost: float
+    change_percentage: Optional[float] = None
+
+class PartUsage(BaseModel):
+    part: str
+    replacements: int
+    previous_replacements: int
+
+class CostAnalytics(BaseModel):
+    year: int
+    through_month: int  # totals, breakdown and parts compare months 1..through_month of both years
+    group_by: str
+    total_cost: float
+    previous_total_cost: float
+    change_percentage: Optional[float] = None
+    monthly: List[MonthlyCost]
+    breakdown: List[CostBreakdown]  # highest spend first
+    top_parts: List[PartUsage]
+
 # Shift summary schemas
 class ShiftSummary(BaseModel):
     shift: str
@@ -166,10 +226,38 @@ class ShiftSummary(BaseModel):
     average_efficiency: float
     equipment_count: int
 
+# Full-text search schemas
+class SearchResult(BaseModel):
+    type: str  # maintenance_log, alert, equipment
+    id: int
+    equipment_id: Optional[int] = None
+    title: Optional[str] = None
+    snippet: Optional[str] = None  # matched text with <mark> highlights
+    score: float
+
 # Equipment with sensor data
 class EquipmentWithSensors(Equipment):
     sensor_data: List[SensorData] = []
     maintenance_alerts: List[MaintenanceAlert] = []
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# Profiling schemas
+class ProfilingArmRequest(BaseModel):
+    route: str  # route template, e.g. /equipment/{equipment_id}/sensors
+    method: Optional[str] = None
+    count: int = Field(10, ge=1, le=1000)
+    duration_seconds: int = Field(300, ge=1, le=86400)
+
+class ProfilingArm(BaseModel):
+    id: str
+    route: str
+    method: Optional[str] = None
+    count: int
+    expires_at: datetime
+
+class ProfileInfo(BaseModel):
+    id: str
+    created_at: datetime
+    size_bytes: int
@@ -0,0 +1,166 @@
+import re
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import bindparam, event, text
+
+from .settings import settings
+
+TEXT_SEARCH_CONFIG = "english"  # PostgreSQL; SQLite uses the porter tokenizer to match its stemming
+HIGHLIGHT = ("<mark>", "</mark>")
+MAX_TERMS = 8
+
+
+class SearchSource(NamedTuple):
+    """A table covered by full-text search"""
+    type: str  # result type returned by the API
+    table: str
+    columns: Tuple[str, ...]  # indexed text columns, most important first
+    weights: Tuple[str, ...]  # PostgreSQL setweight labels; SQLite bm25 weights are derived from them
+    title: str  # column shown as the result title
+    equipment_id: str  # column holding the related equipment id
+
+
+SOURCES = (
+    SearchSource("maintenance_log", "maintenance_logs", ("description", "parts_replaced"), ("A", "B"),
+                 "maintenance_type", "equipment_id"),
+    SearchSource("alert", "maintenance_alerts", ("title", "description"), ("A", "B"), "title", "equipment_id"),
+    SearchSource("equipment", "equipment", ("name", "type", "location"), ("A", "B", "C"), "name", "id"),
+)
+SOURCES_BY_TYPE = {source.type: source for source in SOURCES}
+SOURCES_BY_TABLE = {source.table: source for source in SOURCES}
+BM25_WEIGHTS = {"A": 4.0, "B": 2.0, "C": 1.0}
+
+
+def sqlite_ddl(source: SearchSource) -> List[str]:
+    """External-content FTS5 table plus triggers that keep it in sync with the base table"""
+    fts, cols = f"{source.table}_fts", ", ".join(source.columns)
+    new = ", ".join(f"new.{c}" for c in source.columns)
+    old = ", ".join(f"old.{c}" for c in source.columns)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({cols}, content='{source.table}', "
+        f"content_rowid='id', tokenize='porter unicode61')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {source.table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {source.table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {source.table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END",
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def postgresql_ddl(source: SearchSource) -> List[str]:
+    """Generated tsvector column (maintained by PostgreSQL on every write) with a GIN index"""
+    vector = " || ".join(
+        f"setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce({column}, '')), '{weight}')"
+        for column, weight in zip(source.columns, source.weights)
+    )
+    return [
+        f"ALTER TABLE {source.table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS ({vector}) STORED",
+        f"CREATE INDEX IF NOT EXISTS ix_{source.table}_search ON {source.table} USING gin (search_vector)",
+    ]
+
+
+def _create_index(table, connection, **kw):
+    source = SOURCES_BY_TABLE[table.name]
+    statements = {"sqlite": sqlite_ddl, "postgresql": postgresql_ddl}.get(connection.dialect.name)
+    for statement in statements(source) if statements else ():
+        connection.exec_driver_sql(statement)
+
+
+def _drop_index(table, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {table.name}_fts")
+
+
+def attach_search_index(table):
+    """Create (and drop) the full-text index together with the table in metadata.create_all/drop_all"""
+    event.listen(table, "after_create", _create_index)
+    event.listen(table, "before_drop", _drop_index)
+
+
+def query_terms(query: str) -> List[str]:
+    return re.findall(r"\w+", query.lower())[:MAX_TERMS]
+
+
+def _match_expression(dialect_name: str, terms: Sequence[str]) -> str:
+    """All terms must match; the last one as a prefix so results follow the user's typing"""
+    if dialect_name == "sqlite":
+        return " ".join(f'"{term}"' for term in terms) + "*"
+    return " & ".join(terms) + ":*"
+
+
+def _ranked_select(dialect_name: str, source: SearchSource) -> str:
+    if dialect_name == "sqlite":
+        fts = f"{source.table}_fts"
+        weights = ", ".join(str(BM25_WEIGHTS[w]) for w in source.weights)
+        # bm25() is lower for better matches
+        return (f"SELECT '{source.type}' AS type, rowid AS id, -bm25({fts}, {weights}) AS score "
+                f"FROM {fts} WHERE {fts} MATCH :match ORDER BY rowid DESC LIMIT :candidates")
+    return (f"SELECT '{source.type}' AS type, id, ts_rank_cd(search_vector, tsq) AS score "
+            f"FROM {source.table}, to_tsquery('{TEXT_SEARCH_CONFIG}', :match) tsq "
+            f"WHERE search_vector @@ tsq ORDER BY id DESC LIMIT :candidates")
+
+
+def _details_select(dialect_name: str, source: SearchSource) -> str:
+    start, stop = HIGHLIGHT
+    if dialect_name == "sqlite":
+        fts = f"{source.table}_fts"
+        return (f"SELECT b.id, b.{source.equipment_id}, b.{source.title}, "
+                f"snippet({fts}, -1, '{start}', '{stop}', '…', 16) "
+                f"FROM {fts} JOIN {source.table} b ON b.id = {fts}.rowid "
+                # Prefix queries are expensive to re-evaluate; the rowid range lets FTS5 seek instead of
+                # walking every match, and the unary + keeps IN from replacing the range in the plan
+                f"WHERE {fts} MATCH :match AND {fts}.rowid BETWEEN :low AND :high AND +{fts}.rowid IN :ids")
+    document = " || ' … ' || ".join(f"coalesce({column}, '')" for column in source.columns)
+    return (f"SELECT b.id, b.{source.equipment_id}, b.{source.title}, "
+            f"ts_headline('{TEXT_SEARCH_CONFIG}', {document}, tsq, "
+            f"'StartSel={start}, StopSel={stop}, MaxWords=20, MinWords=8, MaxFragments=2') "
+            f"FROM {source.table} b, to_tsquery('{TEXT_SEARCH_CONFIG}', :match) tsq "
+            f"WHERE b.id IN :ids")
+
+
+async def search(db, query: str, types: Optional[Sequence[str]] = None,
+                 skip: int = 0, limit: int = 20) -> List[dict]:
+    """Ranked full-text search over maintenance logs, alerts and equipment
+
+    Scoring is the expensive part of a broad query, so only the newest
+    `search_max_candidates` matches of each source are ranked; queries with
+    fewer matches are ranked exactly. Only the requested page is decorated
+    with titles and highlighted snippets.
+    """
+    terms = query_terms(query)
+    sources = [SOURCES_BY_TYPE[t] for t in types] if types else list(SOURCES)
+    if not terms or not sources:
+        return []
+    dialect_name = (await db.connection()).dialect.name
+    match = _match_expression(dialect_name, terms)
+
+    ranked = " UNION ALL ".join(
+        f"SELECT * FROM ({_ranked_select(dialect_name, source)}) AS {source.table}_hits" for source in sources
+    )
+    page = (await db.execute(
+        text(f"SELECT type, id, score FROM ({ranked}) AS hits "
+             f"ORDER BY score DESC, type, id LIMIT :limit OFFSET :skip"),
+        {"match": match, "candidates": settings.search_max_candidates, "limit": limit, "skip": skip}
+    )).all()
+
+    details: Dict[Tuple[str, int], tuple] = {}
+    for result_type in {row.type for row in page}:
+        source = SOURCES_BY_TYPE[result_type]
+        ids = [row.id for row in page if row.type == result_type]
+        rows = await db.execute(
+            text(_details_select(dialect_name, source)).bindparams(bindparam("ids", expanding=True)),
+            {"match": match, "ids": ids, "low": min(ids), "high": max(ids)}
+        )
+        for row_id, equipment_id, title, snippet in rows:
+            details[(result_type, row_id)] = (equipment_id, title, snippet)
+
+    results = []
+    for row in page:
+        equipment_id, title, snippet = details.get((row.type, row.id), (None, None, None))
+        results.append({"type": row.type, "id": row.id, "equipment_id": equipment_id,
+                        "title": title, "snippet": snippet, "score": float(row.score)})
+    return results
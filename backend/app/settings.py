@@ -1,10 +1,108 @@
 from pydantic_settings import BaseSettings
 from pydantic import field_validator
-from typing import List
+from typing import Dict, List
 
 class Settings(BaseSettings):
     # Database
     database_url: str = "sqlite+aiosqlite:///./producflow.db"
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    db_statement_cache_size: int = 500  # asyncpg prepared statements per connection
+    db_stream_batch_size: int = 1000  # rows per fetch for server-side cursors
+
+    # SQL instrumentation
+    slow_query_threshold_ms: float = 200.0
+    db_debug_headers: bool = False  # X-DB-Query-Count / X-DB-Query-Time-Ms (always on in debug)
+
+    # Background metrics collection
+    metrics_collector_enabled: bool = True
+    metrics_refresh_interval: float = 30.0
+    metrics_min_refresh_interval: float = 1.0
+    active_user_window_seconds: float = 900.0
+
+    # Alert deduplication and storm suppression (see app/alerts.py)
+    alert_dedup_enabled: bool = True
+    alert_storm_threshold: int = 20  # repeats of one alert per window before repeats are batched
+    alert_storm_window_seconds: float = 60.0
+    alert_flush_interval: float = 5.0
+
+    # Equipment status derived from sensor readings (see app/equipment_status.py)
+    equipment_status_derivation_enabled: bool = True
+    equipment_status_clear_after: int = 3  # consecutive better readings per sensor before de-escalating
+    equipment_status_sync_interval: float = 60.0  # re-read in-memory status counts from the database
+
+    # Full-text search (see app/search.py)
+    search_max_candidates: int = 10000  # newest matches per source that are ranked
+
+    # Equipment autocomplete (see app/autocomplete.py)
+    autocomplete_refresh_interval: float = 10.0  # picks up equipment added or changed by other workers
+
+    # Sensor data retention and archival (see app/retention.py)
+    sensor_retention_enabled: bool = True
+    sensor_retention_days: int = 90  # raw readings kept in the database; 0 keeps them forever
+    sensor_retention_overrides: Dict[str, int] = {}  # "<equipment type>/<sensor type>" -> days, "*" for any
+    sensor_retention_cron: str = "30 3 * * *"
+    sensor_archive_dir: str = "./archive/sensor_data"
+    sensor_archive_chunk_size: int = 5000  # readings moved per write transaction
+    sensor_archive_pause: float = 0.1  # seconds between chunks, so ingest gets the write lock
+    sensor_archive_vacuum_pages: int = 1000  # pages released per incremental vacuum step (SQLite)
+
+    # Streaming exports (see app/exports.py)
+    export_max_concurrent: int = 4  # per worker; each holds a database connection while it streams
+    export_gzip_level: int = 6
+    export_parquet_row_group_rows: int = 100_000
+
+    # Batch health scores and failure forecasts (see app/health.py)
+    health_pipeline_enabled: bool = True
+    health_pipeline_interval: float = 300.0
+    health_window_hours: float = 24.0  # readings used for the trend fit
+    health_forecast_horizon_days: float = 14.0
+    health_alert_min_confidence: float = 0.5
+    health_chunk_size: int = 1000  # equipment per batch
+    health_workers: int = 0  # scoring processes; 0 scores in a thread
+
+    # Sentry performance sampling (see monitoring.AdaptiveTraceSampler)
+    sentry_traces_sample_rate: float = 0.05
+    sentry_traces_per_minute: float = 60.0
+    sentry_profiles_sample_rate: float = 0.1
+    sentry_slow_request_ms: float = 2000.0
+    sentry_trace_route_rates: Dict[str, float] = {
+        "POST /equipment/{equipment_id}/sensors": 0.001,
+        "POST /equipment/{equipment_id}/sensors/batch": 0.01,
+        "GET /health": 0.0,
+        "GET /metrics": 0.0,
+        "POST /token": 0.2,
+        "POST /equipment": 1.0,
+        "PATCH /maintenance/logs/{log_id}/status": 1.0,
+    }
+
+    # Event loop lag monitoring (see app/loop_monitor.py)
+    loop_monitor_enabled: bool = True
+    loop_monitor_interval: float = 0.1
+    loop_block_threshold_ms: float = 100.0
+
+    # Periodic jobs (see app/scheduler.py); only the worker holding the leader lock runs them
+    scheduler_enabled: bool = True
+    scheduler_lock: str = "auto"  # "file", "db" (PostgreSQL advisory lock), "none", or "auto"
+    scheduler_lock_path: str = "/tmp/producflow-scheduler.lock"
+    scheduler_lock_key: int = 7_236_501  # advisory lock id, unique per cluster sharing a database
+    scheduler_leader_check_interval: float = 5.0
+
+    # Request tracing (see app/tracing.py); OTLP JSON to a file or an OTLP/HTTP collector
+    tracing_enabled: bool = False
+    tracing_sample_rate: float = 0.1
+    tracing_exporter: str = "file"  # "file" or "otlp"
+    tracing_file_path: str = "./traces/spans.jsonl"
+    tracing_otlp_endpoint: str = "http://localhost:4318"
+    tracing_service_name: str = "producflow-api"
+
+    # On-demand request profiling (admin only, see app/profiling.py)
+    profiling_enabled: bool = False
+    profile_dir: str = "./profiles"
+    profile_sample_interval_ms: float = 1.0
+    profile_max_stored: int = 200
 
     # Security
     secret_key: str = "change-in-production"
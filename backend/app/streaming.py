@@ -0,0 +1,36 @@
+"""
+Newline-delimited JSON responses for list endpoints.
+
+A client that sends `Accept: application/x-ndjson` gets the items of a
+list endpoint one JSON object per line instead of one JSON array. The
+items come from crud's stream_* functions, batches of db_stream_batch_size
+rows read through a server-side cursor, and each batch is serialized and
+sent before the next is fetched. Peak memory is bounded by the batch size
+rather than by `limit`, and the first line goes out as soon as the first
+batch is read.
+"""
+from typing import AsyncIterator, List, Type
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+NDJSON = "application/x-ndjson"
+
+# OpenAPI entry for list endpoints that can stream
+NDJSON_RESPONSES = {200: {"content": {NDJSON: {}}, "description": "Items as JSON lines (Accept: application/x-ndjson)"}}
+
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON in request.headers.get("accept", "")
+
+
+async def _lines(batches: AsyncIterator[List], schema: Type[BaseModel]) -> AsyncIterator[bytes]:
+    async for batch in batches:
+        if batch:
+            yield "".join([schema.model_validate(item).model_dump_json() + "\n" for item in batch]).encode()
+
+
+def ndjson_response(batches: AsyncIterator[List], schema: Type[BaseModel]) -> StreamingResponse:
+    """Stream batches of ORM objects as JSON lines, each item serialized like the endpoint's response_model"""
+    return StreamingResponse(_lines(batches, schema), media_type=NDJSON, headers={"Vary": "Accept"})
@@ -0,0 +1,476 @@
+"""
+Synthetic fleet data at production scale.
+
+Values are generated with numpy, one chunk at a time, and written with bulk
+statements: COPY on PostgreSQL, executemany on SQLite. The same seed and
+options always produce the same data.
+"""
+import asyncio
+import csv
+import io
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import select, func, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import costs, models, reliability
+from .auth import get_password_hash
+from .database import Base
+from .dimensions import sensor_dimensions
+
+SENSOR_TYPES = ("temperature", "pressure", "vibration", "speed")
+SENSOR_UNITS = ("°C", "PSI", "mm/s", "RPM")
+SENSOR_DECIMALS = (1, 1, 2, 0)
+SENSOR_BASELINE = np.array([75.0, 55.0, 1.0, 1500.0])
+SENSOR_NOISE = np.array([1.5, 1.5, 0.15, 30.0])
+# Change at the end of the series for a fully worn machine
+SENSOR_WEAR_DRIFT = np.array([6.0, -4.0, 1.2, -90.0])
+# Peak change during a fault episode
+SENSOR_FAULT_SHIFT = np.array([9.0, -8.0, 1.8, -250.0])
+# (warning_low, warning_high, critical_low, critical_high), as in crud.get_sensor_status
+SENSOR_LIMITS = np.array([
+    [-np.inf, 80.0, -np.inf, 85.0],
+    [50.0, 60.0, 45.0, 65.0],
+    [-np.inf, 2.0, -np.inf, 2.5],
+    [1300.0, 1700.0, 1200.0, 1800.0],
+])
+SENSOR_STATUSES = np.array(["normal", "warning", "critical"], dtype=object)
+
+EQUIPMENT_TYPES = (
+    # type, name, capacity range, location prefix
+    ("Molding", "Injection Molding Machine", (300, 700), "Production Floor"),
+    ("Milling", "CNC Milling Machine", (150, 450), "Production Floor"),
+    ("Transport", "Conveyor System", (600, 1500), "Assembly Line"),
+    ("Assembly", "Robotic Arm", (100, 300), "Assembly Station"),
+    ("Inspection", "Quality Control Scanner", (500, 1000), "QC Department"),
+)
+SHIFTS = np.array(["morning", "afternoon", "night"], dtype=object)
+SHIFT_START_HOURS = np.array([6, 14, 22])
+MAINTENANCE_TYPES = np.array(["preventive", "corrective", "emergency"], dtype=object)
+MAINTENANCE_DESCRIPTIONS = {
+    "preventive": ["Regular lubrication and filter replacement", "Scheduled inspection and calibration",
+                   "Belt tension check and adjustment"],
+    "corrective": ["Replace worn bearing in spindle assembly", "Repair coolant leak", "Realign drive shaft"],
+    "emergency": ["Hydraulic system repair - critical failure", "Motor burnout - replaced drive motor",
+                  "Emergency stop circuit fault"],
+}
+PARTS = ["Oil filter", "Hydraulic fluid", "Spindle bearing", "Drive belt", "Seal kit", "Pressure valve",
+         "Hydraulic pump", "Coolant pump", "Servo motor", "Proximity sensor"]
+SHIFT_MINUTES = 8 * 60
+
+DEMO_USERS = [
+    ("admin@producflow.com", "admin123", "Admin User", "admin", "IT"),
+    ("manager@producflow.com", "manager123", "Production Manager", "manager", "Production"),
+    ("tech@producflow.com", "tech123", "Maintenance Technician", "technician", "Maintenance"),
+]
+
+
+@dataclass
+class SyntheticConfig:
+    equipment: int = 1000
+    readings: int = 10_000_000  # sensor readings in total, spread over sensor_days
+    sensor_days: float = 30.0
+    production_days: int = 730
+    technicians: int = 25
+    seed: int = 42
+    chunk_size: int = 500_000
+    writers: int = 4  # concurrent COPY connections (PostgreSQL only)
+    end: Optional[datetime] = None  # newest timestamp; defaults to now
+
+
+class _Writer:
+    """Bulk row writer: COPY (CSV) on PostgreSQL, executemany elsewhere"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    @staticmethod
+    def encode(dialect_name: str, data: Sequence[list]):
+        """Column lists -> the payload write_encoded() sends (CPU bound, safe to run in a thread)"""
+        if dialect_name == "postgresql":
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(zip(*data))
+            return buffer.getvalue().encode()
+        return list(zip(*data))
+
+    async def write(self, table: str, columns: Sequence[str], data: Sequence[list]):
+        await self.write_encoded(table, columns, self.encode(self.conn.dialect.name, data))
+
+    async def write_encoded(self, table: str, columns: Sequence[str], payload):
+        if self.conn.dialect.name == "postgresql":
+            raw = await self.conn.get_raw_connection()
+            await raw.driver_connection.copy_to_table(
+                table, source=io.BytesIO(payload), columns=list(columns), format="csv"
+            )
+        else:
+            placeholders = ", ".join("?" for _ in columns)
+            await self.conn.exec_driver_sql(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", payload
+            )
+
+
+def _format_timestamps(values: np.ndarray) -> np.ndarray:
+    """datetime64 -> 'YYYY-MM-DD HH:MM:SS' strings, which both SQLite and PostgreSQL accept"""
+    return np.char.replace(np.datetime_as_string(values, unit="s"), "T", " ").astype(object)
+
+
+def _status_codes(values: np.ndarray, sensor_index: np.ndarray) -> np.ndarray:
+    limits = SENSOR_LIMITS[sensor_index]
+    critical = (values < limits[..., 2]) | (values > limits[..., 3])
+    warning = (values < limits[..., 0]) | (values > limits[..., 1])
+    return np.where(critical, 2, np.where(warning, 1, 0))
+
+
+class FleetGenerator:
+    def __init__(self, config: SyntheticConfig, log: Callable[[str], None] = print):
+        self.config = config
+        self.log = log
+        self.rng = np.random.default_rng(config.seed)
+        self.end = np.datetime64((config.end or datetime.now()).replace(microsecond=0), "s")
+
+        n = config.equipment
+        # Per machine state drawn once, so every table tells the same story
+        self.wear = self.rng.beta(2.0, 5.0, n)
+        self.type_index = self.rng.integers(0, len(EQUIPMENT_TYPES), n)
+        self.sensor_offset = self.rng.normal(0.0, 1.0, (n, len(SENSOR_TYPES))) * SENSOR_NOISE
+        self.daily_phase = self.rng.uniform(0, 2 * np.pi, n)
+        self.fault_rate = 0.5 + 4.0 * self.wear ** 2  # expected fault episodes over the sensor window
+
+    async def run(self, engine):
+        started = time.perf_counter()
+        async with engine.begin() as conn:
+            self.equipment_offset = (await conn.scalar(select(func.max(models.Equipment.id)))) or 0
+            technician_ids = await self._write_users(conn)
+            maintenance_logs, last_maintenance = self._maintenance_logs(technician_ids)
+            await self._write_equipment(conn, last_maintenance)
+            await self._reset_sequences(conn)
+            await _Writer(conn).write("maintenance_logs", *maintenance_logs)
+            self.log(f"maintenance_logs: {len(maintenance_logs[1][0])} rows")
+        async with self._deferred_indexes(engine, models.ProductionRecord.__table__):
+            async with engine.begin() as conn:
+                await self._write_production_records(conn)
+        async with self._deferred_indexes(engine, models.SensorData.__table__):
+            await self._write_sensor_data(engine)
+        async with engine.begin() as conn:
+            await self._write_alerts(conn)
+        self.log(f"Done in {time.perf_counter() - started:.1f}s")
+
+    def _equipment_ids(self, indexes) -> np.ndarray:
+        return np.asarray(indexes) + self.equipment_offset + 1
+
+    async def _write_users(self, conn) -> List[int]:
+        existing = set((await conn.scalars(select(models.User.email))).all())
+        # One bcrypt hash shared by all generated technicians (password "tech123")
+        technician_hash = get_password_hash("tech123")
+        rows = [
+            (email, get_password_hash(password), name, role, department)
+            for email, password, name, role, department in DEMO_USERS if email not in existing
+        ]
+        rows += [
+            (f"technician{i}@producflow.com", technician_hash, f"Technician {i}", "technician", "Maintenance")
+            for i in range(1, self.config.technicians + 1)
+            if f"technician{i}@producflow.com" not in existing
+        ]
+        if rows:
+            columns = ("email", "hashed_password", "full_name", "role", "department", "is_active")
+            await _Writer(conn).write("users", columns, [list(column) for column in zip(*rows)] + [[True] * len(rows)])
+        return list((await conn.scalars(select(models.User.id).where(models.User.role == "technician"))).all())
+
+    async def _write_equipment(self, conn, last_maintenance: np.ndarray):
+        config, rng = self.config, self.rng
+        n = config.equipment
+        health = np.round(100.0 - 80.0 * self.wear - rng.uniform(0, 5, n), 1)
+        status = np.select([health < 50, health < 70], ["critical", "warning"], "operational").astype(object)
+        status[rng.random(n) < 0.01] = "maintenance"
+        self.status = status
+
+        names, types, locations, capacities = [], [], [], []
+        counters = [0] * len(EQUIPMENT_TYPES)
+        for i, t in enumerate(self.type_index):
+            type_name, label, (low, high), location = EQUIPMENT_TYPES[t]
+            counters[t] += 1
+            names.append(f"{label} #{self.equipment_offset + counters[t]}")
+            types.append(type_name)
+            locations.append(f"{location} {chr(ord('A') + i % 6)}")
+            capacities.append(float(round(rng.uniform(low, high), -1)))
+        self.capacity = np.array(capacities)
+        installed = self.end - (rng.uniform(1, 10, n) * 365 * 86400).astype("timedelta64[s]")
+        last = np.where(np.isnat(last_maintenance), installed, last_maintenance)
+
+        columns = ("id", "name", "type", "status", "location", "capacity", "installation_date",
+                   "last_maintenance", "health_score", "created_at")
+        now = _format_timestamps(np.array([self.end]))[0]
+        await _Writer(conn).write("equipment", columns, [
+            self._equipment_ids(np.arange(n)).tolist(), names, types, status.tolist(), locations, capacities,
+            _format_timestamps(installed).tolist(), _format_timestamps(last).tolist(),
+            health.tolist(), [now] * n,
+        ])
+        self.log(f"equipment: {n} rows")
+
+    def _maintenance_logs(self, technician_ids: List[int]):
+        """Preventive work every ~90 days plus wear-driven corrective and emergency repairs"""
+        config, rng = self.config, self.rng
+        n, days = config.equipment, config.production_days
+        preventive = np.full(n, days / 90.0)
+        repairs = 1.0 + 10.0 * self.wear * days / 365.0
+        counts = rng.poisson(preventive + repairs)
+        equipment_index = np.repeat(np.arange(n), counts)
+        total = int(counts.sum())
+
+        repair_share = (repairs / (preventive + repairs))[equipment_index]
+        is_repair = rng.random(total) < repair_share
+        kind = np.where(is_repair, np.where(rng.random(total) < 0.2, 2, 1), 0)
+        scheduled = self.end - (rng.uniform(0, days, total) * 86400).astype("timedelta64[s]")
+        duration = np.round(np.array([2.0, 4.0, 7.0])[kind] * rng.lognormal(0, 0.4, total), 1)
+        cost = np.round(np.array([250.0, 900.0, 2500.0])[kind] * rng.lognormal(0, 0.5, total), 2)
+        completed = scheduled + (duration * 3600).astype("timedelta64[s]")
+        # The newest emergency repairs are still open
+        in_progress = (kind == 2) & (completed > self.end - np.timedelta64(2, "D"))
+
+        kinds = MAINTENANCE_TYPES[kind]
+        descriptions = [MAINTENANCE_DESCRIPTIONS[k][i % 3] for i, k in enumerate(kinds)]
+        part_counts = rng.integers(1, 4, total)
+        part_picks = rng.integers(0, len(PARTS), (total, 3))
+        parts = [", ".join(PARTS[p] for p in picks[:c]) for picks, c in zip(part_picks.tolist(), part_counts.tolist())]
+        technicians = np.array(technician_ids or [None], dtype=object)[rng.integers(0, max(len(technician_ids), 1), total)]
+        scheduled_text = _format_timestamps(scheduled)
+        completed_text = _format_timestamps(completed).astype(object)
+        completed_text[in_progress] = None
+
+        columns = ("equipment_id", "maintenance_type", "description", "technician_id", "cost", "duration_hours",
+                   "parts_replaced", "status", "scheduled_date", "completed_date", "created_at")
+        data = [
+            self._equipment_ids(equipment_index).tolist(), kinds.tolist(), descriptions, technicians.tolist(),
+            cost.tolist(), duration.tolist(), parts, np.where(in_progress, "in_progress", "completed").tolist(),
+            scheduled_text.tolist(), completed_text.tolist(), scheduled_text.tolist(),
+        ]
+
+        # NaT is the smallest int64, so a maximum over the int64 view skips machines without completed work
+        last = np.full(n, np.datetime64("NaT"), dtype="datetime64[s]")
+        done = ~in_progress
+        np.maximum.at(last.view("int64"), equipment_index[done], completed[done].view("int64"))
+        return (columns, data), last
+
+    async def _write_production_records(self, conn):
+        """One record per machine and shift, with output and downtime worsening with wear"""
+        config, rng = self.config, self.rng
+        n, days = config.equipment, config.production_days
+        writer = _Writer(conn)
+        # Capacity is units per shift at full speed
+        capacity_per_minute = self.capacity / SHIFT_MINUTES
+        day_start = (self.end.astype("datetime64[D]") - np.arange(1, days + 1)).astype("datetime64[s]")
+        days_per_chunk = max(1, config.chunk_size // (n * len(SHIFTS)))
+        total = 0
+        for first in range(0, days, days_per_chunk):
+            chunk_days = day_start[first:first + days_per_chunk]
+            shape = (len(chunk_days), len(SHIFTS), n)
+            downtime = np.minimum(rng.gamma(1.5, 8 + 40 * self.wear, shape), SHIFT_MINUTES).astype(int)
+            efficiency = (SHIFT_MINUTES - downtime) / SHIFT_MINUTES * 100
+            output = rng.poisson(capacity_per_minute * (SHIFT_MINUTES - downtime) * rng.uniform(0.9, 1.0, shape))
+            defects = rng.binomial(output, 0.01 + 0.04 * self.wear)
+            dates = (chunk_days[:, None, None] + (SHIFT_START_HOURS * 3600).astype("timedelta64[s]")[None, :, None])
+            dates = np.broadcast_to(dates, shape)
+            count = int(np.prod(shape))
+            date_text = _format_timestamps(dates.ravel()).tolist()
+            await writer.write("production_records", (
+                "equipment_id", "shift", "output_quantity", "defect_quantity", "downtime_minutes",
+                "efficiency_percentage", "date", "created_at",
+            ), [
+                np.broadcast_to(self._equipment_ids(np.arange(n)), shape).ravel().tolist(),
+                np.broadcast_to(SHIFTS[None, :, None], shape).ravel().tolist(),
+                output.ravel().tolist(), defects.ravel().tolist(), downtime.ravel().tolist(),
+                np.round(efficiency, 1).ravel().tolist(), date_text, date_text,
+            ])
+            total += count
+        self.log(f"production_records: {total} rows")
+
+    def _fault_episodes(self, equipment_index: int, length: int):
+        """Fault episodes as (start, ramp length) in sample indexes, seeded per machine"""
+        rng = np.random.default_rng([self.config.seed, equipment_index])
+        episodes = rng.poisson(self.fault_rate[equipment_index])
+        starts = rng.integers(0, length, episodes)
+        ramps = np.maximum(rng.exponential(length / 200, episodes).astype(int), 1)
+        return list(zip(starts.tolist(), ramps.tolist()))
+
+    def _sensor_chunks(self, type_codes: np.ndarray, status_codes: np.ndarray):
+        """Yield column lists of at most ~chunk_size readings: blocks of machines, or time windows of one machine
+
+        Sensor types and statuses are written as their codes (see app/dimensions.py), indexed by sensor and status.
+        """
+        config = self.config
+        n, sensors = config.equipment, len(SENSOR_TYPES)
+        length = max(config.readings // (n * sensors), 1)
+        interval = max(int(config.sensor_days * 86400 / length), 1)
+        start = self.end - np.timedelta64(interval * (length - 1), "s")
+        per_machine = length * sensors
+        machines_per_chunk = max(1, config.chunk_size // per_machine)
+        window = length if per_machine <= config.chunk_size else max(config.chunk_size // sensors, 1)
+
+        for first in range(0, n, machines_per_chunk):
+            machines = np.arange(first, min(first + machines_per_chunk, n))
+            episodes = {m: self._fault_episodes(m, length) for m in machines.tolist()}
+            for t0 in range(0, length, window):
+                steps = np.arange(t0, min(t0 + window, length))
+                rng = np.random.default_rng([config.seed, first, t0])
+                shape = (len(machines), sensors, len(steps))
+                progress = steps / max(length - 1, 1)
+                seconds = steps * interval
+
+                values = np.broadcast_to(SENSOR_BASELINE[None, :, None], shape).copy()
+                values += self.sensor_offset[machines][:, :, None]
+                values += self.wear[machines][:, None, None] * SENSOR_WEAR_DRIFT[None, :, None] * progress
+                # Daily temperature cycle
+                values[:, 0, :] += 2.0 * np.sin(2 * np.pi * seconds / 86400 + self.daily_phase[machines][:, None])
+                for row, machine in enumerate(machines.tolist()):
+                    for fault_start, ramp in episodes[machine]:
+                        inside = (steps >= fault_start) & (steps < fault_start + ramp)
+                        if inside.any():
+                            severity = (steps[inside] - fault_start + 1) / ramp
+                            values[row, :, inside] += severity[:, None] * SENSOR_FAULT_SHIFT[None, :]
+                values += rng.normal(0.0, 1.0, shape) * SENSOR_NOISE[None, :, None]
+                for s, decimals in enumerate(SENSOR_DECIMALS):
+                    values[:, s, :] = np.round(values[:, s, :], decimals)
+                values[:, 2, :] = np.maximum(values[:, 2, :], 0.0)
+
+                sensor_index = np.broadcast_to(np.arange(sensors)[None, :, None], shape)
+                status = _status_codes(values, sensor_index)
+                timestamps = _format_timestamps(start + seconds.astype("timedelta64[s]"))
+                yield [
+                    np.broadcast_to(self._equipment_ids(machines)[:, None, None], shape).ravel().tolist(),
+                    type_codes[sensor_index.ravel()].tolist(),
+                    values.ravel().tolist(),
+                    status_codes[status.ravel()].tolist(),
+                    np.broadcast_to(timestamps[None, None, :], shape).ravel().tolist(),
+                ]
+
+    async def _write_sensor_data(self, engine):
+        columns = ("equipment_id", "sensor_type_id", "value", "status_id", "timestamp")
+        async with engine.begin() as conn:
+            type_codes = np.array([await conn.run_sync(sensor_dimensions.sensor_type_code, name, unit)
+                                   for name, unit in zip(SENSOR_TYPES, SENSOR_UNITS)])
+            status_codes = np.array([await conn.run_sync(sensor_dimensions.status_code, status)
+                                     for status in SENSOR_STATUSES])
+        # Chunks are generated and encoded in a worker thread while the database ingests earlier ones.
+        # PostgreSQL takes several concurrent COPY streams; SQLite has a single writer.
+        writers = self.config.writers if engine.dialect.name == "postgresql" else 1
+        chunks = self._sensor_chunks(type_codes, status_codes)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=writers)
+        progress = {"rows": 0, "logged": time.perf_counter()}
+        started = time.perf_counter()
+
+        def next_payload():
+            data = next(chunks, None)
+            return None if data is None else (len(data[0]), _Writer.encode(engine.dialect.name, data))
+
+        async def produce():
+            while (item := await asyncio.to_thread(next_payload)) is not None:
+                await queue.put(item)
+            for _ in range(writers):
+                await queue.put(None)
+
+        async def consume():
+            while (item := await queue.get()) is not None:
+                rows, payload = item
+                async with engine.begin() as conn:
+                    await _Writer(conn).write_encoded("sensor_data", columns, payload)
+                progress["rows"] += rows
+                if time.perf_counter() - progress["logged"] >= 5:
+                    progress["logged"] = time.perf_counter()
+                    self.log(f"sensor_data: {progress['rows']} rows "
+                             f"({progress['rows'] / (progress['logged'] - started):,.0f} rows/s)")
+
+        await asyncio.gather(produce(), *(consume() for _ in range(writers)))
+        total = progress["rows"]
+        self.log(f"sensor_data: {total} rows ({total / (time.perf_counter() - started):,.0f} rows/s)")
+
+
+    async def _write_alerts(self, conn):
+        """Active alerts for machines currently in warning/critical, resolved ones for the rest of history"""
+        rng = self.rng
+        unhealthy = np.flatnonzero(np.isin(self.status, ["warning", "critical"]))
+        history = rng.poisson(self.wear * 6)
+        resolved_index = np.repeat(np.arange(self.config.equipment), history)
+        equipment_index = np.concatenate([unhealthy, resolved_index])
+        total = len(equipment_index)
+        active = np.arange(total) < len(unhealthy)
+        critical = np.concatenate([self.status[unhealthy] == "critical", rng.random(len(resolved_index)) < 0.15])
+        created = self.end - (np.where(active, rng.uniform(0, 3, total), rng.uniform(3, self.config.production_days, total))
+                              * 86400).astype("timedelta64[s]")
+        resolved = created + (rng.uniform(2, 72, total) * 3600).astype("timedelta64[s]")
+        predicted = created + (rng.uniform(1, 21, total) * 86400).astype("timedelta64[s]")
+        resolved_text = _format_timestamps(resolved).astype(object)
+        resolved_text[active] = None
+
+        await _Writer(conn).write("maintenance_alerts", (
+            "equipment_id", "type", "priority", "title", "description", "predicted_date", "confidence",
+            "status", "created_at", "resolved_at",
+        ), [
+            self._equipment_ids(equipment_index).tolist(),
+            np.where(critical, "emergency", "predictive").tolist(),
+            np.where(critical, "critical", np.where(rng.random(total) < 0.5, "high", "medium")).tolist(),
+            np.where(critical, "Hydraulic System Failure", "Bearing Replacement Required").tolist(),
+            np.where(critical, "Pressure below critical threshold. Immediate attention required.",
+                     "Vibration levels indicate bearing wear.").tolist(),
+            _format_timestamps(predicted).tolist(),
+            np.round(rng.uniform(0.6, 0.98, total), 2).tolist(),
+            np.where(active, "active", "resolved").tolist(),
+            _format_timestamps(created).tolist(),
+            resolved_text.tolist(),
+        ])
+        self.log(f"maintenance_alerts: {total} rows")
+
+    @asynccontextmanager
+    async def _deferred_indexes(self, engine, table):
+        """Drop secondary indexes (and PostgreSQL foreign keys) for the duration of a bulk load
+
+        Rebuilding an index once is much cheaper than maintaining it per row, and
+        PostgreSQL checks foreign keys with a trigger per row whereas adding the
+        constraint afterwards validates it in a single pass.
+        """
+        indexes = list(table.indexes)
+        async with engine.begin() as conn:
+            for index in indexes:
+                await conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+            foreign_keys = []
+            if conn.dialect.name == "postgresql":
+                result = await conn.execute(text(
+                    "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+                    "WHERE conrelid = CAST(:table AS regclass) AND contype = 'f'"
+                ), {"table": table.name})
+                foreign_keys = result.all()
+                for name, _ in foreign_keys:
+                    await conn.execute(text(f'ALTER TABLE {table.name} DROP CONSTRAINT "{name}"'))
+        try:
+            yield
+        finally:
+            # Also after a failed load, so the table is never left without its indexes and constraints
+            self.log(f"{table.name}: rebuilding indexes")
+            async with engine.begin() as conn:
+                for index in indexes:
+                    await conn.run_sync(lambda sync_conn, index=index: index.create(sync_conn))
+                for name, definition in foreign_keys:
+                    await conn.execute(text(f'ALTER TABLE {table.name} ADD CONSTRAINT "{name}" {definition}'))
+
+    async def _reset_sequences(self, conn):
+        # Equipment ids were assigned explicitly; move the PostgreSQL sequence past them
+        if conn.dialect.name == "postgresql":
+            await conn.execute(text(
+                "SELECT setval(pg_get_serial_sequence('equipment', 'id'), (SELECT MAX(id) FROM equipment))"
+            ))
+
+
+async def generate(engine, config: SyntheticConfig, reset: bool = False, log: Callable[[str], None] = print):
+    async with engine.begin() as conn:
+        if reset:
+            await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    await FleetGenerator(config, log=log).run(engine)
+    async with AsyncSession(engine) as db:
+        await reliability.rebuild(db)
+        await costs.rebuild(db)
+        await db.commit()
@@ -0,0 +1,225 @@
+"""
+Compact columnar storage for historical sensor readings.
+
+A file holds blocks of readings, one block per (equipment, sensor type,
+unit) in time order. Each column of a block is encoded for its shape and
+then byte-shuffled and deflated:
+
+- timestamps (microseconds) as delta-of-delta, so a steady sampling rate
+  encodes as zeros;
+- values as the XOR of each float's bits with the previous value's, as in
+  Gorilla, so slowly changing readings share their sign, exponent and high
+  mantissa bits and leave mostly zero bytes;
+- ids as deltas, statuses as codes into a per-block dictionary.
+
+Sensor type and unit are stored once per block instead of once per row.
+Encoding and decoding are whole-array NumPy operations rather than the
+bit-by-bit streams of the original Gorilla format, which keeps both fast
+in Python at a small cost in ratio.
+
+A JSON index at the end of the file lists the blocks with their equipment,
+sensor and time range. Readers memory-map the file and decompress the
+column segments straight from the mapping, so only the blocks that
+overlap a query are touched and nothing else is read into memory.
+"""
+import json
+import mmap
+import os
+import struct
+import zlib
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+import numpy as np
+
+MAGIC = b"PFTSC\x00\x01\x00"
+_FOOTER = struct.Struct("<Q")
+EPOCH = datetime(1970, 1, 1)
+
+
+class BlockInfo(NamedTuple):
+    equipment_id: int
+    sensor_type: Optional[str]
+    unit: Optional[str]
+    count: int
+    first: int  # microseconds since the epoch
+    last: int
+    columns: Dict[str, List[int]]  # column -> [offset, length]
+    statuses: List[Optional[str]]
+
+
+class Block(NamedTuple):
+    """Decoded readings of one block, optionally cut to a time range"""
+    equipment_id: int
+    sensor_type: Optional[str]
+    unit: Optional[str]
+    ids: np.ndarray  # int64
+    timestamps: np.ndarray  # int64 microseconds since the epoch
+    values: np.ndarray  # float64, NaN where the value was missing
+    statuses: np.ndarray  # object array of status strings
+
+
+def to_micros(value: datetime) -> int:
+    """Microseconds since the epoch; aware datetimes are converted to UTC first"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    delta = value - EPOCH
+    return (delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def from_micros(micros: np.ndarray, aware: bool) -> List[datetime]:
+    values = micros.astype("datetime64[us]").astype(object)
+    return [v.replace(tzinfo=timezone.utc) for v in values] if aware else list(values)
+
+
+def _zigzag(x: np.ndarray) -> np.ndarray:
+    return ((x << 1) ^ (x >> 63)).view(np.uint64)
+
+
+def _unzigzag(z: np.ndarray) -> np.ndarray:
+    return ((z >> np.uint64(1)) ^ (np.uint64(0) - (z & np.uint64(1)))).view(np.int64)
+
+
+def _pack(array: np.ndarray) -> bytes:
+    """Byte-shuffle (all first bytes, then all second bytes, ...) and deflate"""
+    shuffled = np.ascontiguousarray(array).view(np.uint8).reshape(len(array), array.itemsize).T
+    return zlib.compress(shuffled.tobytes(), 6)
+
+
+def _unpack(buffer, dtype, count: int) -> np.ndarray:
+    dtype = np.dtype(dtype)
+    shuffled = np.frombuffer(zlib.decompress(buffer), dtype=np.uint8).reshape(dtype.itemsize, count)
+    return np.ascontiguousarray(shuffled.T).view(dtype).reshape(count)
+
+
+def encode_timestamps(micros: np.ndarray) -> bytes:
+    deltas = np.diff(micros, prepend=np.int64(0))
+    dod = deltas.copy()
+    dod[2:] = deltas[2:] - deltas[1:-1]
+    return _pack(_zigzag(dod))
+
+
+def decode_timestamps(buffer, count: int) -> np.ndarray:
+    deltas = _unzigzag(_unpack(buffer, np.uint64, count))
+    deltas[1:] = np.cumsum(deltas[1:])
+    return np.cumsum(deltas)
+
+
+def encode_values(values: np.ndarray) -> bytes:
+    bits = values.view(np.uint64)
+    return _pack(bits ^ np.concatenate(([np.uint64(0)], bits[:-1])))
+
+
+def decode_values(buffer, count: int) -> np.ndarray:
+    return np.bitwise_xor.accumulate(_unpack(buffer, np.uint64, count)).view(np.float64)
+
+
+def write_file(path: str, rows: Iterable) -> int:
+    """Write readings (id, equipment_id, sensor_type, value, unit, status, timestamp) to a new file
+
+    Rows may come in any order; they are grouped into blocks and sorted by
+    time. Returns the size of the file. Written to a temporary name, fsynced
+    and renamed, so a file either exists complete or not at all.
+    """
+    groups: Dict[tuple, list] = {}
+    aware = None
+    for row in rows:
+        groups.setdefault((row.equipment_id, row.sensor_type, row.unit), []).append(row)
+        if aware is None and row.timestamp is not None:
+            aware = row.timestamp.tzinfo is not None
+
+    blocks, offset = [], len(MAGIC)
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as f:
+        f.write(MAGIC)
+        for (equipment_id, sensor_type, unit), readings in sorted(groups.items(), key=lambda item: (
+                item[0][0], item[0][1] or "", item[0][2] or "")):
+            micros = np.array([to_micros(r.timestamp) for r in readings], dtype=np.int64)
+            order = np.argsort(micros, kind="stable")
+            micros = micros[order]
+            ids = np.array([r.id for r in readings], dtype=np.int64)[order]
+            values = np.array([np.nan if r.value is None else r.value for r in readings], dtype=np.float64)[order]
+            statuses, codes = np.unique(np.array([r.status or "" for r in readings], dtype=object)[order],
+                                        return_inverse=True)
+            columns = {}
+            for name, data in (("timestamp", encode_timestamps(micros)), ("value", encode_values(values)),
+                               ("id", _pack(_zigzag(np.diff(ids, prepend=np.int64(0))))),
+                               ("status", _pack(codes.astype(np.uint16)))):
+                f.write(data)
+                columns[name] = [offset, len(data)]
+                offset += len(data)
+            blocks.append({
+                "equipment_id": equipment_id, "sensor_type": sensor_type, "unit": unit, "count": len(readings),
+                "first": int(micros[0]), "last": int(micros[-1]), "columns": columns,
+                "statuses": [status or None for status in statuses.tolist()],
+            })
+        footer = json.dumps({"version": 1, "aware": bool(aware), "blocks": blocks}, separators=(",", ":")).encode()
+        f.write(footer)
+        f.write(_FOOTER.pack(len(footer)))
+        f.write(MAGIC)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+    return os.path.getsize(path)
+
+
+class ArchiveReader:
+    """Memory-mapped reader for a file written by write_file; use as a context manager"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        tail = len(MAGIC) + _FOOTER.size
+        if self._map[:len(MAGIC)] != MAGIC or self._map[-len(MAGIC):] != MAGIC:
+            self._map.close()
+            raise ValueError(f"{path} is not a sensor archive file")
+        (length,) = _FOOTER.unpack_from(self._map, len(self._map) - tail)
+        index = json.loads(self._map[len(self._map) - tail - length:len(self._map) - tail])
+        self.aware = index["aware"]
+        self.blocks = [BlockInfo(**block) for block in index["blocks"]]
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def find(self, equipment_id: Optional[int] = None, sensor_type: Optional[str] = None,
+             start: Optional[int] = None, end: Optional[int] = None) -> Iterator[BlockInfo]:
+        """Blocks matching the filters and overlapping [start, end) in microseconds"""
+        for block in self.blocks:
+            if equipment_id is not None and block.equipment_id != equipment_id:
+                continue
+            if sensor_type is not None and block.sensor_type != sensor_type:
+                continue
+            if (start is not None and block.last < start) or (end is not None and block.first >= end):
+                continue
+            yield block
+
+    def _column(self, block: BlockInfo, name: str) -> memoryview:
+        offset, length = block.columns[name]
+        return memoryview(self._map)[offset:offset + length]
+
+    def timestamps(self, block: BlockInfo) -> np.ndarray:
+        with self._column(block, "timestamp") as buffer:
+            return decode_timestamps(buffer, block.count)
+
+    def values(self, block: BlockInfo) -> np.ndarray:
+        with self._column(block, "value") as buffer:
+            return decode_values(buffer, block.count)
+
+    def read(self, block: BlockInfo, start: Optional[int] = None, end: Optional[int] = None) -> Block:
+        """Decode a block, keeping readings in [start, end) microseconds"""
+        timestamps = self.timestamps(block)
+        low = 0 if start is None else int(np.searchsorted(timestamps, start, side="left"))
+        high = block.count if end is None else int(np.searchsorted(timestamps, end, side="left"))
+        with self._column(block, "id") as buffer:
+            ids = np.cumsum(_unzigzag(_unpack(buffer, np.uint64, block.count)))
+        with self._column(block, "status") as buffer:
+            codes = _unpack(buffer, np.uint16, block.count)
+        statuses = np.array(block.statuses, dtype=object)[codes[low:high]]
+        return Block(block.equipment_id, block.sensor_type, block.unit, ids[low:high], timestamps[low:high],
+                     self.values(block)[low:high], statuses)
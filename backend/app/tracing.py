@@ -0,0 +1,425 @@
+import atexit
+import functools
+import inspect
+import json
+import logging
+import os
+import random
+import threading
+import time
+import urllib.request
+from collections import deque
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+from .db_monitoring import fingerprint_statement
+from .monitoring import get_route_template
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+# OTLP span kinds
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+# OTLP status codes
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+
+class Span:
+    """A finished or in-flight span; serialized in the OTLP/JSON span format"""
+    __slots__ = ("trace", "name", "span_id", "parent_id", "kind", "start_ns", "end_ns", "attributes", "status")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str] = None,
+                 kind: int = SPAN_KIND_INTERNAL, start_ns: Optional[int] = None):
+        self.trace = trace
+        self.name = name
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.kind = kind
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, object] = {}
+        self.status = 0
+
+    def child(self, name: str, kind: int = SPAN_KIND_INTERNAL, start_ns: Optional[int] = None) -> "Span":
+        return Span(self.trace, name, parent_id=self.span_id, kind=kind, start_ns=start_ns)
+
+    def end(self, end_ns: Optional[int] = None):
+        self.end_ns = end_ns or time.time_ns()
+        self.trace.spans.append(self)
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(key, value) for key, value in self.attributes.items()],
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if self.status:
+            span["status"] = {"code": self.status}
+        return span
+
+
+class Trace:
+    """Spans of one sampled request, exported together when the request finishes"""
+    __slots__ = ("trace_id", "spans", "endpoint_start_ns", "endpoint_end_ns")
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.spans: List[Span] = []
+        self.endpoint_start_ns: Optional[int] = None
+        self.endpoint_end_ns: Optional[int] = None
+
+
+def _otlp_attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("trace_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+# Exporters
+def otlp_request(spans: List[Span]) -> dict:
+    """An OTLP/HTTP JSON ExportTraceServiceRequest, accepted by any OpenTelemetry collector"""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [
+                _otlp_attribute("service.name", settings.tracing_service_name),
+                _otlp_attribute("deployment.environment", settings.environment),
+            ]},
+            "scopeSpans": [{
+                "scope": {"name": "producflow"},
+                "spans": [span.to_otlp() for span in spans],
+            }],
+        }]
+    }
+
+
+class FileSpanExporter:
+    """Appends one OTLP JSON export request per line"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, spans: List[Span]):
+        with open(self.path, "a") as f:
+            f.write(json.dumps(otlp_request(spans)) + "\n")
+
+
+class OTLPHttpSpanExporter:
+    """Posts spans to an OTLP/HTTP collector (JSON encoding)"""
+
+    def __init__(self, endpoint: str, timeout: float = 5.0):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.timeout = timeout
+
+    def export(self, spans: List[Span]):
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps(otlp_request(spans)).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+class BatchSpanProcessor:
+    """Queues finished traces and exports them from a background thread
+
+    The queue is bounded; when the exporter cannot keep up, traces are dropped
+    rather than slowing down requests.
+    """
+
+    def __init__(self, exporter, max_queue: int = 2048, batch_size: int = 512, interval: float = 2.0):
+        self.exporter = exporter
+        self.batch_size = batch_size
+        self.interval = interval
+        self.dropped = 0
+        self._queue: deque = deque(maxlen=max_queue)
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def on_trace_end(self, trace: Trace):
+        if len(self._queue) == self._queue.maxlen:
+            self.dropped += 1
+        self._queue.append(trace)
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+                    self._thread.start()
+                    atexit.register(self.flush)
+        if len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        while self._queue:
+            spans: List[Span] = []
+            while self._queue and len(spans) < self.batch_size:
+                spans.extend(self._queue.popleft().spans)
+            try:
+                self.exporter.export(spans)
+            except Exception:
+                logger.exception("Exporting %d spans failed", len(spans))
+
+
+def create_processor() -> BatchSpanProcessor:
+    if settings.tracing_exporter == "otlp":
+        exporter = OTLPHttpSpanExporter(settings.tracing_otlp_endpoint)
+    else:
+        exporter = FileSpanExporter(settings.tracing_file_path)
+    return BatchSpanProcessor(exporter)
+
+
+# Sampling
+def parse_traceparent(value: str):
+    """W3C traceparent -> (trace_id, parent_span_id, sampled), or None if malformed"""
+    parts = value.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        sampled = bool(int(parts[3], 16) & 1)
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    return parts[1], parts[2], sampled
+
+
+def should_sample(trace_id: str, rate: float) -> bool:
+    """Trace-id ratio sampling, so every service makes the same decision for a trace"""
+    return int(trace_id[16:], 16) < rate * (1 << 64)
+
+
+# Instrumentation
+def traced(func, name: Optional[str] = None):
+    """Wrap a function so calls made inside a sampled request produce a span"""
+    span_name = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__qualname__}"
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            parent = _current_span.get()
+            if parent is None:
+                return await func(*args, **kwargs)
+            span = parent.child(span_name)
+            token = _current_span.set(span)
+            try:
+                return await func(*args, **kwargs)
+            except BaseException:
+                span.status = STATUS_ERROR
+                raise
+            finally:
+                _current_span.reset(token)
+                span.end()
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        parent = _current_span.get()
+        if parent is None:
+            return func(*args, **kwargs)
+        span = parent.child(span_name)
+        token = _current_span.set(span)
+        try:
+            return func(*args, **kwargs)
+        except BaseException:
+            span.status = STATUS_ERROR
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+    return wrapper
+
+
+def instrument_module(module):
+    """Replace the module's own functions with traced versions
+
+    Callers go through the module attribute (crud.get_equipment, auth.get_current_user)
+    so they pick up the wrapper; this must run before FastAPI routes capture
+    dependencies.
+    """
+    for attr, value in list(vars(module).items()):
+        if attr.startswith("_") or not inspect.isfunction(value) or value.__module__ != module.__name__:
+            continue
+        if inspect.isasyncgenfunction(value) or inspect.isgeneratorfunction(value):
+            continue
+        setattr(module, attr, traced(value))
+
+
+class TracedRoute(APIRoute):
+    """Route class that times the endpoint body, separately from dependencies and serialization"""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, _trace_endpoint(endpoint), **kwargs)
+
+
+def _trace_endpoint(endpoint):
+    name = f"endpoint.{endpoint.__name__}"
+    wrapped = traced(endpoint, name=name)
+
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        span = _current_span.get()
+        if span is not None:
+            span.trace.endpoint_start_ns = time.time_ns()
+        try:
+            return await wrapped(*args, **kwargs)
+        finally:
+            if span is not None:
+                span.trace.endpoint_end_ns = time.time_ns()
+    return wrapper if inspect.iscoroutinefunction(endpoint) else endpoint
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    parent = _current_span.get()
+    if parent is None:
+        return
+    span = parent.child("db.query", kind=SPAN_KIND_CLIENT)
+    conn.info.setdefault("trace_spans", []).append((span, statement))
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    spans = conn.info.get("trace_spans")
+    if not spans:
+        return
+    span, _ = spans.pop()
+    fingerprint, normalized = fingerprint_statement(statement)
+    span.name = f"db {normalized.split(' ', 1)[0].upper()}"
+    span.attributes["db.system"] = conn.dialect.name
+    span.attributes["db.statement"] = normalized[:2000]
+    span.attributes["db.fingerprint"] = fingerprint
+    if executemany:
+        span.attributes["db.executemany"] = True
+    if cursor.rowcount is not None and cursor.rowcount >= 0:
+        span.attributes["db.rows"] = cursor.rowcount
+    span.end()
+
+
+def _handle_error(exception_context):
+    connection = exception_context.connection
+    spans = connection.info.get("trace_spans") if connection is not None else None
+    if spans:
+        span, statement = spans.pop()
+        span.attributes["db.statement"] = fingerprint_statement(statement)[1][:2000]
+        span.status = STATUS_ERROR
+        span.end()
+
+
+def instrument_engine(engine):
+    sync_engine = getattr(engine, "sync_engine", engine)
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+
+class TracingMiddleware:
+    """Starts a root span for sampled requests and hands finished traces to the processor
+
+    Besides the spans recorded by traced functions and SQL statements, two spans
+    are derived from timestamps: "fastapi.dependencies" (request start until the
+    endpoint runs) and "fastapi.serialize" (endpoint return until response start).
+    """
+
+    def __init__(self, app, processor: BatchSpanProcessor, sample_rate: float = 1.0):
+        self.app = app
+        self.processor = processor
+        self.sample_rate = sample_rate
+
+    def _sampling_decision(self, scope):
+        for name, value in scope["headers"]:
+            if name == b"traceparent":
+                parsed = parse_traceparent(value.decode("latin-1"))
+                if parsed is not None:
+                    return parsed
+        trace_id = f"{random.getrandbits(128):032x}"
+        return trace_id, None, should_sample(trace_id, self.sample_rate)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace_id, parent_id, sampled = self._sampling_decision(scope)
+        if not sampled:
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace(trace_id)
+        root = Span(trace, scope["method"], parent_id=parent_id, kind=SPAN_KIND_SERVER)
+        response_start_ns = None
+        status_code = 500
+
+        async def send_with_trace(message):
+            nonlocal response_start_ns, status_code
+            if message["type"] == "http.response.start":
+                response_start_ns = time.time_ns()
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("traceparent", f"00-{trace_id}-{root.span_id}-01")
+            await send(message)
+
+        token = _current_span.set(root)
+        try:
+            await self.app(scope, receive, send_with_trace)
+        except BaseException:
+            root.status = STATUS_ERROR
+            raise
+        finally:
+            _current_span.reset(token)
+            route = get_route_template(scope)
+            root.name = f"{scope['method']} {route}"
+            root.attributes.update({
+                "http.method": scope["method"],
+                "http.route": route,
+                "http.target": scope["path"],
+                "http.status_code": status_code,
+            })
+            if status_code >= 500:
+                root.status = STATUS_ERROR
+            if trace.endpoint_start_ns is not None:
+                root.child("fastapi.dependencies", start_ns=root.start_ns).end(trace.endpoint_start_ns)
+                if response_start_ns is not None and trace.endpoint_end_ns is not None:
+                    root.child("fastapi.serialize", start_ns=trace.endpoint_end_ns).end(response_start_ns)
+            root.end()
+            self.processor.on_trace_end(trace)
+
+
+def instrument_app(app, engine, modules=()):
+    """Enable tracing for routes declared after this call, the given modules and the engine"""
+    app.router.route_class = TracedRoute
+    for module in modules:
+        instrument_module(module)
+    instrument_engine(engine)
+    app.add_middleware(TracingMiddleware, processor=create_processor(), sample_rate=settings.tracing_sample_rate)
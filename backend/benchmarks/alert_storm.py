@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Alert creation throughput during a simulated alert storm.
+
+Concurrent clients submit the same few alerts over and over (a flapping sensor),
+plus a trickle of distinct ones. Runs the workload with plain inserts, with
+deduplication only, and with deduplication plus storm suppression.
+
+    python benchmarks/alert_storm.py --submissions 20000 --keys 20 --concurrency 16
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from common import print_table, write_results
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app import crud, models, schemas
+from app.alerts import AlertDeduplicator
+from app.database import Base, create_engine_for_url
+from app.settings import settings
+
+MODES = {
+    "insert": None,
+    "dedup": {"storm_threshold": 10 ** 9},
+    "dedup+storm": {"storm_threshold": 20, "storm_window": 60.0},
+}
+
+
+def storm_alert(rng: random.Random, keys: int, distinct_share: float, i: int):
+    if rng.random() < distinct_share:
+        equipment_id, title = 1 + rng.randrange(50), f"Anomaly {i}"
+    else:
+        key = rng.randrange(keys)
+        equipment_id, title = 1 + key % 50, f"Pressure fluctuation on line {key}"
+    return schemas.MaintenanceAlertCreate(
+        equipment_id=equipment_id, type="predictive", priority="high",
+        title=title, description="Pressure outside the warning band"
+    )
+
+
+async def run_mode(url: str, mode: str, submissions: int, keys: int, concurrency: int, distinct_share: float):
+    engine = create_engine_for_url(url)
+    Session = async_sessionmaker(bind=engine, expire_on_commit=False, autoflush=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    options = MODES[mode]
+    dedup = AlertDeduplicator(Session, **options) if options is not None else None
+
+    async def client(worker: int, count: int):
+        rng = random.Random(worker)
+        async with Session() as db:
+            for i in range(count):
+                alert = storm_alert(rng, keys, distinct_share, worker * count + i)
+                if dedup is None:
+                    await crud.create_maintenance_alert(db, alert)
+                else:
+                    await dedup.submit(db, alert)
+
+    per_client = submissions // concurrency
+    dedup_setting = settings.alert_dedup_enabled
+    settings.alert_dedup_enabled = False
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*(client(w, per_client) for w in range(concurrency)))
+        if dedup is not None:
+            await dedup.flush()
+        elapsed = time.perf_counter() - start
+    finally:
+        settings.alert_dedup_enabled = dedup_setting
+
+    async with Session() as db:
+        rows = await db.scalar(select(func.count()).select_from(models.MaintenanceAlert))
+        occurrences = await db.scalar(select(func.sum(models.MaintenanceAlert.occurrence_count)))
+    await engine.dispose()
+    total = per_client * concurrency
+    return {
+        "mode": mode,
+        "submissions": total,
+        "seconds": round(elapsed, 3),
+        "submissions_per_second": round(total / elapsed, 1),
+        "rows": rows,
+        "occurrences": occurrences,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="sqlite+aiosqlite:///./bench_alert_storm.db")
+    parser.add_argument("--submissions", type=int, default=10000)
+    parser.add_argument("--keys", type=int, default=20, help="distinct flapping alerts")
+    parser.add_argument("--distinct-share", type=float, default=0.01, help="share of one-off alerts")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--mode", action="append", choices=list(MODES), help="default: all modes")
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+
+    rows = []
+    for mode in args.mode or list(MODES):
+        rows.append(await run_mode(args.url, mode, args.submissions, args.keys, args.concurrency,
+                                   args.distinct_share))
+    print_table(rows, ["mode", "submissions", "seconds", "submissions_per_second", "rows", "occurrences"])
+
+    if args.output:
+        write_results(args.output, "alert_storm", {row["mode"]: row for row in rows})
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Equipment typeahead latency: the in-memory prefix index against the LIKE
+query it replaces, on a synthetic fleet.
+
+    python benchmarks/autocomplete.py --equipment 100000
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from common import latency_summary, print_table, write_results
+
+from sqlalchemy import insert, or_, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app import models
+from app.autocomplete import EquipmentIndex
+from app.database import Base, create_engine_for_url
+from app.synthetic import EQUIPMENT_TYPES
+
+# What operators type, keystroke by keystroke
+QUERIES = ["c", "cn", "cnc", "cnc m", "cnc mi", "cnc mil 12", "rob", "robotic arm 4", "floor b",
+           "assembly station 7", "quality", "conv 999", "zzz"]
+
+
+async def like_query(db, query: str, limit: int):
+    conditions = [
+        or_(models.Equipment.name.ilike(f"%{word}%"), models.Equipment.type.ilike(f"%{word}%"),
+            models.Equipment.location.ilike(f"%{word}%"))
+        for word in query.split()
+    ]
+    result = await db.execute(select(models.Equipment.id, models.Equipment.name)
+                              .where(*conditions).order_by(models.Equipment.name).limit(limit))
+    return result.all()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="sqlite+aiosqlite:///./bench_autocomplete.db")
+    parser.add_argument("--equipment", type=int, default=100_000)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+
+    engine = create_engine_for_url(args.url)
+    Session = async_sessionmaker(bind=engine, expire_on_commit=False, autoflush=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    rng = random.Random(3)
+    async with Session() as db:
+        rows = []
+        for i in range(args.equipment):
+            kind, name, _, location = EQUIPMENT_TYPES[rng.randrange(len(EQUIPMENT_TYPES))]
+            rows.append({"id": i + 1, "name": f"{name} #{i + 1}", "type": kind, "status": "operational",
+                         "location": f"{location} {rng.choice('ABCDEF') if rng.random() < 0.5 else rng.randint(1, 40)}"})
+        await db.execute(insert(models.Equipment), rows)
+        await db.commit()
+
+    index = EquipmentIndex(Session)
+    start = time.perf_counter()
+    await index.refresh()
+    load_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    await index.refresh()
+    noop_refresh_ms = (time.perf_counter() - start) * 1000
+    print(f"Index of {len(index)} machines built in {load_seconds:.2f}s; unchanged refresh {noop_refresh_ms:.1f}ms")
+
+    results = []
+    for query in QUERIES:
+        samples = []
+        for _ in range(args.iterations):
+            start = time.perf_counter()
+            hits = index.search(query, limit=args.limit)
+            samples.append(time.perf_counter() - start)
+        summary = latency_summary(samples)
+        results.append({"query": query, "method": "index", "results": len(hits),
+                        "p50_us": round(summary["p50_ms"] * 1000, 1), "p99_us": round(summary["p99_ms"] * 1000, 1)})
+
+        samples = []
+        async with Session() as db:
+            for _ in range(max(1, args.iterations // 100)):
+                start = time.perf_counter()
+                hits = await like_query(db, query, args.limit)
+                samples.append(time.perf_counter() - start)
+        summary = latency_summary(samples)
+        results.append({"query": query, "method": "LIKE", "results": len(hits),
+                        "p50_us": round(summary["p50_ms"] * 1000, 1), "p99_us": round(summary["p99_ms"] * 1000, 1)})
+    await engine.dispose()
+
+    print_table(results, ["query", "method", "results", "p50_us", "p99_us"])
+    if args.output:
+        write_results(args.output, "autocomplete", {
+            "equipment": len(index), "load_seconds": round(load_seconds, 3),
+            "noop_refresh_ms": round(noop_refresh_ms, 2), "queries": results,
+        })
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
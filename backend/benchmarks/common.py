@@ -0,0 +1,75 @@
+"""Shared helpers for the benchmark scripts"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# Allow running the scripts directly (python benchmarks/x.py) from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def latency_summary(samples) -> dict:
+    """p50/p95/p99/mean of a list of durations in seconds, reported in milliseconds"""
+    values = sorted(samples)
+    if not values:
+        return {"count": 0, "mean_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0}
+    return {
+        "count": len(values),
+        "mean_ms": round(sum(values) / len(values) * 1000, 3),
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+    }
+
+
+@contextmanager
+def timed(results: dict, key: str, operations: int = 1):
+    start = time.perf_counter()
+    yield
+    elapsed = time.perf_counter() - start
+    results[key] = {
+        "operations": operations,
+        "seconds": round(elapsed, 4),
+        "ops_per_second": round(operations / elapsed, 1) if elapsed > 0 else None,
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return "unknown"
+
+
+def write_results(path: str, name: str, results: dict):
+    """Write machine-readable results so runs can be compared across commits"""
+    payload = {
+        "benchmark": name,
+        "revision": git_revision(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2, default=str)
+    print(f"Results written to {path}")
+
+
+def print_table(rows, columns):
+    widths = [max(len(str(c)), *(len(str(r.get(c, ""))) for r in rows)) for c in columns]
+    print("  ".join(str(c).ljust(w) for c, w in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(str(row.get(c, "")).ljust(w) for c, w in zip(columns, widths)))
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Year-over-year maintenance cost analytics latency as the history grows: the
+monthly rollups against aggregating the maintenance logs per request (which
+covers only the cost breakdown; parts usage would also need parsing every
+parts_replaced text).
+
+    python benchmarks/costs.py --equipment 1000 --logs 10000 --logs 100000 --logs 1000000
+"""
+import argparse
+import asyncio
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from common import latency_summary, print_table, write_results
+
+from sqlalchemy import case, func, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app import costs, models
+from app.database import Base, create_engine_for_url
+from app.synthetic import PARTS
+
+TODAY = date(2026, 6, 15)
+
+
+async def load(Session, equipment: int, logs: int, chunk: int = 100_000):
+    rng = np.random.default_rng(7)
+    start = datetime(2025, 1, 1)
+    async with Session() as db:
+        await db.execute(insert(models.Equipment), [
+            {"id": i + 1, "name": f"Machine #{i + 1}", "type": f"Type {i % 8}", "location": f"Floor {i % 6}",
+             "status": "operational"}
+            for i in range(equipment)
+        ])
+        for offset in range(0, logs, chunk):
+            n = min(chunk, logs - offset)
+            kinds = np.array(["preventive", "corrective", "emergency"])[rng.integers(0, 3, n)]
+            minutes = rng.integers(0, (TODAY - start.date()).days * 24 * 60, n).tolist()
+            parts = rng.integers(0, len(PARTS), (n, 2)).tolist()
+            await db.execute(insert(models.MaintenanceLog), [
+                {"equipment_id": e + 1, "maintenance_type": k, "description": "Repair", "status": "completed",
+                 "cost": c, "parts_replaced": f"{PARTS[p[0]]}, {PARTS[p[1]]}",
+                 "scheduled_date": start + timedelta(minutes=m)}
+                for e, k, c, m, p in zip(rng.integers(0, equipment, n).tolist(), kinds.tolist(),
+                                         np.round(rng.lognormal(6, 0.7, n), 2).tolist(), minutes, parts)
+            ])
+        await db.commit()
+
+
+async def from_history(db):
+    """What a request would do without rollups: aggregate this year and the same months last year"""
+    logs, equipment = models.MaintenanceLog, models.Equipment
+    current = logs.scheduled_date >= datetime(TODAY.year, 1, 1)
+    result = await db.execute(
+        select(equipment.type,
+               func.sum(case((current, logs.cost), else_=0.0)),
+               func.sum(case((current, 0.0), else_=logs.cost)))
+        .join(equipment, equipment.id == logs.equipment_id)
+        .where(((logs.scheduled_date >= datetime(TODAY.year - 1, 1, 1))
+                & (logs.scheduled_date < datetime(TODAY.year - 1, TODAY.month + 1, 1))) | current)
+        .group_by(equipment.type)
+    )
+    return result.all()
+
+
+async def timed(Session, iterations: int, run):
+    samples = []
+    async with Session() as db:
+        for _ in range(iterations):
+            start = time.perf_counter()
+            await run(db)
+            samples.append(time.perf_counter() - start)
+    return latency_summary(samples)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="sqlite+aiosqlite:///./bench_costs.db")
+    parser.add_argument("--equipment", type=int, default=1000)
+    parser.add_argument("--logs", type=int, action="append", help="history sizes (repeatable)")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+
+    engine = create_engine_for_url(args.url)
+    Session = async_sessionmaker(bind=engine, expire_on_commit=False, autoflush=False)
+    rows = []
+    for logs in args.logs or [10_000, 100_000, 1_000_000]:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+        await load(Session, args.equipment, logs)
+        start = time.perf_counter()
+        async with Session() as db:
+            await costs.rebuild(db)
+            await db.commit()
+        rebuild_seconds = time.perf_counter() - start
+
+        for group_by in ("type", "equipment"):
+            latency = await timed(Session, args.iterations,
+                                  lambda db: costs.cost_analytics(db, group_by=group_by, today=TODAY))
+            rows.append({"logs": logs, "method": f"rollups ({group_by})", **latency})
+        latency = await timed(Session, args.iterations, lambda db: costs.year_to_date_savings(db, today=TODAY))
+        rows.append({"logs": logs, "method": "rollups (dashboard)", **latency})
+        latency = await timed(Session, max(1, args.iterations // 4), from_history)
+        rows.append({"logs": logs, "method": "aggregate logs (type)", **latency})
+        print(f"{logs} logs: rollups rebuilt in {rebuild_seconds:.1f}s")
+    await engine.dispose()
+
+    print_table(rows, ["logs", "method", "p50_ms", "p95_ms", "mean_ms"])
+    if args.output:
+        write_results(args.output, "costs", {"equipment": args.equipment, "runs": rows})
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Streaming export of sensor readings (app/exports.py) in each format:
+rows per second, output size, peak Python memory (tracemalloc, measured in
+a second pass) and the longest event loop stall while the export runs.
+The baseline loads the same rows as ORM objects into one list and
+serializes it as one JSON document, as a list endpoint with a large
+limit would.
+
+    python benchmarks/exports.py --readings 1000000
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from common import print_table, write_results
+from sensor_codes import STATUSES, chunks
+
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app import exports, models, schemas
+from app.database import Base, create_engine_for_url
+from app.dimensions import sensor_dimensions
+from app.synthetic import SENSOR_TYPES, SENSOR_UNITS
+
+CASES = [("csv", False), ("ndjson", False), ("csv", True), ("ndjson", True), ("parquet", False), ("orm_list", False)]
+
+
+async def load(engine, args):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(models.Equipment.__table__.insert(), [
+            {"id": i, "name": f"Bench Machine #{i}", "type": "Bench"} for i in range(1, args.equipment + 1)])
+        type_codes = [await conn.run_sync(sensor_dimensions.sensor_type_code, name, unit)
+                      for name, unit in zip(SENSOR_TYPES, SENSOR_UNITS)]
+        status_codes = [await conn.run_sync(sensor_dimensions.status_code, status) for status in STATUSES]
+    for equipment_id, sensor, values, status, timestamps in chunks(args.readings, args.equipment, 200_000):
+        async with engine.begin() as conn:
+            await conn.exec_driver_sql(
+                "INSERT INTO sensor_data (equipment_id, sensor_type_id, value, status_id, timestamp) "
+                "VALUES (?, ?, ?, ?, ?)",
+                list(zip(equipment_id.tolist(), [type_codes[s] for s in sensor.tolist()], values.tolist(),
+                         [status_codes[s] for s in status.tolist()], timestamps.tolist())))
+
+
+async def run_case(Session, format: str, gzip: bool) -> tuple:
+    """(rows, bytes written) of one export"""
+    async with Session() as db:
+        if format == "orm_list":
+            readings = (await db.scalars(select(models.SensorData).order_by(models.SensorData.id))).all()
+            body = TypeAdapter(list[schemas.SensorData]).dump_json(readings)
+            return len(readings), len(body)
+        export = await exports.sensor_data(db, format=format, gzip=gzip)
+        size = 0
+        async for chunk in export.body():
+            size += len(chunk)
+        return None, size
+
+
+async def measure(Session, format: str, gzip: bool, readings: int) -> dict:
+    stalls = []
+
+    async def ticker():
+        # The loop is blocked for however much longer than the interval a sleep takes
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(0.005)
+            stalls.append(time.perf_counter() - started - 0.005)
+
+    tick = asyncio.create_task(ticker())
+    started = time.perf_counter()
+    _, size = await run_case(Session, format, gzip)
+    seconds = time.perf_counter() - started
+    tick.cancel()
+
+    tracemalloc.start()
+    await run_case(Session, format, gzip)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "format": format + (" (gzip)" if gzip else ""), "seconds": round(seconds, 2),
+        "rows_per_s": round(readings / seconds), "output_mb": round(size / 2**20, 1),
+        "peak_mb": round(peak / 2**20, 1), "max_stall_ms": round(max(stalls, default=0) * 1000, 1),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readings", type=int, default=1_000_000)
+    parser.add_argument("--equipment", type=int, default=100)
+    parser.add_argument("--formats", default=",".join(dict.fromkeys(format for format, _ in CASES)))
+    parser.add_argument("--workdir", help="directory for the database (default: a temporary one)")
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="exports_")
+    path = os.path.join(workdir, "exports.db")
+    if os.path.exists(path):
+        os.remove(path)
+    engine = create_engine_for_url(f"sqlite+aiosqlite:///{path}")
+    Session = async_sessionmaker(bind=engine, expire_on_commit=False, autoflush=False)
+    results = []
+    try:
+        await load(engine, args)
+        for format, gzip in CASES:
+            if format not in args.formats.split(","):
+                continue
+            if format == "parquet" and exports.pyarrow is None:
+                print("Skipping parquet: pyarrow is not installed")
+                continue
+            results.append(await measure(Session, format, gzip, args.readings))
+            print_table(results[-1:], list(results[-1]))
+    finally:
+        await engine.dispose()
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print_table(results, list(results[0]))
+    if args.output:
+        write_results(args.output, "exports", {"readings": args.readings, "formats": results})
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Time the batch health-score pipeline on a synthetic fleet: a full run, then an
+incremental run after new readings arrive for a share of the machines.
+
+    python benchmarks/health_pipeline.py --equipment 10000 --readings-per-sensor 96
+    python benchmarks/health_pipeline.py --skip-generate --workers 4
+"""
+import argparse
+import asyncio
+import random
+from datetime import datetime
+
+from common import print_table, write_results
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app import models
+from app.database import create_engine_for_url
+from app.health import HealthPipeline
+from app.synthetic import SyntheticConfig, generate
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="sqlite+aiosqlite:///./bench_health.db")
+    parser.add_argument("--equipment", type=int, default=10000)
+    parser.add_argument("--readings-per-sensor", type=int, default=96, help="readings per sensor in the window")
+    parser.add_argument("--changed-share", type=float, default=0.05, help="machines with new data for the incremental run")
+    parser.add_argument("--workers", type=int, default=0, help="scoring processes (0: thread)")
+    parser.add_argument("--skip-generate", action="store_true", help="reuse the existing database")
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+
+    engine = create_engine_for_url(args.url)
+    Session = async_sessionmaker(bind=engine, expire_on_commit=False, autoflush=False)
+    if not args.skip_generate:
+        config = SyntheticConfig(equipment=args.equipment, readings=args.equipment * 4 * args.readings_per_sensor,
+                                 sensor_days=0.95, production_days=7, technicians=5, end=datetime.now())
+        await generate(engine, config, reset=True, log=lambda message: print(f"  {message}"))
+
+    pipeline = HealthPipeline(Session, workers=args.workers)
+    full = await pipeline.run(full=True)
+
+    async with Session() as db:
+        equipment_ids = (await db.scalars(select(models.Equipment.id))).all()
+    rng = random.Random(7)
+    changed = rng.sample(equipment_ids, max(1, int(len(equipment_ids) * args.changed_share)))
+    async with Session() as db:
+        await db.execute(insert(models.SensorData), [
+            {"equipment_id": equipment_id, "sensor_type": "temperature", "value": 84.0, "unit": "°C",
+             "status": "warning", "timestamp": datetime.now()}
+            for equipment_id in changed
+        ])
+        await db.commit()
+    incremental = await pipeline.run()
+
+    async with Session() as db:
+        alerts = await db.scalar(select(func.count()).select_from(models.MaintenanceAlert)
+                                 .where(models.MaintenanceAlert.title.like("% trending to critical")))
+    await engine.dispose()
+
+    rows = [{"run": "full", **full}, {"run": "incremental", **incremental}]
+    print_table(rows, ["run", "equipment", "readings", "alerts_created", "alerts_updated", "seconds"])
+    print(f"Predictive alerts open: {alerts}")
+    if args.output:
+        write_results(args.output, "health_pipeline", {"full": full, "incremental": incremental})
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
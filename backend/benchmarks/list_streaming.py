@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+GET /production/records with a large `limit`, as one JSON array (the list
+is loaded, validated against the response model and serialized whole) and
+as NDJSON (Accept: application/x-ndjson, see app/streaming.py): time to
+the first byte, total time and peak Python memory (tracemalloc, measured
+in a second pass).
+
+    python benchmarks/list_streaming.py --records 200000 --limits 1000,10000,100000
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import List
+
+from common import print_table, write_results
+
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app import crud, models, schemas, streaming
+from app.database import Base, create_engine_for_url
+
+SHIFTS = ("morning", "afternoon", "night")
+
+
+async def load(engine, records: int, equipment: int):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(models.Equipment.__table__.insert(), [
+            {"id": i, "name": f"Bench Machine #{i}", "type": "Bench"} for i in range(1, equipment + 1)])
+        start = datetime(2024, 1, 1)
+        for offset in range(0, records, 50_000):
+            await conn.execute(models.ProductionRecord.__table__.insert(), [
+                {"equipment_id": i % equipment + 1, "shift": SHIFTS[i % 3], "output_quantity": 400 + i % 97,
+                 "defect_quantity": i % 7, "downtime_minutes": i % 45, "efficiency_percentage": 80 + i % 20,
+                 "date": start + timedelta(minutes=10 * i)}
+                for i in range(offset, min(offset + 50_000, records))])
+
+
+async def json_list(db, limit: int):
+    """(seconds to first byte, body size): the whole response exists before its first byte is sent"""
+    started = time.perf_counter()
+    records = await crud.get_production_records(db, limit=limit)
+    adapter = TypeAdapter(List[schemas.ProductionRecord])
+    body = adapter.dump_json(adapter.validate_python(records, from_attributes=True))
+    return time.perf_counter() - started, len(body)
+
+
+async def ndjson(db, limit: int):
+    started, first, size = time.perf_counter(), None, 0
+    response = streaming.ndjson_response(await crud.stream_production_records(db, limit=limit),
+                                         schemas.ProductionRecord)
+    async for chunk in response.body_iterator:
+        if first is None:
+            first = time.perf_counter() - started
+        size += len(chunk)
+    return first, size
+
+
+async def measure(Session, mode: str, limit: int) -> dict:
+    run = json_list if mode == "json" else ndjson
+    async with Session() as db:
+        started = time.perf_counter()
+        first_byte, size = await run(db, limit)
+        seconds = time.perf_counter() - started
+    tracemalloc.start()
+    async with Session() as db:
+        await run(db, limit)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"mode": mode, "limit": limit, "first_byte_ms": round(first_byte * 1000, 1),
+            "total_ms": round(seconds * 1000, 1), "body_mb": round(size / 2**20, 1),
+            "peak_mb": round(peak / 2**20, 1)}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=200_000)
+    parser.add_argument("--equipment", type=int, default=100)
+    parser.add_argument("--limits", default="1000,10000,100000")
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="list_streaming_")
+    engine = create_engine_for_url(f"sqlite+aiosqlite:///{os.path.join(workdir, 'list_streaming.db')}")
+    Session = async_sessionmaker(bind=engine, expire_on_commit=False, autoflush=False)
+    results = []
+    try:
+        await load(engine, args.records, args.equipment)
+        for limit in (int(value) for value in args.limits.split(",")):
+            for mode in ("json", "ndjson"):
+                results.append(await measure(Session, mode, limit))
+                print_table(results[-1:], list(results[-1]))
+    finally:
+        await engine.dispose()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print_table(results, list(results[0]))
+    if args.output:
+        write_results(args.output, "list_streaming", {"records": args.records, "runs": results})
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
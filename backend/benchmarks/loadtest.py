@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test of the API with realistic request mixes.
+
+Virtual users log in once and then loop over the scenario's weighted operations
+for --duration seconds. Per endpoint, reports throughput, p50/p95/p99 latency
+and error rate.
+
+In-process (ASGI transport, fresh SQLite database seeded with sample data):
+
+    python benchmarks/loadtest.py --scenario mixed --users 20 --duration 30
+
+Against a running server, or a gunicorn started by the harness:
+
+    python benchmarks/loadtest.py --url http://localhost:8000 --scenario dashboard
+    python benchmarks/loadtest.py --gunicorn --workers 4 --scenario ingest --output ingest.json
+
+Scenarios: ingest, dashboard, login, history, mixed.
+"""
+import argparse
+import asyncio
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+from common import latency_summary, print_table, write_results
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CREDENTIALS = [
+    ("admin@producflow.com", "admin123"),
+    ("manager@producflow.com", "manager123"),
+    ("tech@producflow.com", "tech123"),
+]
+SENSOR_TYPES = ("temperature", "pressure", "vibration", "speed")
+
+
+def reading(rng: random.Random) -> dict:
+    # Imported late like the rest of the app, once DATABASE_URL points at the benchmark database
+    from app.crud import get_sensor_unit
+    sensor_type = rng.choice(SENSOR_TYPES)
+    return {"sensor_type": sensor_type, "value": round(rng.uniform(10, 100), 2), "unit": get_sensor_unit(sensor_type)}
+
+
+# Each operation returns (endpoint label, request coroutine)
+def post_sensor(ctx, rng):
+    equipment_id = rng.choice(ctx["equipment_ids"])
+    return "POST /equipment/{id}/sensors", ctx["client"].post(
+        f"/equipment/{equipment_id}/sensors", json=reading(rng), headers=ctx["headers"])
+
+
+def post_sensor_batch(ctx, rng):
+    equipment_id = rng.choice(ctx["equipment_ids"])
+    return "POST /equipment/{id}/sensors/batch", ctx["client"].post(
+        f"/equipment/{equipment_id}/sensors/batch", json=[reading(rng) for _ in range(50)], headers=ctx["headers"])
+
+
+def get_dashboard(ctx, rng):
+    return "GET /dashboard/summary", ctx["client"].get("/dashboard/summary", headers=ctx["headers"])
+
+
+def get_alerts(ctx, rng):
+    return "GET /maintenance", ctx["client"].get("/maintenance", headers=ctx["headers"])
+
+
+def get_production_metrics(ctx, rng):
+    return "GET /production/metrics", ctx["client"].get("/production/metrics", headers=ctx["headers"])
+
+
+def get_equipment_list(ctx, rng):
+    return "GET /equipment", ctx["client"].get("/equipment", headers=ctx["headers"])
+
+
+def login(ctx, rng):
+    username, password = rng.choice(CREDENTIALS)
+    return "POST /token", ctx["client"].post("/token", data={"username": username, "password": password})
+
+
+def get_sensor_history(ctx, rng):
+    equipment_id = rng.choice(ctx["equipment_ids"])
+    return "GET /equipment/{id}/sensors", ctx["client"].get(
+        f"/equipment/{equipment_id}/sensors", params={"limit": 500}, headers=ctx["headers"])
+
+
+def get_production_records(ctx, rng):
+    return "GET /production/records", ctx["client"].get(
+        "/production/records", params={"skip": rng.randint(0, 50), "limit": 100}, headers=ctx["headers"])
+
+
+def get_maintenance_logs(ctx, rng):
+    return "GET /maintenance/logs", ctx["client"].get("/maintenance/logs", headers=ctx["headers"])
+
+
+def get_equipment_item(ctx, rng):
+    equipment_id = rng.choice(ctx["equipment_ids"])
+    return "GET /equipment/{id}", ctx["client"].get(f"/equipment/{equipment_id}", headers=ctx["headers"])
+
+
+SCENARIOS = {
+    # Machines pushing readings, mostly one at a time
+    "ingest": [(post_sensor, 90), (post_sensor_batch, 10)],
+    # Dashboards polling summary widgets
+    "dashboard": [(get_dashboard, 50), (get_alerts, 25), (get_production_metrics, 15), (get_equipment_list, 10)],
+    # Shift change: everyone logs in at once (bcrypt bound)
+    "login": [(login, 100)],
+    # Users browsing history
+    "history": [(get_sensor_history, 40), (get_production_records, 25), (get_maintenance_logs, 20),
+                (get_equipment_item, 15)],
+}
+SCENARIOS["mixed"] = (
+    [(op, weight * 6) for op, weight in SCENARIOS["ingest"]]
+    + [(op, weight * 3) for op, weight in SCENARIOS["dashboard"]]
+    + [(op, weight * 1) for op, weight in SCENARIOS["history"]]
+    + [(login, 5)]
+)
+
+
+async def virtual_user(ctx, user: int, operations, deadline: float, warmup_until: float, samples, errors, think_time: float):
+    rng = random.Random(user)
+    ops, weights = zip(*operations)
+    while time.perf_counter() < deadline:
+        label, request = rng.choices(ops, weights)[0](ctx, rng)
+        start = time.perf_counter()
+        try:
+            response = await request
+            failed = response.status_code >= 400
+        except Exception:
+            failed = True
+        end = time.perf_counter()
+        if start >= warmup_until:
+            samples[label].append((end, end - start))
+            if failed:
+                errors[label] += 1
+        if think_time:
+            await asyncio.sleep(rng.expovariate(1 / think_time))
+
+
+async def run_load(client, scenario: str, users: int, duration: float, warmup: float, think_time: float) -> dict:
+    response = await client.post("/token", data={"username": CREDENTIALS[0][0], "password": CREDENTIALS[0][1]})
+    response.raise_for_status()
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    equipment = (await client.get("/equipment", headers=headers)).json()
+    ctx = {"client": client, "headers": headers, "equipment_ids": [item["id"] for item in equipment]}
+
+    samples, errors = defaultdict(list), defaultdict(int)
+    start = time.perf_counter()
+    warmup_until = start + warmup
+    deadline = warmup_until + duration
+    await asyncio.gather(*(
+        virtual_user(ctx, user, SCENARIOS[scenario], deadline, warmup_until, samples, errors, think_time)
+        for user in range(users)
+    ))
+    elapsed = time.perf_counter() - warmup_until
+
+    endpoints = {}
+    for label, values in sorted(samples.items()):
+        endpoints[label] = {
+            **latency_summary([latency for _, latency in values]),
+            "requests_per_second": round(len(values) / elapsed, 1),
+            "errors": errors[label],
+            "error_rate": round(errors[label] / len(values), 4),
+        }
+    total = sum(len(values) for values in samples.values())
+    return {
+        "scenario": scenario,
+        "users": users,
+        "duration_seconds": round(elapsed, 2),
+        "requests": total,
+        "requests_per_second": round(total / elapsed, 1),
+        "error_rate": round(sum(errors.values()) / total, 4) if total else 0.0,
+        "latency": latency_summary([latency for values in samples.values() for _, latency in values]),
+        "endpoints": endpoints,
+    }
+
+
+async def seed_database(database_url: str):
+    """Create tables and sample data through the app's own code paths"""
+    os.environ["DATABASE_URL"] = database_url
+    from app import crud
+    from app.database import create_engine_for_url
+    from app.models import Base
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    engine = create_engine_for_url(database_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(bind=engine, expire_on_commit=False)() as db:
+        await crud.init_sample_data(db)
+    await engine.dispose()
+
+
+async def run_in_process(args) -> dict:
+    database_url = args.database_url or f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/loadtest.db"
+    os.environ.update(DATABASE_URL=database_url, DEBUG="false")
+    await seed_database(database_url)
+
+    import httpx
+    from main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60) as client:
+        return await run_load(client, args.scenario, args.users, args.duration, args.warmup, args.think_time)
+
+
+async def run_against_url(args, url: str) -> dict:
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    async with httpx.AsyncClient(base_url=url, timeout=60, limits=limits) as client:
+        return await run_load(client, args.scenario, args.users, args.duration, args.warmup, args.think_time)
+
+
+def start_gunicorn(args, port: int):
+    database_url = args.database_url or f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/loadtest.db"
+    # Seed before the workers start so they do not race on create_all
+    subprocess.check_call([sys.executable, os.path.abspath(__file__), "--seed-only", "--database-url", database_url],
+                          cwd=BACKEND_DIR)
+    env = {**os.environ, "DATABASE_URL": database_url, "DEBUG": "false",
+           "PROMETHEUS_MULTIPROC_DIR": tempfile.mkdtemp()}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "main:app", "-c", "gunicorn.conf.py",
+         "--bind", f"127.0.0.1:{port}", "--workers", str(args.workers),
+         "--access-logfile", "/dev/null", "--error-logfile", "-", "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    import httpx
+    for _ in range(100):
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health").status_code == 200:
+                return process
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("gunicorn did not become healthy")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="mixed")
+    parser.add_argument("--users", type=int, default=20, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=3.0, help="seconds excluded from results")
+    parser.add_argument("--think-time", type=float, default=0.0, help="mean pause between requests per user")
+    parser.add_argument("--url", help="load an already running server")
+    parser.add_argument("--gunicorn", action="store_true", help="start gunicorn with gunicorn.conf.py and load it")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--database-url", help="defaults to a fresh SQLite database")
+    parser.add_argument("--seed-only", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+
+    if args.seed_only:
+        asyncio.run(seed_database(args.database_url))
+        return
+
+    if args.gunicorn:
+        process = start_gunicorn(args, args.port)
+        try:
+            results = asyncio.run(run_against_url(args, f"http://127.0.0.1:{args.port}"))
+        finally:
+            process.send_signal(signal.SIGTERM)
+            process.wait(timeout=30)
+        results["target"] = f"gunicorn ({args.workers} workers)"
+    elif args.url:
+        results = asyncio.run(run_against_url(args, args.url))
+        results["target"] = args.url
+    else:
+        results = asyncio.run(run_in_process(args))
+        results["target"] = "in-process"
+
+    print(f"\n{results['scenario']} on {results['target']}: {results['requests']} requests, "
+          f"{results['requests_per_second']} req/s, error rate {results['error_rate']:.2%}")
+    rows = [{
+        "endpoint": label,
+        "count": stats["count"],
+        "req/s": stats["requests_per_second"],
+        "p50_ms": stats["p50_ms"],
+        "p95_ms": stats["p95_ms"],
+        "p99_ms": stats["p99_ms"],
+        "errors": stats["errors"],
+    } for label, stats in results["endpoints"].items()]
+    print_table(rows, ["endpoint", "count", "req/s", "p50_ms", "p95_ms", "p99_ms", "errors"])
+
+    if args.output:
+        write_results(args.output, "loadtest", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the crud functions, auth.get_current_user, response model
+serialization and the Prometheus middleware, with regression checks.
+
+Every run seeds the same fleet (app.synthetic, fixed seed) into a fresh database.
+Each case is timed for --rounds rounds and the median time per call is compared
+with a stored baseline; a case slower than baseline * (1 + tolerance) fails the run.
+
+    python benchmarks/microbench.py --save-baseline               # on the reference machine
+    python benchmarks/microbench.py --tolerance 0.25              # exits 1 on regression
+    python benchmarks/microbench.py --filter crud. --case-tolerance crud.get_shift_summary=0.5
+
+Baselines are machine specific: record them on the machine that runs the check.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+from common import print_table, write_results
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import selectinload
+
+from app import auth, crud, models, schemas
+from app.database import create_engine_for_url
+from app.monitoring import PrometheusMiddleware
+from app.synthetic import SyntheticConfig, generate
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "microbench.json")
+
+# Fixed dataset: 50 machines, 200 readings per sensor, 30 days of shifts
+DATASET = dict(equipment=50, readings=50 * 4 * 200, sensor_days=7, production_days=30, technicians=3,
+               chunk_size=100_000)
+
+# Calls per round are grown until a round takes at least this long
+MIN_ROUND_SECONDS = 0.02
+MAX_CALLS_PER_ROUND = 10_000
+
+
+async def seed(engine, seed_value: int) -> datetime:
+    # Anchored to today so the "last 7 days" queries see data; values depend only on the seed
+    end = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    await generate(engine, SyntheticConfig(seed=seed_value, end=end, **DATASET), reset=True, log=lambda message: None)
+    return end
+
+
+def crud_cases(end: datetime):
+    """name -> async fn(db, i) for every function in app/crud.py except init_sample_data"""
+    day = end - timedelta(days=1)
+
+    def sensor(i):
+        return schemas.SensorDataCreate(sensor_type="temperature", value=70.0 + i % 10, unit="°C")
+
+    def record(i):
+        return schemas.ProductionRecordCreate(equipment_id=1 + i % 50, shift="morning", output_quantity=100 + i,
+                                              efficiency_percentage=95.0, date=day)
+
+    async def drain(batches):
+        return [item async for batch in await batches for item in batch]
+
+    async def download(export):
+        return b"".join([chunk async for chunk in (await export).body()])
+
+    batch = [sensor(i) for i in range(100)]
+    return {
+        "crud.get_equipment": lambda db, i: crud.get_equipment(db),
+        "crud.stream_equipment": lambda db, i: drain(crud.stream_equipment(db)),
+        "crud.get_equipment_by_id": lambda db, i: crud.get_equipment_by_id(db, 1 + i % 50),
+        "crud.autocomplete_equipment": lambda db, i: crud.autocomplete_equipment(
+            db, ("cnc", "robotic arm 1", "floor")[i % 3]),
+        "crud.create_equipment": lambda db, i: crud.create_equipment(db, schemas.EquipmentCreate(
+            name=f"Bench Machine {i}", type="Bench", location="Lab", capacity=100.0)),
+        "crud.get_sensor_data": lambda db, i: crud.get_sensor_data(db, 1 + i % 50),
+        "crud.stream_sensor_data": lambda db, i: drain(crud.stream_sensor_data(db, 1 + i % 50)),
+        "crud.create_sensor_data": lambda db, i: crud.create_sensor_data(db, sensor(i), equipment_id=1 + i % 50),
+        "crud.create_sensor_data_bulk": lambda db, i: crud.create_sensor_data_bulk(db, batch, equipment_id=1 + i % 50),
+        "crud.get_maintenance_alerts": lambda db, i: crud.get_maintenance_alerts(db),
+        "crud.stream_maintenance_alerts": lambda db, i: drain(crud.stream_maintenance_alerts(db)),
+        "crud.create_maintenance_alert": lambda db, i: crud.create_maintenance_alert(db, schemas.MaintenanceAlertCreate(
+            equipment_id=1 + i % 50, type="predictive", priority="low", title=f"Alert {i}", description="bench")),
+        "crud.get_production_metrics": lambda db, i: crud.get_production_metrics(db),
+        "crud.get_dashboard_summary": lambda db, i: crud.get_dashboard_summary(db),
+        "crud.get_fleet_reliability": lambda db, i: crud.get_fleet_reliability(
+            db, group_by=("equipment", "type")[i % 2]),
+        "crud.get_cost_analytics": lambda db, i: crud.get_cost_analytics(
+            db, group_by=("type", "equipment", "location", "maintenance_type")[i % 4]),
+        "crud.search": lambda db, i: crud.search(db, ("bearing", "hydraulic pump", "filt")[i % 3]),
+        "crud.generate_sensor_value": lambda db, i: crud.generate_sensor_value("pressure"),
+        "crud.get_sensor_unit": lambda db, i: crud.get_sensor_unit("vibration"),
+        "crud.get_sensor_status": lambda db, i: crud.get_sensor_status("speed", 1250.0 + i % 600),
+        "crud.get_production_records": lambda db, i: crud.get_production_records(db),
+        "crud.stream_production_records": lambda db, i: drain(crud.stream_production_records(db)),
+        "crud.get_production_record_by_id": lambda db, i: crud.get_production_record_by_id(db, 1 + i % 1000),
+        "crud.create_production_record": lambda db, i: crud.create_production_record(db, record(i)),
+        "crud.update_production_record": lambda db, i: crud.update_production_record(db, 1 + i % 1000, record(i)),
+        "crud.get_maintenance_logs": lambda db, i: crud.get_maintenance_logs(db),
+        "crud.stream_maintenance_logs": lambda db, i: drain(crud.stream_maintenance_logs(db)),
+        "crud.get_maintenance_log_by_id": lambda db, i: crud.get_maintenance_log_by_id(db, 1 + i % 50),
+        "crud.create_maintenance_log": lambda db, i: crud.create_maintenance_log(db, schemas.MaintenanceLogCreate(
+            equipment_id=1 + i % 50, technician_id=1, maintenance_type="preventive", description=f"Log {i}")),
+        "crud.update_maintenance_log_status": lambda db, i: crud.update_maintenance_log_status(
+            db, 1 + i % 50, "in_progress" if i % 2 else "completed"),
+        "crud.get_shift_summary": lambda db, i: crud.get_shift_summary(db, day),
+        "crud.export_sensor_data": lambda db, i: download(
+            crud.export_sensor_data(db, equipment_id=1 + i % 50, limit=1000)),
+        "crud.export_production_records": lambda db, i: download(crud.export_production_records(db, limit=1000)),
+    }
+
+
+async def serialization_cases(Session, end: datetime):
+    """name -> fn(i) validating ORM objects (or dicts) into each response model and dumping to JSON"""
+    async with Session() as db:
+        users = (await db.scalars(select(models.User))).all()
+        equipment = (await db.scalars(select(models.Equipment).limit(100))).all()
+        readings = (await db.scalars(select(models.SensorData).limit(100))).all()
+        alerts = (await db.scalars(select(models.MaintenanceAlert).limit(100))).all()
+        records = (await db.scalars(select(models.ProductionRecord).limit(100))).all()
+        logs = (await db.scalars(select(models.MaintenanceLog).limit(100))).all()
+        detailed = (await db.scalars(
+            select(models.Equipment).where(models.Equipment.id == 1)
+            .options(selectinload(models.Equipment.sensor_data), selectinload(models.Equipment.maintenance_alerts))
+        )).one()
+        metrics = await crud.get_production_metrics(db)
+        summary = await crud.get_dashboard_summary(db)
+        shifts = await crud.get_shift_summary(db, end - timedelta(days=1))
+
+    token = {"access_token": auth.create_access_token({"sub": "admin@producflow.com"}), "token_type": "bearer"}
+    arm = {"id": "a1b2c3", "route": "/equipment/{equipment_id}/sensors", "method": "GET", "count": 10,
+           "expires_at": end}
+    profiles = [{"id": f"profile-{i}", "created_at": end, "size_bytes": 1024 * i} for i in range(100)]
+
+    def dump(model, objects):
+        return lambda i: [model.model_validate(obj).model_dump(mode="json") for obj in objects]
+
+    return {
+        "schemas.User": dump(schemas.User, users),
+        "schemas.Token": dump(schemas.Token, [token]),
+        "schemas.Equipment x100": dump(schemas.Equipment, equipment),
+        "schemas.SensorData x100": dump(schemas.SensorData, readings),
+        "schemas.MaintenanceAlert x100": dump(schemas.MaintenanceAlert, alerts),
+        "schemas.ProductionMetrics": dump(schemas.ProductionMetrics, [metrics]),
+        "schemas.DashboardSummary": dump(schemas.DashboardSummary, [summary]),
+        "schemas.ProductionRecord x100": dump(schemas.ProductionRecord, records),
+        "schemas.MaintenanceLog x100": dump(schemas.MaintenanceLog, logs),
+        "schemas.ShiftSummary": dump(schemas.ShiftSummary, shifts),
+        "schemas.EquipmentWithSensors": dump(schemas.EquipmentWithSensors, [detailed]),
+        "schemas.ProfilingArm": dump(schemas.ProfilingArm, [arm]),
+        "schemas.ProfileInfo x100": dump(schemas.ProfileInfo, profiles),
+    }
+
+
+def middleware_case():
+    """One request through PrometheusMiddleware around an app that answers immediately"""
+    class Route:
+        path = "/equipment/{equipment_id}"
+
+    async def app(scope, receive, send):
+        scope["route"] = Route
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    middleware = PrometheusMiddleware(app)
+    return lambda i: middleware({"type": "http", "method": "GET", "path": f"/equipment/{i % 50}"}, receive, send)
+
+
+async def run_calls(call, calls: int):
+    for i in range(calls):
+        result = call(i)
+        if asyncio.iscoroutine(result):
+            await result
+
+
+async def time_rounds(call, rounds: int) -> dict:
+    """Median/min seconds per call; calls per round are calibrated first, then fixed for every round
+
+    call(i) may be a plain function or return a coroutine.
+    """
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        await run_calls(call, calls)
+        if time.perf_counter() - start >= MIN_ROUND_SECONDS or calls >= MAX_CALLS_PER_ROUND:
+            break
+        calls = min(calls * 2, MAX_CALLS_PER_ROUND)
+    per_call = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        await run_calls(call, calls)
+        per_call.append((time.perf_counter() - start) / calls)
+    per_call.sort()
+    return {
+        "calls_per_round": calls,
+        "rounds": rounds,
+        "median_us": round(per_call[len(per_call) // 2] * 1e6, 3),
+        "min_us": round(per_call[0] * 1e6, 3),
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float, case_tolerance: dict):
+    """Rows for the report and the names of cases slower than their baseline allows"""
+    rows, regressions = [], []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        row = {"case": name, "median_us": result["median_us"]}
+        if reference:
+            allowed = case_tolerance.get(name, tolerance)
+            change = result["median_us"] / reference["median_us"] - 1
+            row.update(baseline_us=reference["median_us"], change=f"{change:+.1%}")
+            if change > allowed:
+                row["status"] = f"REGRESSION (> {allowed:.0%})"
+                regressions.append(name)
+            else:
+                row["status"] = "ok"
+        else:
+            row["status"] = "new"
+        rows.append(row)
+    return rows, regressions
+
+
+def parse_case_tolerance(values) -> dict:
+    overrides = {}
+    for value in values:
+        name, _, fraction = value.rpartition("=")
+        if not name:
+            raise SystemExit(f"--case-tolerance expects NAME=FRACTION, got {value!r}")
+        overrides[name] = float(fraction)
+    return overrides
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="sqlite+aiosqlite:///./bench_micro.db")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--filter", default="", help="only run cases whose name contains this text")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON to compare with or save to")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown as a fraction of the baseline median (default 0.25)")
+    parser.add_argument("--case-tolerance", action="append", default=[], metavar="NAME=FRACTION",
+                        help="per-case tolerance override, may be repeated")
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+    case_tolerance = parse_case_tolerance(args.case_tolerance)
+
+    engine = create_engine_for_url(args.url)
+    Session = async_sessionmaker(bind=engine, expire_on_commit=False, autoflush=False)
+    end = await seed(engine, args.seed)
+    results = {}
+
+    for name, fn in crud_cases(end).items():
+        if args.filter in name:
+            async with Session() as db:
+                results[name] = await time_rounds(lambda i: fn(db, i), args.rounds)
+
+    if args.filter in "auth.get_current_user":
+        token = auth.create_access_token({"sub": "admin@producflow.com"})
+        async with Session() as db:
+            results["auth.get_current_user"] = await time_rounds(
+                lambda i: auth.get_current_user(token=token, db=db), args.rounds)
+
+    for name, fn in (await serialization_cases(Session, end)).items():
+        if args.filter in name:
+            results[name] = await time_rounds(fn, args.rounds)
+
+    if args.filter in "monitoring.PrometheusMiddleware":
+        results["monitoring.PrometheusMiddleware"] = await time_rounds(middleware_case(), args.rounds)
+    await engine.dispose()
+
+    if args.output:
+        write_results(args.output, "microbench", results)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        write_results(args.baseline, "microbench", results)
+        print_table([{"case": name, **result} for name, result in results.items()],
+                    ["case", "median_us", "min_us", "calls_per_round"])
+        return 0
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+    else:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one")
+
+    rows, regressions = compare(results, baseline, args.tolerance, case_tolerance)
+    print_table(rows, ["case", "median_us", "baseline_us", "change", "status"])
+    if regressions:
+        print(f"\nPERFORMANCE REGRESSION in {len(regressions)} case(s): {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
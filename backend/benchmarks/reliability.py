@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Fleet reliability (MTBF/MTTR) latency as the maintenance history grows:
+the running statistics against recomputing from the full history per request.
+
+    python benchmarks/reliability.py --equipment 1000 --logs 10000 --logs 100000 --logs 1000000
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from common import latency_summary, print_table, write_results
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app import models, reliability
+from app.database import Base, create_engine_for_url
+
+
+async def load(Session, equipment: int, logs: int, chunk: int = 100_000):
+    rng = np.random.default_rng(5)
+    start = datetime(2024, 1, 1)
+    async with Session() as db:
+        await db.execute(insert(models.Equipment), [
+            {"id": i + 1, "name": f"Machine #{i + 1}", "type": f"Type {i % 8}", "status": "operational"}
+            for i in range(equipment)
+        ])
+        for offset in range(0, logs, chunk):
+            n = min(chunk, logs - offset)
+            kinds = np.array(["preventive", "corrective", "emergency"])[rng.integers(0, 3, n)]
+            minutes = rng.integers(0, 2 * 365 * 24 * 60, n).tolist()
+            await db.execute(insert(models.MaintenanceLog), [
+                {"equipment_id": e + 1, "maintenance_type": k, "description": "Repair", "status": "completed",
+                 "duration_hours": d, "scheduled_date": start + timedelta(minutes=m)}
+                for e, k, d, m in zip(rng.integers(0, equipment, n).tolist(), kinds.tolist(),
+                                      np.round(rng.lognormal(1, 0.5, n), 1).tolist(), minutes)
+            ])
+        await db.commit()
+
+
+async def timed(Session, iterations: int, run):
+    samples = []
+    async with Session() as db:
+        for _ in range(iterations):
+            start = time.perf_counter()
+            await run(db)
+            samples.append(time.perf_counter() - start)
+            await db.rollback()
+    return latency_summary(samples)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="sqlite+aiosqlite:///./bench_reliability.db")
+    parser.add_argument("--equipment", type=int, default=1000)
+    parser.add_argument("--logs", type=int, action="append", help="history sizes (repeatable)")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+
+    engine = create_engine_for_url(args.url)
+    Session = async_sessionmaker(bind=engine, expire_on_commit=False, autoflush=False)
+    rows = []
+    for logs in args.logs or [10_000, 100_000, 1_000_000]:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+        await load(Session, args.equipment, logs)
+        async with Session() as db:
+            await reliability.rebuild(db)
+            await db.commit()
+
+        running = await timed(Session, args.iterations, lambda db: reliability.fleet_reliability(db))
+
+        async def from_history(db):
+            # What a request would do without running statistics
+            await reliability.rebuild(db)
+            return await reliability.fleet_reliability(db)
+
+        recomputed = await timed(Session, max(1, args.iterations // 4), from_history)
+        rows.append({"logs": logs, "method": "running statistics", **running})
+        rows.append({"logs": logs, "method": "recompute from history", **recomputed})
+    await engine.dispose()
+
+    print_table(rows, ["logs", "method", "p50_ms", "p95_ms", "mean_ms"])
+    if args.output:
+        write_results(args.output, "reliability", {"equipment": args.equipment, "runs": rows})
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
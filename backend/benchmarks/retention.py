@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Sensor data retention: archival throughput, and how long concurrent ingest
+waits while expired readings are archived in chunks, compared with deleting
+them in a single transaction.
+
+Each run loads --readings readings spread over --days days, then archives
+everything older than --retention-days while a writer inserts a batch of
+readings every 20ms (as crud.create_sensor_data_bulk does).
+
+    python benchmarks/retention.py --readings 2000000 --days 180 --retention-days 90
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from common import latency_summary, print_table, write_results
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app import models
+from app.database import Base, create_engine_for_url
+from app.retention import RetentionPolicy, SensorArchiver
+from app.synthetic import EQUIPMENT_TYPES
+
+SENSORS = ["temperature", "pressure", "vibration", "speed"]
+
+
+async def load(Session, readings: int, equipment: int, days: int, now: datetime, chunk: int = 100_000):
+    rng = np.random.default_rng(13)
+    async with Session() as db:
+        await db.execute(insert(models.Equipment), [
+            {"id": i + 1, "name": f"Machine #{i + 1}", "type": EQUIPMENT_TYPES[i % len(EQUIPMENT_TYPES)][0],
+             "status": "operational"}
+            for i in range(equipment)
+        ])
+        await db.commit()
+    # Oldest first, as they would have been ingested
+    seconds = np.sort(rng.uniform(0, days * 86400, readings))[::-1]
+    for offset in range(0, readings, chunk):
+        n = min(chunk, readings - offset)
+        async with Session() as db:
+            await db.execute(insert(models.SensorData), [
+                {"equipment_id": e + 1, "sensor_type": SENSORS[s], "value": v, "unit": "u", "status": "normal",
+                 "timestamp": now - timedelta(seconds=t)}
+                for e, s, v, t in zip(rng.integers(0, equipment, n).tolist(), rng.integers(0, 4, n).tolist(),
+                                      np.round(rng.normal(50, 5, n), 2).tolist(), seconds[offset:offset + n].tolist())
+            ])
+            await db.commit()
+
+
+async def ingest(Session, equipment: int, stop: asyncio.Event, samples: list):
+    i = 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        async with Session() as db:
+            await db.execute(insert(models.SensorData), [
+                {"equipment_id": 1 + (i + j) % equipment, "sensor_type": "temperature", "value": 70.0, "unit": "u",
+                 "status": "normal", "timestamp": datetime.now()}
+                for j in range(50)
+            ])
+            await db.commit()
+        samples.append(time.perf_counter() - start)
+        i += 1
+        await asyncio.sleep(0.02)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readings", type=int, default=2_000_000)
+    parser.add_argument("--equipment", type=int, default=200)
+    parser.add_argument("--days", type=int, default=180)
+    parser.add_argument("--retention-days", type=int, default=90)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+
+    now = datetime(2026, 6, 1)
+    rows = []
+    for method, chunk_size in (("chunked", args.chunk_size), ("single transaction", args.readings)):
+        workdir = tempfile.mkdtemp(prefix="bench_retention_")
+        path = os.path.join(workdir, "retention.db")
+        engine = create_engine_for_url(f"sqlite+aiosqlite:///{path}")
+        Session = async_sessionmaker(bind=engine, expire_on_commit=False, autoflush=False)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        await load(Session, args.readings, args.equipment, args.days, now)
+        size_before = os.path.getsize(path) + os.path.getsize(path + "-wal")
+
+        archiver = SensorArchiver(Session, RetentionPolicy(args.retention_days), archive_dir=os.path.join(workdir, "archive"),
+                                  chunk_size=chunk_size)
+        stop, samples = asyncio.Event(), []
+        writer = asyncio.create_task(ingest(Session, args.equipment, stop, samples))
+        await asyncio.sleep(0.5)
+        start = time.perf_counter()
+        stats = await archiver.run(now=now)
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await writer
+        async with engine.connect() as conn:
+            await conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+        await engine.dispose()
+
+        archive_bytes = sum(os.path.getsize(os.path.join(d, f)) for d, _, fs in os.walk(os.path.join(workdir, "archive"))
+                            for f in fs)
+        ingest_latency = latency_summary(samples)
+        rows.append({
+            "method": method, "archived": stats["readings"], "files": stats["files"], "seconds": round(elapsed, 1),
+            "rows_per_second": round(stats["readings"] / elapsed), "ingest_p50_ms": ingest_latency["p50_ms"],
+            "ingest_p99_ms": ingest_latency["p99_ms"], "ingest_max_ms": round(max(samples) * 1000, 1),
+            "db_mb_before": round(size_before / 2**20, 1), "db_mb_after": round(os.path.getsize(path) / 2**20, 1),
+            "archive_mb": round(archive_bytes / 2**20, 1),
+        })
+        shutil.rmtree(workdir)
+
+    print_table(rows, list(rows[0]))
+    if args.output:
+        write_results(args.output, "retention", {"readings": args.readings, "runs": rows})
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
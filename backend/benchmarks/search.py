@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Full-text search latency on a large maintenance history, compared with the
+LIKE '%term%' scans the search index replaces.
+
+Loads --logs maintenance logs (with the index kept up to date by the same
+triggers / generated columns as production), then times ranked searches for
+rare, common, multi-term and prefix queries and a deep page.
+
+    python benchmarks/search.py --logs 1000000 --iterations 20
+    python benchmarks/search.py --skip-generate --output search.json
+"""
+import argparse
+import asyncio
+import time
+
+import numpy as np
+from common import latency_summary, print_table, write_results
+
+from sqlalchemy import insert, or_, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app import models
+from app.database import Base, create_engine_for_url
+from app.search import search
+from app.synthetic import EQUIPMENT_TYPES, MAINTENANCE_DESCRIPTIONS, PARTS
+
+NOTES = ["no further action", "noise reported by operator", "found during night shift round",
+         "parts ordered from supplier", "follow-up inspection scheduled", "tolerances within spec",
+         "replaced under warranty", "operator retrained on start-up procedure"]
+RARE_NOTE = "gearbox teeth chipped"  # about one log in 10,000
+
+QUERIES = [
+    ("rare", "gearbox", 0),
+    ("common", "bearing", 0),
+    ("two terms", "hydraulic pump", 0),
+    ("prefix", "lubric", 0),
+    ("deep page", "filter", 1000),
+]
+
+
+async def load(Session, logs: int, equipment: int, chunk: int = 100_000):
+    rng = np.random.default_rng(11)
+    descriptions = [d for group in MAINTENANCE_DESCRIPTIONS.values() for d in group]
+    async with Session() as db:
+        await db.execute(insert(models.Equipment), [
+            {"id": i + 1, "name": f"{EQUIPMENT_TYPES[i % 5][1]} #{i + 1}", "type": EQUIPMENT_TYPES[i % 5][0],
+             "location": f"{EQUIPMENT_TYPES[i % 5][3]} {chr(65 + i % 6)}", "status": "operational"}
+            for i in range(equipment)
+        ])
+        await db.commit()
+
+    start = time.perf_counter()
+    for offset in range(0, logs, chunk):
+        n = min(chunk, logs - offset)
+        template = rng.integers(0, len(descriptions), n)
+        note = rng.integers(0, len(NOTES), n)
+        rare = rng.random(n) < 1e-4
+        parts = rng.integers(0, len(PARTS), (n, 2))
+        rows = [
+            {"equipment_id": equipment_id + 1, "maintenance_type": "corrective",
+             "description": f"{descriptions[t]}; {RARE_NOTE if r else NOTES[k]}",
+             "parts_replaced": f"{PARTS[p[0]]}, {PARTS[p[1]]}", "status": "completed", "cost": 100.0}
+            for equipment_id, t, k, r, p in zip(rng.integers(0, equipment, n).tolist(), template.tolist(),
+                                                 note.tolist(), rare.tolist(), parts.tolist())
+        ]
+        async with Session() as db:
+            await db.execute(insert(models.MaintenanceLog), rows)
+            await db.commit()
+    elapsed = time.perf_counter() - start
+    return {"rows": logs, "seconds": round(elapsed, 1), "rows_per_second": round(logs / elapsed)}
+
+
+async def like_scan(db, term: str, skip: int):
+    pattern = f"%{term}%"
+    result = await db.scalars(
+        select(models.MaintenanceLog.id)
+        .where(or_(models.MaintenanceLog.description.ilike(pattern),
+                   models.MaintenanceLog.parts_replaced.ilike(pattern)))
+        .order_by(models.MaintenanceLog.id.desc()).offset(skip).limit(20)
+    )
+    return result.all()
+
+
+async def time_query(Session, iterations: int, run):
+    samples, hits = [], 0
+    async with Session() as db:
+        for _ in range(iterations):
+            start = time.perf_counter()
+            hits = len(await run(db))
+            samples.append(time.perf_counter() - start)
+    return latency_summary(samples), hits
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="sqlite+aiosqlite:///./bench_search.db")
+    parser.add_argument("--logs", type=int, default=1_000_000)
+    parser.add_argument("--equipment", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--skip-like", action="store_true", help="do not time the LIKE baseline")
+    parser.add_argument("--skip-generate", action="store_true", help="reuse the existing database")
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+
+    engine = create_engine_for_url(args.url)
+    Session = async_sessionmaker(bind=engine, expire_on_commit=False, autoflush=False)
+    results = {}
+    if not args.skip_generate:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+        results["load"] = await load(Session, args.logs, args.equipment)
+        print(f"Loaded {args.logs} logs with the index in {results['load']['seconds']}s "
+              f"({results['load']['rows_per_second']} rows/s)")
+
+    rows = []
+    for name, term, skip in QUERIES:
+        latency, hits = await time_query(Session, args.iterations,
+                                         lambda db: search(db, term, types=["maintenance_log"], skip=skip))
+        rows.append({"query": name, "method": "full-text", "results": hits, **latency})
+        if not args.skip_like:
+            latency, hits = await time_query(Session, max(1, args.iterations // 5),
+                                             lambda db: like_scan(db, term, skip))
+            rows.append({"query": name, "method": "LIKE scan", "results": hits, **latency})
+    await engine.dispose()
+
+    print_table(rows, ["query", "method", "results", "p50_ms", "p95_ms", "mean_ms"])
+    results["queries"] = rows
+    if args.output:
+        write_results(args.output, "search", results)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+sensor_data with sensor type, unit and status stored as strings on every
+row (the layout before migration 0007) against small-integer codes into
+sensor_types and sensor_statuses: table and index size, a full-table
+aggregate and the health pipeline's windowed read.
+
+Both databases hold the same readings, loaded in time order as live ingest
+writes them.
+
+    python benchmarks/sensor_codes.py --readings 50000000
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+from common import print_table, write_results
+
+import sqlalchemy as sa
+
+from app import models
+from app.database import create_engine_for_url
+from app.dimensions import sensor_dimensions
+from app.synthetic import SENSOR_BASELINE, SENSOR_NOISE, SENSOR_TYPES, SENSOR_UNITS
+
+STATUSES = ("normal", "warning", "critical")
+STATUS_SHARE = (0.9, 0.08, 0.02)
+
+# sensor_data as created by migration 0001
+legacy = sa.MetaData()
+sa.Table(
+    "sensor_data", legacy,
+    sa.Column("id", sa.Integer, primary_key=True, index=True),
+    sa.Column("equipment_id", sa.Integer),
+    sa.Column("sensor_type", sa.String),
+    sa.Column("value", sa.Float),
+    sa.Column("unit", sa.String),
+    sa.Column("status", sa.String),
+    sa.Column("timestamp", sa.DateTime(timezone=True)),
+    sa.Index("ix_sensor_data_equipment_timestamp", "equipment_id", "timestamp"),
+)
+
+
+def chunks(readings: int, equipment: int, chunk: int, seed: int = 5):
+    """(equipment_id, sensor index, value, status index, timestamp text) columns, one reading per machine and sensor per minute"""
+    rng = np.random.default_rng(seed)
+    per_minute = equipment * len(SENSOR_TYPES)
+    start = np.datetime64("2026-01-01T00:00:00")
+    for offset in range(0, readings, chunk):
+        index = np.arange(offset, min(offset + chunk, readings))
+        sensor = index % len(SENSOR_TYPES)
+        minutes = index // per_minute
+        timestamps = np.char.replace(np.datetime_as_string(start + minutes.astype("timedelta64[m]"), unit="s"), "T", " ")
+        values = np.round(SENSOR_BASELINE[sensor] + rng.normal(0, 1, len(index)) * SENSOR_NOISE[sensor], 2)
+        yield (index // len(SENSOR_TYPES) % equipment + 1, sensor, values,
+               rng.choice(len(STATUSES), len(index), p=STATUS_SHARE), timestamps.astype(object))
+
+
+async def load(url: str, layout: str, args) -> dict:
+    engine = create_engine_for_url(url)
+    started = time.perf_counter()
+    async with engine.begin() as conn:
+        await conn.exec_driver_sql("PRAGMA journal_mode=OFF")
+        if layout == "strings":
+            await conn.run_sync(legacy.create_all)
+        else:
+            await conn.run_sync(models.Base.metadata.create_all, tables=[
+                models.SensorType.__table__, models.SensorStatus.__table__, models.SensorData.__table__])
+            type_codes = np.array([await conn.run_sync(sensor_dimensions.sensor_type_code, name, unit)
+                                   for name, unit in zip(SENSOR_TYPES, SENSOR_UNITS)])
+            status_codes = np.array([await conn.run_sync(sensor_dimensions.status_code, status)
+                                     for status in STATUSES])
+    names, units, statuses = (np.array(values, dtype=object) for values in (SENSOR_TYPES, SENSOR_UNITS, STATUSES))
+    for equipment_id, sensor, values, status, timestamps in chunks(args.readings, args.equipment, args.chunk):
+        if layout == "strings":
+            sql = ("INSERT INTO sensor_data (equipment_id, sensor_type, value, unit, status, timestamp) "
+                   "VALUES (?, ?, ?, ?, ?, ?)")
+            rows = zip(equipment_id.tolist(), names[sensor].tolist(), values.tolist(), units[sensor].tolist(),
+                       statuses[status].tolist(), timestamps.tolist())
+        else:
+            sql = "INSERT INTO sensor_data (equipment_id, sensor_type_id, value, status_id, timestamp) VALUES (?, ?, ?, ?, ?)"
+            rows = zip(equipment_id.tolist(), type_codes[sensor].tolist(), values.tolist(),
+                       status_codes[status].tolist(), timestamps.tolist())
+        async with engine.begin() as conn:
+            await conn.exec_driver_sql(sql, list(rows))
+    load_seconds = time.perf_counter() - started
+
+    async with engine.connect() as conn:
+        sizes = dict((await conn.execute(sa.text(
+            "SELECT name, SUM(pgsize) FROM dbstat WHERE name LIKE '%sensor_data%' GROUP BY name"))).all())
+    table_bytes = sizes.pop("sensor_data")
+    index_bytes = sum(sizes.values())
+
+    if layout == "strings":
+        aggregate = ("SELECT sensor_type, unit, status, COUNT(*), AVG(value) FROM sensor_data "
+                     "GROUP BY sensor_type, unit, status")
+        window = ("SELECT equipment_id, sensor_type, value, timestamp FROM sensor_data "
+                  "WHERE equipment_id <= :machines AND timestamp >= :since AND sensor_type IN ('temperature', 'vibration')")
+    else:
+        # Grouped on the codes; the handful of result rows are decoded from memory
+        aggregate = ("SELECT sensor_type_id, status_id, COUNT(*), AVG(value) FROM sensor_data "
+                     "GROUP BY sensor_type_id, status_id")
+        window = ("SELECT equipment_id, sensor_type_id, value, timestamp FROM sensor_data "
+                  "WHERE equipment_id <= :machines AND timestamp >= :since AND sensor_type_id IN "
+                  "(SELECT id FROM sensor_types WHERE name IN ('temperature', 'vibration'))")
+    minutes = args.readings // (args.equipment * len(SENSOR_TYPES))
+    since = str(np.datetime64("2026-01-01T00:00:00") + np.timedelta64(max(minutes - args.window_minutes, 0), "m")
+                ).replace("T", " ")
+    timings = {}
+    async with engine.connect() as conn:
+        for name, sql, params in (("aggregate", aggregate, {}),
+                                  ("window", window, {"machines": args.machines, "since": since})):
+            samples = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                rows = (await conn.execute(sa.text(sql), params)).all()
+                if layout == "codes" and name == "aggregate":
+                    rows = [(*(await conn.run_sync(sensor_dimensions.sensor_type, row[0])),
+                             await conn.run_sync(sensor_dimensions.status, row[1]), *row[2:]) for row in rows]
+                samples.append(time.perf_counter() - start)
+            timings[name] = (min(samples), len(rows))
+    await engine.dispose()
+    return {
+        "layout": layout, "readings": args.readings, "load_s": round(load_seconds, 1),
+        "table_mb": round(table_bytes / 2**20, 1), "index_mb": round(index_bytes / 2**20, 1),
+        "bytes_per_row": round(table_bytes / args.readings, 1),
+        "aggregate_s": round(timings["aggregate"][0], 2),
+        "window_ms": round(timings["window"][0] * 1000, 1), "window_rows": timings["window"][1],
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readings", type=int, default=5_000_000)
+    parser.add_argument("--equipment", type=int, default=1000)
+    parser.add_argument("--machines", type=int, default=100, help="machines read by the windowed query")
+    parser.add_argument("--window-minutes", type=int, default=24 * 60)
+    parser.add_argument("--chunk", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workdir", help="directory for the two databases (default: a temporary one)")
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="sensor_codes_")
+    results = []
+    try:
+        for layout in ("strings", "codes"):
+            path = os.path.join(workdir, f"{layout}.db")
+            if os.path.exists(path):
+                os.remove(path)
+            results.append(await load(f"sqlite+aiosqlite:///{path}", layout, args))
+            print_table(results[-1:], list(results[-1]))
+            os.remove(path)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print_table(results, list(results[0]))
+    if args.output:
+        write_results(args.output, "sensor_codes", {"layouts": results})
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Request latency and CPU cost with Sentry tracing off, at 100% and with the adaptive sampler.
+
+Each mode runs in a fresh subprocess (sentry_sdk.init cannot be undone) against
+a temporary SQLite database, through an in-process ASGI transport. Envelopes are
+dropped by a null transport, so the numbers are pure client-side overhead.
+
+    python benchmarks/sentry_overhead.py --requests 2000
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import latency_summary, print_table, write_results
+
+MODES = ("off", "full", "adaptive")
+
+
+async def run_mode(mode: str, requests: int) -> dict:
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/sentry_bench.db"
+    os.environ["DEBUG"] = "false"
+
+    import httpx
+    import sentry_sdk
+    from sentry_sdk.transport import Transport
+
+    from main import app
+    from app import crud, monitoring
+    from app.database import engine, SessionLocal
+    from app.models import Base
+
+    class NullTransport(Transport):
+        def capture_envelope(self, envelope):
+            pass
+
+    dsn = "https://public@sentry.invalid/1"
+    if mode == "full":
+        # The previous hard-coded configuration
+        sentry_sdk.init(dsn=dsn, transport=NullTransport, traces_sample_rate=1.0, profiles_sample_rate=1.0)
+    elif mode == "adaptive":
+        monitoring.init_sentry(dsn=dsn, environment="benchmark", transport=NullTransport)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with SessionLocal() as db:
+        await crud.init_sample_data(db)
+
+    samples = {"POST /equipment/{id}/sensors": [], "GET /dashboard/summary": []}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        response = await client.post("/token", data={"username": "admin@producflow.com", "password": "admin123"})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        reading = {"sensor_type": "temperature", "value": 72.5, "unit": "°C"}
+
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        for i in range(requests):
+            start = time.perf_counter()
+            if i % 5:
+                await client.post(f"/equipment/{i % 5 + 1}/sensors", json=reading, headers=headers)
+                samples["POST /equipment/{id}/sensors"].append(time.perf_counter() - start)
+            else:
+                await client.get("/dashboard/summary", headers=headers)
+                samples["GET /dashboard/summary"].append(time.perf_counter() - start)
+        cpu, wall = time.process_time() - cpu_start, time.perf_counter() - wall_start
+
+    return {
+        "mode": mode,
+        "requests_per_second": round(requests / wall, 1),
+        "cpu_ms_per_request": round(cpu / requests * 1000, 3),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "endpoints": {name: latency_summary(values) for name, values in samples.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(asyncio.run(run_mode(args.mode, args.requests))))
+        return
+
+    results = []
+    for mode in MODES:
+        output = subprocess.check_output(
+            [sys.executable, os.path.abspath(__file__), "--mode", mode, "--requests", str(args.requests)],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        )
+        results.append(json.loads(output.decode().strip().splitlines()[-1]))
+
+    rows = [{
+        "mode": r["mode"],
+        "req/s": r["requests_per_second"],
+        "cpu_ms/req": r["cpu_ms_per_request"],
+        "ingest_p50_ms": r["endpoints"]["POST /equipment/{id}/sensors"]["p50_ms"],
+        "ingest_p99_ms": r["endpoints"]["POST /equipment/{id}/sensors"]["p99_ms"],
+        "dashboard_p50_ms": r["endpoints"]["GET /dashboard/summary"]["p50_ms"],
+        "max_rss_mb": r["max_rss_mb"],
+    } for r in results]
+    print_table(rows, list(rows[0]))
+
+    if args.output:
+        write_results(args.output, "sentry_overhead", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Archived sensor readings: bytes per reading and read speed of the columnar
+format (app/timeseries.py), against rows in SQLite and the gzip CSV files
+the archive used before.
+
+Readings are random walks at each sensor's precision (as ingested), every
+5 minutes with a few seconds of jitter, written in archive-sized files of
+--chunk readings ordered by equipment and time, as the retention job does.
+
+    python benchmarks/timeseries.py --equipment 50 --days 30
+"""
+import argparse
+import asyncio
+import csv
+import gzip
+import io
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+from common import print_table, write_results
+
+from sqlalchemy import insert, select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app import models, timeseries
+from app.database import Base, create_engine_for_url
+
+# sensor -> (unit, start, step, decimals)
+SENSORS = {
+    "temperature": ("°C", 75.0, 0.05, 1),
+    "pressure": ("PSI", 55.0, 0.05, 1),
+    "vibration": ("mm/s", 1.0, 0.01, 2),
+    "speed": ("RPM", 1500.0, 2.0, 0),
+}
+COLUMNS = ("id", "equipment_id", "sensor_type", "value", "unit", "status", "timestamp")
+
+
+def generate(equipment: int, days: int):
+    rng = np.random.default_rng(17)
+    start = datetime(2026, 1, 1)
+    steps = days * 288
+    rows, next_id = [], 1
+    for equipment_id in range(1, equipment + 1):
+        for sensor_type, (unit, level, step, decimals) in SENSORS.items():
+            values = np.round(level + np.cumsum(rng.normal(0, step, steps)), decimals)
+            seconds = np.arange(steps) * 300 + rng.integers(-3, 4, steps)
+            for value, second in zip(values.tolist(), seconds.tolist()):
+                rows.append(SimpleNamespace(id=next_id, equipment_id=equipment_id, sensor_type=sensor_type,
+                                            value=value, unit=unit, status="normal",
+                                            timestamp=start + timedelta(seconds=second)))
+                next_id += 1
+    rows.sort(key=lambda r: (r.equipment_id, r.timestamp))
+    return rows
+
+
+def write_csv(path, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    for row in rows:
+        writer.writerow([row.id, row.equipment_id, row.sensor_type, row.value, row.unit, row.status,
+                         row.timestamp.isoformat()])
+    with open(path, "wb") as f:
+        f.write(gzip.compress(buffer.getvalue().encode(), compresslevel=6))
+
+
+def read_csv(path, equipment_id=None, sensor_type=None, start=None, end=None):
+    values = []
+    with gzip.open(path, "rt", newline="") as f:
+        for row in csv.DictReader(f):
+            if equipment_id is not None and (int(row["equipment_id"]) != equipment_id
+                                             or row["sensor_type"] != sensor_type):
+                continue
+            timestamp = datetime.fromisoformat(row["timestamp"])
+            if start is not None and not start <= timestamp < end:
+                continue
+            values.append(float(row["value"]))
+    return values
+
+
+def read_columnar(path, equipment_id=None, sensor_type=None, start=None, end=None):
+    low = timeseries.to_micros(start) if start else None
+    high = timeseries.to_micros(end) if end else None
+    total = 0
+    with timeseries.ArchiveReader(path) as reader:
+        for info in reader.find(equipment_id, sensor_type, low, high):
+            total += len(reader.read(info, low, high).values)
+    return total
+
+
+async def sqlite_bytes(path, rows):
+    engine = create_engine_for_url(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    Session = async_sessionmaker(bind=engine, expire_on_commit=False)
+    async with Session() as db:
+        for offset in range(0, len(rows), 100_000):
+            await db.execute(insert(models.SensorData), [
+                {column: getattr(row, column) for column in COLUMNS} for row in rows[offset:offset + 100_000]])
+        await db.commit()
+    async with engine.connect() as conn:
+        await conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+        pages = (await conn.execute(text("PRAGMA page_count"))).scalar() - \
+            (await conn.execute(text("PRAGMA freelist_count"))).scalar()
+        page_size = (await conn.execute(text("PRAGMA page_size"))).scalar()
+    return engine, pages * page_size
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--equipment", type=int, default=50)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--chunk", type=int, default=5000, help="readings per archive file")
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+
+    rows = generate(args.equipment, args.days)
+    n = len(rows)
+    workdir = tempfile.mkdtemp(prefix="bench_timeseries_")
+    chunks = [rows[i:i + args.chunk] for i in range(0, n, args.chunk)]
+    results = {"readings": n}
+
+    engine, db_bytes = await sqlite_bytes(os.path.join(workdir, "rows.db"), rows)
+    table = []
+    for name, extension, write, read in (("gzip CSV", "csv.gz", write_csv, read_csv),
+                                         ("columnar", "tsc", timeseries.write_file, read_columnar)):
+        paths = [os.path.join(workdir, f"{i}.{extension}") for i in range(len(chunks))]
+        start = time.perf_counter()
+        for path, chunk in zip(paths, chunks):
+            write(path, chunk)
+        write_seconds = time.perf_counter() - start
+        size = sum(os.path.getsize(path) for path in paths)
+        start = time.perf_counter()
+        for path in paths:
+            read(path)
+        scan_seconds = time.perf_counter() - start
+        # One machine and sensor for one day, reading every file whose range could hold it, as the API does
+        day = datetime(2026, 1, 1) + timedelta(days=args.days // 2)
+        equipment_id = args.equipment // 2 + 1
+        candidates = [path for path, chunk in zip(paths, chunks)
+                      if chunk[0].equipment_id <= equipment_id <= chunk[-1].equipment_id]
+        start = time.perf_counter()
+        for path in candidates:
+            read(path, equipment_id, "vibration", day, day + timedelta(days=1))
+        query_ms = (time.perf_counter() - start) * 1000
+        table.append({"format": name, "bytes_per_reading": round(size / n, 2), "size_mb": round(size / 2**20, 1),
+                      "write_rows_per_s": round(n / write_seconds), "scan_rows_per_s": round(n / scan_seconds),
+                      "one_day_query_ms": round(query_ms, 1)})
+
+    Session = async_sessionmaker(bind=engine, expire_on_commit=False)
+    async with Session() as db:
+        start = time.perf_counter()
+        await db.execute(select(models.SensorData.value).where(
+            models.SensorData.equipment_id == equipment_id, models.SensorData.sensor_type == "vibration",
+            models.SensorData.timestamp >= day, models.SensorData.timestamp < day + timedelta(days=1)))
+        query_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        await db.execute(select(models.SensorData.value))
+        scan_seconds = time.perf_counter() - start
+    await engine.dispose()
+    table.insert(0, {"format": "SQLite rows", "bytes_per_reading": round(db_bytes / n, 2),
+                     "size_mb": round(db_bytes / 2**20, 1), "write_rows_per_s": None,
+                     "scan_rows_per_s": round(n / scan_seconds), "one_day_query_ms": round(query_ms, 1)})
+    shutil.rmtree(workdir)
+
+    print(f"{n} readings ({args.equipment} machines x {len(SENSORS)} sensors x {args.days} days)")
+    print_table(table, list(table[0]))
+    results["formats"] = table
+    if args.output:
+        write_results(args.output, "timeseries", results)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
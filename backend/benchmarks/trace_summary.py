@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Where request time goes, aggregated from a trace file written by app/tracing.py.
+
+For every route, lists each span name with its calls and time per request and
+its share of the request duration (nested spans are counted inside their parents).
+
+    TRACING_ENABLED=true TRACING_SAMPLE_RATE=1 uvicorn main:app
+    python benchmarks/trace_summary.py traces/spans.jsonl --route "GET /dashboard/summary"
+"""
+import argparse
+import json
+from collections import defaultdict
+
+from common import print_table, write_results
+
+
+def load_traces(path: str) -> dict:
+    traces = defaultdict(list)
+    with open(path) as f:
+        for line in f:
+            for resource in json.loads(line)["resourceSpans"]:
+                for scope in resource["scopeSpans"]:
+                    for span in scope["spans"]:
+                        traces[span["traceId"]].append(span)
+    return traces
+
+
+def duration_ms(span: dict) -> float:
+    return (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e6
+
+
+def summarize(traces: dict) -> dict:
+    routes = defaultdict(lambda: {"requests": 0, "duration_ms": 0.0, "spans": defaultdict(lambda: [0, 0.0])})
+    for spans in traces.values():
+        span_ids = {span["spanId"] for span in spans}
+        roots = [span for span in spans if span.get("parentSpanId") not in span_ids]
+        if len(roots) != 1:
+            continue
+        root = roots[0]
+        route = routes[root["name"]]
+        route["requests"] += 1
+        route["duration_ms"] += duration_ms(root)
+        for span in spans:
+            if span is not root:
+                stats = route["spans"][span["name"]]
+                stats[0] += 1
+                stats[1] += duration_ms(span)
+
+    summary = {}
+    for name, route in routes.items():
+        requests = route["requests"]
+        summary[name] = {
+            "requests": requests,
+            "mean_ms": round(route["duration_ms"] / requests, 3),
+            "spans": {
+                span_name: {
+                    "calls_per_request": round(calls / requests, 2),
+                    "ms_per_request": round(total / requests, 3),
+                    "share": round(total / route["duration_ms"], 3) if route["duration_ms"] else 0.0,
+                }
+                for span_name, (calls, total) in sorted(route["spans"].items(), key=lambda item: -item[1][1])
+            },
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="trace file (one OTLP JSON export request per line)")
+    parser.add_argument("--route", help='only this root span, e.g. "GET /dashboard/summary"')
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+
+    summary = summarize(load_traces(args.path))
+    if args.route:
+        summary = {name: route for name, route in summary.items() if name == args.route}
+
+    for name, route in sorted(summary.items(), key=lambda item: -item[1]["requests"]):
+        print(f"\n{name}: {route['requests']} requests, mean {route['mean_ms']} ms")
+        rows = [{"span": span_name, **stats} for span_name, stats in route["spans"].items()]
+        if rows:
+            print_table(rows, ["span", "calls_per_request", "ms_per_request", "share"])
+
+    if args.output:
+        write_results(args.output, "trace_summary", summary)
+
+
+if __name__ == "__main__":
+    main()
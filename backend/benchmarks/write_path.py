@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Write latency and statements per call for every create/update path.
+
+Compares the current crud functions with the previous commit() + refresh()
+pattern, and single inserts with the bulk INSERT ... RETURNING path.
+
+    python benchmarks/write_path.py --iterations 500 --output write_path.json
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime
+
+from common import latency_summary, print_table, write_results
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app import crud, models, schemas
+from app.database import Base, create_engine_for_url
+
+
+def equipment_payload(i):
+    return schemas.EquipmentCreate(name=f"Machine {i}", type="Bench", location="Lab", capacity=10.0)
+
+
+def sensor_payload(i):
+    return schemas.SensorDataCreate(sensor_type="temperature", value=70.0 + i % 10, unit="°C")
+
+
+def alert_payload(i):
+    return schemas.MaintenanceAlertCreate(
+        equipment_id=1, type="predictive", priority="low", title=f"Alert {i}", description="bench"
+    )
+
+
+def record_payload(i):
+    return schemas.ProductionRecordCreate(
+        equipment_id=1, shift="morning", output_quantity=100 + i, efficiency_percentage=95.0,
+        date=datetime(2024, 1, 1)
+    )
+
+
+def log_payload(i):
+    return schemas.MaintenanceLogCreate(
+        equipment_id=1, technician_id=1, maintenance_type="preventive", description=f"Log {i}"
+    )
+
+
+async def legacy_create(db, obj):
+    db.add(obj)
+    await db.commit()
+    await db.refresh(obj)
+    return obj
+
+
+async def legacy_update_record(db, record_id, payload):
+    db_record = await crud.get_production_record_by_id(db, record_id)
+    for key, value in payload.dict(exclude_unset=True).items():
+        setattr(db_record, key, value)
+    await db.commit()
+    await db.refresh(db_record)
+    return db_record
+
+
+async def legacy_update_log_status(db, log_id, status):
+    db_log = await crud.get_maintenance_log_by_id(db, log_id)
+    db_log.status = status
+    await db.commit()
+    await db.refresh(db_log)
+    return db_log
+
+
+OPERATIONS = {
+    "create_equipment": (
+        lambda db, i: crud.create_equipment(db, equipment_payload(i)),
+        lambda db, i: legacy_create(db, models.Equipment(**equipment_payload(i).dict())),
+    ),
+    "create_sensor_data": (
+        lambda db, i: crud.create_sensor_data(db, sensor_payload(i), equipment_id=1),
+        lambda db, i: legacy_create(db, models.SensorData(**sensor_payload(i).dict(), equipment_id=1)),
+    ),
+    "create_maintenance_alert": (
+        lambda db, i: crud.create_maintenance_alert(db, alert_payload(i)),
+        lambda db, i: legacy_create(db, models.MaintenanceAlert(**alert_payload(i).dict())),
+    ),
+    "create_production_record": (
+        lambda db, i: crud.create_production_record(db, record_payload(i)),
+        lambda db, i: legacy_create(db, models.ProductionRecord(**record_payload(i).dict())),
+    ),
+    "create_maintenance_log": (
+        lambda db, i: crud.create_maintenance_log(db, log_payload(i)),
+        lambda db, i: legacy_create(db, models.MaintenanceLog(**log_payload(i).dict())),
+    ),
+    "update_production_record": (
+        lambda db, i: crud.update_production_record(db, 1, record_payload(i)),
+        lambda db, i: legacy_update_record(db, 1, record_payload(i)),
+    ),
+    "update_maintenance_log_status": (
+        lambda db, i: crud.update_maintenance_log_status(db, 1, "in_progress" if i % 2 else "scheduled"),
+        lambda db, i: legacy_update_log_status(db, 1, "in_progress" if i % 2 else "scheduled"),
+    ),
+}
+
+
+async def measure(Session, counter, fn, iterations):
+    samples = []
+    statements_before = counter["statements"]
+    async with Session() as db:
+        for i in range(iterations):
+            start = time.perf_counter()
+            await fn(db, i)
+            samples.append(time.perf_counter() - start)
+    summary = latency_summary(samples)
+    summary["statements_per_call"] = round((counter["statements"] - statements_before) / iterations, 2)
+    return summary
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="sqlite+aiosqlite:///./bench_write_path.db")
+    parser.add_argument("--iterations", type=int, default=300)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+
+    engine = create_engine_for_url(args.url)
+    Session = async_sessionmaker(bind=engine, expire_on_commit=False, autoflush=False)
+    counter = {"statements": 0}
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        counter["statements"] += 1
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with Session() as db:
+        db.add(models.User(email="bench@example.com", full_name="Bench", hashed_password="x"))
+        await crud.create_equipment(db, equipment_payload(0))
+        await crud.create_production_record(db, record_payload(0))
+        await crud.create_maintenance_log(db, log_payload(0))
+
+    results, rows = {}, []
+    for name, (current, legacy) in OPERATIONS.items():
+        before = await measure(Session, counter, legacy, args.iterations)
+        after = await measure(Session, counter, current, args.iterations)
+        results[name] = {"before": before, "after": after}
+        rows.append({
+            "operation": name,
+            "p50_before_ms": before["p50_ms"], "p50_after_ms": after["p50_ms"],
+            "stmts_before": before["statements_per_call"], "stmts_after": after["statements_per_call"],
+        })
+
+    # Bulk ingest: per-reading cost of one INSERT ... RETURNING for a whole batch
+    single = await measure(Session, counter, OPERATIONS["create_sensor_data"][0], args.iterations)
+    batch = [sensor_payload(i) for i in range(args.batch_size)]
+    bulk = await measure(Session, counter, lambda db, i: crud.create_sensor_data_bulk(db, batch, equipment_id=1),
+                         max(1, args.iterations // 10))
+    per_reading_ms = round(bulk["p50_ms"] / args.batch_size, 4)
+    results["create_sensor_data_bulk"] = {"single": single, "bulk": bulk, "batch_size": args.batch_size}
+    rows.append({
+        "operation": f"sensor_data x{args.batch_size} (per reading)",
+        "p50_before_ms": single["p50_ms"], "p50_after_ms": per_reading_ms,
+        "stmts_before": single["statements_per_call"],
+        "stmts_after": round(bulk["statements_per_call"] / args.batch_size, 3),
+    })
+
+    print_table(rows, ["operation", "p50_before_ms", "p50_after_ms", "stmts_before", "stmts_after"])
+    await engine.dispose()
+
+    if args.output:
+        write_results(args.output, "write_path", results)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,4 +1,13 @@
 # Gunicorn configuration file for production
+import os
+import shutil
+
+# Prometheus multiprocess mode: each worker writes its metrics to files in this
+# directory and /metrics aggregates them. It has to be set before the app (and
+# prometheus_client) is imported, and is emptied on master start.
+prometheus_multiproc_dir = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/producflow-prometheus")
+shutil.rmtree(prometheus_multiproc_dir, ignore_errors=True)
+os.makedirs(prometheus_multiproc_dir, exist_ok=True)
 
 # Server socket
 bind = "0.0.0.0:8000"
@@ -38,4 +47,9 @@ preload_app = True
 graceful_timeout = 30
 
 # Temporary directory
-tmp_upload_dir = None
\ No newline at end of file
+tmp_upload_dir = None
+
+def child_exit(server, worker):
+    """Drop live gauges (in-progress requests, active users) of exited workers"""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -1,9 +1,14 @@
 #!/usr/bin/env python3
 """
 Initialize the database with tables and sample data (async)
+
+    python init_db.py                         # demo data
+    python init_db.py --synthetic --equipment 1000 --readings 100000000 --seed 7
 """
 
+import argparse
 import asyncio
+import time
 from app.database import engine, SessionLocal
 from app.models import Base
 from app.crud import init_sample_data
@@ -18,10 +23,51 @@ async def init_database():
         await init_sample_data(db)
 
     print("Database initialized successfully!\n")
+    print_credentials()
+
+async def init_synthetic_database(args):
+    from app.synthetic import SyntheticConfig, generate
+
+    config = SyntheticConfig(
+        equipment=args.equipment,
+        readings=args.readings,
+        sensor_days=args.sensor_days,
+        production_days=args.production_days,
+        technicians=args.technicians,
+        seed=args.seed,
+        chunk_size=args.chunk_size,
+        writers=args.writers,
+    )
+    print(f"Generating synthetic data (seed {config.seed})...")
+    await generate(engine, config, reset=args.reset,
+                   log=lambda message: print(f"[{time.strftime('%H:%M:%S')}] {message}", flush=True))
+    await engine.dispose()
+    print("Database initialized successfully!\n")
+    print_credentials()
+
+def print_credentials():
     print("Demo credentials:")
     print("Admin:    admin@producflow.com / admin123")
     print("Manager:  manager@producflow.com / manager123")
     print("Technician: tech@producflow.com / tech123")
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Initialize the ProducFlow database")
+    parser.add_argument("--synthetic", action="store_true", help="generate a synthetic fleet instead of demo data")
+    parser.add_argument("--equipment", type=int, default=1000)
+    parser.add_argument("--readings", type=int, default=10_000_000, help="total sensor readings")
+    parser.add_argument("--sensor-days", type=float, default=30.0, help="time span covered by sensor readings")
+    parser.add_argument("--production-days", type=int, default=730, help="days of shift records and maintenance history")
+    parser.add_argument("--technicians", type=int, default=25)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-size", type=int, default=500_000, help="rows generated and written per batch")
+    parser.add_argument("--writers", type=int, default=4, help="concurrent COPY connections (PostgreSQL)")
+    parser.add_argument("--reset", action="store_true", help="drop all tables first")
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    asyncio.run(init_database())
\ No newline at end of file
+    args = parse_args()
+    if args.synthetic:
+        asyncio.run(init_synthetic_database(args))
+    else:
+        asyncio.run(init_database())
@@ -1,6 +1,8 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Response
+from fastapi import FastAPI, Depends, HTTPException, status, Request, Response, Query
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.background import BackgroundTask
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
 from typing import List, Optional
@@ -10,8 +12,19 @@ import os
 
 from app.database import engine
 from app import models, schemas, crud, auth, monitoring
+from app.alerts import deduplicator
+from app.autocomplete import equipment_index
+from app.collectors import collector
+from app.loop_monitor import monitor as loop_monitor
+from app.scheduler import scheduler, create_leader_lock
 from app.models import Base
 from app.monitoring import PrometheusMiddleware, init_sentry, get_metrics
+from prometheus_client import CONTENT_TYPE_LATEST
+from app.db_monitoring import QueryStatsMiddleware, instrument_engine
+from app import exports, profiling, streaming, tracing
+from app.search import SOURCES_BY_TYPE
+from app.health import pipeline as health_pipeline
+from app.retention import archiver as sensor_archiver
 
 async def create_tables():
     async with engine.begin() as conn:
@@ -35,6 +48,28 @@ app = FastAPI(
 @app.on_event("startup")
 async def on_startup():
     await create_tables()
+    if settings.metrics_collector_enabled:
+        collector.start()
+    if settings.loop_monitor_enabled:
+        loop_monitor.start()
+    if settings.alert_dedup_enabled:
+        deduplicator.start()
+    equipment_index.start()
+    if settings.scheduler_enabled:
+        if settings.health_pipeline_enabled and "health_scores" not in scheduler.jobs:
+            scheduler.add_job("health_scores", health_pipeline.run, seconds=settings.health_pipeline_interval,
+                              timeout=settings.health_pipeline_interval, jitter=10.0)
+        if settings.sensor_retention_enabled and "sensor_retention" not in scheduler.jobs:
+            scheduler.add_job("sensor_retention", sensor_archiver.run, cron=settings.sensor_retention_cron)
+        scheduler.start(create_leader_lock(settings.scheduler_lock, engine))
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await collector.stop()
+    await loop_monitor.stop()
+    await scheduler.stop()
+    await deduplicator.stop()
+    await equipment_index.stop()
 
 
 # Initialize Sentry if DSN is provided
@@ -44,9 +79,21 @@ if os.getenv("SENTRY_DSN"):
         environment=os.getenv("ENVIRONMENT", "development")
     )
 
+# On-demand request profiling (admin only)
+if settings.profiling_enabled:
+    app.add_middleware(profiling.ProfilingMiddleware)
+
 # Add Prometheus middleware
 app.add_middleware(PrometheusMiddleware)
 
+# Per-request SQL statement counts and timings
+instrument_engine(engine)
+app.add_middleware(QueryStatsMiddleware, debug_headers=settings.db_debug_headers or settings.debug)
+
+# Request tracing; must run before the routes below so endpoints and dependencies are wrapped
+if settings.tracing_enabled:
+    tracing.instrument_app(app, engine, modules=(crud, auth))
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -82,17 +129,31 @@ async def read_users_me(
     return current_user
 
 # Equipment endpoints
-@app.get("/equipment", response_model=List[schemas.Equipment])
+@app.get("/equipment", response_model=List[schemas.Equipment], responses=streaming.NDJSON_RESPONSES)
 async def read_equipment(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     status: Optional[str] = None,
     db: AsyncSession = Depends(auth.get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
+    if streaming.wants_ndjson(request):
+        return streaming.ndjson_response(
+            await crud.stream_equipment(db, skip=skip, limit=limit, status=status), schemas.Equipment)
     equipment = await crud.get_equipment(db, skip=skip, limit=limit, status=status)
     return equipment
 
+# Declared before /equipment/{equipment_id} so "autocomplete" is not taken for an id
+@app.get("/equipment/autocomplete", response_model=List[schemas.EquipmentSuggestion])
+async def autocomplete_equipment(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(auth.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    return await crud.autocomplete_equipment(db, q, limit=limit)
+
 @app.get("/equipment/{equipment_id}", response_model=schemas.Equipment)
 async def read_equipment_item(
     equipment_id: int,
@@ -113,14 +174,25 @@ async def create_equipment(
     return await crud.create_equipment(db=db, equipment=equipment)
 
 # Sensor data endpoints
-@app.get("/equipment/{equipment_id}/sensors", response_model=List[schemas.SensorData])
+@app.get("/equipment/{equipment_id}/sensors", response_model=List[schemas.SensorData],
+         responses=streaming.NDJSON_RESPONSES)
 async def read_sensor_data(
+    request: Request,
     equipment_id: int,
     limit: int = 100,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    sensor_type: Optional[str] = None,
     db: AsyncSession = Depends(auth.get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
-    sensor_data = await crud.get_sensor_data(db, equipment_id=equipment_id, limit=limit)
+    # Readings past their retention period are read back from the archive transparently
+    if streaming.wants_ndjson(request):
+        return streaming.ndjson_response(await crud.stream_sensor_data(
+            db, equipment_id=equipment_id, limit=limit, start=start, end=end, sensor_type=sensor_type
+        ), schemas.SensorData)
+    sensor_data = await crud.get_sensor_data(db, equipment_id=equipment_id, limit=limit, start=start, end=end,
+                                             sensor_type=sensor_type)
     return sensor_data
 
 @app.post("/equipment/{equipment_id}/sensors", response_model=schemas.SensorData)
@@ -132,15 +204,29 @@ async def create_sensor_data(
 ):
     return await crud.create_sensor_data(db=db, sensor_data=sensor_data, equipment_id=equipment_id)
 
+@app.post("/equipment/{equipment_id}/sensors/batch", response_model=List[schemas.SensorData])
+async def create_sensor_data_batch(
+    equipment_id: int,
+    readings: List[schemas.SensorDataCreate],
+    db: AsyncSession = Depends(auth.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    return await crud.create_sensor_data_bulk(db=db, readings=readings, equipment_id=equipment_id)
+
 # Maintenance endpoints
-@app.get("/maintenance", response_model=List[schemas.MaintenanceAlert])
+@app.get("/maintenance", response_model=List[schemas.MaintenanceAlert], responses=streaming.NDJSON_RESPONSES)
 async def read_maintenance_alerts(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     priority: Optional[str] = None,
     db: AsyncSession = Depends(auth.get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
+    if streaming.wants_ndjson(request):
+        return streaming.ndjson_response(
+            await crud.stream_maintenance_alerts(db, skip=skip, limit=limit, priority=priority),
+            schemas.MaintenanceAlert)
     alerts = await crud.get_maintenance_alerts(db, skip=skip, limit=limit, priority=priority)
     return alerts
 
@@ -152,6 +238,24 @@ async def create_maintenance_alert(
 ):
     return await crud.create_maintenance_alert(db=db, alert=alert)
 
+@app.post("/maintenance/acknowledge")
+async def acknowledge_maintenance_alerts(
+    update: schemas.MaintenanceAlertBulkUpdate,
+    db: AsyncSession = Depends(auth.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    updated = await crud.acknowledge_maintenance_alerts(db, alert_ids=update.alert_ids)
+    return {"message": "Alerts acknowledged", "updated": updated}
+
+@app.post("/maintenance/resolve")
+async def resolve_maintenance_alerts(
+    update: schemas.MaintenanceAlertBulkUpdate,
+    db: AsyncSession = Depends(auth.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    updated = await crud.resolve_maintenance_alerts(db, alert_ids=update.alert_ids)
+    return {"message": "Alerts resolved", "updated": updated}
+
 # Production metrics endpoints
 @app.get("/production/metrics", response_model=schemas.ProductionMetrics)
 async def read_production_metrics(
@@ -160,6 +264,28 @@ async def read_production_metrics(
 ):
     return await crud.get_production_metrics(db)
 
+# Reliability analytics (MTBF/MTTR) from running statistics
+@app.get("/analytics/reliability", response_model=schemas.FleetReliability)
+async def read_fleet_reliability(
+    group_by: str = Query("equipment", pattern="^(equipment|type)$"),
+    sort_by: str = Query("mtbf", pattern="^(mtbf|mttr|failures|availability)$"),
+    limit: int = Query(20, ge=1, le=500),
+    db: AsyncSession = Depends(auth.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    return await crud.get_fleet_reliability(db, group_by=group_by, sort_by=sort_by, limit=limit)
+
+# Maintenance cost analytics (year over year) from monthly rollups
+@app.get("/analytics/costs", response_model=schemas.CostAnalytics)
+async def read_cost_analytics(
+    year: Optional[int] = Query(None, ge=1970, le=9999),
+    group_by: str = Query("type", pattern="^(equipment|type|location|maintenance_type)$"),
+    limit: int = Query(20, ge=1, le=500),
+    db: AsyncSession = Depends(auth.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    return await crud.get_cost_analytics(db, year=year, group_by=group_by, limit=limit)
+
 # Dashboard summary endpoint
 @app.get("/dashboard/summary", response_model=schemas.DashboardSummary)
 async def read_dashboard_summary(
@@ -168,6 +294,21 @@ async def read_dashboard_summary(
 ):
     return await crud.get_dashboard_summary(db)
 
+# Full-text search across maintenance logs, alerts and equipment
+@app.get("/search", response_model=List[schemas.SearchResult])
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    types: Optional[List[str]] = Query(None),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(auth.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    unknown = set(types or ()) - SOURCES_BY_TYPE.keys()
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown search types: {', '.join(sorted(unknown))}")
+    return await crud.search(db, q, types=types, skip=skip, limit=limit)
+
 # Healthcheck endpoint for uptime monitoring and container health
 @app.get("/health")
 async def health():
@@ -178,12 +319,14 @@ async def health():
 async def metrics():
     return Response(
         content=get_metrics(),
-        media_type="text/plain"
+        media_type=CONTENT_TYPE_LATEST
     )
 
 # Production records endpoints
-@app.get("/production/records", response_model=List[schemas.ProductionRecord])
+@app.get("/production/records", response_model=List[schemas.ProductionRecord],
+         responses=streaming.NDJSON_RESPONSES)
 async def read_production_records(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     equipment_id: Optional[int] = None,
@@ -191,6 +334,9 @@ async def read_production_records(
     db: AsyncSession = Depends(auth.get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
+    if streaming.wants_ndjson(request):
+        return streaming.ndjson_response(await crud.stream_production_records(
+            db, skip=skip, limit=limit, equipment_id=equipment_id, shift=shift), schemas.ProductionRecord)
     records = await crud.get_production_records(db, skip=skip, limit=limit, equipment_id=equipment_id, shift=shift)
     return records
 
@@ -237,8 +383,9 @@ async def read_shift_summary(
     return summaries
 
 # Maintenance logs endpoints
-@app.get("/maintenance/logs", response_model=List[schemas.MaintenanceLog])
+@app.get("/maintenance/logs", response_model=List[schemas.MaintenanceLog], responses=streaming.NDJSON_RESPONSES)
 async def read_maintenance_logs(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     equipment_id: Optional[int] = None,
@@ -246,6 +393,9 @@ async def read_maintenance_logs(
     db: AsyncSession = Depends(auth.get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
+    if streaming.wants_ndjson(request):
+        return streaming.ndjson_response(await crud.stream_maintenance_logs(
+            db, skip=skip, limit=limit, equipment_id=equipment_id, status=status), schemas.MaintenanceLog)
     logs = await crud.get_maintenance_logs(db, skip=skip, limit=limit, equipment_id=equipment_id, status=status)
     return logs
 
@@ -281,5 +431,88 @@ async def update_maintenance_log_status(
         raise HTTPException(status_code=404, detail="Maintenance log not found")
     return {"message": "Status updated successfully", "status": status}
 
+# Streaming exports (CSV, NDJSON or Parquet) for offline analysis
+async def export_response(prepare) -> StreamingResponse:
+    try:
+        export = await prepare
+    except exports.ExportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except exports.ExportsBusy:
+        raise HTTPException(status_code=429, detail="Too many exports in progress", headers={"Retry-After": "30"})
+    # body() releases the export's slot; the background task covers a body that is never started
+    return StreamingResponse(export.body(), media_type=export.media_type, headers=export.headers,
+                             background=BackgroundTask(export.release))
+
+@app.get("/export/sensor-data")
+async def export_sensor_data(
+    format: str = Query("csv", pattern="^(csv|ndjson|parquet)$"),
+    equipment_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    sensor_type: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    gzip: bool = False,
+    db: AsyncSession = Depends(auth.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    # The session stays open until the response is sent, so the body streams from it
+    return await export_response(crud.export_sensor_data(
+        db, format=format, equipment_id=equipment_id, start=start, end=end, sensor_type=sensor_type,
+        cursor=cursor, limit=limit, gzip=gzip))
+
+@app.get("/export/production-records")
+async def export_production_records(
+    format: str = Query("csv", pattern="^(csv|ndjson|parquet)$"),
+    equipment_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    gzip: bool = False,
+    db: AsyncSession = Depends(auth.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    return await export_response(crud.export_production_records(
+        db, format=format, equipment_id=equipment_id, start=start, end=end, cursor=cursor, limit=limit,
+        gzip=gzip))
+
+# Profiling endpoints (admin only)
+@app.post("/admin/profiling/arm", response_model=schemas.ProfilingArm)
+async def arm_profiling(
+    request: schemas.ProfilingArmRequest,
+    current_user: models.User = Depends(auth.get_current_admin)
+):
+    if not settings.profiling_enabled:
+        raise HTTPException(status_code=409, detail="Profiling is disabled")
+    armed = profiling.arm(request.route, request.count, request.duration_seconds, request.method)
+    return {**armed, "expires_at": datetime.fromtimestamp(armed["expires_at"])}
+
+@app.delete("/admin/profiling/arm")
+async def disarm_profiling(
+    current_user: models.User = Depends(auth.get_current_admin)
+):
+    profiling.disarm()
+    return {"message": "Profiling disarmed"}
+
+@app.get("/admin/profiles", response_model=List[schemas.ProfileInfo])
+async def read_profiles(
+    current_user: models.User = Depends(auth.get_current_admin)
+):
+    return [
+        {**profile, "created_at": datetime.fromtimestamp(profile["created_at"])}
+        for profile in profiling.list_profiles()
+    ]
+
+@app.get("/admin/profiles/{profile_id}")
+async def read_profile(
+    profile_id: str,
+    current_user: models.User = Depends(auth.get_current_admin)
+):
+    path = profiling.profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/json", filename=f"{profile_id}.speedscope.json")
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,142 @@
+"""initial schema
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-18 23:59:20.762095
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('equipment',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=True),
+    sa.Column('type', sa.String(), nullable=True),
+    sa.Column('status', sa.String(), nullable=True),
+    sa.Column('location', sa.String(), nullable=True),
+    sa.Column('capacity', sa.Float(), nullable=True),
+    sa.Column('installation_date', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('last_maintenance', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('health_score', sa.Float(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_equipment_id'), 'equipment', ['id'], unique=False)
+    op.create_index(op.f('ix_equipment_name'), 'equipment', ['name'], unique=False)
+
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(), nullable=True),
+    sa.Column('hashed_password', sa.String(), nullable=True),
+    sa.Column('full_name', sa.String(), nullable=True),
+    sa.Column('role', sa.String(), nullable=True),
+    sa.Column('department', sa.String(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=True)
+    op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+
+    op.create_table('maintenance_alerts',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('equipment_id', sa.Integer(), nullable=True),
+    sa.Column('type', sa.String(), nullable=True),
+    sa.Column('priority', sa.String(), nullable=True),
+    sa.Column('title', sa.String(), nullable=True),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('predicted_date', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('confidence', sa.Float(), nullable=True),
+    sa.Column('status', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('resolved_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['equipment_id'], ['equipment.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_maintenance_alerts_id'), 'maintenance_alerts', ['id'], unique=False)
+    op.create_index('ix_maintenance_alerts_status_priority', 'maintenance_alerts', ['status', 'priority'], unique=False)
+
+    op.create_table('maintenance_logs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('equipment_id', sa.Integer(), nullable=True),
+    sa.Column('maintenance_type', sa.String(), nullable=True),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('technician_id', sa.Integer(), nullable=True),
+    sa.Column('cost', sa.Float(), nullable=True),
+    sa.Column('duration_hours', sa.Float(), nullable=True),
+    sa.Column('parts_replaced', sa.Text(), nullable=True),
+    sa.Column('status', sa.String(), nullable=True),
+    sa.Column('scheduled_date', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('completed_date', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['equipment_id'], ['equipment.id'], ),
+    sa.ForeignKeyConstraint(['technician_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_maintenance_logs_equipment_created', 'maintenance_logs', ['equipment_id', 'created_at'], unique=False)
+    op.create_index(op.f('ix_maintenance_logs_id'), 'maintenance_logs', ['id'], unique=False)
+
+    op.create_table('production_records',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('equipment_id', sa.Integer(), nullable=True),
+    sa.Column('shift', sa.String(), nullable=True),
+    sa.Column('output_quantity', sa.Integer(), nullable=True),
+    sa.Column('defect_quantity', sa.Integer(), nullable=True),
+    sa.Column('downtime_minutes', sa.Integer(), nullable=True),
+    sa.Column('efficiency_percentage', sa.Float(), nullable=True),
+    sa.Column('date', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['equipment_id'], ['equipment.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_production_records_equipment_date', 'production_records', ['equipment_id', 'date'], unique=False)
+    op.create_index(op.f('ix_production_records_id'), 'production_records', ['id'], unique=False)
+
+    op.create_table('sensor_data',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('equipment_id', sa.Integer(), nullable=True),
+    sa.Column('sensor_type', sa.String(), nullable=True),
+    sa.Column('value', sa.Float(), nullable=True),
+    sa.Column('unit', sa.String(), nullable=True),
+    sa.Column('status', sa.String(), nullable=True),
+    sa.Column('timestamp', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['equipment_id'], ['equipment.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_sensor_data_equipment_timestamp', 'sensor_data', ['equipment_id', 'timestamp'], unique=False)
+    op.create_index(op.f('ix_sensor_data_id'), 'sensor_data', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_sensor_data_id'), table_name='sensor_data')
+    op.drop_index('ix_sensor_data_equipment_timestamp', table_name='sensor_data')
+    op.drop_table('sensor_data')
+    op.drop_index(op.f('ix_production_records_id'), table_name='production_records')
+    op.drop_index('ix_production_records_equipment_date', table_name='production_records')
+    op.drop_table('production_records')
+    op.drop_index(op.f('ix_maintenance_logs_id'), table_name='maintenance_logs')
+    op.drop_index('ix_maintenance_logs_equipment_created', table_name='maintenance_logs')
+    op.drop_table('maintenance_logs')
+    op.drop_index('ix_maintenance_alerts_status_priority', table_name='maintenance_alerts')
+    op.drop_index(op.f('ix_maintenance_alerts_id'), table_name='maintenance_alerts')
+    op.drop_table('maintenance_alerts')
+    op.drop_index(op.f('ix_users_id'), table_name='users')
+    op.drop_index(op.f('ix_users_email'), table_name='users')
+    op.drop_table('users')
+    op.drop_index(op.f('ix_equipment_name'), table_name='equipment')
+    op.drop_index(op.f('ix_equipment_id'), table_name='equipment')
+    op.drop_table('equipment')
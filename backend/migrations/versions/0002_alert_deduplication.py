@@ -0,0 +1,34 @@
+"""alert deduplication
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 01:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('maintenance_alerts') as batch_op:
+        batch_op.add_column(sa.Column('occurrence_count', sa.Integer(), server_default='1', nullable=True))
+        batch_op.add_column(sa.Column('last_seen_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True))
+    op.create_index('ix_maintenance_alerts_dedup', 'maintenance_alerts', ['equipment_id', 'type', 'title', 'status'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_maintenance_alerts_dedup', table_name='maintenance_alerts')
+    with op.batch_alter_table('maintenance_alerts') as batch_op:
+        batch_op.drop_column('last_seen_at')
+        batch_op.drop_column('occurrence_count')
@@ -0,0 +1,50 @@
+"""full-text search
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 02:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from app.search import SearchSource, postgresql_ddl, sqlite_ddl
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The indexed columns as of this revision
+SOURCES = (
+    SearchSource("maintenance_log", "maintenance_logs", ("description", "parts_replaced"), ("A", "B"),
+                 "maintenance_type", "equipment_id"),
+    SearchSource("alert", "maintenance_alerts", ("title", "description"), ("A", "B"), "title", "equipment_id"),
+    SearchSource("equipment", "equipment", ("name", "type", "location"), ("A", "B", "C"), "name", "id"),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    for source in SOURCES:
+        # SQLite: FTS5 tables are filled from the existing rows by 'rebuild'
+        statements = sqlite_ddl(source) if dialect == "sqlite" else postgresql_ddl(source)
+        for statement in statements:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    for source in SOURCES:
+        if dialect == "sqlite":
+            for trigger in ("ai", "ad", "au"):
+                op.execute(f"DROP TRIGGER IF EXISTS {source.table}_fts_{trigger}")
+            op.execute(f"DROP TABLE IF EXISTS {source.table}_fts")
+        else:
+            op.execute(f"DROP INDEX IF EXISTS ix_{source.table}_search")
+            op.execute(f"ALTER TABLE {source.table} DROP COLUMN IF EXISTS search_vector")
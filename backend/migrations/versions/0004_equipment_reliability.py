@@ -0,0 +1,55 @@
+"""equipment reliability statistics
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 03:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('equipment_reliability',
+    sa.Column('equipment_id', sa.Integer(), nullable=False),
+    sa.Column('failures', sa.Integer(), nullable=False),
+    sa.Column('first_failure_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('last_failure_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('repairs', sa.Integer(), nullable=False),
+    sa.Column('repair_hours', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['equipment_id'], ['equipment.id'], ),
+    sa.PrimaryKeyConstraint('equipment_id')
+    )
+
+    # Backfill from the existing history (same rules as app.reliability.rebuild)
+    if op.get_bind().dialect.name == "postgresql":
+        def epoch(column):
+            return f"extract(epoch from {column})"
+    else:
+        def epoch(column):
+            return f"(julianday({column}) - 2440587.5) * 86400.0"
+    started = "coalesce(scheduled_date, created_at)"
+    hours = (f"CASE WHEN status != 'completed' THEN NULL ELSE coalesce(duration_hours, "
+             f"({epoch('completed_date')} - {epoch(started)}) / 3600.0) END")
+    op.execute(
+        "INSERT INTO equipment_reliability "
+        "(equipment_id, failures, first_failure_at, last_failure_at, repairs, repair_hours) "
+        f"SELECT equipment_id, count(*), min({started}), max({started}), count({hours}), coalesce(sum({hours}), 0.0) "
+        "FROM maintenance_logs WHERE maintenance_type IN ('corrective', 'emergency') AND equipment_id IS NOT NULL "
+        "GROUP BY equipment_id"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('equipment_reliability')
@@ -0,0 +1,61 @@
+"""maintenance cost rollups
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 04:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.costs import Rollup
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    costs = op.create_table('maintenance_cost_monthly',
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('equipment_id', sa.Integer(), nullable=False),
+    sa.Column('maintenance_type', sa.String(), nullable=False),
+    sa.Column('logs', sa.Integer(), nullable=False),
+    sa.Column('cost', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['equipment_id'], ['equipment.id'], ),
+    sa.PrimaryKeyConstraint('month', 'equipment_id', 'maintenance_type'),
+    sqlite_with_rowid=False
+    )
+    parts = op.create_table('parts_usage_monthly',
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('part', sa.String(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('replacements', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('month', 'part'),
+    sqlite_with_rowid=False
+    )
+
+    # Backfill from the existing history (parts_replaced is parsed in Python, as in app.costs.rebuild)
+    logs = sa.table('maintenance_logs',
+        sa.column('equipment_id', sa.Integer()), sa.column('maintenance_type', sa.String()),
+        sa.column('cost', sa.Float()), sa.column('parts_replaced', sa.Text()),
+        sa.column('scheduled_date', sa.DateTime(timezone=True)), sa.column('created_at', sa.DateTime(timezone=True)),
+    )
+    rollup = Rollup()
+    result = op.get_bind().execution_options(yield_per=10000).execute(sa.select(logs))
+    for row in result:
+        rollup.add(row)
+    op.bulk_insert(costs, rollup.cost_rows())
+    op.bulk_insert(parts, rollup.part_rows())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('parts_usage_monthly')
+    op.drop_table('maintenance_cost_monthly')
@@ -0,0 +1,42 @@
+"""sensor archive files
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 05:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, Sequence[str], None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('sensor_archive_files',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('path', sa.String(), nullable=False),
+    sa.Column('min_equipment_id', sa.Integer(), nullable=False),
+    sa.Column('max_equipment_id', sa.Integer(), nullable=False),
+    sa.Column('first_timestamp', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('last_timestamp', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('readings', sa.Integer(), nullable=False),
+    sa.Column('size_bytes', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('path')
+    )
+    op.create_index('ix_sensor_archive_files_last_timestamp', 'sensor_archive_files', ['last_timestamp'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_sensor_archive_files_last_timestamp', table_name='sensor_archive_files')
+    op.drop_table('sensor_archive_files')
@@ -0,0 +1,119 @@
+"""sensor dimension codes
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 07:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, Sequence[str], None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+types = sa.table('sensor_types', sa.column('id', sa.Integer()), sa.column('name', sa.String()),
+                 sa.column('unit', sa.String()))
+statuses = sa.table('sensor_statuses', sa.column('id', sa.Integer()), sa.column('name', sa.String()))
+
+
+def _sensor_data_table(name: str, coded: bool) -> sa.Table:
+    if coded:
+        columns = [sa.Column('sensor_type_id', sa.SmallInteger(), nullable=True),
+                   sa.Column('value', sa.Float(), nullable=True),
+                   sa.Column('status_id', sa.SmallInteger(), nullable=True),
+                   sa.ForeignKeyConstraint(['sensor_type_id'], ['sensor_types.id'], ),
+                   sa.ForeignKeyConstraint(['status_id'], ['sensor_statuses.id'], )]
+    else:
+        columns = [sa.Column('sensor_type', sa.String(), nullable=True),
+                   sa.Column('value', sa.Float(), nullable=True),
+                   sa.Column('unit', sa.String(), nullable=True),
+                   sa.Column('status', sa.String(), nullable=True)]
+    return op.create_table(name,
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('equipment_id', sa.Integer(), nullable=True),
+    *columns,
+    sa.Column('timestamp', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['equipment_id'], ['equipment.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def _replace_sensor_data(new: sa.Table) -> None:
+    """Swap the copy in for sensor_data; a copy rather than ALTERs leaves no dead space behind"""
+    op.drop_index(op.f('ix_sensor_data_id'), table_name='sensor_data')
+    op.drop_index('ix_sensor_data_equipment_timestamp', table_name='sensor_data')
+    op.drop_table('sensor_data')
+    op.rename_table(new.name, 'sensor_data')
+    op.create_index('ix_sensor_data_equipment_timestamp', 'sensor_data', ['equipment_id', 'timestamp'], unique=False)
+    op.create_index(op.f('ix_sensor_data_id'), 'sensor_data', ['id'], unique=False)
+    if op.get_bind().dialect.name == 'postgresql':
+        # The copied ids were inserted explicitly, so the sequence has not moved
+        op.execute("SELECT setval(pg_get_serial_sequence('sensor_data', 'id'), COALESCE(MAX(id), 0) + 1, false) "
+                   "FROM sensor_data")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('sensor_types',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=True),
+    sa.Column('unit', sa.String(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name', 'unit')
+    )
+    op.create_table('sensor_statuses',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+
+    old = sa.table('sensor_data', sa.column('id', sa.Integer()), sa.column('equipment_id', sa.Integer()),
+                   sa.column('sensor_type', sa.String()), sa.column('value', sa.Float()),
+                   sa.column('unit', sa.String()), sa.column('status', sa.String()),
+                   sa.column('timestamp', sa.DateTime(timezone=True)))
+    op.execute(types.insert().from_select(
+        ['name', 'unit'],
+        sa.select(old.c.sensor_type, old.c.unit).distinct()
+        .where(sa.or_(old.c.sensor_type.isnot(None), old.c.unit.isnot(None)))
+        .order_by(old.c.sensor_type, old.c.unit)
+    ))
+    op.execute(statuses.insert().from_select(
+        ['name'], sa.select(old.c.status).distinct().where(old.c.status.isnot(None)).order_by(old.c.status)
+    ))
+
+    new = _sensor_data_table('sensor_data_coded', coded=True)
+    op.execute(new.insert().from_select(
+        ['id', 'equipment_id', 'sensor_type_id', 'value', 'status_id', 'timestamp'],
+        sa.select(old.c.id, old.c.equipment_id, types.c.id, old.c.value, statuses.c.id, old.c.timestamp)
+        .select_from(old.outerjoin(types, sa.and_(types.c.name.is_not_distinct_from(old.c.sensor_type),
+                                                  types.c.unit.is_not_distinct_from(old.c.unit)))
+                     .outerjoin(statuses, statuses.c.name == old.c.status))
+        .order_by(old.c.id)
+    ))
+    _replace_sensor_data(new)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    coded = sa.table('sensor_data', sa.column('id', sa.Integer()), sa.column('equipment_id', sa.Integer()),
+                     sa.column('sensor_type_id', sa.SmallInteger()), sa.column('value', sa.Float()),
+                     sa.column('status_id', sa.SmallInteger()), sa.column('timestamp', sa.DateTime(timezone=True)))
+    new = _sensor_data_table('sensor_data_named', coded=False)
+    op.execute(new.insert().from_select(
+        ['id', 'equipment_id', 'sensor_type', 'value', 'unit', 'status', 'timestamp'],
+        sa.select(coded.c.id, coded.c.equipment_id, types.c.name, coded.c.value, types.c.unit, statuses.c.name,
+                  coded.c.timestamp)
+        .select_from(coded.outerjoin(types, types.c.id == coded.c.sensor_type_id)
+                     .outerjoin(statuses, statuses.c.id == coded.c.status_id))
+        .order_by(coded.c.id)
+    ))
+    _replace_sensor_data(new)
+    op.drop_table('sensor_statuses')
+    op.drop_table('sensor_types')
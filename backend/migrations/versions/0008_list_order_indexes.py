@@ -0,0 +1,29 @@
+"""list order indexes
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 08:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, Sequence[str], None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_production_records_date', 'production_records', ['date'], unique=False)
+    op.create_index('ix_maintenance_logs_created', 'maintenance_logs', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_maintenance_logs_created', table_name='maintenance_logs')
+    op.drop_index('ix_production_records_date', table_name='production_records')
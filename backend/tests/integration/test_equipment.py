@@ -127,4 +127,24 @@ async def test_filter_equipment_by_status(client, auth_headers, test_equipment):
     
     assert response.status_code == status.HTTP_200_OK
     data = response.json()
-    assert all(equipment["status"] == "maintenance" for equipment in data)
\ No newline at end of file
+    assert all(equipment["status"] == "maintenance" for equipment in data)
+
+@pytest.mark.asyncio
+async def test_create_sensor_data_batch(client, auth_headers, test_equipment):
+    """Test creating several sensor readings in one request"""
+    readings = [
+        {"sensor_type": "temperature", "value": 70.5, "unit": "°C"},
+        {"sensor_type": "pressure", "value": 55.0, "unit": "PSI"},
+    ]
+
+    response = await client.post(
+        f"/equipment/{test_equipment.id}/sensors/batch",
+        json=readings,
+        headers=auth_headers
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert [r["sensor_type"] for r in data] == ["temperature", "pressure"]
+    assert all(r["equipment_id"] == test_equipment.id for r in data)
+    assert all(r["id"] and r["timestamp"] for r in data)
@@ -0,0 +1,24 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.database import Base, create_engine_for_url
+
+@pytest.fixture
+def seed_rows():
+    """ORM objects the test database starts with; test modules override this with their own"""
+    return []
+
+@pytest_asyncio.fixture
+async def session_factory(tmp_path, seed_rows):
+    """Session factory of a fresh SQLite database holding seed_rows"""
+    engine = create_engine_for_url(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(bind=engine, expire_on_commit=False, autoflush=False)
+    if seed_rows:
+        async with factory() as db:
+            db.add_all(seed_rows)
+            await db.commit()
+    yield factory
+    await engine.dispose()
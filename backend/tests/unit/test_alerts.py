@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import OperationalError
+
+from app import models, schemas
+from app.alerts import AlertDeduplicator
+
+def bearing_alert(equipment_id=1):
+    return schemas.MaintenanceAlertCreate(
+        equipment_id=equipment_id, type="predictive", priority="high",
+        title="Bearing Replacement Required", description="Vibration levels indicate bearing wear."
+    )
+
+async def stored_alerts(session_factory):
+    async with session_factory() as db:
+        return (await db.scalars(select(models.MaintenanceAlert).order_by(models.MaintenanceAlert.id))).all()
+
+@pytest.mark.asyncio
+async def test_repeats_are_merged_into_one_alert(session_factory):
+    """Test identical alerts increment the occurrence count of a single open alert"""
+    dedup = AlertDeduplicator(session_factory, storm_threshold=100)
+    async with session_factory() as db:
+        first = await dedup.submit(db, bearing_alert())
+        for _ in range(4):
+            repeat = await dedup.submit(db, bearing_alert())
+        other = await dedup.submit(db, bearing_alert(equipment_id=2))
+
+    assert repeat.id == first.id
+    assert other.id != first.id
+    alerts = await stored_alerts(session_factory)
+    assert [a.occurrence_count for a in alerts] == [5, 1]
+
+@pytest.mark.asyncio
+async def test_concurrent_first_submissions_create_one_alert(session_factory):
+    """Test concurrent submissions of a new alert do not insert duplicates"""
+    dedup = AlertDeduplicator(session_factory, storm_threshold=100)
+
+    async def submit():
+        async with session_factory() as db:
+            return await dedup.submit(db, bearing_alert())
+
+    results = await asyncio.gather(*(submit() for _ in range(10)))
+    assert len({alert.id for alert in results}) == 1
+    assert (await stored_alerts(session_factory))[0].occurrence_count == 10
+
+@pytest.mark.asyncio
+async def test_storm_repeats_are_counted_and_flushed(session_factory):
+    """Test repeats beyond the storm threshold are batched and written on flush"""
+    dedup = AlertDeduplicator(session_factory, storm_threshold=3, storm_window=60)
+    async with session_factory() as db:
+        for _ in range(50):
+            response = await dedup.submit(db, bearing_alert())
+        statements_before_flush = (await stored_alerts(session_factory))[0].occurrence_count
+
+    assert response.occurrence_count == 50
+    assert statements_before_flush == 4
+    await dedup.flush()
+    assert (await stored_alerts(session_factory))[0].occurrence_count == 50
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_storm_counts_and_resolved_alerts_are_skipped(session_factory):
+    """Test storm counts survive a failed write and are not added to alerts resolved in the meantime"""
+    def failing_session_factory():
+        db = session_factory()
+
+        async def commit():
+            raise OperationalError("UPDATE maintenance_alerts", {}, Exception("database is locked"))
+
+        db.commit = commit
+        return db
+
+    dedup = AlertDeduplicator(failing_session_factory, storm_threshold=3, storm_window=60)
+    async with session_factory() as db:
+        for _ in range(20):
+            await dedup.submit(db, bearing_alert())
+            await dedup.submit(db, bearing_alert(equipment_id=2))
+    with pytest.raises(OperationalError):
+        await dedup.flush()
+
+    dedup.session_factory = session_factory
+    async with session_factory() as db:
+        # Resolved by another process before the counts are written
+        await db.execute(update(models.MaintenanceAlert).where(models.MaintenanceAlert.equipment_id == 2)
+                         .values(status="resolved"))
+        await db.commit()
+    await dedup.flush()
+    assert [a.occurrence_count for a in await stored_alerts(session_factory)] == [20, 4]
+
+@pytest.mark.asyncio
+async def test_resolve_sets_resolved_at_and_reopens_on_next_occurrence(session_factory):
+    """Test bulk resolve closes alerts and a later occurrence creates a new alert"""
+    dedup = AlertDeduplicator(session_factory, storm_threshold=100)
+    async with session_factory() as db:
+        first = await dedup.submit(db, bearing_alert())
+        second = await dedup.submit(db, bearing_alert(equipment_id=2))
+        assert await dedup.set_status(db, [first.id, second.id], "acknowledged") == 2
+        assert (await dedup.submit(db, bearing_alert())).id == first.id
+        assert await dedup.set_status(db, [first.id, second.id], "resolved") == 2
+        assert await dedup.set_status(db, [first.id], "resolved") == 0
+        reopened = await dedup.submit(db, bearing_alert())
+
+    assert reopened.id not in (first.id, second.id)
+    alerts = await stored_alerts(session_factory)
+    assert [a.status for a in alerts] == ["resolved", "resolved", "active"]
+    assert all(a.resolved_at is not None for a in alerts[:2])
+
+@pytest.mark.asyncio
+async def test_alert_resolved_by_another_process_is_not_reused(session_factory):
+    """Test a stale index entry falls back to creating a new alert"""
+    dedup = AlertDeduplicator(session_factory, storm_threshold=100)
+    other_worker = AlertDeduplicator(session_factory, storm_threshold=100)
+    async with session_factory() as db:
+        first = await dedup.submit(db, bearing_alert())
+        await other_worker.set_status(db, [first.id], "resolved")
+        again = await dedup.submit(db, bearing_alert())
+
+    assert again.id != first.id
+    async with session_factory() as db:
+        assert await db.scalar(select(func.count()).select_from(models.MaintenanceAlert)) == 2
@@ -0,0 +1,64 @@
+import pytest
+from sqlalchemy import delete, update
+
+from app import models
+from app.autocomplete import EquipmentIndex
+
+@pytest.fixture
+def seed_rows():
+    return [
+        models.Equipment(id=1, name="CNC Milling Machine #2", type="Milling", location="Production Floor B"),
+        models.Equipment(id=2, name="CNC Lathe #12", type="Turning", location="Production Floor A"),
+        models.Equipment(id=3, name="Robotic Arm #3", type="Assembly", location="Assembly Station 3"),
+        models.Equipment(id=4, name="Conveyor System #1", type="Transport", location="Assembly Line"),
+    ]
+
+def names(suggestions):
+    return [s.name for s in suggestions]
+
+@pytest.mark.asyncio
+async def test_prefix_matches_rank_names_before_type_and_location(session_factory):
+    """Test word prefixes match, name matches come first and several words narrow the result"""
+    index = EquipmentIndex(session_factory)
+    await index.refresh()
+
+    assert names(index.search("cnc")) == ["CNC Lathe #12", "CNC Milling Machine #2"]
+    assert names(index.search("co")) == ["Conveyor System #1"]
+    # "Assembly" is the name of no machine: type and location matches follow
+    assert names(index.search("assem")) == ["Conveyor System #1", "Robotic Arm #3"]
+    assert names(index.search("cnc floor b")) == ["CNC Milling Machine #2"]
+    assert names(index.search("Floor", limit=1)) == ["CNC Lathe #12"]
+    assert index.search("zzz") == [] and index.search(" ") == []
+
+@pytest.mark.asyncio
+async def test_refresh_picks_up_changes_from_other_workers(session_factory):
+    """Test a refresh loads only new or changed rows and rebuilds after deletes"""
+    index = EquipmentIndex(session_factory)
+    await index.refresh()
+    async with session_factory() as db:
+        db.add(models.Equipment(id=5, name="Hydraulic Press", type="Forming", location="Press Shop"))
+        await db.execute(update(models.Equipment).where(models.Equipment.id == 3).values(name="Welding Robot #3"))
+        await db.commit()
+    await index.refresh()
+    assert names(index.search("hydr")) == ["Hydraulic Press"]
+    assert names(index.search("robot")) == ["Welding Robot #3"]
+    assert index.search("arm") == []
+
+    async with session_factory() as db:
+        await db.execute(delete(models.Equipment).where(models.Equipment.id == 1))
+        await db.commit()
+    await index.refresh()
+    assert names(index.search("cnc")) == ["CNC Lathe #12"]
+    assert len(index) == 4
+
+@pytest.mark.asyncio
+async def test_created_equipment_is_searchable_immediately(session_factory):
+    """Test equipment created by this worker is indexed without a refresh"""
+    index = EquipmentIndex(session_factory)
+    await index.refresh()
+    async with session_factory() as db:
+        equipment = models.Equipment(name="Paint Booth", type="Finishing", location="Paint Shop")
+        db.add(equipment)
+        await db.commit()
+    index.add(equipment)
+    assert names(index.search("paint")) == ["Paint Booth"]
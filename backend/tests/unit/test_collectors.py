@@ -0,0 +1,61 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app import collectors, models
+from app.equipment_status import EquipmentStatusTracker
+
+@pytest.fixture
+def seed_rows():
+    return [
+        models.Equipment(id=1, name="Press #1", status="operational"),
+        models.Equipment(id=2, name="Press #2", status="operational"),
+        models.Equipment(id=3, name="Mill #1", status="maintenance"),
+        models.MaintenanceAlert(equipment_id=1, priority="high", title="Bearing wear", status="active"),
+        models.MaintenanceAlert(equipment_id=2, priority="high", title="Oil pressure", status="active"),
+        models.MaintenanceAlert(equipment_id=3, priority="low", title="Filter due", status="active"),
+        models.MaintenanceAlert(equipment_id=3, priority="critical", title="Spindle", status="resolved"),
+        models.User(id=1, email="ana@example.com"),
+        models.User(id=2, email="ben@example.com"),
+        models.User(id=3, email="cai@example.com", last_seen_at=datetime.now()),  # served by another worker
+        models.User(id=4, email="dee@example.com", last_seen_at=datetime.now() - timedelta(hours=1)),
+    ]
+
+def gauge(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels)
+
+async def until(condition, timeout: float = 2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "condition not met in time"
+        await asyncio.sleep(0.01)
+
+@pytest.mark.asyncio
+async def test_collector_sets_gauges_and_refreshes_early_when_marked_dirty(session_factory, monkeypatch):
+    """Test gauges reflect the database after start, active users include other workers' within the window,
+    and mark_dirty refreshes them well before the interval"""
+    monkeypatch.setattr(collectors, "tracker", EquipmentStatusTracker())
+    collector = collectors.MetricsCollector(session_factory, interval=60, min_interval=0, active_user_window=300)
+    collector.record_user_activity(1)
+    collector.record_user_activity(2)
+    collector.start()
+    try:
+        await until(lambda: gauge("maintenance_alerts_active", priority="high") == 2)
+        assert gauge("maintenance_alerts_active", priority="low") == 1
+        assert gauge("maintenance_alerts_active", priority="critical") == 0
+        assert gauge("equipment_status", status="operational") == 2
+        assert gauge("equipment_status", status="maintenance") == 1
+        assert gauge("equipment_status", status="warning") == 0
+        assert gauge("active_users") == 3
+        async with session_factory() as db:
+            assert (await db.get(models.User, 2)).last_seen_at is not None
+
+        async with session_factory() as db:
+            db.add(models.MaintenanceAlert(equipment_id=3, priority="high", title="Coolant leak", status="active"))
+            await db.commit()
+        collector.mark_dirty()
+        await until(lambda: gauge("maintenance_alerts_active", priority="high") == 3)
+    finally:
+        await collector.stop()
@@ -0,0 +1,73 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import select
+
+from app import costs, crud, models, schemas
+
+@pytest.fixture
+def seed_rows():
+    return [
+        models.Equipment(id=1, name="Press #1", type="Forming", location="Floor A"),
+        models.Equipment(id=2, name="Mill #1", type="Milling", location="Floor B"),
+        models.User(id=1, email="tech@example.com"),
+    ]
+
+def log(equipment_id, when, cost, kind="corrective", parts=None):
+    return schemas.MaintenanceLogCreate(
+        equipment_id=equipment_id, technician_id=1, maintenance_type=kind, description="Work",
+        cost=cost, parts_replaced=parts, scheduled_date=when
+    )
+
+async def snapshot(db):
+    cost_rows = (await db.execute(select(models.MaintenanceCostMonthly.__table__)
+                                  .order_by(*models.MaintenanceCostMonthly.__table__.primary_key))).all()
+    part_rows = (await db.execute(select(models.PartsUsageMonthly.__table__)
+                                  .order_by(*models.PartsUsageMonthly.__table__.primary_key))).all()
+    return [tuple(r) for r in cost_rows], [tuple(r) for r in part_rows]
+
+@pytest.mark.asyncio
+async def test_rollups_maintained_on_write_match_a_rebuild(session_factory):
+    """Test created logs update cost and parts rollups exactly as a recomputation from history would"""
+    async with session_factory() as db:
+        await crud.create_maintenance_log(db, log(1, datetime(2026, 3, 2), 100.0, parts="Oil filter, Seal kit"))
+        await crud.create_maintenance_log(db, log(1, datetime(2026, 3, 20), 50.5, parts="oil  FILTER;\nDrive belt"))
+        await crud.create_maintenance_log(db, log(1, datetime(2026, 4, 1), None, kind="preventive"))
+        await crud.create_maintenance_log(db, log(2, datetime(2025, 3, 9), 300.0, parts=" , "))
+        running = await snapshot(db)
+        await costs.rebuild(db)
+        await db.commit()
+        rebuilt = await snapshot(db)
+
+    assert running == rebuilt
+    assert (date(2026, 3, 1), 1, "corrective", 2, 150.5) in running[0]
+    assert (date(2026, 3, 1), "oil filter", "Oil filter", 2) in running[1]
+    assert len(running[1]) == 3
+
+@pytest.mark.asyncio
+async def test_year_over_year_analytics_and_dashboard_savings(session_factory):
+    """Test totals compare the same months of both years while the monthly series covers the whole year"""
+    async with session_factory() as db:
+        await crud.create_maintenance_log(db, log(1, datetime(2025, 2, 10), 400.0, parts="Seal kit"))
+        await crud.create_maintenance_log(db, log(2, datetime(2025, 2, 11), 200.0, kind="preventive"))
+        await crud.create_maintenance_log(db, log(1, datetime(2025, 9, 1), 1000.0))
+        await crud.create_maintenance_log(db, log(1, datetime(2026, 2, 3), 300.0, parts="Seal kit, Seal kit"))
+        await crud.create_maintenance_log(db, log(2, datetime(2026, 11, 3), 999.0))  # after "today"
+
+        today = date(2026, 6, 15)
+        result = await costs.cost_analytics(db, group_by="type", today=today)
+        by_kind = await costs.cost_analytics(db, group_by="maintenance_type", today=today)
+        last_year = await costs.cost_analytics(db, year=2025, group_by="equipment", today=today)
+        savings = await costs.year_to_date_savings(db, today=today)
+
+    assert (result["year"], result["through_month"]) == (2026, 6)
+    assert (result["total_cost"], result["previous_total_cost"], result["change_percentage"]) == (300.0, 600.0, -50.0)
+    assert result["monthly"][1] == {"month": 2, "cost": 300.0, "previous_cost": 600.0, "logs": 1}
+    assert result["monthly"][8]["previous_cost"] == 1000.0
+    assert [(b["key"], b["cost"], b["previous_cost"]) for b in result["breakdown"]] == [
+        ("Forming", 300.0, 400.0), ("Milling", 0.0, 200.0)]
+    assert [b["key"] for b in by_kind["breakdown"]] == ["corrective", "preventive"]
+    assert result["top_parts"] == [{"part": "Seal kit", "replacements": 2, "previous_replacements": 1}]
+    assert last_year["total_cost"] == 1600.0
+    assert last_year["breakdown"][0]["equipment_id"] == 1
+    assert savings == 300.0
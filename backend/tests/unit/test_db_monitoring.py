@@ -0,0 +1,25 @@
+from app.db_monitoring import fingerprint_statement
+
+def test_fingerprint_ignores_literals_and_parameters():
+    """Test statements differing only in values share a fingerprint"""
+    first, _ = fingerprint_statement("SELECT * FROM equipment WHERE id = 1 AND name = 'a'")
+    second, normalized = fingerprint_statement("SELECT *  FROM equipment WHERE id = ? AND name = :name_1")
+
+    assert first == second
+    assert normalized == "SELECT * FROM equipment WHERE id = ? AND name = ?"
+
+def test_fingerprint_collapses_in_and_values_lists():
+    """Test IN lists and multi-row VALUES do not create new fingerprints"""
+    single, _ = fingerprint_statement("INSERT INTO sensor_data (a, b) VALUES ($1, $2) RETURNING id")
+    batch, _ = fingerprint_statement("INSERT INTO sensor_data (a, b) VALUES ($1, $2), ($3, $4) RETURNING id")
+    assert single == batch
+
+    short_in, _ = fingerprint_statement("SELECT id FROM equipment WHERE id IN (?, ?)")
+    long_in, normalized = fingerprint_statement("SELECT id FROM equipment WHERE id IN (?, ?, ?, ?)")
+    assert short_in == long_in
+    assert normalized.endswith("IN (...)")
+
+def test_fingerprint_is_short_label():
+    """Test fingerprints are short enough to be used as metric labels"""
+    fingerprint, _ = fingerprint_statement("SELECT 1")
+    assert len(fingerprint) == 12
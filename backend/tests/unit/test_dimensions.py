@@ -0,0 +1,56 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import insert, select, text
+
+from app import crud, models, schemas
+
+@pytest.fixture
+def seed_rows():
+    return [models.Equipment(id=1, name="Press #1", type="Forming")]
+
+@pytest.mark.asyncio
+async def test_readings_are_stored_as_codes_and_read_as_strings(session_factory):
+    """Test every write path stores codes while readings still carry their sensor type, unit and status"""
+    async with session_factory() as db:
+        single = await crud.create_sensor_data(
+            db, schemas.SensorDataCreate(sensor_type="temperature", value=71.0, unit="°C"), equipment_id=1)
+        bulk = await crud.create_sensor_data_bulk(db, [
+            schemas.SensorDataCreate(sensor_type="temperature", value=72.0, unit="°C", status="warning"),
+            schemas.SensorDataCreate(sensor_type="humidity", value=40.0, unit="%"),
+        ], equipment_id=1)
+        await db.execute(insert(models.SensorData), [
+            {"equipment_id": 1, "sensor_type": "humidity", "value": 41.0, "unit": "%", "status": "critical",
+             "timestamp": datetime(2030, 1, 1)}
+        ])
+        await db.commit()
+
+    assert (single.sensor_type, single.unit, single.status) == ("temperature", "°C", "normal")
+    assert [(r.sensor_type, r.unit, r.status) for r in bulk] == [("temperature", "°C", "warning"),
+                                                                 ("humidity", "%", "normal")]
+    async with session_factory() as db:
+        readings = await crud.get_sensor_data(db, 1, sensor_type="humidity")
+        codes = (await db.execute(text("SELECT sensor_type_id, status_id FROM sensor_data ORDER BY id"))).all()
+        sensor_types = (await db.execute(select(models.SensorType.name, models.SensorType.unit)
+                                         .order_by(models.SensorType.id))).all()
+    assert [(r.value, r.sensor_type, r.unit, r.status) for r in readings] == [
+        (41.0, "humidity", "%", "critical"), (40.0, "humidity", "%", "normal")]
+    assert all(isinstance(code, int) for row in codes for code in row)
+    assert sensor_types == [("temperature", "°C"), ("humidity", "%")]
+
+@pytest.mark.asyncio
+async def test_codes_registered_in_a_rolled_back_transaction_are_forgotten(session_factory):
+    """Test a rollback drops codes that were never committed, so a reused id cannot decode to the wrong type"""
+    async with session_factory() as db:
+        db.add(models.SensorData(equipment_id=1, sensor_type="humidity", value=40.0, unit="%"))
+        await db.flush()
+        await db.rollback()
+    async with session_factory() as db:
+        # Takes the id the rolled back registration had
+        db.add(models.SensorType(name="noise", unit="dB"))
+        await db.commit()
+    async with session_factory() as db:
+        db.add(models.SensorData(equipment_id=1, sensor_type="humidity", value=41.0, unit="%"))
+        await db.commit()
+        reading = (await crud.get_sensor_data(db, 1))[0]
+    assert (reading.sensor_type, reading.unit) == ("humidity", "%")
@@ -0,0 +1,91 @@
+import pytest
+from sqlalchemy import select, update
+
+from app import models
+from app.equipment_status import EquipmentStatusTracker
+
+@pytest.fixture
+def seed_rows():
+    return [
+        models.Equipment(name="Press", status="operational"),
+        models.Equipment(name="Mill", status="operational"),
+        models.Equipment(name="Robot", status="maintenance"),
+    ]
+
+async def feed(tracker, session_factory, readings):
+    async with session_factory() as db:
+        status_update = await tracker.observe(db, readings)
+        await db.commit()
+    tracker.apply(status_update)
+    return status_update.transitions
+
+async def set_status(session_factory, equipment_id, status):
+    """Status change made outside the tracker, as by another worker"""
+    async with session_factory() as db:
+        await db.execute(update(models.Equipment).where(models.Equipment.id == equipment_id).values(status=status))
+        await db.commit()
+
+async def stored_status(session_factory, equipment_id):
+    async with session_factory() as db:
+        return await db.scalar(select(models.Equipment.status).where(models.Equipment.id == equipment_id))
+
+@pytest.mark.asyncio
+async def test_status_escalates_immediately_and_clears_with_hysteresis(session_factory):
+    """Test a worse reading changes the status at once and recovery needs consecutive better readings"""
+    tracker = EquipmentStatusTracker(clear_after=3)
+    assert await feed(tracker, session_factory, [(1, "temperature", "critical")]) == [(1, "operational", "critical")]
+    assert await stored_status(session_factory, 1) == "critical"
+
+    # Flapping around the limit keeps the machine critical
+    flapping = [(1, "temperature", s) for s in ("normal", "normal", "critical", "warning", "normal")]
+    assert await feed(tracker, session_factory, flapping) == []
+    assert await feed(tracker, session_factory, [(1, "temperature", "normal")]) == [(1, "critical", "warning")]
+    assert await feed(tracker, session_factory, [(1, "temperature", "normal")] * 3) == [(1, "warning", "operational")]
+    assert await stored_status(session_factory, 1) == "operational"
+
+@pytest.mark.asyncio
+async def test_worst_sensor_wins_and_maintenance_is_left_alone(session_factory):
+    """Test the status follows the worst sensor and equipment in maintenance is not touched"""
+    tracker = EquipmentStatusTracker(clear_after=1)
+    readings = [(2, "pressure", "warning"), (2, "vibration", "normal"), (3, "temperature", "critical")]
+    assert await feed(tracker, session_factory, readings) == [(2, "operational", "warning")]
+    assert await feed(tracker, session_factory, [(2, "vibration", "normal")]) == []
+    assert await stored_status(session_factory, 2) == "warning"
+    assert await stored_status(session_factory, 3) == "maintenance"
+
+    # Back in service: derived again from the next reading
+    await set_status(session_factory, 3, "operational")
+    assert await feed(tracker, session_factory, [(3, "temperature", "critical")]) == [(3, "operational", "critical")]
+
+@pytest.mark.asyncio
+async def test_rolled_back_transitions_leave_the_tracker_unchanged(session_factory):
+    """Test state computed in a transaction that rolls back is not kept in memory"""
+    tracker = EquipmentStatusTracker(clear_after=1, sync_interval=3600)
+    async with session_factory() as db:
+        assert await tracker.counts(db) == {"operational": 2, "maintenance": 1}
+        status_update = await tracker.observe(db, [(1, "temperature", "critical")])
+        assert status_update.transitions == [(1, "operational", "critical")]
+        await db.rollback()
+
+    assert await stored_status(session_factory, 1) == "operational"
+    async with session_factory() as db:
+        assert await tracker.counts(db) == {"operational": 2, "maintenance": 1}
+    assert await feed(tracker, session_factory, [(1, "temperature", "critical")]) == [(1, "operational", "critical")]
+
+@pytest.mark.asyncio
+async def test_counts_follow_transitions_without_rescanning(session_factory):
+    """Test in-memory status counts are adjusted by transitions and resynced after outside changes"""
+    tracker = EquipmentStatusTracker(sync_interval=3600)
+    async with session_factory() as db:
+        assert await tracker.counts(db) == {"operational": 2, "maintenance": 1}
+
+    await feed(tracker, session_factory, [(1, "speed", "warning")])
+    async with session_factory() as db:
+        assert await tracker.counts(db) == {"operational": 1, "warning": 1, "maintenance": 1}
+
+    # Another worker puts the machine into maintenance: the stale update is dropped, not applied
+    await set_status(session_factory, 1, "maintenance")
+    assert await feed(tracker, session_factory, [(1, "speed", "critical")]) == []
+    assert await stored_status(session_factory, 1) == "maintenance"
+    async with session_factory() as db:
+        assert await tracker.sync(db) == {"operational": 1, "maintenance": 2}
@@ -0,0 +1,90 @@
+import asyncio
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import crud, exports, models
+from app.settings import settings
+
+@pytest.fixture
+def seed_rows():
+    return [
+        models.Equipment(id=1, name="Press #1", type="Forming"),
+        models.Equipment(id=2, name="Press #2", type="Forming"),
+        *(models.SensorData(equipment_id=i % 2 + 1, sensor_type="temperature", value=float(i), unit="°C",
+                            timestamp=datetime(2026, 1, 1) + timedelta(minutes=i)) for i in range(50)),
+    ]
+
+async def download(export: exports.Export) -> bytes:
+    body = b"".join([chunk async for chunk in export.body()])
+    return gzip.decompress(body) if export.gzip else body
+
+@pytest.mark.asyncio
+async def test_export_pages_through_filtered_readings_with_cursors(session_factory):
+    """Test limited exports chain through cursors, each row exported once, in every text format"""
+    rows, cursor = [], None
+    async with session_factory() as db:
+        for page in range(3):
+            export = await crud.export_sensor_data(
+                db, format=("csv", "ndjson")[page % 2], equipment_id=2, start=datetime(2026, 1, 1, 0, 10),
+                cursor=cursor, limit=8, gzip=page == 1)
+            body = (await download(export)).decode()
+            if export.format == "csv":
+                rows.extend(csv.DictReader(io.StringIO(body)))
+            else:
+                rows.extend(json.loads(line) for line in body.splitlines())
+            cursor = export.next_cursor
+    assert cursor is None
+    assert [float(row["value"]) for row in rows] == [float(i) for i in range(11, 50, 2)]
+    assert {(row["sensor_type"], row["unit"], row["status"], str(row["equipment_id"])) for row in rows} == {
+        ("temperature", "°C", "normal", "2")}
+
+@pytest.mark.asyncio
+async def test_export_cursor_returns_the_same_rows_after_new_readings(session_factory):
+    """Test a retried cursor is not extended by rows written since, and cursors of other exports are refused"""
+    async with session_factory() as db:
+        first = await crud.export_sensor_data(db, format="ndjson", limit=30)
+        first.release()  # only its cursor is used
+        retry = await crud.export_sensor_data(db, format="ndjson", cursor=first.next_cursor)
+        before = await download(retry)
+    async with session_factory() as db:
+        db.add(models.SensorData(equipment_id=1, sensor_type="temperature", value=99.0, unit="°C"))
+        await db.commit()
+    async with session_factory() as db:
+        again = await crud.export_sensor_data(db, format="ndjson", cursor=first.next_cursor, limit=20)
+        assert await download(again) == before
+        assert again.next_cursor is not None
+        with pytest.raises(exports.ExportError):
+            await crud.export_production_records(db, cursor=first.next_cursor)
+        with pytest.raises(exports.ExportError):
+            await crud.export_sensor_data(db, cursor="not-a-cursor")
+
+@pytest.mark.asyncio
+async def test_concurrent_exports_are_capped_when_prepared(session_factory, monkeypatch):
+    """Test the slot is taken when an export is prepared, so parallel requests cannot all pass the limit"""
+    monkeypatch.setattr(settings, "export_max_concurrent", 1)
+
+    async def prepare():
+        async with session_factory() as db:
+            return await crud.export_sensor_data(db, format="ndjson")
+
+    results = await asyncio.gather(prepare(), prepare(), return_exceptions=True)
+    assert sorted(type(result).__name__ for result in results) == ["Export", "ExportsBusy"]
+    export = next(result for result in results if isinstance(result, exports.Export))
+    async with session_factory() as db:
+        with pytest.raises(exports.ExportsBusy):
+            await crud.export_sensor_data(db)
+
+    export.release()
+    export.release()
+    assert exports.Export.active == 0
+    async with session_factory() as db:
+        with pytest.raises(exports.ExportError):
+            await crud.export_sensor_data(db, cursor="not-a-cursor")
+        assert exports.Export.active == 0
+        assert len((await download(await crud.export_sensor_data(db, format="ndjson"))).splitlines()) == 50
+    assert exports.Export.active == 0
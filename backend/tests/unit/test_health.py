@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy import insert, select
+
+from app import models
+from app.health import HealthPipeline, fit_trends, score_trends
+
+def test_grouped_fit_recovers_each_line():
+    """Test one vectorized fit recovers slope and level of every group"""
+    hours = np.tile(np.arange(-10.0, 1.0), 3)
+    groups = np.repeat(np.arange(3), 11)
+    values = np.concatenate([70 + 0.5 * hours[:11], 55 - 0.2 * hours[:11], np.full(11, 1500.0)])
+    fit = fit_trends(groups, hours, values, 3)
+
+    np.testing.assert_allclose(fit["slope"], [0.5, -0.2, 0.0], atol=1e-9)
+    np.testing.assert_allclose(fit["level"], [70.0, 55.0, 1500.0])
+    np.testing.assert_allclose(fit["r2"][:2], [1.0, 1.0])
+
+def test_rising_trend_predicts_breach_and_lowers_health():
+    """Test a sensor heading for its critical limit gets a breach time and a lower score"""
+    nominal = [75.0, 55.0, 1.0, 1500.0]
+    fit = {
+        "n": np.full(8, 50.0),
+        "slope": np.array([0.5, 0, 0, 0, 0, 0, 0, 0]),
+        "level": np.array([80.0] + nominal[1:] + nominal),
+        "r2": np.full(8, 0.9),
+    }
+    scores = score_trends(fit, horizon_hours=14 * 24)
+
+    assert scores["breach_hours"][0] == pytest.approx(10.0)
+    assert scores["breach_sensor"][0] == 0
+    assert np.isinf(scores["breach_hours"][1])
+    assert scores["health"][1] == 100.0
+    assert scores["health"][0] < 50.0
+
+async def add_readings(session_factory, equipment_id, values, end, step=timedelta(minutes=15)):
+    async with session_factory() as db:
+        await db.execute(insert(models.SensorData), [
+            {"equipment_id": equipment_id, "sensor_type": "temperature", "value": value, "unit": "°C",
+             "timestamp": end - step * (len(values) - 1 - i)}
+            for i, value in enumerate(values)
+        ])
+        await db.commit()
+
+@pytest.mark.asyncio
+async def test_pipeline_scores_alerts_and_runs_incrementally(session_factory):
+    """Test the pipeline updates health, raises one predictive alert and only rescans changed equipment"""
+    async with session_factory() as db:
+        db.add_all([models.Equipment(id=i, name=f"Machine {i}", type="Bench", location="Lab") for i in (1, 2, 3)])
+        await db.commit()
+    now = datetime.now()
+    await add_readings(session_factory, 1, [70 + 0.1 * i for i in range(40)], now)
+    await add_readings(session_factory, 2, [75.0, 75.2, 74.9, 75.1] * 10, now)
+
+    pipeline = HealthPipeline(session_factory, window_hours=24, horizon_days=14, min_confidence=0.5)
+    stats = await pipeline.run()
+    assert (stats["equipment"], stats["alerts_created"]) == (2, 1)
+
+    async with session_factory() as db:
+        health = dict((await db.execute(select(models.Equipment.id, models.Equipment.health_score))).all())
+        alert = (await db.scalars(select(models.MaintenanceAlert))).one()
+    assert health[1] < health[2]
+    assert health[3] == 100.0
+    assert (alert.equipment_id, alert.type, alert.title) == (1, "predictive", "Temperature trending to critical")
+    # 0.4 °C per hour from 73.9 °C reaches 85 °C in about 28 hours
+    assert now + timedelta(hours=26) < alert.predicted_date.replace(tzinfo=None) < now + timedelta(hours=30)
+
+    assert (await pipeline.run())["equipment"] == 0
+    await add_readings(session_factory, 1, [74.5], now + timedelta(minutes=15))
+    stats = await pipeline.run()
+    assert (stats["equipment"], stats["alerts_created"], stats["alerts_updated"]) == (1, 0, 1)
@@ -0,0 +1,43 @@
+import asyncio
+import logging
+import time
+
+import pytest
+
+from app.loop_monitor import LoopMonitor
+from app.monitoring import active_requests
+
+def block_the_loop(seconds):
+    time.sleep(seconds)
+
+@pytest.mark.asyncio
+async def test_blocking_call_is_reported_with_stack_and_route(caplog):
+    """Test a synchronous call on the loop is logged with its stack and the active route"""
+    monitor = LoopMonitor(interval=0.02, threshold=0.05)
+    monitor.start()
+    await asyncio.sleep(0.05)
+
+    active_requests[asyncio.current_task()] = {"method": "POST", "path": "/token"}
+    try:
+        with caplog.at_level(logging.WARNING, logger="app.loop_monitor"):
+            block_the_loop(0.3)
+            await asyncio.sleep(0.05)
+    finally:
+        active_requests.pop(asyncio.current_task(), None)
+        await monitor.stop()
+
+    messages = [record.getMessage() for record in caplog.records]
+    assert len(messages) == 1
+    assert "POST /token" in messages[0]
+    assert "block_the_loop" in messages[0]
+
+@pytest.mark.asyncio
+async def test_idle_loop_is_not_reported(caplog):
+    """Test an idle loop does not trigger blocked-loop reports"""
+    monitor = LoopMonitor(interval=0.02, threshold=0.05)
+    monitor.start()
+    with caplog.at_level(logging.WARNING, logger="app.loop_monitor"):
+        await asyncio.sleep(0.3)
+    await monitor.stop()
+
+    assert caplog.records == []
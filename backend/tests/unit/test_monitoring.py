@@ -0,0 +1,117 @@
+import random
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from prometheus_client import REGISTRY
+
+from app import monitoring
+from app.settings import settings
+
+class FakeTime:
+    """Stands in for the time module in app.monitoring; advance() moves both clocks"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def perf_counter(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr(monitoring, "time", clock)
+    monkeypatch.setattr(monitoring, "random", random.Random(0))
+    return clock
+
+def run(sampler, clock, path: str, per_second: int, seconds: int) -> int:
+    """Sampled transactions out of `per_second` requests a second to `path` for `seconds`"""
+    sampled = 0
+    for _ in range(per_second * seconds):
+        clock.advance(1 / per_second)
+        sampled += sampler({"asgi_scope": {"method": "GET", "path": path}}) == 1.0
+    return sampled
+
+def test_sampler_ramps_down_a_hot_route_to_the_budget(clock):
+    """Test a burst of traffic on a fully sampled route is scaled down to about target_per_minute"""
+    sampler = monitoring.AdaptiveTraceSampler(
+        default_rate=0.1, route_rates={"GET /sensors/{sensor_id}": 1.0, "/health": 0.0}, target_per_minute=60)
+
+    run(sampler, clock, "/equipment/1", per_second=1, seconds=120)
+    assert sampler.scale == pytest.approx(10, rel=0.01)  # quiet: scaled up towards the budget
+
+    run(sampler, clock, "/sensors/7", per_second=100, seconds=120)
+    assert sampler.scale == pytest.approx(0.01, rel=0.05)
+    assert 40 <= run(sampler, clock, "/sensors/7", per_second=100, seconds=60) <= 80
+
+    assert run(sampler, clock, "/health", per_second=100, seconds=5) == 0
+    assert sampler({"parent_sampled": True, "asgi_scope": {"method": "GET", "path": "/health"}}) == 1.0
+
+def test_sampler_scale_stops_at_its_floor(clock):
+    """Test min_scale bounds the ramp-down, so a route's rate never drops below rate * min_scale"""
+    sampler = monitoring.AdaptiveTraceSampler(default_rate=1.0, route_rates={}, target_per_minute=6,
+                                              min_scale=0.01)
+    run(sampler, clock, "/sensors/7", per_second=100, seconds=120)
+    assert sampler.scale == 0.01
+    assert run(sampler, clock, "/sensors/7", per_second=100, seconds=60) >= 40
+
+@pytest.mark.asyncio
+async def test_errors_and_slow_requests_reach_sentry_whatever_the_trace_sampling(clock, monkeypatch):
+    """Test error events are never sampled and a slow request is reported even when its trace was dropped"""
+    options, messages = {}, []
+    monkeypatch.setattr(monitoring.sentry_sdk, "init", lambda **kwargs: options.update(kwargs))
+    monkeypatch.setattr(monitoring.sentry_sdk, "capture_message", lambda message, level: messages.append(message))
+    monkeypatch.setattr(settings, "sentry_slow_request_ms", 500)
+    monkeypatch.setattr(monitoring, "_slow_request_seconds", None)  # restored after init_sentry sets it
+    monitoring.init_sentry("https://key@sentry.example.com/1")
+    assert options["sample_rate"] == 1.0
+    assert isinstance(options["traces_sampler"], monitoring.AdaptiveTraceSampler)
+
+    async def app(scope, receive, send):
+        clock.advance(scope["seconds"])
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def send(message):
+        pass
+
+    middleware = monitoring.PrometheusMiddleware(app)
+    for seconds in (0.1, 0.8):
+        await middleware({"type": "http", "method": "GET", "path": "/reports", "seconds": seconds}, None, send)
+    assert messages == ["Slow request: GET unmatched"]
+
+@pytest.mark.asyncio
+async def test_request_metrics_are_labelled_by_route_template():
+    """Test requests are counted per route template, unmatched paths share one label and non-HTTP scopes pass"""
+    app = FastAPI()
+    app.add_middleware(monitoring.PrometheusMiddleware)
+
+    @app.get("/equipment/{equipment_id}")
+    async def read_equipment(equipment_id: int):
+        return {"id": equipment_id}
+
+    def count(endpoint: str, status_code: str) -> float:
+        labels = {"method": "GET", "endpoint": endpoint, "status_code": status_code}
+        return REGISTRY.get_sample_value("http_requests_total", labels) or 0.0
+
+    before = {key: count(*key) for key in (("/equipment/{equipment_id}", "200"), ("unmatched", "404"))}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        for path in ("/equipment/1", "/equipment/2", "/equipment/3", "/nope/1", "/nope/2"):
+            await client.get(path)
+    assert count("/equipment/{equipment_id}", "200") - before["/equipment/{equipment_id}", "200"] == 3
+    assert count("unmatched", "404") - before["unmatched", "404"] == 2
+    assert count("/equipment/1", "200") == 0
+
+    seen = []
+
+    async def inner(scope, receive, send):
+        seen.append(scope)
+
+    await monitoring.PrometheusMiddleware(inner)({"type": "lifespan"}, None, None)
+    assert seen == [{"type": "lifespan"}]
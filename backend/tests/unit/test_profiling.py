@@ -0,0 +1,100 @@
+import os
+import sys
+
+import pytest
+
+from app import auth, models, profiling
+from app.settings import settings
+
+@pytest.fixture
+def seed_rows():
+    return [
+        models.User(id=1, email="admin@example.com", role="admin"),
+        models.User(id=2, email="operator@example.com", role="operator"),
+    ]
+
+@pytest.fixture
+def profile_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "profile_dir", str(tmp_path / "profiles"))
+    return settings.profile_dir
+
+async def app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+async def request(middleware, path: str, headers=()):
+    """Response start message of a GET request sent through the middleware"""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": path, "query_string": b"", "headers": list(headers)}
+    await middleware(scope, receive, send)
+    return dict(messages[0]["headers"])
+
+@pytest.mark.asyncio
+async def test_profile_header_is_honoured_for_admins_only(session_factory, profile_dir, monkeypatch):
+    """Test X-Profile stores a profile for an admin token and is ignored for others"""
+    monkeypatch.setattr(profiling, "SessionLocal", session_factory)
+    middleware = profiling.ProfilingMiddleware(app)
+
+    def bearer(email):
+        return (b"authorization", f"Bearer {auth.create_access_token({'sub': email})}".encode())
+
+    admin = await request(middleware, "/equipment", [(b"x-profile", b"store"), bearer("admin@example.com")])
+    assert profiling.profile_path(admin[b"x-profile-id"].decode())
+
+    for headers in ([(b"x-profile", b"store"), bearer("operator@example.com")],
+                    [(b"x-profile", b"store"), (b"authorization", b"Bearer not-a-token")],
+                    [(b"x-profile", b"store")]):
+        assert b"x-profile-id" not in await request(middleware, "/equipment", headers)
+    assert len(profiling.list_profiles()) == 1
+
+@pytest.mark.asyncio
+async def test_profiler_stops_when_the_app_raises(profile_dir, monkeypatch):
+    """Test a failing request stops the sampler and restores the switch interval in store and return modes"""
+    async def is_admin(scope):
+        return True
+
+    async def failing_app(scope, receive, send):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(profiling, "_is_admin", is_admin)
+    middleware = profiling.ProfilingMiddleware(failing_app)
+    switch_interval = sys.getswitchinterval()
+    for mode in (b"store", b"return"):
+        with pytest.raises(RuntimeError):
+            await request(middleware, "/equipment", [(b"x-profile", mode)])
+        assert profiling._active_profilers == 0
+        assert sys.getswitchinterval() == switch_interval
+    # Only the stored mode keeps a profile of the failed request
+    assert len(profiling.list_profiles()) == 1
+
+def test_armed_captures_are_shared_and_their_slots_cleaned_up(profile_dir):
+    """Test workers share an armed capture's slots, and re-arming or disarming deletes the claimed ones"""
+    def slots():
+        return sorted(name for name in os.listdir(profile_dir) if ".slot" in name)
+
+    first = profiling.arm("/equipment/{equipment_id}", count=3, duration_seconds=60, method="get")
+    workers = [profiling._ArmedState(), profiling._ArmedState()]
+    scope = {"type": "http", "method": "GET", "path": "/equipment/7"}
+    assert all(worker.matches(scope) for worker in workers)
+    assert not workers[0].matches({**scope, "method": "POST"})
+    assert not workers[0].matches({**scope, "path": "/equipment/7/sensors"})
+
+    assert [worker.claim_slot() for worker in workers * 2] == [True, True, True, False]
+    assert slots() == [f"{first['id']}.slot{slot}" for slot in range(3)]
+
+    second = profiling.arm("/equipment", count=1, duration_seconds=60)
+    assert slots() == []
+    worker = profiling._ArmedState()
+    assert worker.matches({**scope, "path": "/equipment"}) and worker.claim_slot()
+    assert slots() == [f"{second['id']}.slot0"]
+
+    profiling.disarm()
+    assert slots() == []
+    assert not profiling._ArmedState().matches(scope)
@@ -0,0 +1,72 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+
+from app import crud, models, reliability, schemas
+
+@pytest.fixture
+def seed_rows():
+    return [
+        models.Equipment(id=1, name="Press #1", type="Forming"),
+        models.Equipment(id=2, name="Press #2", type="Forming"),
+        models.Equipment(id=3, name="Mill #1", type="Milling"),
+        models.User(id=1, email="tech@example.com"),
+    ]
+
+def failure(equipment_id, day, hours=None, kind="corrective"):
+    return schemas.MaintenanceLogCreate(
+        equipment_id=equipment_id, technician_id=1, maintenance_type=kind, description="Repair",
+        duration_hours=hours, scheduled_date=datetime(2026, 1, day)
+    )
+
+async def snapshot(db):
+    rows = (await db.scalars(select(models.EquipmentReliability)
+                             .order_by(models.EquipmentReliability.equipment_id))).all()
+    return [(r.equipment_id, r.failures, r.first_failure_at, r.last_failure_at, r.repairs, round(r.repair_hours, 6))
+            for r in rows]
+
+@pytest.mark.asyncio
+async def test_running_statistics_match_a_rebuild_from_history(session_factory):
+    """Test creating and updating logs keeps the statistics equal to a full recomputation"""
+    async with session_factory() as db:
+        await crud.create_maintenance_log(db, failure(1, 1, hours=2.0))
+        await crud.create_maintenance_log(db, failure(1, 11, hours=4.0, kind="emergency"))
+        open_repair = await crud.create_maintenance_log(db, failure(1, 6))
+        await crud.create_maintenance_log(db, failure(2, 3, hours=1.0))
+        await crud.create_maintenance_log(db, schemas.MaintenanceLogCreate(
+            equipment_id=3, technician_id=1, maintenance_type="preventive", description="Lubrication"))
+        await crud.update_maintenance_log_status(db, open_repair.id, "in_progress")
+        await crud.update_maintenance_log_status(db, open_repair.id, "completed", datetime(2026, 1, 6, 3))
+        early_repair = await crud.create_maintenance_log(db, failure(2, 8))
+        await crud.update_maintenance_log_status(db, early_repair.id, "completed", datetime(2026, 1, 7))
+        incremental = await snapshot(db)
+
+        await reliability.rebuild(db)
+        await db.commit()
+        assert await snapshot(db) == incremental
+
+    assert incremental == [
+        (1, 3, datetime(2026, 1, 1), datetime(2026, 1, 11), 3, 9.0),
+        (2, 2, datetime(2026, 1, 3), datetime(2026, 1, 8), 2, 1.0),
+    ]
+
+@pytest.mark.asyncio
+async def test_fleet_reliability_ranks_worst_first(session_factory):
+    """Test MTBF/MTTR per equipment and type and the worst-first rankings"""
+    async with session_factory() as db:
+        for day, hours in ((1, 2.0), (3, 4.0), (5, 6.0)):
+            await crud.create_maintenance_log(db, failure(1, day, hours=hours))
+        for day in (1, 11):
+            await crud.create_maintenance_log(db, failure(3, day, hours=1.0))
+
+        result = await crud.get_fleet_reliability(db)
+        by_type = await crud.get_fleet_reliability(db, group_by="type", sort_by="mttr")
+
+    press, mill = result["ranking"]
+    assert (press["equipment_id"], press["mtbf_hours"], press["mttr_hours"]) == (1, 48.0, 4.0)
+    assert (mill["equipment_id"], mill["mtbf_hours"], mill["mttr_hours"]) == (3, 240.0, 1.0)
+    assert press["availability"] == round(48 / 52, 4)
+    # Pooled: (96 + 240) hours over 2 + 1 intervals, 14 repair hours over 5 repairs
+    assert (result["fleet"]["mtbf_hours"], result["fleet"]["mttr_hours"]) == (112.0, 2.8)
+    assert [row["type"] for row in by_type["ranking"]] == ["Forming", "Milling"]
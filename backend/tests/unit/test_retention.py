@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select, text
+
+from app import crud, models
+from app.retention import RetentionPolicy, SensorArchiver
+from app.settings import settings
+
+NOW = datetime(2026, 6, 1)
+
+@pytest.fixture
+def seed_rows():
+    return [
+        models.Equipment(id=1, name="Press #1", type="Forming"),
+        models.Equipment(id=2, name="Mill #1", type="Milling"),
+        # One reading per equipment and sensor every day for 100 days
+        *(models.SensorData(equipment_id=equipment_id, sensor_type=sensor_type, value=float(day), unit="u",
+                            status="normal", timestamp=NOW - timedelta(days=day))
+          for equipment_id in (1, 2) for sensor_type in ("temperature", "vibration") for day in range(100)),
+    ]
+
+def test_policy_prefers_the_most_specific_override():
+    """Test equipment type and sensor type overrides resolve in order of specificity"""
+    policy = RetentionPolicy(90, {"*/vibration": 30, "Milling/*": 365, "Milling/vibration": 60})
+
+    assert policy.days("Forming", "temperature") == 90
+    assert policy.days("Forming", "vibration") == 30
+    assert policy.days("Milling", "temperature") == 365
+    assert policy.days("Milling", "vibration") == 60
+    assert policy.rules("Forming") == [(30, ["vibration"], []), (90, None, ["vibration"])]
+    with pytest.raises(ValueError):
+        RetentionPolicy(90, {"vibration": 30})
+
+@pytest.mark.asyncio
+async def test_expired_readings_are_archived_and_still_queryable(session_factory, tmp_path, monkeypatch):
+    """Test readings move to archive files in chunks per policy and queries read them back transparently"""
+    monkeypatch.setattr(settings, "sensor_archive_dir", str(tmp_path / "archive"))
+    archiver = SensorArchiver(session_factory, RetentionPolicy(80, {"*/vibration": 30}),
+                              archive_dir=settings.sensor_archive_dir, chunk_size=25, pause=0)
+    async with session_factory() as db:
+        before = await crud.get_sensor_data(db, 1, limit=1000, start=NOW - timedelta(days=50),
+                                            end=NOW - timedelta(days=20), sensor_type="vibration")
+
+    stats = await archiver.run(now=NOW)
+
+    # Days 31-99 of vibration and 81-99 of temperature, for both machines
+    assert stats["readings"] == 2 * (69 + 19)
+    async with session_factory() as db:
+        remaining = await db.scalar(select(func.count()).select_from(models.SensorData))
+        files = (await db.scalars(select(models.SensorArchiveFile))).all()
+        after = await crud.get_sensor_data(db, 1, limit=1000, start=NOW - timedelta(days=50),
+                                           end=NOW - timedelta(days=20), sensor_type="vibration")
+        newest = await crud.get_sensor_data(db, 1, limit=5)
+        oldest = await crud.get_sensor_data(db, 1, limit=3, end=NOW - timedelta(days=97))
+        assert await db.scalar(text("PRAGMA freelist_count")) == 0
+
+    assert remaining == 400 - stats["readings"]
+    assert sum(f.readings for f in files) == stats["readings"] and max(f.readings for f in files) <= 25
+    assert [(r.id, r.value, r.timestamp) for r in after] == [(r.id, r.value, r.timestamp) for r in before]
+    assert [r.value for r in newest] == [0.0, 0.0, 1.0, 1.0, 2.0]
+    assert [r.value for r in oldest] == [98.0, 98.0, 99.0]
+    assert (await archiver.run(now=NOW))["readings"] == 0
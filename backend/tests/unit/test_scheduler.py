@@ -0,0 +1,103 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.scheduler import CronTrigger, FileLeaderLock, Scheduler
+
+def test_cron_trigger_next_times():
+    """Test cron expressions resolve to the next matching minute"""
+    assert CronTrigger("*/15 * * * *").next_after(datetime(2024, 3, 1, 10, 7, 30)) == datetime(2024, 3, 1, 10, 15)
+    assert CronTrigger("30 2 * * *").next_after(datetime(2024, 3, 1, 2, 30)) == datetime(2024, 3, 2, 2, 30)
+    # 2024-03-04 is a Monday
+    assert CronTrigger("0 6 * * 1-5").next_after(datetime(2024, 3, 2, 12, 0)) == datetime(2024, 3, 4, 6, 0)
+    assert CronTrigger("0 0 1 * *").next_after(datetime(2024, 12, 15)) == datetime(2025, 1, 1)
+    # Both day fields restricted: either matches (the 13th, or any Friday)
+    assert CronTrigger("0 0 13 * 5").next_after(datetime(2024, 3, 1)) == datetime(2024, 3, 8)
+    with pytest.raises(ValueError):
+        CronTrigger("61 * * * *")
+
+@pytest.mark.asyncio
+async def test_interval_job_runs_and_skips_overlapping_runs():
+    """Test a job still running when due again is skipped instead of started twice"""
+    scheduler = Scheduler(leader_check_interval=0.01)
+    active, peak, runs = 0, 0, 0
+
+    async def slow_job():
+        nonlocal active, peak, runs
+        active += 1
+        runs += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.12)
+        active -= 1
+
+    job = scheduler.add_job("slow", slow_job, seconds=0.03)
+    scheduler.start()
+    await asyncio.sleep(0.4)
+    await scheduler.stop()
+
+    assert runs >= 2
+    assert peak == 1
+    assert job.last_outcome == "success"
+
+@pytest.mark.asyncio
+async def test_jittered_interval_job_stays_on_its_grid():
+    """Test jitter delays each run without shifting the runs after it"""
+    scheduler = Scheduler()
+
+    async def noop():
+        pass
+
+    job = scheduler.add_job("jittered", noop, seconds=60, jitter=20)
+    start = datetime(2024, 3, 1, 10, 0)
+    scheduler._plan_job(job, start)
+    for run in range(1, 51):
+        assert job.scheduled == start + timedelta(minutes=run)
+        assert job.scheduled <= job.next_due <= job.scheduled + timedelta(seconds=20)
+        scheduler._fire(job, job.next_due)
+        await job._running
+
+@pytest.mark.asyncio
+async def test_job_timeout_is_recorded():
+    """Test a job exceeding its timeout is cancelled and marked as timed out"""
+    scheduler = Scheduler(leader_check_interval=0.01)
+
+    async def hang():
+        await asyncio.sleep(10)
+
+    job = scheduler.add_job("hang", hang, seconds=0.02, timeout=0.05)
+    scheduler.start()
+    await asyncio.sleep(0.15)
+    await scheduler.stop()
+
+    assert job.last_outcome == "timeout"
+
+@pytest.mark.asyncio
+async def test_only_one_scheduler_leads_and_another_takes_over(tmp_path):
+    """Test the file lock elects a single leader and a follower takes over when it stops"""
+    path = str(tmp_path / "scheduler.lock")
+    runs = {"a": 0, "b": 0}
+
+    def make(name):
+        scheduler = Scheduler(leader_check_interval=0.02)
+
+        async def tick():
+            runs[name] += 1
+
+        scheduler.add_job("tick", tick, seconds=0.02)
+        scheduler.start(FileLeaderLock(path))
+        return scheduler
+
+    first = make("a")
+    await asyncio.sleep(0.05)
+    second = make("b")
+    await asyncio.sleep(0.2)
+
+    assert first.is_leader and not second.is_leader
+    assert runs["a"] > 0 and runs["b"] == 0
+
+    await first.stop()
+    await asyncio.sleep(0.15)
+    await second.stop()
+
+    assert runs["b"] > 0
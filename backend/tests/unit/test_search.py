@@ -0,0 +1,60 @@
+import pytest
+from sqlalchemy import delete, update
+
+from app import models
+from app.search import search
+
+@pytest.fixture
+def seed_rows():
+    return [
+        models.Equipment(id=1, name="CNC Milling Machine #2", type="Milling", location="Production Floor B"),
+        models.Equipment(id=2, name="Hydraulic Press", type="Forming", location="Production Floor A"),
+        models.MaintenanceLog(id=1, equipment_id=1, maintenance_type="corrective",
+                              description="Replace worn bearing in spindle assembly",
+                              parts_replaced="Spindle bearing assembly"),
+        models.MaintenanceLog(id=2, equipment_id=2, maintenance_type="preventive",
+                              description="Regular lubrication and filter replacement",
+                              parts_replaced="Oil filter, hydraulic fluid"),
+        models.MaintenanceAlert(id=1, equipment_id=1, type="predictive", priority="high",
+                                title="Bearing Replacement Required",
+                                description="Vibration levels indicate bearing wear."),
+    ]
+
+@pytest.mark.asyncio
+async def test_search_ranks_matches_across_sources(session_factory):
+    """Test a term matches logs and alerts with stemming, highlights and the best match first"""
+    async with session_factory() as db:
+        results = await search(db, "Bearings")
+
+    assert {(r["type"], r["id"]) for r in results} == {("maintenance_log", 1), ("alert", 1)}
+    assert results[0]["score"] >= results[1]["score"]
+    alert = next(r for r in results if r["type"] == "alert")
+    assert alert["title"] == "Bearing Replacement Required"
+    assert alert["equipment_id"] == 1
+    assert "<mark>" in alert["snippet"]
+
+@pytest.mark.asyncio
+async def test_search_filters_prefixes_and_paginates(session_factory):
+    """Test type filters, prefix matching on the last term and skip/limit"""
+    async with session_factory() as db:
+        assert [(r["type"], r["id"]) for r in await search(db, "hydraul", types=["equipment"])] == [("equipment", 2)]
+        assert [r["id"] for r in await search(db, "oil filt")] == [2]
+        first = await search(db, "production floor", limit=1)
+        second = await search(db, "production floor", skip=1, limit=1)
+        assert await search(db, "  --  ") == []
+
+    assert len(first) == len(second) == 1
+    assert first[0]["id"] != second[0]["id"]
+
+@pytest.mark.asyncio
+async def test_index_follows_updates_and_deletes(session_factory):
+    """Test the index is kept in sync with writes to the base tables"""
+    async with session_factory() as db:
+        await db.execute(update(models.MaintenanceLog).where(models.MaintenanceLog.id == 2)
+                         .values(description="Realign drive shaft"))
+        await db.execute(delete(models.MaintenanceAlert).where(models.MaintenanceAlert.id == 1))
+        await db.commit()
+
+        assert [r["id"] for r in await search(db, "realign")] == [2]
+        assert await search(db, "lubrication") == []
+        assert [r["type"] for r in await search(db, "bearing")] == ["maintenance_log"]
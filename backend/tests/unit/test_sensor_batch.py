@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+
+from app import auth, crud, models
+from app.equipment_status import EquipmentStatusTracker
+from main import app
+
+@pytest.fixture
+def seed_rows():
+    return [models.Equipment(id=1, name="Press #1", type="Forming", status="operational")]
+
+@pytest.mark.asyncio
+async def test_batch_endpoint_returns_the_stored_readings(session_factory, monkeypatch):
+    """Test a batch POST answers with the inserted rows: their ids, server-set timestamps and decoded strings"""
+    monkeypatch.setattr(crud, "tracker", EquipmentStatusTracker())
+
+    async def get_db():
+        async with session_factory() as db:
+            yield db
+
+    monkeypatch.setitem(app.dependency_overrides, auth.get_db, get_db)
+    monkeypatch.setitem(app.dependency_overrides, auth.get_current_user, lambda: models.User(id=1, role="admin"))
+    readings = [
+        {"sensor_type": "temperature", "value": 71.5, "unit": crud.get_sensor_unit("temperature")},
+        {"sensor_type": "pressure", "value": 52.0, "unit": crud.get_sensor_unit("pressure")},
+        {"sensor_type": "vibration", "value": 2.2, "unit": crud.get_sensor_unit("vibration"), "status": "warning"},
+    ]
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post("/equipment/1/sensors/batch", json=readings)
+    assert response.status_code == 200
+    body = response.json()
+
+    async with session_factory() as db:
+        stored = sorted(await crud.get_sensor_data(db, 1), key=lambda reading: reading.id)
+    assert [item["id"] for item in body] == [reading.id for reading in stored]
+    assert [(item["sensor_type"], item["value"], item["unit"], item["status"]) for item in body] == [
+        ("temperature", 71.5, "°C", "normal"), ("pressure", 52.0, "PSI", "normal"),
+        ("vibration", 2.2, "mm/s", "warning")]
+    assert {item["equipment_id"] for item in body} == {1}
+    for item, reading in zip(body, stored):
+        timestamp = datetime.fromisoformat(item["timestamp"])
+        assert timestamp == reading.timestamp
+        assert abs(timestamp.replace(tzinfo=None) - datetime.utcnow()) < timedelta(minutes=1)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        assert (await client.post("/equipment/1/sensors/batch", json=[])).json() == []
@@ -0,0 +1,58 @@
+import json
+from datetime import datetime, timedelta
+from typing import List
+
+import pytest
+from pydantic import TypeAdapter
+
+from app import crud, models, schemas, streaming
+from app.retention import RetentionPolicy, SensorArchiver
+from app.settings import settings
+
+NOW = datetime(2026, 6, 1)
+
+@pytest.fixture
+def seed_rows():
+    return [
+        models.Equipment(id=1, name="Press #1", type="Forming"),
+        *(models.ProductionRecord(equipment_id=1, shift=("morning", "night")[day % 2], output_quantity=day,
+                                  efficiency_percentage=90.0, date=NOW - timedelta(days=day))
+          for day in range(20)),
+        *(models.SensorData(equipment_id=1, sensor_type=sensor_type, value=float(day), unit="u",
+                            timestamp=NOW - timedelta(days=day, hours=hours))
+          for sensor_type, hours in (("temperature", 0), ("vibration", 12)) for day in range(60)),
+    ]
+
+async def ndjson(response) -> List[list]:
+    """The JSON lines of a streamed response, grouped by the chunk they were sent in"""
+    return [[json.loads(line) for line in chunk.decode().splitlines()] async for chunk in response.body_iterator]
+
+@pytest.mark.asyncio
+async def test_ndjson_lines_match_the_json_list_and_arrive_in_batches(session_factory, monkeypatch):
+    """Test a streamed list holds the items of the JSON response in order, one cursor batch per chunk"""
+    monkeypatch.setattr(settings, "db_stream_batch_size", 4)
+    async with session_factory() as db:
+        listed = await crud.get_production_records(db, skip=2, limit=9, shift="morning")
+        chunks = await ndjson(streaming.ndjson_response(
+            await crud.stream_production_records(db, skip=2, limit=9, shift="morning"), schemas.ProductionRecord))
+
+    assert [len(chunk) for chunk in chunks] == [4, 4]
+    assert [item for chunk in chunks for item in chunk] == \
+        TypeAdapter(List[schemas.ProductionRecord]).dump_python(listed, mode="json")
+
+@pytest.mark.asyncio
+async def test_streamed_sensor_data_merges_archived_readings(session_factory, tmp_path, monkeypatch):
+    """Test streamed readings interleave live and archived ones newest first, as the JSON list does"""
+    monkeypatch.setattr(settings, "sensor_archive_dir", str(tmp_path / "archive"))
+    monkeypatch.setattr(settings, "db_stream_batch_size", 7)
+    await SensorArchiver(session_factory, RetentionPolicy(0, {"*/vibration": 10}),
+                         archive_dir=settings.sensor_archive_dir, pause=0).run(now=NOW)
+
+    async with session_factory() as db:
+        for limit, start in ((5, None), (40, None), (500, None), (30, NOW - timedelta(days=25))):
+            listed = await crud.get_sensor_data(db, 1, limit=limit, start=start)
+            batches = await crud.stream_sensor_data(db, 1, limit=limit, start=start)
+            streamed = [reading async for batch in batches for reading in batch]
+            assert [(r.id, r.sensor_type, r.timestamp) for r in streamed] == \
+                [(r.id, r.sensor_type, r.timestamp) for r in listed]
+        assert any(r.sensor_type == "vibration" and r.timestamp < NOW - timedelta(days=10) for r in listed)
@@ -0,0 +1,68 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+
+from app import models
+from app.database import Base, create_engine_for_url
+from app.synthetic import FleetGenerator, SyntheticConfig, generate
+
+async def load(path, seed):
+    engine = create_engine_for_url(f"sqlite+aiosqlite:///{path}")
+    config = SyntheticConfig(equipment=6, readings=4800, sensor_days=2, production_days=20, technicians=2,
+                             seed=seed, chunk_size=1000, end=datetime(2024, 6, 1))
+    await generate(engine, config, log=lambda message: None)
+    async with engine.connect() as conn:
+        counts = {
+            table: (await conn.execute(text(f"SELECT COUNT(*) FROM {table}"))).scalar()
+            for table in ("equipment", "sensor_data", "production_records", "maintenance_logs", "users")
+        }
+        readings = (await conn.execute(text(
+            "SELECT equipment_id, sensor_types.name, value, sensor_statuses.name, timestamp FROM sensor_data "
+            "JOIN sensor_types ON sensor_types.id = sensor_type_id JOIN sensor_statuses ON sensor_statuses.id = status_id "
+            "ORDER BY sensor_data.id"
+        ))).all()
+    await engine.dispose()
+    return counts, readings
+
+@pytest.mark.asyncio
+async def test_generator_is_deterministic_and_sized(tmp_path):
+    """Test the same seed produces identical data of the requested size"""
+    counts, readings = await load(tmp_path / "a.db", seed=7)
+    _, same_readings = await load(tmp_path / "b.db", seed=7)
+    _, other_readings = await load(tmp_path / "c.db", seed=8)
+
+    assert counts["equipment"] == 6
+    assert counts["sensor_data"] == 4800
+    assert counts["production_records"] == 6 * 20 * 3
+    assert counts["users"] == 3 + 2
+    assert readings == same_readings
+    assert readings != other_readings
+
+@pytest.mark.asyncio
+async def test_generated_statuses_follow_sensor_limits(tmp_path):
+    """Test reading statuses agree with the value thresholds"""
+    _, readings = await load(tmp_path / "a.db", seed=7)
+    for _, sensor_type, value, status, _ in readings:
+        if sensor_type == "temperature" and value > 85:
+            assert status == "critical"
+        if sensor_type == "vibration" and 2.0 < value <= 2.5:
+            assert status == "warning"
+        if sensor_type == "pressure" and 50 <= value <= 60:
+            assert status == "normal"
+
+@pytest.mark.asyncio
+async def test_indexes_are_rebuilt_when_a_bulk_load_fails(tmp_path):
+    """Test a load that raises still leaves the table with its secondary indexes"""
+    engine = create_engine_for_url(f"sqlite+aiosqlite:///{tmp_path / 'failed.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    generator = FleetGenerator(SyntheticConfig(seed=1), log=lambda message: None)
+    with pytest.raises(RuntimeError):
+        async with generator._deferred_indexes(engine, models.SensorData.__table__):
+            raise RuntimeError("load failed")
+    async with engine.connect() as conn:
+        indexes = set((await conn.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'sensor_data'"))).scalars())
+    await engine.dispose()
+    assert {index.name for index in models.SensorData.__table__.indexes} <= indexes
@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import numpy as np
+
+from app import timeseries
+
+def reading(i, equipment_id, sensor_type, value, timestamp, status="normal"):
+    return SimpleNamespace(id=i, equipment_id=equipment_id, sensor_type=sensor_type, value=value,
+                           unit="°C" if sensor_type == "temperature" else "mm/s", status=status, timestamp=timestamp)
+
+def test_round_trip_preserves_every_field(tmp_path):
+    """Test irregular timestamps, missing values and statuses survive encoding, grouped into sorted blocks"""
+    start = datetime(2026, 1, 1, 8, 0, 0)
+    rng = np.random.default_rng(1)
+    rows = [reading(1000 + i, 1 + i % 2, ("temperature", "vibration")[i % 3 == 0],
+                    None if i == 7 else round(70 + float(rng.normal()), 1),
+                    start + timedelta(seconds=300 * i + int(rng.integers(-5, 5)), microseconds=i),
+                    "warning" if i % 11 == 0 else "normal")
+            for i in range(500)]
+    rng.shuffle(rows)
+    path = str(tmp_path / "readings.tsc")
+    size = timeseries.write_file(path, rows)
+
+    decoded = []
+    with timeseries.ArchiveReader(path) as reader:
+        assert len(reader.blocks) == 4
+        for info in reader.find():
+            block = reader.read(info)
+            assert np.all(np.diff(block.timestamps) >= 0)
+            for args in zip(block.ids.tolist(), block.values.tolist(), block.statuses.tolist(),
+                            timeseries.from_micros(block.timestamps, reader.aware)):
+                decoded.append((args[0], block.equipment_id, block.sensor_type,
+                                None if args[1] != args[1] else args[1], block.unit, args[2], args[3]))
+
+    assert sorted(decoded) == sorted((r.id, r.equipment_id, r.sensor_type, r.value, r.unit, r.status, r.timestamp)
+                                     for r in rows)
+    assert size < 500 * 8
+
+def test_find_and_read_select_blocks_and_time_ranges(tmp_path):
+    """Test lookups skip non-matching blocks and cut to [start, end), with aware timestamps kept in UTC"""
+    start = datetime(2026, 3, 1, tzinfo=timezone.utc)
+    rows = [reading(i, 1, "temperature", 70.0 + i / 10, start + timedelta(minutes=i)) for i in range(100)]
+    rows += [reading(100 + i, 2, "temperature", 50.0, start + timedelta(minutes=i)) for i in range(100)]
+    path = str(tmp_path / "aware.tsc")
+    timeseries.write_file(path, rows)
+
+    low = timeseries.to_micros(start + timedelta(minutes=10))
+    high = timeseries.to_micros(start + timedelta(minutes=20))
+    with timeseries.ArchiveReader(path) as reader:
+        blocks = list(reader.find(equipment_id=1, sensor_type="temperature", start=low, end=high))
+        block = reader.read(blocks[0], low, high)
+        assert list(reader.find(equipment_id=1, start=timeseries.to_micros(start + timedelta(days=1)))) == []
+        timestamps = timeseries.from_micros(block.timestamps, reader.aware)
+
+    assert len(blocks) == 1
+    assert block.ids.tolist() == list(range(10, 20))
+    assert block.values.tolist() == [70.0 + i / 10 for i in range(10, 20)]
+    assert timestamps[0] == start + timedelta(minutes=10)
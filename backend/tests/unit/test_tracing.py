@@ -0,0 +1,43 @@
+import pytest
+
+from app import tracing
+
+def test_parse_traceparent():
+    """Test W3C traceparent headers are parsed and malformed ones rejected"""
+    trace_id, parent_id, sampled = tracing.parse_traceparent(
+        "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+    )
+    assert trace_id == "4bf92f3577b34da6a3ce929d0e0e4736"
+    assert parent_id == "00f067aa0ba902b7"
+    assert sampled is True
+
+    assert tracing.parse_traceparent("00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-00")[2] is False
+    assert tracing.parse_traceparent("garbage") is None
+    assert tracing.parse_traceparent("00-zzz-00f067aa0ba902b7-01") is None
+
+def test_should_sample_is_deterministic_per_trace():
+    """Test the sampling decision depends only on the trace id and rate"""
+    trace_id = "4bf92f3577b34da6" + "0000000000000001"
+    assert tracing.should_sample(trace_id, 0.5) is True
+    assert tracing.should_sample("4bf92f3577b34da6" + "ffffffffffffffff", 0.5) is False
+    assert tracing.should_sample(trace_id, 0.0) is False
+
+@pytest.mark.asyncio
+async def test_traced_records_nested_spans_only_inside_a_trace():
+    """Test traced functions are pass-through without an active span and nest spans within one"""
+    async def inner():
+        return 42
+
+    traced_inner = tracing.traced(inner, name="inner")
+    assert await traced_inner() == 42
+
+    trace = tracing.Trace("4bf92f3577b34da6a3ce929d0e0e4736")
+    root = tracing.Span(trace, "root")
+    token = tracing._current_span.set(root)
+    try:
+        assert await traced_inner() == 42
+    finally:
+        tracing._current_span.reset(token)
+
+    assert [span.name for span in trace.spans] == ["inner"]
+    assert trace.spans[0].parent_id == root.span_id